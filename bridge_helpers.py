@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
 """Shared bridge routing helpers (no Twisted / heavy imports)."""
 
+import heapq
+import itertools
 import re
+import sys
 import time
+from collections.abc import Mapping, MutableMapping
+from functools import lru_cache
 
+from dmr_utils3 import bptc
 from dmr_utils3.utils import bytes_3
+from const import HBPF_DATA_SYNC, HBPF_SLT_VHEAD, HBPF_SLT_VTERM
 from ipsc_const import is_routing_master
 
 DIAL_A_TG = 9
@@ -58,6 +65,68 @@ def dmr_seq_delta(sequence, previous):
     return (int(sequence) - int(previous)) & 0xFF
 
 
+# A DMR burst payload is 33 bytes / 264 bits (bit 0 = MSB of byte 0). Full LC
+# frames keep bits 98-165 (slot type + sync) and carry the LC either side of
+# them; voice bursts B-E carry a 32-bit embedded LC fragment at bits 116-147.
+_FULL_LC_KEEP = ((1 << 68) - 1) << 98
+_EMB_LC_KEEP = ((1 << 264) - 1) ^ (((1 << 32) - 1) << 116)
+_LOW_98 = (1 << 98) - 1
+
+
+def _full_lc_template(lc_bits):
+    _value = int(lc_bits.to01(), 2)
+    return ((_value >> 98) << 166) | (_value & _LOW_98)
+
+
+@lru_cache(maxsize=1024)
+def lc_rewrite_templates(dst_lc):
+    """Precompute int templates for rewriting a burst's LC to dst_lc.
+
+    Returns (header, terminator, embedded) where embedded is indexed by
+    burst 1-4 (B-E). Cached by LC, so every leg with the same TGID and
+    source shares one BPTC encode per call.
+    """
+    _emb = bptc.encode_emblc(dst_lc)
+    return (
+        _full_lc_template(bptc.encode_header_lc(dst_lc)),
+        _full_lc_template(bptc.encode_terminator_lc(dst_lc)),
+        (None,) + tuple(int(_emb[i].to01(), 2) << 116 for i in (1, 2, 3, 4)),
+    )
+
+
+def rewrite_burst_lc(dmrpkt, frame_type, dtype_vseq, templates):
+    """Return the 33-byte burst with its full or embedded LC from templates."""
+    if frame_type == HBPF_DATA_SYNC and dtype_vseq == HBPF_SLT_VHEAD:
+        _keep, _tpl = _FULL_LC_KEEP, templates[0]
+    elif frame_type == HBPF_DATA_SYNC and dtype_vseq == HBPF_SLT_VTERM:
+        _keep, _tpl = _FULL_LC_KEEP, templates[1]
+    elif dtype_vseq in (1, 2, 3, 4):
+        _keep, _tpl = _EMB_LC_KEEP, templates[2][dtype_vseq]
+    else:
+        return dmrpkt
+    return ((int.from_bytes(dmrpkt, 'big') & _keep) | _tpl).to_bytes(33, 'big')
+
+
+def fanout_payload(fanout, data, tgid, tmp_bits, dmrpkt, frame_type,
+                   dtype_vseq, templates, trailer=b''):
+    """Return one leg's rewritten DMRD packet, built once per signature.
+
+    fanout is a per-frame dict: legs sharing TGID, slot bits, LC templates
+    and trailer (e.g. GENERATOR slots) reuse the same bytes. The 4-byte
+    peer field is left as received; HBSYSTEM.send_peer patches it per peer.
+    """
+    _key = (tgid, tmp_bits, trailer)
+    _hit = fanout.get(_key)
+    if _hit is not None and _hit[0] is templates:
+        return _hit[1]
+    _packet = b''.join([
+        data[:8], tgid, data[11:15], tmp_bits.to_bytes(1, 'big'), data[16:20],
+        rewrite_burst_lc(dmrpkt, frame_type, dtype_vseq, templates), trailer,
+    ])
+    fanout[_key] = (templates, _packet)
+    return _packet
+
+
 def earliest_obp_owner(openbridge_systems, system_objects, stream_id,
                        dst_id, rf_src, now, stream_timeout):
     """Return the earliest active OBP claimant, including the local ingress."""
@@ -148,6 +217,131 @@ def is_parrot_bridge(bridge_name):
     return is_parrot_talkgroup(bridge_name)
 
 
+# Bridge legs: every BRIDGES entry has the same ten keys, and GENERATOR
+# meshes hold 2 * N_masters of them per TG, so they are slotted objects
+# rather than dicts. Names and TGIDs are interned and ON/OFF/RESET are
+# shared tuples (never mutated in place; callers always assign a new list).
+_LEG_FIELDS = ('SYSTEM', 'TS', 'TGID', 'ACTIVE', 'TIMEOUT', 'TO_TYPE',
+               'OFF', 'ON', 'RESET', 'TIMER')
+# Optional keys: present only while set (dial-a-tg link owner)
+_LEG_OPTIONAL = ('LINKER', 'LINKER_PEER')
+_LEG_SLOTS = frozenset(_LEG_FIELDS + _LEG_OPTIONAL)
+_LEG_TRIGGERS = frozenset(('OFF', 'ON', 'RESET'))
+_SHARED_TRIGGERS = {(): ()}
+_SHARED_TGIDS = {}
+
+
+def shared_triggers(value):
+    """Return ON/OFF/RESET as a canonical tuple shared by every identical leg."""
+    if not value:
+        return ()
+    _value = tuple(value)
+    return _SHARED_TRIGGERS.setdefault(_value, _value)
+
+
+def _shared_tgid(tgid):
+    if isinstance(tgid, bytes):
+        return _SHARED_TGIDS.setdefault(tgid, tgid)
+    return tgid
+
+
+class BridgeLeg(MutableMapping):
+    """One BRIDGES entry. Behaves as a mapping, so leg['ACTIVE'] = True,
+    leg.get('LINKER') and rules-file style access keep working; keys
+    outside the usual set are kept in a small side dict."""
+
+    __slots__ = _LEG_FIELDS + _LEG_OPTIONAL + ('_extra',)
+
+    def __init__(self, SYSTEM, TS, TGID, ACTIVE=False, TIMEOUT='', TO_TYPE='NONE',
+                 OFF=(), ON=(), RESET=(), TIMER=0.0, **extra):
+        self.SYSTEM = sys.intern(SYSTEM) if type(SYSTEM) is str else SYSTEM
+        self.TS = TS
+        self.TGID = _shared_tgid(TGID)
+        self.ACTIVE = ACTIVE
+        self.TIMEOUT = TIMEOUT
+        self.TO_TYPE = TO_TYPE
+        self.OFF = shared_triggers(OFF)
+        self.ON = shared_triggers(ON)
+        self.RESET = shared_triggers(RESET)
+        self.TIMER = TIMER
+        self._extra = None
+        for _key, _value in extra.items():
+            self[_key] = _value
+
+    @classmethod
+    def from_mapping(cls, entry):
+        """Build a leg from a rules-file dict (or another leg)."""
+        if isinstance(entry, cls):
+            return entry
+        _entry = dict(entry)
+        return cls(**_entry)
+
+    def __getitem__(self, key):
+        if key in _LEG_SLOTS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in _LEG_SLOTS:
+            return getattr(self, key, default)
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __contains__(self, key):
+        if key in _LEG_SLOTS:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def __setitem__(self, key, value):
+        if key in _LEG_SLOTS:
+            if key in _LEG_TRIGGERS:
+                value = shared_triggers(value)
+            elif key == 'TGID':
+                value = _shared_tgid(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _LEG_SLOTS:
+            if key in _LEG_FIELDS or not hasattr(self, key):
+                raise KeyError(key)
+            delattr(self, key)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        yield from _LEG_FIELDS
+        for _key in _LEG_OPTIONAL:
+            if hasattr(self, _key):
+                yield _key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return (len(_LEG_FIELDS) + sum(1 for _key in _LEG_OPTIONAL if hasattr(self, _key))
+                + (len(self._extra) if self._extra else 0))
+
+    def copy(self):
+        return BridgeLeg(**dict(self))
+
+    def __reduce__(self):
+        return (BridgeLeg.from_mapping, (dict(self),))
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
 def build_bridge_index(bridges):
     """Map (system, ts, tgid_bytes) -> set(bridge_names). Matches BRIDGE_IDX layout."""
     index = {}
@@ -593,6 +787,277 @@ def reset_dial_reflector_timers_on_user_activity(bridges, system, rf_src, peer_i
     return reset_bridges
 
 
+# Leg expiry: rule timers fire from a deadline queue instead of a full sweep.
+class ExpiryQueue:
+    """Min-heap of deadlines with at most one live entry per key.
+
+    schedule() only pushes when the new deadline is earlier than the one
+    already pending, so timer extensions cost nothing: the older entry
+    fires early, the caller finds nothing due and schedules again. Entries
+    superseded by an earlier deadline or discard() are dropped lazily.
+    """
+    __slots__ = ('_heap', '_next', '_seq')
+
+    def __init__(self):
+        self._heap = []
+        self._next = {}
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._next)
+
+    def __contains__(self, key):
+        return key in self._next
+
+    def schedule(self, key, deadline):
+        _pending = self._next.get(key)
+        if _pending is not None and _pending <= deadline:
+            return False
+        self._next[key] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._seq), key))
+        if len(self._heap) > 2 * len(self._next) + 1024:
+            self._compact()
+        return True
+
+    def discard(self, key):
+        self._next.pop(key, None)
+
+    def clear(self):
+        self._heap = []
+        self._next = {}
+
+    def next_deadline(self):
+        while self._heap and self._next.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Remove and return the keys whose deadline is <= now, earliest first."""
+        _due = []
+        _heap = self._heap
+        while _heap and _heap[0][0] <= now:
+            _deadline, _seq, _key = heapq.heappop(_heap)
+            if self._next.get(_key) == _deadline:
+                del self._next[_key]
+                _due.append(_key)
+        return _due
+
+    def _compact(self):
+        self._heap = [(_deadline, next(self._seq), _key) for _key, _deadline in self._next.items()]
+        heapq.heapify(self._heap)
+
+
+# OpenBridge stream state: an OBP stream times out after this much silence ...
+OBP_STREAM_TIMEOUT_S = 5
+# ... and is forgotten this long after its last frame (timed out or finished)
+OBP_STREAM_HOLD_S = 180
+# Upper bound on streams remembered per OpenBridge system
+OBP_STREAM_MAX = 8192
+
+
+def _heard(stream):
+    _last = stream.get('LAST', stream.get('START'))
+    return 0.0 if _last is None else _last
+
+
+class ObpStreamTable(dict):
+    """routerOBP.STATUS: per-stream dicts keyed by stream ID, with expiry.
+
+    Reads are plain dict operations. Storing a stream schedules it in an
+    ExpiryQueue at LAST (or START) + timeout; LAST updates cost nothing,
+    and expire() reschedules an entry that is not due yet. A silent stream
+    is marked '_to' and returned once for the timeout log/report. It is
+    dropped hold seconds after its last frame, as is a '_fin' stream. Past
+    maxlen the oldest finished or timed-out stream is evicted; only when
+    every stream is live does the least recently heard one go, counted in
+    evicted_live.
+    """
+    __slots__ = ('maxlen', 'timeout', 'hold', 'opened', 'timed_out', 'removed', 'evicted', 'evicted_live',
+                 '_live_unreported', '_expiry')
+
+    def __init__(self, maxlen=OBP_STREAM_MAX, timeout=OBP_STREAM_TIMEOUT_S, hold=OBP_STREAM_HOLD_S):
+        dict.__init__(self)
+        self.maxlen = maxlen
+        self.timeout = timeout
+        self.hold = hold
+        self.opened = self.timed_out = self.removed = self.evicted = self.evicted_live = 0
+        self._live_unreported = 0
+        self._expiry = ExpiryQueue()
+
+    def __setitem__(self, stream_id, stream):
+        if stream_id not in self:
+            if len(self) >= self.maxlen:
+                self._evict()
+            self.opened += 1
+        dict.__setitem__(self, stream_id, stream)
+        _last = stream.get('LAST', stream.get('START'))
+        self._expiry.schedule(stream_id, (time.time() if _last is None else _last) + self.timeout)
+
+    def _evict(self):
+        # Insertion order is roughly age, so a finished stream is usually first
+        for _stream_id, _stream in dict.items(self):
+            if '_to' in _stream or '_fin' in _stream:
+                break
+        else:
+            _stream_id = min(self, key=lambda _sid: _heard(dict.__getitem__(self, _sid)))
+            self.evicted_live += 1
+            self._live_unreported += 1
+        self.pop(_stream_id)
+        self.evicted += 1
+
+    def live_evictions(self):
+        """Live streams evicted since the last call, for the trimmer to log."""
+        _count, self._live_unreported = self._live_unreported, 0
+        return _count
+
+    def __delitem__(self, stream_id):
+        dict.__delitem__(self, stream_id)
+        self._expiry.discard(stream_id)
+
+    def pop(self, stream_id, *default):
+        self._expiry.discard(stream_id)
+        return dict.pop(self, stream_id, *default)
+
+    def clear(self):
+        dict.clear(self)
+        self._expiry.clear()
+
+    def expire(self, now):
+        """Return ([(stream_id, stream) newly timed out], [(stream_id, stream) removed])."""
+        _timed_out = []
+        _removed = []
+        for _stream_id in self._expiry.pop_due(now):
+            _stream = dict.get(self, _stream_id)
+            if _stream is None:
+                continue
+            _last = _stream.get('LAST')
+            if _last is None:
+                # Stub that never carried a frame: start its clock now
+                _stream['LAST'] = _last = now
+            if '_to' in _stream or '_fin' in _stream:
+                if _last < now - self.hold:
+                    dict.__delitem__(self, _stream_id)
+                    _removed.append((_stream_id, _stream))
+                    continue
+                _deadline = _last + self.hold
+            elif _last < now - self.timeout:
+                _stream['_to'] = True
+                _timed_out.append((_stream_id, _stream))
+                _deadline = _last + self.hold
+            else:
+                _deadline = _last + self.timeout
+            self._expiry.schedule(_stream_id, _deadline)
+        self.timed_out += len(_timed_out)
+        self.removed += len(_removed)
+        return _timed_out, _removed
+
+
+# Frames remembered per stream for duplicate detection (~3.8 s of voice at 60 ms a frame)
+FRAME_RING_SIZE = 64
+
+
+class FrameRing:
+    """Fingerprints of a stream's last *size* accepted frames.
+
+    A fingerprint is hash() of the 53-byte DMRD frame, sequence number
+    included, so repeated payloads (silence) at different sequence numbers
+    are distinct. add() is O(1): a set for membership and a ring of the same
+    hashes for eviction, filled on demand, so memory stays fixed however
+    long the stream runs.
+    """
+    __slots__ = ('size', '_ring', '_seen', '_pos')
+
+    def __init__(self, size=FRAME_RING_SIZE):
+        self.size = size
+        self._ring = []
+        self._seen = set()
+        self._pos = 0
+
+    def __len__(self):
+        return len(self._ring)
+
+    def __contains__(self, frame):
+        return hash(frame) in self._seen
+
+    def add(self, frame):
+        """Remember *frame*; return False if it is already among the recent ones."""
+        _key = hash(frame)
+        if _key in self._seen:
+            return False
+        _ring = self._ring
+        if len(_ring) < self.size:
+            _ring.append(_key)
+        else:
+            self._seen.discard(_ring[self._pos])
+            _ring[self._pos] = _key
+            self._pos = (self._pos + 1) % self.size
+        self._seen.add(_key)
+        return True
+
+    def clear(self):
+        self._ring = []
+        self._seen = set()
+        self._pos = 0
+
+
+def leg_timer_pending(entry):
+    """ON legs wait to deactivate, OFF legs to re-activate; both on TIMER."""
+    if entry.get('TO_TYPE') == 'ON':
+        return bool(entry.get('ACTIVE'))
+    if entry.get('TO_TYPE') == 'OFF':
+        return not entry.get('ACTIVE')
+    return False
+
+
+def bridge_next_deadline(entries):
+    """Earliest TIMER among a bridge's legs with a pending rule timer, or None."""
+    _next = None
+    for entry in entries:
+        if not leg_timer_pending(entry):
+            continue
+        timer = entry.get('TIMER')
+        if isinstance(timer, (int, float)) and (_next is None or timer < _next):
+            _next = timer
+    return _next
+
+
+# Sticky TG: reverse index (system, ts, tgid) -> subscribers over SUB_MAP
+# entries (system, ts, tg, timestamp[, peer_id]). 3-element entries and
+# entries without a TG are not indexed.
+def sticky_index_key(entry):
+    try:
+        if len(entry) >= 4 and entry[2] is not None:
+            return (entry[0], entry[1], entry[2])
+    except TypeError:
+        pass
+    return None
+
+
+def build_sticky_index(sub_map):
+    index = {}
+    for subscriber, entry in sub_map.items():
+        key = sticky_index_key(entry)
+        if key is not None:
+            index.setdefault(key, set()).add(subscriber)
+    return index
+
+
+def sticky_index_update(index, subscriber, old_entry, new_entry):
+    """Move *subscriber* from old_entry's key to new_entry's (either may be None)."""
+    old_key = sticky_index_key(old_entry) if old_entry is not None else None
+    new_key = sticky_index_key(new_entry) if new_entry is not None else None
+    if old_key == new_key:
+        return
+    if old_key is not None:
+        subscribers = index.get(old_key)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del index[old_key]
+    if new_key is not None:
+        index.setdefault(new_key, set()).add(subscriber)
+
+
 # STAT trimmer: prune idle master ON legs and expire cold stat bridges.
 STAT_TRIMMER_INTERVAL_S = 120
 STAT_ON_LEG_IDLE_TTL_S = 3600
@@ -693,7 +1158,7 @@ def clean_report_trigger_list(value):
 
 def build_report_bridge_leg(bridge_system, now_fn=None):
     """Build one slim report leg dict, or None if the leg should be omitted."""
-    if not isinstance(bridge_system, dict):
+    if not isinstance(bridge_system, Mapping):
         return None
     if 'SYSTEM' not in bridge_system or 'TS' not in bridge_system or 'TGID' not in bridge_system:
         return None
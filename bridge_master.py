@@ -34,14 +34,13 @@ This program currently only works with group voice calls.
 
 # Python modules we need
 import sys
-from bitarray import bitarray
-from time import time,sleep,perf_counter
+from time import time,perf_counter
 import importlib.util
 import re
 import copy
 from setproctitle import setproctitle
 from collections import deque
-from threading import Event
+from collections.abc import Mapping
 
 #from crccheck.crc import Crc32
 
@@ -53,8 +52,9 @@ from twisted.internet.defer import inlineCallbacks
 
 # Things we import from the main hblink module
 from hblink import HBSYSTEM, OPENBRIDGE, systems, hblink_handler, reportFactory, REPORT_OPCODES, mk_aliases, acl_check
+from hblink import SOURCE_SERVERS, STREAM_VERDICTS
 from dmr_utils3.utils import bytes_3, int_id, get_alias, bytes_4
-from dmr_utils3 import decode, bptc, const
+from dmr_utils3 import decode, const
 import config
 from config import acl_build
 import log
@@ -72,6 +72,14 @@ from bridge_helpers import (
     DIAL_A_TG,
     DIAL_A_TG_BYTES,
     PARROT_TG,
+    BridgeLeg,
+    ExpiryQueue,
+    FrameRing,
+    ObpStreamTable,
+    bridge_next_deadline,
+    leg_timer_pending,
+    build_sticky_index,
+    sticky_index_update,
     is_dial_service_code,
     is_invalid_dial_reflector,
     is_parrot_talkgroup,
@@ -105,7 +113,19 @@ from bridge_helpers import (
     hbp_claim_is_local,
     hbp_should_scan_obp,
     hbp_short_gap_continuation,
+    lc_rewrite_templates,
+    fanout_payload,
 )
+from subscriber_store import (
+    SubscriberBuckets,
+    SubscriberJournal,
+    SubscriberRecord,
+    load_sub_map,
+    write_snapshot,
+)
+from report_delta import delta_message, diff_bridges, full_message
+from report_events import BridgeEvent, EventError, format_csv, pack_events
+from voice_playout import PlayoutScheduler
 # NOTE: 'words' is loaded dynamically via readAMBE() at runtime (see line ~2689)
 #from voice_lib import words
 
@@ -173,6 +193,9 @@ def config_reports(_config, _factory):
                     i = i +1
             logger.info('(REPORT) %s systems have at least one peer',i)
             logger.info('(REPORT) Subscriber Map has %s entries',len(SUB_MAP))
+            if _server.dropped or _server.coalesced:
+                logger.info('(REPORT) Report client queues: %s dropped, %s coalesced since startup',
+                            _server.dropped, _server.coalesced)
 
         def _reporting_errback(failure):
             logger.error('(REPORT) Unhandled error in reporting loop.\n %s', failure)
@@ -203,6 +226,32 @@ def config_reports(_config, _factory):
 #     to the full scan and schedules a rebuild (belt-and-suspenders safety).
 # ---------------------------------------------------------------------------
 BRIDGE_IDX = {}
+# Reverse of BRIDGE_IDX: bridge_name -> set of keys it was indexed under, so
+# removing or replacing one bridge only touches that bridge's own keys.
+BRIDGE_IDX_KEYS = {}
+
+# Rule timers. Each bridge with a pending ON/OFF TIMER has one entry in
+# _LEG_EXPIRY at its earliest deadline (armed by _set_leg_timer and the
+# bridge index); leg_expiry_loop evaluates only the bridges that are due.
+# rule_timer_loop is a rare consistency sweep over every bridge: it drops
+# unused bridges and warns about any pending TIMER that nothing armed.
+_LEG_EXPIRY = ExpiryQueue()
+_LEG_EXPIRY_TICK_S = 1.0
+_STICKY_RECHECK_S = 52.0
+RULE_TIMER_SWEEP_S = 600
+
+# Sticky TG: (system, ts, tgid) -> set of subscribers whose SUB_MAP entry
+# names that TG. SUB_MAP writes go through _sub_map_set / _sub_map_pop so
+# the rule timer's sticky check is a lookup, not a SUB_MAP scan.
+STICKY_IDX = {}
+# Subscribers bucketed by last-heard time, so SubMapTrimmer only visits expired ones
+SUB_BUCKETS = SubscriberBuckets()
+SUB_MAP_TTL_S = 86400
+# SubscriberJournal when ALIASES SUB_MAP_JOURNAL is set (see subscriber_store)
+SUB_JOURNAL = None
+SUB_JOURNAL_FLUSH_S = 1.0
+# Idents, announcements and AMBE file playback, paced by one 60ms reactor timer
+VOICE_PLAYOUT = PlayoutScheduler(reactor)
 
 # Routing statistics counters (reset every _ROUTE_STATS_INTERVAL seconds)
 _ROUTE_STATS = {'packets': 0, 'index_hits': 0, 'index_misses': 0, 'fallbacks': 0}
@@ -279,21 +328,57 @@ def _remember_term(key, data, now):
                 _TERM_TOMBSTONES.pop(old_key, None)
 
 
+def _arm_bridge_expiry(bridge_name):
+    """Queue *bridge_name* for its earliest pending leg TIMER.
+
+    Call after a leg is activated or a TIMER is shortened. Extensions are
+    safe to skip: the earlier entry fires, finds nothing due and re-arms.
+    """
+    _next = bridge_next_deadline(BRIDGES.get(bridge_name, ()))
+    if _next is not None:
+        _LEG_EXPIRY.schedule(bridge_name, _next)
+
+
+def _set_leg_timer(bridge_name, entry, timer=None, active=None):
+    """Set a leg's ACTIVE and/or TIMER and arm *bridge_name* for it.
+
+    Every TIMER/ACTIVE change to an existing leg goes through here, except
+    _bridge_timer_pass, whose callers schedule its result. New legs are
+    armed when their bridge is indexed (_idx_add_bridge, _idx_replace_bridge,
+    rebuild_bridge_index), and so are bridges changed by the bridge_helpers
+    mutators.
+    """
+    if active is not None:
+        entry['ACTIVE'] = active
+    if timer is not None:
+        entry['TIMER'] = timer
+    if leg_timer_pending(entry):
+        _LEG_EXPIRY.schedule(bridge_name, entry['TIMER'])
+
+
 def _idx_add_bridge(bridge_name):
     """Add all entries for *bridge_name* into BRIDGE_IDX."""
+    _keys = BRIDGE_IDX_KEYS.get(bridge_name)
     for e in BRIDGES.get(bridge_name, ()):
         _key = (e['SYSTEM'], e['TS'], e['TGID'])
         if _key not in BRIDGE_IDX:
             BRIDGE_IDX[_key] = set()
         BRIDGE_IDX[_key].add(bridge_name)
+        if _keys is None:
+            _keys = BRIDGE_IDX_KEYS[bridge_name] = set()
+        _keys.add(_key)
+    _arm_bridge_expiry(bridge_name)
 
 
 def _idx_remove_bridge(bridge_name):
     """Remove all BRIDGE_IDX entries that reference *bridge_name*."""
-    empty_keys = [k for k, v in BRIDGE_IDX.items() if bridge_name in v]
-    for _key in empty_keys:
-        BRIDGE_IDX[_key].discard(bridge_name)
-        if not BRIDGE_IDX[_key]:
+    _LEG_EXPIRY.discard(bridge_name)
+    for _key in BRIDGE_IDX_KEYS.pop(bridge_name, ()):
+        _names = BRIDGE_IDX.get(_key)
+        if _names is None:
+            continue
+        _names.discard(bridge_name)
+        if not _names:
             del BRIDGE_IDX[_key]
 
 
@@ -305,16 +390,25 @@ def _idx_replace_bridge(bridge_name):
 
 def rebuild_bridge_index():
     """Rebuild BRIDGE_IDX from scratch.  Call after bulk BRIDGES mutations."""
-    global BRIDGE_IDX
+    global BRIDGE_IDX, BRIDGE_IDX_KEYS
     _t0 = time()
     new_idx = {}
+    new_keys = {}
     for _bname, _entries in BRIDGES.items():
+        _keys = set()
         for e in _entries:
             _key = (e['SYSTEM'], e['TS'], e['TGID'])
             if _key not in new_idx:
                 new_idx[_key] = set()
             new_idx[_key].add(_bname)
+            _keys.add(_key)
+        if _keys:
+            new_keys[_bname] = _keys
     BRIDGE_IDX = new_idx
+    BRIDGE_IDX_KEYS = new_keys
+    _LEG_EXPIRY.clear()
+    for _bname in BRIDGES:
+        _arm_bridge_expiry(_bname)
     _BRIDGE_IDX_LAST_REBUILD[0] = time()
     _elapsed_ms = (_BRIDGE_IDX_LAST_REBUILD[0] - _t0) * 1000.0
     if _elapsed_ms >= 20.0:
@@ -404,9 +498,10 @@ def make_bridges(_rules):
                 _system['OFF'][i] = bytes_3(_system['OFF'][i])
             _system['TIMEOUT']    = _system['TIMEOUT']*60
             if _system['ACTIVE'] == True:
-                _system['TIMER']  = time() + _system['TIMEOUT']
+                _set_leg_timer(_bridge, _system, time() + _system['TIMEOUT'])
             else:
-                _system['TIMER']  = time()
+                _set_leg_timer(_bridge, _system, time())
+        _rules[_bridge] = [BridgeLeg.from_mapping(_system) for _system in _rules[_bridge]]
         
        # if _bridge[0:1] == '#':
         #    continue
@@ -425,13 +520,13 @@ def make_bridges(_rules):
             if _bridge[0:1] != '#':
                 _tmout = CONFIG['SYSTEMS'][_confsystem]['DEFAULT_UA_TIMER']
                 if ts1 == False:
-                    _rules[_bridge].append({'SYSTEM': _confsystem, 'TS': 1, 'TGID': bytes_3(int(_bridge)),'ACTIVE': False,'TIMEOUT': _tmout * 60,'TO_TYPE': 'ON','OFF': [],'ON': [bytes_3(int(_bridge)),],'RESET': [], 'TIMER': time()})
+                    _rules[_bridge].append(BridgeLeg(SYSTEM=_confsystem, TS=1, TGID=bytes_3(int(_bridge)),ACTIVE=False,TIMEOUT=_tmout * 60,TO_TYPE='ON',ON=[bytes_3(int(_bridge)),],TIMER=time()))
                 if ts2 == False:
-                    _rules[_bridge].append({'SYSTEM': _confsystem, 'TS': 2, 'TGID': bytes_3(int(_bridge)),'ACTIVE': False,'TIMEOUT': _tmout * 60,'TO_TYPE': 'ON','OFF': [],'ON': [bytes_3(int(_bridge)),],'RESET': [], 'TIMER': time()})
+                    _rules[_bridge].append(BridgeLeg(SYSTEM=_confsystem, TS=2, TGID=bytes_3(int(_bridge)),ACTIVE=False,TIMEOUT=_tmout * 60,TO_TYPE='ON',ON=[bytes_3(int(_bridge)),],TIMER=time()))
             else:
                 _tmout = CONFIG['SYSTEMS'][_confsystem]['DEFAULT_UA_TIMER']
                 if ts2 == False:
-                    _rules[_bridge].append({'SYSTEM': _confsystem, 'TS': 2, 'TGID': bytes_3(9),'ACTIVE': False,'TIMEOUT': _tmout * 60,'TO_TYPE': 'ON','OFF': [bytes_3(4000)],'ON': [],'RESET': [], 'TIMER': time()})
+                    _rules[_bridge].append(BridgeLeg(SYSTEM=_confsystem, TS=2, TGID=bytes_3(9),ACTIVE=False,TIMEOUT=_tmout * 60,TO_TYPE='ON',OFF=[bytes_3(4000)],TIMER=time()))
     
     return _rules
 
@@ -483,22 +578,22 @@ def augment_bridges_for_masters():
             _tmout = CONFIG['SYSTEMS'][_confsystem]['DEFAULT_UA_TIMER']
             if _bridge[0:1] != '#':
                 if not ts1:
-                    BRIDGES[_bridge].append({
-                        'SYSTEM': _confsystem, 'TS': 1, 'TGID': bytes_3(_bridge_tgid),
-                        'ACTIVE': False, 'TIMEOUT': _tmout * 60, 'TO_TYPE': 'ON',
-                        'OFF': [], 'ON': [bytes_3(_bridge_tgid)], 'RESET': [], 'TIMER': time()})
+                    BRIDGES[_bridge].append(BridgeLeg(
+                        SYSTEM=_confsystem, TS=1, TGID=bytes_3(_bridge_tgid),
+                        ACTIVE=False, TIMEOUT=_tmout * 60, TO_TYPE='ON',
+                        ON=[bytes_3(_bridge_tgid)], TIMER=time()))
                     _added += 1
                 if not ts2:
-                    BRIDGES[_bridge].append({
-                        'SYSTEM': _confsystem, 'TS': 2, 'TGID': bytes_3(_bridge_tgid),
-                        'ACTIVE': False, 'TIMEOUT': _tmout * 60, 'TO_TYPE': 'ON',
-                        'OFF': [], 'ON': [bytes_3(_bridge_tgid)], 'RESET': [], 'TIMER': time()})
+                    BRIDGES[_bridge].append(BridgeLeg(
+                        SYSTEM=_confsystem, TS=2, TGID=bytes_3(_bridge_tgid),
+                        ACTIVE=False, TIMEOUT=_tmout * 60, TO_TYPE='ON',
+                        ON=[bytes_3(_bridge_tgid)], TIMER=time()))
                     _added += 1
             elif not ts2:
-                BRIDGES[_bridge].append({
-                    'SYSTEM': _confsystem, 'TS': 2, 'TGID': bytes_3(9),
-                    'ACTIVE': False, 'TIMEOUT': _tmout * 60, 'TO_TYPE': 'ON',
-                    'OFF': [bytes_3(4000)], 'ON': [], 'RESET': [], 'TIMER': time()})
+                BRIDGES[_bridge].append(BridgeLeg(
+                    SYSTEM=_confsystem, TS=2, TGID=bytes_3(9),
+                    ACTIVE=False, TIMEOUT=_tmout * 60, TO_TYPE='ON',
+                    OFF=[bytes_3(4000)], TIMER=time()))
                 _added += 1
 
     if _removed or _added:
@@ -507,11 +602,44 @@ def augment_bridges_for_masters():
                     _removed, _added)
 
 
+def augment_bridges_for_shards():
+    """Give every group and reflector bridge a leg to each sibling shard (SHARDS > 1).
+
+    Rules bridges never list the OBP-SHARD-n links; make_single_bridge,
+    make_stat_bridge and make_single_reflector add them to bridges created
+    at runtime like any other OBP system. Same TG range as those automatic
+    OBP legs: parrot and TGs < 59 stay local.
+    """
+    _links = [_system for _system in CONFIG['SYSTEMS'] if CONFIG['SYSTEMS'][_system].get('_SHARD_LINK')]
+    _added = 0
+    for _bridge in BRIDGES:
+        if is_parrot_bridge(_bridge):
+            continue
+        try:
+            _bridge_tgid = int(_bridge[1:]) if _bridge[0:1] == '#' else int(_bridge)
+        except ValueError:
+            continue
+        if _bridge_tgid < 59 or 9990 <= _bridge_tgid <= 9999:
+            continue
+        _present = {_entry['SYSTEM'] for _entry in BRIDGES[_bridge]}
+        for _link in _links:
+            if _link not in _present:
+                BRIDGES[_bridge].append(BridgeLeg(
+                    SYSTEM=_link, TS=1, TGID=bytes_3(_bridge_tgid),
+                    ACTIVE=True, TIMEOUT='', TO_TYPE='NONE',
+                    TIMER=time()))
+                _added += 1
+    if _added:
+        rebuild_bridge_index()
+        logger.info('(ROUTER) Shard bridge augment: added %s shard link legs', _added)
+
+
 def _ensure_master_on_legs(bridge_name, system):
-    """Add missing UA ON legs for a routing master on a lazy STAT bridge.
+    """Add missing UA ON legs for a routing master on a lazy STAT or UA bridge.
 
-    make_stat_bridge only creates OBP STAT legs; master ON legs are added on demand
-    when this hotspot/IPSC actually keys or needs the TG.
+    make_stat_bridge only creates OBP STAT legs and make_single_bridge only the
+    source master's legs; other masters' ON legs are added on demand when this
+    hotspot/IPSC actually keys or needs the TG.
     """
     if bridge_name not in BRIDGES or system not in CONFIG['SYSTEMS']:
         return False
@@ -534,11 +662,11 @@ def _ensure_master_on_legs(bridge_name, system):
     for _ts in (1, 2):
         if (system, _ts) in _existing:
             continue
-        BRIDGES[bridge_name].append({
-            'SYSTEM': system, 'TS': _ts, 'TGID': _tgid_b,
-            'ACTIVE': False, 'TIMEOUT': _tmout * 60, 'TO_TYPE': 'ON',
-            'OFF': [], 'ON': [_tgid_b], 'RESET': [], 'TIMER': time(),
-        })
+        BRIDGES[bridge_name].append(BridgeLeg(
+            SYSTEM=system, TS=_ts, TGID=_tgid_b,
+            ACTIVE=False, TIMEOUT=_tmout * 60, TO_TYPE='ON',
+            ON=[_tgid_b], TIMER=time(),
+        ))
         _added = True
     if _added:
         _idx_replace_bridge(bridge_name)
@@ -577,12 +705,11 @@ def activate_ua_bridge_source(bridge_name, system, slot, tmout=None, peer_id=Non
                 _tgid = bytes_3(int(bridge_name))
             except ValueError:
                 _tgid = bytes_3(PARROT_TG)
-            BRIDGES[bridge_name].append({
-                'SYSTEM': system, 'TS': slot, 'TGID': _tgid,
-                'ACTIVE': True, 'TIMEOUT': _timeout_s, 'TO_TYPE': 'ON',
-                'OFF': [], 'ON': [_tgid], 'RESET': [],
-                'TIMER': time() + _timeout_s,
-            })
+            BRIDGES[bridge_name].append(BridgeLeg(
+                SYSTEM=system, TS=slot, TGID=_tgid,
+                ACTIVE=True, TIMEOUT=_timeout_s, TO_TYPE='ON',
+                ON=[_tgid], TIMER=time() + _timeout_s,
+            ))
             rebuild_bridge_index()
             _changed = True
             logger.info('(ROUTER) Bridge %s added UA leg for %s TS%s (parrot)',
@@ -592,14 +719,14 @@ def activate_ua_bridge_source(bridge_name, system, slot, tmout=None, peer_id=Non
         if (_entry['SYSTEM'] == system and _entry['TS'] == slot
                 and _entry['TO_TYPE'] != 'NONE'):
             if not _entry['ACTIVE']:
-                _entry['ACTIVE'] = True
                 _changed = True
                 logger.info('(ROUTER) Bridge %s activated for %s TS%s', bridge_name, system, slot)
             # Always refresh TIMER locally; do not BRIDGE_SND on timer-only refresh —
             # pickle stalls the reactor under busy listen key-ups on active TGs.
-            _entry['TIMER'] = time() + _timeout_s
+            _set_leg_timer(bridge_name, _entry, time() + _timeout_s, active=True)
     if _activate_linked_ipsc_legs(bridge_name, system, slot, _timeout_s, peer_id):
         _changed = True
+    _arm_bridge_expiry(bridge_name)
     # Notify monitor only on real ACTIVE/topology change (not every PTT timer bump).
     if _changed:
         notify_bridge_table_updated()
@@ -611,13 +738,18 @@ def _activate_linked_ipsc_legs(bridge_name, source_system, slot, timeout_s, peer
 
     Returns True if any linked leg was newly activated (idle→active).
     """
-    from bridge_helpers import activate_linked_bridge_legs
+    from bridge_helpers import activate_linked_bridge_legs, linked_ipsc_slots
+    # UA bridges only hold legs for masters that have joined; give linked IPSC slots theirs
+    for _target in linked_ipsc_slots(CONFIG['SYSTEMS'], source_system, peer_id):
+        _ensure_master_on_legs(bridge_name, _target)
     _now = time()
     _activated = activate_linked_bridge_legs(
             BRIDGES, CONFIG['SYSTEMS'], bridge_name, source_system, slot, timeout_s, _now, peer_id)
     for _target in _activated:
         logger.info('(ROUTER) Bridge %s linked leg activated: %s TS%s (source %s)',
                     bridge_name, _target, slot, source_system)
+    if _activated:
+        _arm_bridge_expiry(bridge_name)
     return bool(_activated)
 
 
@@ -632,50 +764,47 @@ def make_single_bridge(_tgid,_sourcesystem,_slot,_tmout):
     if is_parrot_talkgroup(int_id(_tgid)):
         BRIDGES[_tgid_s] = []
         if _slot == 1:
-            BRIDGES[_tgid_s].append({
-                'SYSTEM': _sourcesystem, 'TS': 1, 'TGID': _tgid, 'ACTIVE': True,
-                'TIMEOUT': _tmout * 60, 'TO_TYPE': 'ON', 'OFF': [], 'ON': [_tgid],
-                'RESET': [], 'TIMER': time() + (_tmout * 60)})
-            BRIDGES[_tgid_s].append({
-                'SYSTEM': _sourcesystem, 'TS': 2, 'TGID': _tgid, 'ACTIVE': False,
-                'TIMEOUT': _tmout * 60, 'TO_TYPE': 'ON', 'OFF': [], 'ON': [_tgid],
-                'RESET': [], 'TIMER': time()})
+            BRIDGES[_tgid_s].append(BridgeLeg(
+                SYSTEM=_sourcesystem, TS=1, TGID=_tgid, ACTIVE=True,
+                TIMEOUT=_tmout * 60, TO_TYPE='ON', ON=[_tgid],
+                TIMER=time() + (_tmout * 60)))
+            BRIDGES[_tgid_s].append(BridgeLeg(
+                SYSTEM=_sourcesystem, TS=2, TGID=_tgid, ACTIVE=False,
+                TIMEOUT=_tmout * 60, TO_TYPE='ON', ON=[_tgid],
+                TIMER=time()))
         else:
-            BRIDGES[_tgid_s].append({
-                'SYSTEM': _sourcesystem, 'TS': 2, 'TGID': _tgid, 'ACTIVE': True,
-                'TIMEOUT': _tmout * 60, 'TO_TYPE': 'ON', 'OFF': [], 'ON': [_tgid],
-                'RESET': [], 'TIMER': time() + (_tmout * 60)})
-            BRIDGES[_tgid_s].append({
-                'SYSTEM': _sourcesystem, 'TS': 1, 'TGID': _tgid, 'ACTIVE': False,
-                'TIMEOUT': _tmout * 60, 'TO_TYPE': 'ON', 'OFF': [], 'ON': [_tgid],
-                'RESET': [], 'TIMER': time()})
+            BRIDGES[_tgid_s].append(BridgeLeg(
+                SYSTEM=_sourcesystem, TS=2, TGID=_tgid, ACTIVE=True,
+                TIMEOUT=_tmout * 60, TO_TYPE='ON', ON=[_tgid],
+                TIMER=time() + (_tmout * 60)))
+            BRIDGES[_tgid_s].append(BridgeLeg(
+                SYSTEM=_sourcesystem, TS=1, TGID=_tgid, ACTIVE=False,
+                TIMEOUT=_tmout * 60, TO_TYPE='ON', ON=[_tgid],
+                TIMER=time()))
         if ('PARROT' in CONFIG['SYSTEMS']
                 and CONFIG['SYSTEMS']['PARROT'].get('ENABLED')
                 and _sourcesystem != 'PARROT'):
-            BRIDGES[_tgid_s].append({
-                'SYSTEM': 'PARROT', 'TS': 2, 'TGID': _tgid, 'ACTIVE': True,
-                'TIMEOUT': 15, 'TO_TYPE': 'NONE', 'OFF': [], 'ON': [], 'RESET': [],
-                'TIMER': time()})
+            BRIDGES[_tgid_s].append(BridgeLeg(
+                SYSTEM='PARROT', TS=2, TGID=_tgid, ACTIVE=True,
+                TIMEOUT=15, TO_TYPE='NONE', TIMER=time()))
         _idx_add_bridge(_tgid_s)
         notify_bridge_table_updated()
         return
 
+    # Only the source master gets legs up front. Every other routing master
+    # joins on demand through activate_ua_bridge_source / _ensure_master_on_legs
+    # (same as lazy STAT bridges), so an idle master costs no legs or index keys.
     BRIDGES[_tgid_s] = []
-    for _system in iter_routing_master_systems():
-        if _system == _sourcesystem:
-            if _slot == 1:
-                BRIDGES[_tgid_s].append({'SYSTEM': _system, 'TS': 1, 'TGID': _tgid,'ACTIVE': True,'TIMEOUT': _tmout * 60,'TO_TYPE': 'ON','OFF': [],'ON': [_tgid,],'RESET': [], 'TIMER': time() + (_tmout * 60)})
-                BRIDGES[_tgid_s].append({'SYSTEM': _system, 'TS': 2, 'TGID': _tgid,'ACTIVE': False,'TIMEOUT': _tmout * 60,'TO_TYPE': 'ON','OFF': [],'ON': [_tgid,],'RESET': [], 'TIMER': time()})
-            else:
-                BRIDGES[_tgid_s].append({'SYSTEM': _system, 'TS': 2, 'TGID': _tgid,'ACTIVE': True,'TIMEOUT': _tmout * 60,'TO_TYPE': 'ON','OFF': [],'ON': [_tgid,],'RESET': [], 'TIMER': time() + (_tmout * 60)})
-                BRIDGES[_tgid_s].append({'SYSTEM': _system, 'TS': 1, 'TGID': _tgid,'ACTIVE': False,'TIMEOUT': _tmout * 60,'TO_TYPE': 'ON','OFF': [],'ON': [_tgid,],'RESET': [], 'TIMER': time()})
-        else:
-            BRIDGES[_tgid_s].append({'SYSTEM': _system, 'TS': 1, 'TGID': _tgid,'ACTIVE': False,'TIMEOUT': _tmout * 60,'TO_TYPE': 'ON','OFF': [],'ON': [_tgid,],'RESET': [], 'TIMER': time()})
-            BRIDGES[_tgid_s].append({'SYSTEM': _system, 'TS': 2, 'TGID': _tgid,'ACTIVE': False,'TIMEOUT': _tmout * 60,'TO_TYPE': 'ON','OFF': [],'ON': [_tgid,],'RESET': [], 'TIMER': time()})
+    if _slot == 1:
+        BRIDGES[_tgid_s].append(BridgeLeg(SYSTEM=_sourcesystem, TS=1, TGID=_tgid,ACTIVE=True,TIMEOUT=_tmout * 60,TO_TYPE='ON',ON=[_tgid,],TIMER=time() + (_tmout * 60)))
+        BRIDGES[_tgid_s].append(BridgeLeg(SYSTEM=_sourcesystem, TS=2, TGID=_tgid,ACTIVE=False,TIMEOUT=_tmout * 60,TO_TYPE='ON',ON=[_tgid,],TIMER=time()))
+    else:
+        BRIDGES[_tgid_s].append(BridgeLeg(SYSTEM=_sourcesystem, TS=2, TGID=_tgid,ACTIVE=True,TIMEOUT=_tmout * 60,TO_TYPE='ON',ON=[_tgid,],TIMER=time() + (_tmout * 60)))
+        BRIDGES[_tgid_s].append(BridgeLeg(SYSTEM=_sourcesystem, TS=1, TGID=_tgid,ACTIVE=False,TIMEOUT=_tmout * 60,TO_TYPE='ON',ON=[_tgid,],TIMER=time()))
 
     for _system in CONFIG['SYSTEMS']:
         if _system[0:3] == 'OBP' and (int_id(_tgid) >= 59 and (int_id(_tgid) < 9990 or int_id(_tgid) > 9999)):
-            BRIDGES[_tgid_s].append({'SYSTEM': _system, 'TS': 1, 'TGID': _tgid,'ACTIVE': True,'TIMEOUT': '','TO_TYPE': 'NONE','OFF': [],'ON': [],'RESET': [], 'TIMER': time()})
+            BRIDGES[_tgid_s].append(BridgeLeg(SYSTEM=_system, TS=1, TGID=_tgid,ACTIVE=True,TIMEOUT='',TO_TYPE='NONE',TIMER=time()))
     _activate_linked_ipsc_legs(_tgid_s, _sourcesystem, _slot, _tmout * 60)
     # Keep routing index in sync
     _idx_add_bridge(_tgid_s)
@@ -694,7 +823,7 @@ def make_stat_bridge(_tgid):
     BRIDGES[_tgid_s] = []
     for _system in CONFIG['SYSTEMS']:
         if _system[0:3] == 'OBP':
-            BRIDGES[_tgid_s].append({'SYSTEM': _system, 'TS': 1, 'TGID': _tgid,'ACTIVE': True,'TIMEOUT': '','TO_TYPE': 'STAT','OFF': [],'ON': [],'RESET': [], 'TIMER': time()})
+            BRIDGES[_tgid_s].append(BridgeLeg(SYSTEM=_system, TS=1, TGID=_tgid,ACTIVE=True,TIMEOUT='',TO_TYPE='STAT',TIMER=time()))
     # Keep routing index in sync
     _idx_add_bridge(_tgid_s)
         
@@ -761,7 +890,7 @@ def make_default_reflector(reflector,_tmout,system):
     bridgetemp = deque()
     for bridgesystem in BRIDGES[bridge]:
         if bridgesystem['SYSTEM'] == system and bridgesystem['TS'] == 2:
-            bridgetemp.append({'SYSTEM': system, 'TS': 2, 'TGID': bytes_3(9),'ACTIVE': True,'TIMEOUT':  _tmout * 60,'TO_TYPE': 'OFF','OFF': [],'ON': [bytes_3(reflector),],'RESET': [], 'TIMER': time() + (_tmout * 60)})
+            bridgetemp.append(BridgeLeg(SYSTEM=system, TS=2, TGID=bytes_3(9),ACTIVE=True,TIMEOUT=_tmout * 60,TO_TYPE='OFF',ON=[bytes_3(reflector),],TIMER=time() + (_tmout * 60)))
         else:
             bridgetemp.append(bridgesystem)
             
@@ -772,12 +901,11 @@ def make_static_tg(tg, ts, _tmout, system):
     #_tmout = CONFIG['SYSTEMS'][system]['DEFAULT_UA_TIMER']
     tg_s = str(tg)
     tgid_b = bytes_3(tg)
-    static_entry = {
-        'SYSTEM': system, 'TS': ts, 'TGID': tgid_b,
-        'ACTIVE': True, 'TIMEOUT': _tmout * 60, 'TO_TYPE': 'OFF',
-        'OFF': [], 'ON': [tgid_b], 'RESET': [],
-        'TIMER': time() + (_tmout * 60),
-    }
+    static_entry = BridgeLeg(
+        SYSTEM=system, TS=ts, TGID=tgid_b,
+        ACTIVE=True, TIMEOUT=_tmout * 60, TO_TYPE='OFF',
+        ON=[tgid_b], TIMER=time() + (_tmout * 60),
+    )
     if tg_s not in BRIDGES:
         make_single_bridge(tgid_b, system, ts, _tmout)
     bridgetemp = deque()
@@ -803,7 +931,7 @@ def reset_static_tg(tg,ts,_tmout,system):
     bridgetemp = deque()
     for bridgesystem in BRIDGES[str(tg)]:
         if bridgesystem['SYSTEM'] == system and bridgesystem['TS'] == ts:
-            bridgetemp.append({'SYSTEM': system, 'TS': ts, 'TGID': bytes_3(tg),'ACTIVE': False,'TIMEOUT':  _tmout * 60,'TO_TYPE': 'ON','OFF': [],'ON': [bytes_3(tg),],'RESET': [], 'TIMER': time() + (_tmout * 60)})
+            bridgetemp.append(BridgeLeg(SYSTEM=system, TS=ts, TGID=bytes_3(tg),ACTIVE=False,TIMEOUT=_tmout * 60,TO_TYPE='ON',ON=[bytes_3(tg),],TIMER=time() + (_tmout * 60)))
         else:
             bridgetemp.append(bridgesystem)
         
@@ -825,7 +953,7 @@ def reset_default_reflector(reflector,_tmout,system):
     bridgetemp = deque()
     for bridgesystem in BRIDGES[bridge]:
         if bridgesystem['SYSTEM'] == system and bridgesystem['TS'] == 2:
-            bridgetemp.append({'SYSTEM': system, 'TS': 2, 'TGID': bytes_3(9),'ACTIVE': False,'TIMEOUT':  _tmout * 60,'TO_TYPE': 'ON','OFF': [],'ON': [bytes_3(reflector),],'RESET': [], 'TIMER': time() + (_tmout * 60)})
+            bridgetemp.append(BridgeLeg(SYSTEM=system, TS=2, TGID=bytes_3(9),ACTIVE=False,TIMEOUT=_tmout * 60,TO_TYPE='ON',ON=[bytes_3(reflector),],TIMER=time() + (_tmout * 60)))
         else:
             bridgetemp.append(bridgesystem)
         BRIDGES[bridge] = bridgetemp
@@ -847,12 +975,12 @@ def make_single_reflector(_tgid,_tmout,_sourcesystem):
     BRIDGES[_bridge] = []
     for _system in iter_routing_master_systems():
         if _system == _sourcesystem:
-            BRIDGES[_bridge].append({'SYSTEM': _system, 'TS': 2, 'TGID': bytes_3(9),'ACTIVE': True,'TIMEOUT':  _tmout * 60,'TO_TYPE': 'ON','OFF': [],'ON': [_tgid,],'RESET': [], 'TIMER': time() + (_tmout * 60)})
+            BRIDGES[_bridge].append(BridgeLeg(SYSTEM=_system, TS=2, TGID=bytes_3(9),ACTIVE=True,TIMEOUT=_tmout * 60,TO_TYPE='ON',ON=[_tgid,],TIMER=time() + (_tmout * 60)))
         else:
-            BRIDGES[_bridge].append({'SYSTEM': _system, 'TS': 2, 'TGID': bytes_3(9),'ACTIVE': False,'TIMEOUT':  CONFIG['SYSTEMS'][_system]['DEFAULT_UA_TIMER'] * 60,'TO_TYPE': 'ON','OFF': [],'ON': [_tgid,],'RESET': [], 'TIMER': time()})
+            BRIDGES[_bridge].append(BridgeLeg(SYSTEM=_system, TS=2, TGID=bytes_3(9),ACTIVE=False,TIMEOUT=CONFIG['SYSTEMS'][_system]['DEFAULT_UA_TIMER'] * 60,TO_TYPE='ON',ON=[_tgid,],TIMER=time()))
     for _system in CONFIG['SYSTEMS']:
         if _system[0:3] == 'OBP' and (int_id(_tgid) >= 59 and (int_id(_tgid) < 9990 or int_id(_tgid) > 9999)):
-            BRIDGES[_bridge].append({'SYSTEM': _system, 'TS': 1, 'TGID': _tgid,'ACTIVE': True,'TIMEOUT': '','TO_TYPE': 'NONE','OFF': [],'ON': [],'RESET': [], 'TIMER': time()})
+            BRIDGES[_bridge].append(BridgeLeg(SYSTEM=_system, TS=1, TGID=_tgid,ACTIVE=True,TIMEOUT='',TO_TYPE='NONE',TIMER=time()))
     # Keep routing index in sync
     _idx_add_bridge(_bridge)
 
@@ -868,19 +996,19 @@ def remove_bridge_system(system):
             else:
                 if _bridge not in _bridgestemp:
                     _bridgestemp[_bridge] = []
-                _bridgestemp[_bridge].append({
-                    'SYSTEM': system,
-                    'TS': _bridgesystem['TS'],
-                    'TGID': _bridgesystem['TGID'],
-                    'ACTIVE': False,
-                    'TIMEOUT': _bridgesystem['TIMEOUT'],
-                    'TO_TYPE': _bridgesystem['TO_TYPE'],
-                    'OFF': list(_bridgesystem['OFF']),
-                    'ON': (list(_bridgesystem['ON']) if _bridgesystem['ON']
+                _bridgestemp[_bridge].append(BridgeLeg(
+                    SYSTEM=system,
+                    TS=_bridgesystem['TS'],
+                    TGID=_bridgesystem['TGID'],
+                    ACTIVE=False,
+                    TIMEOUT=_bridgesystem['TIMEOUT'],
+                    TO_TYPE=_bridgesystem['TO_TYPE'],
+                    OFF=list(_bridgesystem['OFF']),
+                    ON=(list(_bridgesystem['ON']) if _bridgesystem['ON']
                            else ([] if _bridge[0:1] == '#' else [_bridgesystem['TGID']])),
-                    'RESET': list(_bridgesystem['RESET']),
-                    'TIMER': time() + _bridgesystem['TIMEOUT'],
-                })
+                    RESET=list(_bridgesystem['RESET']),
+                    TIMER=time() + _bridgesystem['TIMEOUT'],
+                ))
             
     BRIDGES.update(_bridgestemp)
     # Entries for the system changed across ALL bridges; cheapest correct option is a full rebuild
@@ -907,8 +1035,7 @@ def reset_dynamic_reflectors(system):
             if _sys['SYSTEM'] != system or _sys['TO_TYPE'] != 'ON':
                 continue
             if _sys['ACTIVE']:
-                _sys['ACTIVE'] = False
-                _sys['TIMER'] = time()
+                _set_leg_timer(_bridge, _sys, time(), active=False)
                 clear_reflector_link_owner(_sys)
                 _changed = True
                 logger.info('(REFLECTOR) Cleared dynamic dial-a-tg link %s for %s', _bridge, system)
@@ -926,8 +1053,7 @@ def disconnect_dial_reflectors(system):
             if _sys['SYSTEM'] != system:
                 continue
             if _sys['ACTIVE']:
-                _sys['ACTIVE'] = False
-                _sys['TIMER'] = time()
+                _set_leg_timer(_bridge, _sys, time(), active=False)
                 clear_reflector_link_owner(_sys)
                 _changed = True
                 logger.info('(REFLECTOR) Disconnect (4000): deactivated %s for %s', _bridge, system)
@@ -944,8 +1070,7 @@ def deactivate_user_activated_bridges(system):
         for _sys in BRIDGES[_bridge]:
             if (_sys['SYSTEM'] == system and _sys['ACTIVE']
                     and _sys['TO_TYPE'] == 'ON'):
-                _sys['ACTIVE'] = False
-                _sys['TIMER'] = time()
+                _set_leg_timer(_bridge, _sys, time(), active=False)
                 _changed = True
                 logger.info('(UA) Selfcare disconnect: deactivated bridge %s for %s',
                             _bridge, system)
@@ -990,8 +1115,7 @@ def sanitize_dial_reflectors(system):
                 continue
             if is_dial_service_code(_bridge[1:]):
                 if _sys['ACTIVE']:
-                    _sys['ACTIVE'] = False
-                    _sys['TIMER'] = time()
+                    _set_leg_timer(_bridge, _sys, time(), active=False)
                     _changed = True
                     logger.info('(REFLECTOR) Cleared dial service reflector %s for %s', _bridge, system)
                 if _sys['ON']:
@@ -1014,8 +1138,7 @@ def deactivate_other_dynamic_reflectors(system, keep_bridge, slot=2):
         for _sys in BRIDGES[_bridge]:
             if (_sys['SYSTEM'] == system and _sys['TS'] == slot
                     and _sys['TO_TYPE'] == 'ON' and _sys['ACTIVE']):
-                _sys['ACTIVE'] = False
-                _sys['TIMER'] = time()
+                _set_leg_timer(_bridge, _sys, time(), active=False)
                 _changed = True
                 logger.info('(REFLECTOR) Single dial-a-tg mode: deactivated %s for %s (keeping %s)',
                             _bridge, system, keep_bridge)
@@ -1023,48 +1146,58 @@ def deactivate_other_dynamic_reflectors(system, keep_bridge, slot=2):
         rebuild_bridge_index()
 
 
+def _sub_map_set(subscriber, entry):
+    _old = SUB_MAP.get(subscriber)
+    sticky_index_update(STICKY_IDX, subscriber, _old, entry)
+    SUB_BUCKETS.update(subscriber, _old.time if _old is not None else None, entry.time)
+    SUB_MAP[subscriber] = entry
+    if SUB_JOURNAL is not None:
+        SUB_JOURNAL.record(subscriber, entry)
+
+
+def _sub_map_pop(subscriber):
+    _entry = SUB_MAP.pop(subscriber, None)
+    if _entry is not None:
+        sticky_index_update(STICKY_IDX, subscriber, _entry, None)
+        SUB_BUCKETS.update(subscriber, _entry.time, None)
+        if SUB_JOURNAL is not None:
+            SUB_JOURNAL.record(subscriber, None)
+    return _entry
+
+
+def rebuild_sub_map_indexes():
+    """Rebuild STICKY_IDX and SUB_BUCKETS from scratch.  Call after SUB_MAP is replaced."""
+    global STICKY_IDX, SUB_BUCKETS
+    STICKY_IDX = build_sticky_index(SUB_MAP)
+    SUB_BUCKETS = SubscriberBuckets.build(SUB_MAP)
+
+
 def clear_sub_map_for_system(system):
     """Remove persisted subscriber entries for a MASTER (e.g. on hotspot login/disconnect)."""
-    _remove = []
-    for _subscriber in SUB_MAP:
-        try:
-            if SUB_MAP[_subscriber][0] == system:
-                _remove.append(_subscriber)
-        except (TypeError, IndexError):
-            pass
+    _remove = [_subscriber for _subscriber, _rec in SUB_MAP.items() if _rec.system == system]
     for _subscriber in _remove:
-        SUB_MAP.pop(_subscriber, None)
+        _sub_map_pop(_subscriber)
     if _remove:
         logger.info('(SUBSCRIBER) Cleared %s SUB_MAP entries for %s', len(_remove), system)
 
 
 def clear_sub_map_for_peer(peer_id):
     """Remove SUB_MAP entries for a hotspot peer (survives REPEATER-N slot changes)."""
-    _remove = []
-    for _subscriber in SUB_MAP:
-        try:
-            _entry = SUB_MAP[_subscriber]
-            if len(_entry) >= 5 and _entry[4] == peer_id:
-                _remove.append(_subscriber)
-        except (TypeError, IndexError):
-            pass
+    _remove = [_subscriber for _subscriber, _rec in SUB_MAP.items() if _rec.peer_id == peer_id]
     for _subscriber in _remove:
-        SUB_MAP.pop(_subscriber, None)
+        _sub_map_pop(_subscriber)
     if _remove:
         logger.info('(SUBSCRIBER) Cleared %s SUB_MAP entries for peer %s', len(_remove), int_id(peer_id))
 
 
 def clear_subscriber_on_disconnect(system, subscriber_id, peer_id):
     """Drop sticky-TG state when the user dials disconnect (4000)."""
-    if subscriber_id not in SUB_MAP:
+    _rec = SUB_MAP.get(subscriber_id)
+    if _rec is None:
         return
-    try:
-        _entry = SUB_MAP[subscriber_id]
-        if _entry[0] == system or (len(_entry) >= 5 and _entry[4] == peer_id):
-            SUB_MAP.pop(subscriber_id, None)
-            logger.info('(SUBSCRIBER) Cleared sticky TG for subscriber %s on disconnect', int_id(subscriber_id))
-    except (TypeError, IndexError):
-        pass
+    if _rec.system == system or _rec.peer_id == peer_id:
+        _sub_map_pop(subscriber_id)
+        logger.info('(SUBSCRIBER) Cleared sticky TG for subscriber %s on disconnect', int_id(subscriber_id))
 
 
 def notify_bridge_table_updated():
@@ -1083,136 +1216,135 @@ def notify_bridge_table_updated():
         logger.debug('(REPORT) send_bridge after dial-a-tg timer reset failed: %s', exc)
 
 
-# Run this every minute for rule timer updates
-def rule_timer_loop():
-    logger.debug('(ROUTER) routerHBP Rule timer loop started')
-    _t0 = time()
-    _now = time()
-    _remove_bridges = deque()
-
-    # Pre-compute set of systems that have any sticky-TG feature enabled.
-    # This avoids scanning the full SUB_MAP for every active bridge entry on
-    # systems where stickiness is not configured at all.
-    _sticky_enabled_systems = set()
+def _sticky_tg_systems():
+    # Systems that have any sticky-TG feature enabled. This avoids scanning
+    # the full SUB_MAP for every active bridge entry on systems where
+    # stickiness is not configured at all.
+    _sticky = set()
     for _sys in CONFIG['SYSTEMS']:
         if CONFIG['SYSTEMS'][_sys].get('STICKY_TG', False):
-            _sticky_enabled_systems.add(_sys)
+            _sticky.add(_sys)
         elif 'PEERS' in CONFIG['SYSTEMS'][_sys]:
             for _pid in CONFIG['SYSTEMS'][_sys]['PEERS']:
                 if CONFIG['SYSTEMS'][_sys]['PEERS'][_pid].get('STICKY', False):
-                    _sticky_enabled_systems.add(_sys)
+                    _sticky.add(_sys)
                     break
+    return _sticky
 
-    for _bridge in BRIDGES:
-        _bridge_used = False
-        for _system in BRIDGES[_bridge]:
-            if _system['TO_TYPE'] == 'ON':
-                if _system['ACTIVE'] == True:
-                    _bridge_used = True
-                    
-                    # STICKY_TG LOGIC: Check if this bridge should remain active due to sticky TG
-                    # PRODUCTION SAFETY: Feature flag check - only apply sticky logic if enabled
-                    # Priority: Peer STICKY > System STICKY_TG > Default (False)
-                    # Dial-a-tg reflector bridges (#...) must not use sticky TG — they share TGID 9
-                    # and would all stay active while the user is on TG 9.
-                    _sticky_active = False
-                    # Optimisation: only scan SUB_MAP for systems that actually have
-                    # sticky TG enabled (pre-computed above).  Avoids O(N_subscribers)
-                    # scan for every active bridge entry on non-sticky systems.
-                    if (_bridge[0:1] != '#' and
-                            is_routing_master(CONFIG['SYSTEMS'][_system['SYSTEM']]['MODE']) and
-                            _system['SYSTEM'] in _sticky_enabled_systems):
-                        # Check if any subscriber has this TG as their sticky TG
-                        for _subscriber in SUB_MAP:
-                            try:
-                                _sub_peer_id = None
-                                if len(SUB_MAP[_subscriber]) == 5:
-                                    _sub_system, _sub_ts, _sub_tg, _sub_time, _sub_peer_id = SUB_MAP[_subscriber]
-                                elif len(SUB_MAP[_subscriber]) == 4:
-                                    _sub_system, _sub_ts, _sub_tg, _sub_time = SUB_MAP[_subscriber]
-                                else:
-                                    continue  # Old 3-element format doesn't support sticky TG
-                                
-                                # Check if subscriber is on this system and has this TG as sticky
-                                if (_sub_system == _system['SYSTEM'] and 
-                                    _sub_ts == _system['TS'] and 
-                                    _sub_tg == _system['TGID'] and
-                                    _sub_tg is not None):
-                                    
-                                    # Determine if sticky TG is enabled for this subscriber
-                                    # Priority 1: Per-peer STICKY setting (if available)
-                                    # Priority 2: System-wide STICKY_TG setting
-                                    # Priority 3: Default to False
-                                    _sticky_enabled = False
-                                    if (_sub_peer_id and 
-                                        'PEERS' in CONFIG['SYSTEMS'][_system['SYSTEM']] and
-                                        _sub_peer_id in CONFIG['SYSTEMS'][_system['SYSTEM']]['PEERS'] and
-                                        'STICKY' in CONFIG['SYSTEMS'][_system['SYSTEM']]['PEERS'][_sub_peer_id]):
-                                        # Peer has explicit STICKY setting - use it
-                                        _sticky_enabled = CONFIG['SYSTEMS'][_system['SYSTEM']]['PEERS'][_sub_peer_id]['STICKY']
-                                        logger.debug('(%s) STICKY_TG: Using peer-level STICKY=%s for subscriber %s (peer %s)', 
-                                                   _system['SYSTEM'], _sticky_enabled, int_id(_subscriber), int_id(_sub_peer_id))
-                                    elif CONFIG['SYSTEMS'][_system['SYSTEM']].get('STICKY_TG', False):
-                                        # No peer-level setting, use system default
-                                        _sticky_enabled = True
-                                        logger.debug('(%s) STICKY_TG: Using system-level STICKY_TG for subscriber %s', 
-                                                   _system['SYSTEM'], int_id(_subscriber))
-                                    
-                                    if _sticky_enabled:
-                                        _sticky_active = True
-                                        logger.debug('(%s) STICKY_TG: Bridge %s kept active for subscriber %s on TG %s', 
-                                                   _system['SYSTEM'], _bridge, int_id(_subscriber), int_id(_sub_tg))
-                                        break
-                            except (TypeError, ValueError, IndexError):
-                                pass
-                    
-                    if _sticky_active:
-                        # Keep bridge active due to sticky TG - don't timeout
-                        _bridge_used = True
-                        logger.debug('(ROUTER) Conference Bridge ACTIVE (STICKY_TG): System: %s Bridge: %s, TS: %s, TGID: %s', 
-                                   _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']))
-                    elif _system['TIMER'] < _now:
-                        # Normal timeout behavior when sticky TG not active
-                        _system['ACTIVE'] = False
-                        if _bridge[0:1] == '#':
-                            clear_reflector_link_owner(_system)
-                        _timeout_min = int(_system['TIMEOUT'] // 60) if _system['TIMEOUT'] else 0
-                        logger.info(
-                            '(ROUTER) Conference Bridge TIMEOUT (%s min): DEACTIVATE System: %s, Bridge: %s, TS: %s, TGID: %s',
-                            _timeout_min, _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']))
-                        if _bridge[0:1] == '#':
-                            reactor.callInThread(disconnectedVoice, _system['SYSTEM'])
-                    else:
-                        timeout_in = _system['TIMER'] - _now
-                        _bridge_used = True
-                        logger.debug('(ROUTER) Conference Bridge ACTIVE (ON timer running): System: %s Bridge: %s, TS: %s, TGID: %s, Timeout in: %.2fs,', _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']),  timeout_in)
-                elif _system['ACTIVE'] == False:
-                    logger.debug('(ROUTER) Conference Bridge INACTIVE (no change): System: %s Bridge: %s, TS: %s, TGID: %s', _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']))
-            elif _system['TO_TYPE'] == 'OFF':
-                # PRIORITY: Static TGs always override - they use TO_TYPE='OFF'
-                # Static TGs (TS1_STATIC/TS2_STATIC) have highest priority and always remain active
-                if _system['ACTIVE'] == False:
-                    if _system['TIMER'] < _now:
-                        _system['ACTIVE'] = True
-                        _bridge_used = True 
-                        logger.info('(ROUTER) Conference Bridge TIMEOUT: ACTIVATE System: %s, Bridge: %s, TS: %s, TGID: %s', _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']))
-                    else:
-                        timeout_in = _system['TIMER'] - _now
-                        _bridge_used = True
-                        logger.info('(ROUTER) Conference Bridge INACTIVE (OFF timer running): System: %s Bridge: %s, TS: %s, TGID: %s, Timeout in: %.2fs,', _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']),  timeout_in)
-                elif _system['ACTIVE'] == True:
+
+def _bridge_timer_pass(_bridge, _now, _sticky_enabled_systems):
+    """Expire ON legs and re-activate OFF legs of one bridge.
+
+    Returns (bridge_used, next_deadline, changed).
+    """
+    _bridge_used = False
+    _changed = False
+    _next = None
+    for _system in BRIDGES[_bridge]:
+        if _system['TO_TYPE'] == 'ON':
+            if _system['ACTIVE'] == True:
+                _bridge_used = True
+                
+                # STICKY_TG LOGIC: Check if this bridge should remain active due to sticky TG
+                # PRODUCTION SAFETY: Feature flag check - only apply sticky logic if enabled
+                # Priority: Peer STICKY > System STICKY_TG > Default (False)
+                # Dial-a-tg reflector bridges (#...) must not use sticky TG — they share TGID 9
+                # and would all stay active while the user is on TG 9.
+                _sticky_active = False
+                # Only systems with sticky TG enabled (see _sticky_tg_systems) are
+                # checked, and STICKY_IDX yields just the subscribers on this
+                # system/slot/TG instead of a scan over every SUB_MAP entry.
+                if (_bridge[0:1] != '#' and
+                        is_routing_master(CONFIG['SYSTEMS'][_system['SYSTEM']]['MODE']) and
+                        _system['SYSTEM'] in _sticky_enabled_systems):
+                    # Check if any subscriber has this TG as their sticky TG
+                    for _subscriber in STICKY_IDX.get((_system['SYSTEM'], _system['TS'], _system['TGID']), ()):
+                        try:
+                            _sub_peer_id = SUB_MAP[_subscriber].peer_id
+                            _sub_tg = SUB_MAP[_subscriber].tg
+
+                            # Determine if sticky TG is enabled for this subscriber
+                            # Priority 1: Per-peer STICKY setting (if available)
+                            # Priority 2: System-wide STICKY_TG setting
+                            # Priority 3: Default to False
+                            _sticky_enabled = False
+                            if (_sub_peer_id and 
+                                'PEERS' in CONFIG['SYSTEMS'][_system['SYSTEM']] and
+                                _sub_peer_id in CONFIG['SYSTEMS'][_system['SYSTEM']]['PEERS'] and
+                                'STICKY' in CONFIG['SYSTEMS'][_system['SYSTEM']]['PEERS'][_sub_peer_id]):
+                                # Peer has explicit STICKY setting - use it
+                                _sticky_enabled = CONFIG['SYSTEMS'][_system['SYSTEM']]['PEERS'][_sub_peer_id]['STICKY']
+                                logger.debug('(%s) STICKY_TG: Using peer-level STICKY=%s for subscriber %s (peer %s)', 
+                                           _system['SYSTEM'], _sticky_enabled, int_id(_subscriber), int_id(_sub_peer_id))
+                            elif CONFIG['SYSTEMS'][_system['SYSTEM']].get('STICKY_TG', False):
+                                # No peer-level setting, use system default
+                                _sticky_enabled = True
+                                logger.debug('(%s) STICKY_TG: Using system-level STICKY_TG for subscriber %s', 
+                                           _system['SYSTEM'], int_id(_subscriber))
+                            
+                            if _sticky_enabled:
+                                _sticky_active = True
+                                logger.debug('(%s) STICKY_TG: Bridge %s kept active for subscriber %s on TG %s', 
+                                           _system['SYSTEM'], _bridge, int_id(_subscriber), int_id(_sub_tg))
+                                break
+                        except (KeyError, TypeError, ValueError, IndexError):
+                            pass
+                if _sticky_active:
+                    # Keep bridge active due to sticky TG - don't timeout
                     _bridge_used = True
-                    logger.debug('(ROUTER) Conference Bridge ACTIVE (no change): System: %s Bridge: %s, TS: %s, TGID: %s', _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']))
-            else:
-                if _system['SYSTEM'][0:3] != 'OBP':
+                    _due = _system['TIMER'] if _system['TIMER'] > _now else _now + _STICKY_RECHECK_S
+                    if _next is None or _due < _next:
+                        _next = _due
+                    logger.debug('(ROUTER) Conference Bridge ACTIVE (STICKY_TG): System: %s Bridge: %s, TS: %s, TGID: %s', 
+                               _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']))
+                elif _system['TIMER'] < _now:
+                    # Normal timeout behavior when sticky TG not active
+                    _system['ACTIVE'] = False
+                    _changed = True
+                    if _bridge[0:1] == '#':
+                        clear_reflector_link_owner(_system)
+                    _timeout_min = int(_system['TIMEOUT'] // 60) if _system['TIMEOUT'] else 0
+                    logger.info(
+                        '(ROUTER) Conference Bridge TIMEOUT (%s min): DEACTIVATE System: %s, Bridge: %s, TS: %s, TGID: %s',
+                        _timeout_min, _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']))
+                    if _bridge[0:1] == '#':
+                        disconnectedVoice(_system['SYSTEM'])
+                else:
+                    timeout_in = _system['TIMER'] - _now
                     _bridge_used = True
-                elif _system['SYSTEM'][0:3] == 'OBP' and _system['TO_TYPE'] == 'STAT':
+                    if _next is None or _system['TIMER'] < _next:
+                        _next = _system['TIMER']
+                    logger.debug('(ROUTER) Conference Bridge ACTIVE (ON timer running): System: %s Bridge: %s, TS: %s, TGID: %s, Timeout in: %.2fs,', _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']),  timeout_in)
+            elif _system['ACTIVE'] == False:
+                logger.debug('(ROUTER) Conference Bridge INACTIVE (no change): System: %s Bridge: %s, TS: %s, TGID: %s', _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']))
+        elif _system['TO_TYPE'] == 'OFF':
+            # PRIORITY: Static TGs always override - they use TO_TYPE='OFF'
+            # Static TGs (TS1_STATIC/TS2_STATIC) have highest priority and always remain active
+            if _system['ACTIVE'] == False:
+                if _system['TIMER'] < _now:
+                    _system['ACTIVE'] = True
+                    _bridge_used = True 
+                    _changed = True
+                    logger.info('(ROUTER) Conference Bridge TIMEOUT: ACTIVATE System: %s, Bridge: %s, TS: %s, TGID: %s', _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']))
+                else:
+                    timeout_in = _system['TIMER'] - _now
                     _bridge_used = True
-                logger.debug('(ROUTER) Conference Bridge NO ACTION: System: %s, Bridge: %s, TS: %s, TGID: %s', _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']))
-                
-        if _bridge_used == False:
-            _remove_bridges.append(_bridge)
-                
+                    if _next is None or _system['TIMER'] < _next:
+                        _next = _system['TIMER']
+                    logger.info('(ROUTER) Conference Bridge INACTIVE (OFF timer running): System: %s Bridge: %s, TS: %s, TGID: %s, Timeout in: %.2fs,', _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']),  timeout_in)
+            elif _system['ACTIVE'] == True:
+                _bridge_used = True
+                logger.debug('(ROUTER) Conference Bridge ACTIVE (no change): System: %s Bridge: %s, TS: %s, TGID: %s', _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']))
+        else:
+            if _system['SYSTEM'][0:3] != 'OBP':
+                _bridge_used = True
+            elif _system['SYSTEM'][0:3] == 'OBP' and _system['TO_TYPE'] == 'STAT':
+                _bridge_used = True
+            logger.debug('(ROUTER) Conference Bridge NO ACTION: System: %s, Bridge: %s, TS: %s, TGID: %s', _system['SYSTEM'], _bridge, _system['TS'], int_id(_system['TGID']))
+    return _bridge_used, _next, _changed
+
+
+def _finish_timer_pass(_remove_bridges):
     for _bridgerem in _remove_bridges:
         _idx_remove_bridge(_bridgerem)
         del BRIDGES[_bridgerem]
@@ -1221,6 +1353,48 @@ def rule_timer_loop():
     if CONFIG['REPORTS']['REPORT']:
         report_server.send_clients(b'bridge updated')
 
+
+def leg_expiry_loop():
+    """Run the rule timer for bridges whose earliest leg TIMER has passed."""
+    _now = time()
+    _due = _LEG_EXPIRY.pop_due(_now)
+    if not _due:
+        return
+    _sticky = _sticky_tg_systems()
+    _remove_bridges = deque()
+    _changed = False
+    for _bridge in _due:
+        if _bridge not in BRIDGES:
+            continue
+        _bridge_used, _next, _bridge_changed = _bridge_timer_pass(_bridge, _now, _sticky)
+        _changed = _changed or _bridge_changed
+        if _bridge_used == False:
+            _remove_bridges.append(_bridge)
+        elif _next is not None:
+            _LEG_EXPIRY.schedule(_bridge, _next)
+    if _changed or _remove_bridges:
+        _finish_timer_pass(_remove_bridges)
+
+
+# Consistency sweep over every bridge (RULE_TIMER_SWEEP_S)
+def rule_timer_loop():
+    logger.debug('(ROUTER) routerHBP Rule timer loop started')
+    _t0 = time()
+    _now = time()
+    _remove_bridges = deque()
+    _sticky = _sticky_tg_systems()
+
+    for _bridge in BRIDGES:
+        if _bridge not in _LEG_EXPIRY and bridge_next_deadline(BRIDGES[_bridge]) is not None:
+            logger.warning('(ROUTER) Rule timer for bridge %s was not armed', _bridge)
+        _bridge_used, _next, _changed = _bridge_timer_pass(_bridge, _now, _sticky)
+        if _bridge_used == False:
+            _remove_bridges.append(_bridge)
+        elif _next is not None:
+            _LEG_EXPIRY.schedule(_bridge, _next)
+
+    _finish_timer_pass(_remove_bridges)
+
     _elapsed_ms = (time() - _t0) * 1000.0
     if _elapsed_ms >= 50.0:
         logger.info(
@@ -1272,49 +1446,99 @@ def kaReporting():
                     logger.warning('(ROUTER) not sending to system %s as last KeepAlive was %s seconds ago',system, int(time() - CONFIG['SYSTEMS'][system]['_bcka']))
  
 #Write SUB_MAP to disk 
-def subMapWrite():
+def _write_sub_map_snapshot(path, snapshot):
     try:
-        _fh = open(CONFIG['ALIASES']['PATH'] + CONFIG['ALIASES']['SUB_MAP_FILE'],'wb')
-        pickle.dump(SUB_MAP,_fh)
-        _fh.close()
-        logger.info('(SUBSCRIBER) Writing SUB_MAP to disk')
-    except:
-        logger.warning('(SUBSCRIBER) Cannot write SUB_MAP to file')
+        if SUB_JOURNAL is not None:
+            _size = SUB_JOURNAL.finish_compaction(snapshot)
+        else:
+            _size = write_snapshot(path, snapshot)
+        logger.info('(SUBSCRIBER) Wrote SUB_MAP snapshot: %s entries, %s bytes', len(snapshot), _size)
+    except Exception as e:
+        logger.warning('(SUBSCRIBER) Cannot write SUB_MAP to file: %s', e)
+
+
+def subMapWrite(sync=False):
+    """Snapshot SUB_MAP to disk; the encode and fsync run in the thread pool unless *sync*.
+
+    In journal mode this is the compaction: the log is rotated first so the
+    snapshot covers everything in it.
+    """
+    _path = CONFIG['ALIASES']['PATH'] + CONFIG['ALIASES']['SUB_MAP_FILE']
+    if SUB_JOURNAL is not None:
+        try:
+            if not SUB_JOURNAL.begin_compaction():
+                SUB_JOURNAL.flush()
+                logger.info('(SUBSCRIBER) SUB_MAP compaction still running, journal flushed only')
+                return
+        except OSError as e:
+            logger.warning('(SUBSCRIBER) Cannot rotate SUB_MAP journal: %s', e)
+            return
+    # Records are immutable tuples, so a shallow copy is a consistent snapshot
+    _snapshot = dict(SUB_MAP)
+    if sync:
+        _write_sub_map_snapshot(_path, _snapshot)
+    else:
+        reactor.callInThread(_write_sub_map_snapshot, _path, _snapshot)
         
 
+def subMapLoad(seed_path=None):
+    """Load SUB_MAP from this process's SUB_MAP_FILE, opening its journal if configured.
+
+    Sharded processes call this after apply_shard, so each one reads and
+    writes its own snapshot and journal. A shard with nothing on disk yet
+    starts from *seed_path* (the unsharded snapshot). With SHARDS > 1 only
+    entries for this process's systems are kept.
+    """
+    global SUB_MAP, SUB_JOURNAL
+    _path = CONFIG['ALIASES']['PATH'] + CONFIG['ALIASES']['SUB_MAP_FILE']
+    if CONFIG['ALIASES']['SUB_MAP_JOURNAL']:
+        # Snapshot plus journal replay; folded into a fresh snapshot below
+        SUB_JOURNAL = SubscriberJournal(_path)
+        SUB_MAP, _migrated, _replayed = SUB_JOURNAL.load()
+        logger.info('(SUBSCRIBER) Loaded SUB_MAP with %s entries (%s journal entries replayed)',
+                    len(SUB_MAP), _replayed)
+        _migrated = _migrated or _replayed > 0
+    else:
+        # Binary snapshot; a legacy pickle of 3/4/5 tuples is migrated
+        # here and rewritten in the new format straight away
+        try:
+            SUB_MAP, _migrated = load_sub_map(_path)
+        except FileNotFoundError:
+            if seed_path is None:
+                raise
+            SUB_MAP, _migrated = {}, False
+        logger.info('(SUBSCRIBER) Loaded SUB_MAP with %s entries', len(SUB_MAP))
+    if not SUB_MAP and seed_path is not None:
+        try:
+            SUB_MAP, _ = load_sub_map(seed_path)
+        except FileNotFoundError:
+            pass
+        else:
+            logger.info('(SUBSCRIBER) Seeded SUB_MAP from %s', seed_path)
+            _migrated = True
+    if CONFIG['GLOBAL']['SHARDS'] > 1:
+        SUB_MAP = {_sub: _rec for _sub, _rec in SUB_MAP.items() if _rec.system in CONFIG['SYSTEMS']}
+    if _migrated:
+        subMapWrite(sync=True)
+
+
+def subMapJournalFlush():
+    """Append the last second's SUB_MAP changes to the journal."""
+    try:
+        SUB_JOURNAL.flush()
+    except OSError as e:
+        logger.warning('(SUBSCRIBER) Cannot append to SUB_MAP journal: %s', e)
+
+
 #Subscriber Map trimmer loop
 def SubMapTrimmer():
     logger.debug('(SUBSCRIBER) Subscriber Map trimmer loop started')
-    _sub_time = time()
-    _remove_list = deque()
-    for _subscriber in SUB_MAP:
-        # BACKWARDS COMPATIBILITY: Handle 3, 4, and 5-element formats
-        try:
-            # Determine timestamp index based on format
-            if len(SUB_MAP[_subscriber]) == 5:
-                # New format: (system, ts, tg, timestamp, peer_id)
-                _timestamp_idx = 3
-            elif len(SUB_MAP[_subscriber]) == 4:
-                # Old format: (system, ts, tg, timestamp)
-                _timestamp_idx = 3
-            elif len(SUB_MAP[_subscriber]) == 3:
-                # Old format: (system, ts, timestamp)
-                _timestamp_idx = 2
-            else:
-                logger.warning('(SUBSCRIBER) Invalid SUB_MAP entry for subscriber %s: unexpected length %s', 
-                             int_id(_subscriber), len(SUB_MAP[_subscriber]))
-                _remove_list.append(_subscriber)
-                continue
-            
-            # Check if entry should be removed (older than 24 hours)
-            if SUB_MAP[_subscriber][_timestamp_idx] < (_sub_time - 86400):
-                _remove_list.append(_subscriber)
-        except (TypeError, IndexError) as e:
-            logger.warning('(SUBSCRIBER) Invalid SUB_MAP entry for subscriber %s, removing: %s', int_id(_subscriber), e)
-            _remove_list.append(_subscriber)
-    
+    # Remove entries not heard for 24 hours
+    _remove_list = SUB_BUCKETS.expired(SUB_MAP, time() - SUB_MAP_TTL_S)
     for _remove in _remove_list:
-        SUB_MAP.pop(_remove)
+        _sub_map_pop(_remove)
+    if _remove_list:
+        logger.info('(SUBSCRIBER) Expired %s SUB_MAP entries, %s remain', len(_remove_list), len(SUB_MAP))
     if CONFIG['ALIASES']['SUB_MAP_FILE']:
         subMapWrite()
  
@@ -1347,7 +1571,7 @@ def stream_trimmer_loop():
                         logger.info('(%s) *TIME OUT*  RX STREAM ID: %s SUB: %s TGID %s, TS %s, Duration: %.2f', \
                             system, int_id(_slot['RX_STREAM_ID']), int_id(_slot['RX_RFS']), int_id(_slot['RX_TGID']), slot, _slot['RX_TIME'] - _slot['RX_START'])
                     if CONFIG['REPORTS']['REPORT']:
-                        systems[system]._report.send_bridgeEvent('GROUP VOICE,END,RX,{},{},{},{},{},{},{:.2f}'.format(system, int_id(_slot['RX_STREAM_ID']), int_id(_slot['RX_PEER']), int_id(_slot['RX_RFS']), slot, int_id(_slot['RX_TGID']), _slot['RX_TIME'] - _slot['RX_START']).encode(encoding='utf-8', errors='ignore'))
+                        systems[system]._report.bridge_event(BridgeEvent.GROUP_VOICE_END, 'RX', system, _slot['RX_STREAM_ID'], _slot['RX_PEER'], _slot['RX_RFS'], slot, _slot['RX_TGID'], _slot['RX_TIME'] - _slot['RX_START'])
                 #Null stream_id - for loop control 
                 if _slot['RX_TIME'] < _now - 60:
                     _slot['RX_STREAM_ID'] = b'\x00'
@@ -1358,84 +1582,55 @@ def stream_trimmer_loop():
                     logger.debug('(%s) *TIME OUT*  TX STREAM ID: %s SUB: %s TGID %s, TS %s, Duration: %.2f', \
                         system, int_id(_slot['TX_STREAM_ID']), int_id(_slot['TX_RFS']), int_id(_slot['TX_TGID']), slot, _slot['TX_TIME'] - _slot['TX_START'])
                     if CONFIG['REPORTS']['REPORT']:
-                        systems[system]._report.send_bridgeEvent('GROUP VOICE,END,TX,{},{},{},{},{},{},{:.2f}'.format(system, int_id(_slot['TX_STREAM_ID']), int_id(_slot['TX_PEER']), int_id(_slot['TX_RFS']), slot, int_id(_slot['TX_TGID']), _slot['TX_TIME'] - _slot['TX_START']).encode(encoding='utf-8', errors='ignore'))
+                        systems[system]._report.bridge_event(BridgeEvent.GROUP_VOICE_END, 'TX', system, _slot['TX_STREAM_ID'], _slot['TX_PEER'], _slot['TX_RFS'], slot, _slot['TX_TGID'], _slot['TX_TIME'] - _slot['TX_START'])
 
-        # OBP systems
-        # We can't delete items from a dicationry that's being iterated, so we have to make a temporarly list of entrys to remove later
+        # OBP systems: the stream table hands back only the streams that are due
         if CONFIG['SYSTEMS'][system]['MODE'] == 'OPENBRIDGE':
-            remove_list = deque()
-            fin_list = deque()
-            for stream_id in systems[system].STATUS:
-                
-                #if stream already marked as finished, just remove it
-                if '_fin' in systems[system].STATUS[stream_id] and systems[system].STATUS[stream_id]['LAST'] < _now - 180:
-                    logger.debug('(%s) *FINISHED STREAM* STREAM ID: %s',system, int_id(stream_id))
-                    fin_list.append(stream_id)
-                    continue
-                
+            _table = systems[system].STATUS
+            _timed_out, _removed = _table.expire(_now)
+            _sysconfig = CONFIG['SYSTEMS'][system]
+            for stream_id, _stream in _timed_out:
                 try:
-                    if '_to' not in systems[system].STATUS[stream_id] and '_fin' not in systems[system].STATUS[stream_id] and systems[system].STATUS[stream_id]['LAST'] < _now - 5:
-                        _stream = systems[system].STATUS[stream_id]
-                        _sysconfig = CONFIG['SYSTEMS'][system]
-                        #systems[system].STATUS[stream_id]['_fin'] = True
-                        if '_bcsq' in _sysconfig and _stream['TGID'] in _sysconfig['_bcsq'] and _sysconfig['_bcsq'][_stream['TGID']] == stream_id:
-                            logger.debug('(%s) *TIME OUT*   STREAM ID: %s SUB: %s PEER: %s TGID: %s TS 1 (BCSQ)', \
-                                system, int_id(stream_id), get_alias(int_id(_stream['RFS']), subscriber_ids), get_alias(int_id(_stream['RX_PEER']), peer_ids), get_alias(int_id(_stream['TGID']), talkgroup_ids))
-                        elif '_bcsq' in systems[system].STATUS[stream_id] :
-                            logger.debug('(%s) *TIME OUT*   STREAM ID: %s SUB: %s PEER: %s TGID: %s TS 1 (BCSQ)', \
-                                system, int_id(stream_id), get_alias(int_id(_stream['RFS']), subscriber_ids), get_alias(int_id(_stream['RX_PEER']), peer_ids), get_alias(int_id(_stream['TGID']), talkgroup_ids))
+                    if '_bcsq' in _sysconfig and _stream['TGID'] in _sysconfig['_bcsq'] and _sysconfig['_bcsq'][_stream['TGID']] == stream_id:
+                        logger.debug('(%s) *TIME OUT*   STREAM ID: %s SUB: %s PEER: %s TGID: %s TS 1 (BCSQ)', \
+                            system, int_id(stream_id), get_alias(int_id(_stream['RFS']), subscriber_ids), get_alias(int_id(_stream['RX_PEER']), peer_ids), get_alias(int_id(_stream['TGID']), talkgroup_ids))
+                    elif '_bcsq' in _stream:
+                        logger.debug('(%s) *TIME OUT*   STREAM ID: %s SUB: %s PEER: %s TGID: %s TS 1 (BCSQ)', \
+                            system, int_id(stream_id), get_alias(int_id(_stream['RFS']), subscriber_ids), get_alias(int_id(_stream['RX_PEER']), peer_ids), get_alias(int_id(_stream['TGID']), talkgroup_ids))
+                    else:
+                        if 'loss' in _stream and 'packets' in _stream and _stream['packets']:
+                            loss = _stream['loss'] / _stream['packets'] * 100
+                            #Only report this at INFO level if it has loss information as this will be a source
+                            #stream not a target stream
+                            #These represent streams where the stream has been lost - i.e. no TERM packet.
+                            logger.info('(%s) *TIME OUT - STREAM LOST*   STREAM ID: %s SUB: %s PEER: %s TGID: %s TS 1 Duration: %.2f, Loss: %.2f%%', \
+                                system, int_id(stream_id), get_alias(int_id(_stream['RFS']), subscriber_ids), get_alias(int_id(_stream['RX_PEER']), peer_ids), get_alias(int_id(_stream['TGID']), talkgroup_ids), _stream['LAST'] - _stream['START'],loss)
                         else:
-                            if 'loss' in _stream and 'packets' in _stream and _stream['packets']:
-                                loss = _stream['loss'] / _stream['packets'] * 100
-                                #Only report this at INFO level if it has loss information as this will be a source
-                                #stream not a target stream
-                                #These represent streams where the stream has been lost - i.e. no TERM packet.
-                                logger.info('(%s) *TIME OUT - STREAM LOST*   STREAM ID: %s SUB: %s PEER: %s TGID: %s TS 1 Duration: %.2f, Loss: %.2f%%', \
-                                    system, int_id(stream_id), get_alias(int_id(_stream['RFS']), subscriber_ids), get_alias(int_id(_stream['RX_PEER']), peer_ids), get_alias(int_id(_stream['TGID']), talkgroup_ids), _stream['LAST'] - _stream['START'],loss)
-                            else:
-                                logger.debug('(%s) *TIME OUT*   STREAM ID: %s SUB: %s PEER: %s TGID: %s TS 1 Duration: %.2f', \
-                                    system, int_id(stream_id), get_alias(int_id(_stream['RFS']), subscriber_ids), get_alias(int_id(_stream['RX_PEER']), peer_ids), get_alias(int_id(_stream['TGID']), talkgroup_ids), _stream['LAST'] - _stream['START'])
-                            
-                        if CONFIG['REPORTS']['REPORT']:
-                                systems[system]._report.send_bridgeEvent('GROUP VOICE,END,RX,{},{},{},{},{},{},{:.2f}'.format(system, int_id(stream_id), int_id(_stream['RX_PEER']), int_id(_stream['RFS']), 1, int_id(_stream['TGID']), _stream['LAST'] - _stream['START']).encode(encoding='utf-8', errors='ignore'))
-                        systems[system].STATUS[stream_id]['_to'] = True
-                        continue
-                except Exception as e:
-                    logger.exception("(%s) Keyerror - stream trimmer Stream ID: %s",system,stream_id, exc_info=e)
-                    systems[system].STATUS[stream_id]['LAST'] = _now
-                    continue
+                            logger.debug('(%s) *TIME OUT*   STREAM ID: %s SUB: %s PEER: %s TGID: %s TS 1 Duration: %.2f', \
+                                system, int_id(stream_id), get_alias(int_id(_stream['RFS']), subscriber_ids), get_alias(int_id(_stream['RX_PEER']), peer_ids), get_alias(int_id(_stream['TGID']), talkgroup_ids), _stream['LAST'] - _stream['START'])
 
-                    
-                try:
-                    if systems[system].STATUS[stream_id]['LAST'] < _now - 180:
-                        remove_list.append(stream_id)
+                    if CONFIG['REPORTS']['REPORT']:
+                        systems[system]._report.bridge_event(BridgeEvent.GROUP_VOICE_END, 'RX', system, stream_id, _stream['RX_PEER'], _stream['RFS'], 1, _stream['TGID'], _stream['LAST'] - _stream['START'])
                 except Exception as e:
                     logger.exception("(%s) Keyerror - stream trimmer Stream ID: %s",system,stream_id, exc_info=e)
-                    systems[system].STATUS[stream_id]['LAST'] = _now
+
+            for stream_id, _stream in _removed:
+                if '_fin' in _stream:
+                    logger.debug('(%s) *FINISHED STREAM* STREAM ID: %s',system, int_id(stream_id))
                     continue
-                
-            #remove finished     
-            for stream_id in fin_list:
-                removed = systems[system].STATUS.pop(stream_id)
-                
-            for stream_id in remove_list:
-                if stream_id in systems[system].STATUS:
-                    _stream = systems[system].STATUS[stream_id]
-                    _sysconfig = CONFIG['SYSTEMS'][system]
-                    
-                    removed = systems[system].STATUS.pop(stream_id)
-                
-                    try:
-                        _bcsq_remove = deque()
-                        for tgid in _sysconfig['_bcsq']:
-                            if _sysconfig['_bcsq'][tgid] == stream_id:
-                                _bcsq_remove.append(tgid)
-                        for bcrm in _bcsq_remove:
-                            removed = _sysconfig['_bcsq'].pop(bcrm)
-                    except KeyError:
-                        pass
-                else:
-                    logger.debug('(%s) Attemped to remove OpenBridge Stream ID %s not in the Stream ID list: %s', system, int_id(stream_id), [id for id in systems[system].STATUS])
+                # Drop any source quench still held against this stream
+                _bcsq = _sysconfig.get('_bcsq')
+                if _bcsq:
+                    for tgid in [tgid for tgid in _bcsq if _bcsq[tgid] == stream_id]:
+                        _bcsq.pop(tgid)
+
+            _live_evicted = _table.live_evictions()
+            if _live_evicted:
+                logger.warning('(%s) OBP stream table full (%s): evicted %s live stream(s)',
+                               system, _table.maxlen, _live_evicted)
+            if _timed_out or _removed:
+                logger.debug('(%s) OBP streams: %s live, %s timed out, %s removed, %s evicted (%s live)', \
+                    system, len(_table), _table.timed_out, _table.removed, _table.evicted, _table.evicted_live)
 
 def sendVoicePacket(self, pkt, _source_id, _dest_id, _slot):
     _system = self._system
@@ -1457,42 +1652,19 @@ def sendVoicePacket(self, pkt, _source_id, _dest_id, _slot):
     self.send_system(pkt)
 
 
-def _send_voice_from_worker(*args):
-    """Backpressure canned audio with a bounded shutdown-safe wait."""
-    if not getattr(reactor, 'running', False):
-        return False
-    done = Event()
-    sent = [False]
-
-    def _send():
-        try:
-            sendVoicePacket(*args)
-            sent[0] = True
-        finally:
-            done.set()
-
-    reactor.callFromThread(_send)
-    return done.wait(1.0) and sent[0]
+def _voice_sender(system, source_id, dest_id):
+    # Looked up per frame: the system can go away mid-announcement
+    def _send(pkt):
+        _master = systems.get(system)
+        if _master is None:
+            return False
+        sendVoicePacket(_master, pkt, source_id, dest_id, _master.STATUS[2])
+    return _send
 
 
 def sendSpeech(self, speech):
-    logger.debug('(%s) Inside sendspeech thread', self._system)
-    sleep(1)
-    _nine = bytes_3(9)
-    _source_id = bytes_3(5000)
-    _slot = systems[self._system].STATUS[2]
-    while True:
-        try:
-            pkt = next(speech)
-        except StopIteration:
-            break
-        #Packet every 60ms
-        sleep(0.058)
-        if not _send_voice_from_worker(
-                self, pkt, _source_id, _nine, _slot):
-            break
-
-    logger.debug('(%s) Sendspeech thread ended',self._system)
+    logger.debug('(%s) Queueing speech playout', self._system)
+    VOICE_PLAYOUT.play(speech, _voice_sender(self._system, bytes_3(5000), bytes_3(9)), name=self._system)
 
 def disconnectedVoice(system):
     _say = _build_disconnect_say(system)
@@ -1502,14 +1674,11 @@ def disconnectedVoice(system):
             logger.warning('(%s) IPSC reflector timeout — no router for disconnect voice', system)
             return
         logger.info('(%s) IPSC reflector timeout — sending disconnect voice to subscribers', system)
-        for _subscriber, _entry in list(SUB_MAP.items()):
-            try:
-                if _entry[0] != system:
-                    continue
-                _slot = _entry[1]
-                _peer_id = _entry[4] if len(_entry) >= 5 else None
-            except (TypeError, IndexError):
+        for _subscriber, _rec in list(SUB_MAP.items()):
+            if _rec.system != system:
                 continue
+            _slot = _rec.ts
+            _peer_id = _rec.peer_id
             if not _peer_id:
                 _peer_id = _master.STATUS.get(_slot, {}).get('RX_PEER')
             if not _peer_id:
@@ -1527,21 +1696,7 @@ def disconnectedVoice(system):
     _source_id = bytes_3(5000)
     logger.debug('(%s) Sending disconnected voice', system)
     speech = pkt_gen(_source_id, _nine, bytes_4(9), 1, _say)
-
-    sleep(1)
-    _master = systems[system]
-    _slot = _master.STATUS[2]
-    while True:
-        try:
-            pkt = next(speech)
-        except StopIteration:
-            break
-        sleep(0.058)
-        if not _send_voice_from_worker(
-                _master, pkt, _source_id, _nine, _slot):
-            break
-
-    logger.debug('(%s) disconnected voice thread end', system)
+    VOICE_PLAYOUT.play(speech, _voice_sender(system, _source_id, _nine), name=system)
 
 def playFileOnRequest(self,fileNumber):
     system = self._system
@@ -1549,7 +1704,6 @@ def playFileOnRequest(self,fileNumber):
     _nine = bytes_3(9)
     _source_id = bytes_3(5000)
     logger.debug('(%s) Sending contents of AMBE file: %s',system,fileNumber)
-    sleep(1)
     _say = []
     try:
         _say.append(AMBEobj.readSingleFile(''.join(['/',_lang,'/ondemand/',str(fileNumber),'.ambe'])))
@@ -1557,34 +1711,33 @@ def playFileOnRequest(self,fileNumber):
         logger.warning('(%s) cannot read file for number %s',system,fileNumber)
         return
     speech = pkt_gen(_source_id, _nine, bytes_4(9), 1, _say)
-    sleep(1)
-    _slot  = systems[system].STATUS[2]
-    while True:
-        try:
-            pkt = next(speech)
-        except StopIteration:
-                break
-        #Packet every 60ms
-        sleep(0.058)
-        _stream_id = pkt[16:20]
-        _pkt_time = time()
-        if not _send_voice_from_worker(
-                self, pkt, _source_id, _nine, _slot):
-            break
-    logger.debug('(%s) Sending AMBE file %s end',system,fileNumber)
+    # Same 2s lead-in the file player always had
+    VOICE_PLAYOUT.play(speech, _voice_sender(system, _source_id, _nine), delay=2.0, name=system)
 
     
 
-def threadIdent():
-    logger.debug('(IDENT) starting ident thread')
-    reactor.callInThread(ident)
-    
 def threadAlias():
     logger.debug('(ALIAS) starting alias thread')
     reactor.callInThread(aliasb)
 
 def setAlias(_peer_ids,_subscriber_ids, _talkgroup_ids, _local_subscriber_ids, _server_ids):
-    peer_ids, subscriber_ids, talkgroup_ids,local_subscriber_ids,server_ids = _peer_ids, _subscriber_ids, _talkgroup_ids, _local_subscriber_ids,_server_ids
+    global peer_ids, subscriber_ids, talkgroup_ids, local_subscriber_ids, server_ids
+    # mk_aliases returns an empty dict for a file it could not load; keep the
+    # one we already have rather than rejecting every ID until the next run
+    if _peer_ids:
+        peer_ids = CONFIG['_PEER_IDS'] = _peer_ids
+    if _subscriber_ids:
+        subscriber_ids = CONFIG['_SUB_IDS'] = _subscriber_ids
+    if _talkgroup_ids:
+        talkgroup_ids = _talkgroup_ids
+    if _local_subscriber_ids:
+        local_subscriber_ids = CONFIG['_LOCAL_SUBSCRIBER_IDS'] = _local_subscriber_ids
+    if _server_ids:
+        server_ids = CONFIG['_SERVER_IDS'] = _server_ids
+    # Source server verdicts depend on the server and subscriber lists
+    SOURCE_SERVERS.rebuild(CONFIG)
+    STREAM_VERDICTS.invalidate()
+    logger.debug('(ALIAS) aliases reloaded, %s allowed source server IDs', len(SOURCE_SERVERS.allowed))
     
 def aliasb():
     _peer_ids, _subscriber_ids, _talkgroup_ids, _local_subscriber_ids, _server_ids = mk_aliases(CONFIG)
@@ -1652,22 +1805,7 @@ def ident():
 
                 _peer_id = CONFIG['GLOBAL']['SERVER_ID']
                 speech = pkt_gen(_source_id, _dst_id, _peer_id, 1, _say)
-
-                sleep(1)
-                _slot  = systems[system].STATUS[2]
-                while True:
-                    try:
-                        pkt = next(speech)
-                    except StopIteration:
-                            break
-                    #Packet every 60ms
-                    sleep(0.058)
-                    
-                    _stream_id = pkt[16:20]
-                    _pkt_time = time()
-                    if not _send_voice_from_worker(
-                            systems[system], pkt, _source_id, _dst_id, _slot):
-                        break
+                VOICE_PLAYOUT.play(speech, _voice_sender(system, _source_id, _dst_id), name=system)
 
 def options_config():
     # RPTO/selfcare/disconnect paths mark this dirty. Keep the 26-second timer
@@ -1910,21 +2048,15 @@ def options_config():
                         logger.debug('(OPTIONS) %s Updating DEFAULT_UA_TIMER for existing bridges.',_system)
                         remove_bridge_system(_system)
                         for _bridge in BRIDGES:
-                            ts1 = False 
+                            # Talkgroup bridges pick this system up on demand when it keys
+                            if _bridge[0:1] != '#':
+                                continue
                             ts2 = False
                             for i,e in enumerate(BRIDGES[_bridge]):
-                                if e['SYSTEM'] == _system and e['TS'] == 1:
-                                    ts1 = True
                                 if e['SYSTEM'] == _system and e['TS'] == 2:
                                     ts2 = True
-                            if _bridge[0:1] != '#':
-                                if ts1 == False:
-                                    BRIDGES[_bridge].append({'SYSTEM': _system, 'TS': 1, 'TGID': bytes_3(int(_bridge)),'ACTIVE': False,'TIMEOUT': _tmout * 60,'TO_TYPE': 'ON','OFF': [],'ON': [bytes_3(int(_bridge)),],'RESET': [], 'TIMER': time()})
-                                if ts2 == False:
-                                    BRIDGES[_bridge].append({'SYSTEM': _system, 'TS': 2, 'TGID': bytes_3(int(_bridge)),'ACTIVE': False,'TIMEOUT': _tmout * 60,'TO_TYPE': 'ON','OFF': [],'ON': [bytes_3(int(_bridge)),],'RESET': [], 'TIMER': time()})
-                            else:
-                                if ts2 == False:
-                                    BRIDGES[_bridge].append({'SYSTEM': _system, 'TS': 2, 'TGID': bytes_3(9),'ACTIVE': False,'TIMEOUT': _tmout * 60,'TO_TYPE': 'ON','OFF': [bytes_3(4000)],'ON': [],'RESET': [], 'TIMER': time()})
+                            if ts2 == False:
+                                BRIDGES[_bridge].append(BridgeLeg(SYSTEM=_system, TS=2, TGID=bytes_3(9),ACTIVE=False,TIMEOUT=_tmout * 60,TO_TYPE='ON',OFF=[bytes_3(4000)],TIMER=time()))
                         # Direct appends to BRIDGES above bypass the individual index helpers;
                         # rebuild the full index to restore consistency.
                         rebuild_bridge_index()
@@ -2110,7 +2242,7 @@ class routerOBP(OPENBRIDGE):
 
     def __init__(self, _name, _config, _report):
         OPENBRIDGE.__init__(self, _name, _config, _report)
-        self.STATUS = {}
+        self.STATUS = ObpStreamTable()
         
     def get_rptr(self,_sid):
         _int_peer_id = int_id(_sid)
@@ -2126,6 +2258,7 @@ class routerOBP(OPENBRIDGE):
                 
     def to_target(self, _peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data, pkt_time, dmrpkt, _bits,_bridge,_system,_noOBP,sysIgnore, _hops = b'', _source_server = b'\x00\x00\x00\x00', _ber = b'\x00', _rssi = b'\x00', _source_rptr = b'\x00\x00\x00\x00', _new_generation=False):
         _sysIgnore = sysIgnore
+        _fanout = {}
         for _target in BRIDGES[_bridge]:
             if (_target['SYSTEM'] != self._system) and (_target['ACTIVE']):
                 _target_status = systems[_target['SYSTEM']].STATUS
@@ -2141,6 +2274,9 @@ class routerOBP(OPENBRIDGE):
                 if _target_system['MODE'] == 'OPENBRIDGE':
                     if _noOBP == True or is_parrot_bridge(_bridge):
                         continue
+                    # Shards are a full mesh: never relay one shard's traffic to another
+                    if self._config.get('_SHARD_LINK') and _target_system.get('_SHARD_LINK'):
+                        continue
                     #If target has quenched us, don't send
                     if _target_system.get('_bcsq', {}).get(_target['TGID']) == _stream_id:
                         #logger.info('(%s) Conference Bridge: %s, is Source Quenched for Stream ID: %s, skipping system: %s TS: %s, TGID: %s', self._system, _bridge, int_id(_stream_id), _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
@@ -2179,7 +2315,7 @@ class routerOBP(OPENBRIDGE):
                             # Inbound LoopControl may see this stub first — keep packet stats present
                             'packets': 0,
                             'loss': 0,
-                            'crcs': set(),
+                            'recent': FrameRing(),
                             'lastSeq': False,
                             'lastData': False,
                             'TARGET_LC': {},
@@ -2193,13 +2329,11 @@ class routerOBP(OPENBRIDGE):
                         dst_lc = b''.join([_src_lc, _target['TGID'], _rf_src])
                         _target_lc_map[_target['TGID']] = {
                             'START': pkt_time,
-                            'H_LC': bptc.encode_header_lc(dst_lc),
-                            'T_LC': bptc.encode_terminator_lc(dst_lc),
-                            'EMB_LC': bptc.encode_emblc(dst_lc),
+                            'LC_TPL': lc_rewrite_templates(dst_lc),
                         }
                         logger.debug('(%s) Conference Bridge: %s, Call Bridged to OBP System: %s TS: %s, TGID: %s', self._system, _bridge, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
                         if CONFIG['REPORTS']['REPORT']:
-                            systems[_target['SYSTEM']]._report.send_bridgeEvent('GROUP VOICE,START,TX,{},{},{},{},{},{}'.format(_target['SYSTEM'], int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _target['TS'], int_id(_target['TGID'])).encode(encoding='utf-8', errors='ignore'))
+                            systems[_target['SYSTEM']]._report.bridge_event(BridgeEvent.GROUP_VOICE_START, 'TX', _target['SYSTEM'], _stream_id, _peer_id, _rf_src, _target['TS'], _target['TGID'])
                     _target_lc = _target_lc_map[_target['TGID']]
 
                     # Record the time of this packet so we can later identify a stale stream
@@ -2207,42 +2341,16 @@ class routerOBP(OPENBRIDGE):
                     # Clear the TS bit -- all OpenBridge streams are effectively on TS1
                     _tmp_bits = _bits & ~(1 << 7)
 
-                    # Assemble transmit HBP packet header
-                    _tmp_data = b''.join([_data[:8], _target['TGID'], _data[11:15], _tmp_bits.to_bytes(1, 'big'), _data[16:20]])
-
-                    # MUST TEST FOR NEW STREAM AND IF SO, RE-WRITE THE LC FOR THE TARGET
-                    # MUST RE-WRITE DESTINATION TGID IF DIFFERENT
-                    # if _dst_id != rule['DST_GROUP']:
-                    # Keep each fanout leg isolated: LC rewriting for one target
-                    # must never become the input payload for the next target.
-                    _tx_dmrpkt = dmrpkt
-                    dmrbits = bitarray(endian='big')
-                    dmrbits.frombytes(_tx_dmrpkt)
-                    # Create a voice header packet (FULL LC)
-                    if _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VHEAD:
-                        try:
-                            dmrbits = _target_lc['H_LC'][0:98] + dmrbits[98:166] + _target_lc['H_LC'][98:197]
-                        except KeyError:
-                            logger.debug('(%s) KeyError - H_LC, skipping', self._system)
-                            continue
-                    # Create a voice terminator packet (FULL LC)
-                    elif _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VTERM:
-                        try:
-                            dmrbits = _target_lc['T_LC'][0:98] + dmrbits[98:166] + _target_lc['T_LC'][98:197]
-                        except KeyError:
-                            logger.debug('(%s) KeyError - T_LC, skipping', self._system)
+                    # Assemble the transmit HBP packet. Legs sharing TGID, slot bit and
+                    # LC templates reuse one payload per frame; the bytes are immutable, so
+                    # one target's LC rewrite never becomes the input for the next.
+                    # Header/terminator get the target's FULL LC, bursts B-E its
+                    # embedded LC, applied as int masks from the per-call templates
+                    _tmp_data = fanout_payload(_fanout, _data, _target['TGID'], _tmp_bits, dmrpkt, _frame_type, _dtype_vseq, _target_lc['LC_TPL'])
+                    if _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VTERM:
                         if CONFIG['REPORTS']['REPORT']:
                             call_duration = pkt_time - _target_lc['START']
-                            systems[_target['SYSTEM']]._report.send_bridgeEvent('GROUP VOICE,END,TX,{},{},{},{},{},{},{:.2f}'.format(_target['SYSTEM'], int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _target['TS'], int_id(_target['TGID']), call_duration).encode(encoding='utf-8', errors='ignore'))
-                    # Create a Burst B-E packet (Embedded LC)
-                    elif _dtype_vseq in [1,2,3,4]:
-                        try:
-                            dmrbits = dmrbits[0:116] + _target_lc['EMB_LC'][_dtype_vseq] + dmrbits[148:264]
-                        except KeyError:
-                            logger.debug('(%s) KeyError - EMB_LC, skipping', self._system)
-                            continue
-                    _tx_dmrpkt = dmrbits.tobytes()
-                    _tmp_data = b''.join([_tmp_data, _tx_dmrpkt])
+                            systems[_target['SYSTEM']]._report.bridge_event(BridgeEvent.GROUP_VOICE_END, 'TX', _target['SYSTEM'], _stream_id, _peer_id, _rf_src, _target['TS'], _target['TGID'], call_duration)
 
                 else:
                     # BEGIN CONTENTION HANDLING
@@ -2294,13 +2402,11 @@ class routerOBP(OPENBRIDGE):
                         _target_status[_target['TS']]['TX_PEER'] = _peer_id
                         # Generate LCs (full and EMB) for the TX stream
                         dst_lc = b''.join([self.STATUS[_stream_id]['LC'][0:3], _target['TGID'], _rf_src])
-                        _target_status[_target['TS']]['TX_H_LC'] = bptc.encode_header_lc(dst_lc)
-                        _target_status[_target['TS']]['TX_T_LC'] = bptc.encode_terminator_lc(dst_lc)
-                        _target_status[_target['TS']]['TX_EMB_LC'] = bptc.encode_emblc(dst_lc)
+                        _target_status[_target['TS']]['TX_LC_TPL'] = lc_rewrite_templates(dst_lc)
                         logger.debug('(%s) Generating TX FULL and EMB LCs for HomeBrew destination: System: %s, TS: %s, TGID: %s', self._system, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
                         logger.debug('(%s) Conference Bridge: %s, Call Bridged to HBP System: %s TS: %s, TGID: %s', self._system, _bridge, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
                         if CONFIG['REPORTS']['REPORT']:
-                            systems[_target['SYSTEM']]._report.send_bridgeEvent('GROUP VOICE,START,TX,{},{},{},{},{},{}'.format(_target['SYSTEM'], int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _target['TS'], int_id(_target['TGID'])).encode(encoding='utf-8', errors='ignore'))
+                            systems[_target['SYSTEM']]._report.bridge_event(BridgeEvent.GROUP_VOICE_START, 'TX', _target['SYSTEM'], _stream_id, _peer_id, _rf_src, _target['TS'], _target['TGID'])
 
                     # Set other values for the contention handler to test next time there is a frame to forward
                     _target_status[_target['TS']]['TX_TIME'] = pkt_time
@@ -2312,32 +2418,16 @@ class routerOBP(OPENBRIDGE):
                     else:
                         _tmp_bits = _bits
 
-                    # Assemble transmit HBP packet header
-                    _tmp_data = b''.join([_data[:8], _target['TGID'], _data[11:15], _tmp_bits.to_bytes(1, 'big'), _data[16:20]])
-
-                    # MUST TEST FOR NEW STREAM AND IF SO, RE-WRITE THE LC FOR THE TARGET
-                    # MUST RE-WRITE DESTINATION TGID IF DIFFERENT
-                    # if _dst_id != rule['DST_GROUP']:
-                    # Keep each fanout leg isolated: LC rewriting for one target
-                    # must never become the input payload for the next target.
-                    _tx_dmrpkt = dmrpkt
-                    dmrbits = bitarray(endian='big')
-                    dmrbits.frombytes(_tx_dmrpkt)
-                    # Create a voice header packet (FULL LC)
-                    if _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VHEAD:
-                        dmrbits = _target_status[_target['TS']]['TX_H_LC'][0:98] + dmrbits[98:166] + _target_status[_target['TS']]['TX_H_LC'][98:197]
-                    # Create a voice terminator packet (FULL LC)
-                    elif _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VTERM:
-                        dmrbits = _target_status[_target['TS']]['TX_T_LC'][0:98] + dmrbits[98:166] + _target_status[_target['TS']]['TX_T_LC'][98:197]
+                    # Assemble the transmit HBP packet. Legs sharing TGID, slot bit and
+                    # LC templates reuse one payload per frame; the bytes are immutable, so
+                    # one target's LC rewrite never becomes the input for the next.
+                    # Header/terminator get the target's FULL LC, bursts B-E its
+                    # embedded LC, applied as int masks from the per-call templates
+                    _tmp_data = fanout_payload(_fanout, _data, _target['TGID'], _tmp_bits, dmrpkt, _frame_type, _dtype_vseq, _target_status[_target['TS']]['TX_LC_TPL'])
+                    if _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VTERM:
                         if CONFIG['REPORTS']['REPORT']:
                             call_duration = pkt_time - _target_status[_target['TS']]['TX_START']
-                            systems[_target['SYSTEM']]._report.send_bridgeEvent('GROUP VOICE,END,TX,{},{},{},{},{},{},{:.2f}'.format(_target['SYSTEM'], int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _target['TS'], int_id(_target['TGID']), call_duration).encode(encoding='utf-8', errors='ignore'))
-                    # Create a Burst B-E packet (Embedded LC)
-                    elif _dtype_vseq in [1,2,3,4]:
-                        dmrbits = dmrbits[0:116] + _target_status[_target['TS']]['TX_EMB_LC'][_dtype_vseq] + dmrbits[148:264]
-                    _tx_dmrpkt = dmrbits.tobytes()
-                    #_tmp_data = b''.join([_tmp_data, _tx_dmrpkt, b'\x00\x00']) # Add two bytes of nothing since OBP doesn't include BER & RSSI bytes #_data[53:55]
-                    _tmp_data = b''.join([_tmp_data, _tx_dmrpkt])
+                            systems[_target['SYSTEM']]._report.bridge_event(BridgeEvent.GROUP_VOICE_END, 'TX', _target['SYSTEM'], _stream_id, _peer_id, _rf_src, _target['TS'], _target['TGID'], call_duration)
 
                 # Transmit the packet to the destination system
                 systems[_target['SYSTEM']].send_system(_tmp_data,_hops,_ber,_rssi,_source_server, _source_rptr)
@@ -2354,7 +2444,7 @@ class routerOBP(OPENBRIDGE):
         systems[_d_system].send_system(_tmp_data)
         logger.debug('(%s) UNIT Data Bridged to HBP on slot 1: %s DST_ID: %s',self._system,_d_system,_int_dst_id)
         if CONFIG['REPORTS']['REPORT']:
-            systems[_d_system]._report.send_bridgeEvent('UNIT DATA,DATA,TX,{},{},{},{},{},{}'.format(_d_system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), 1, _int_dst_id).encode(encoding='utf-8', errors='ignore'))
+            systems[_d_system]._report.bridge_event(BridgeEvent.UNIT_DATA, 'TX', _d_system, _stream_id, _peer_id, _rf_src, 1, _int_dst_id)
         
     def sendDataToOBP(self,_target,_data,dmrpkt,pkt_time,_stream_id,_dst_id,_peer_id,_rf_src,_bits,_slot,_hops = b'',_source_server = b'\x00\x00\x00\x00', _ber = b'\x00', _rssi = b'\x00', _source_rptr = b'\x00\x00\x00\x00'):
 
@@ -2378,7 +2468,7 @@ class routerOBP(OPENBRIDGE):
                 # Match group OBP stub counters — inbound may see this first
                 'packets': 0,
                 'loss': 0,
-                'crcs': set(),
+                'recent': FrameRing(),
                 'lastSeq': False,
                 'lastData': False,
             }
@@ -2398,7 +2488,7 @@ class routerOBP(OPENBRIDGE):
         systems[_target].send_system(_tmp_data,_hops,_ber,_rssi, _source_server, _source_rptr)
         logger.debug('(%s) UNIT Data Bridged to OBP System: %s DST_ID: %s', self._system, _target,_int_dst_id)
         if CONFIG['REPORTS']['REPORT']:
-            systems[_target]._report.send_bridgeEvent('UNIT DATA,DATA,TX,{},{},{},{},{},{}'.format(_target, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), 1, _int_dst_id).encode(encoding='utf-8', errors='ignore'))
+            systems[_target]._report.bridge_event(BridgeEvent.UNIT_DATA, 'TX', _target, _stream_id, _peer_id, _rf_src, 1, _int_dst_id)
 
 
     def dmrd_received(self, _peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data,_hash, _hops = b'', _source_server = b'\x00\x00\x00\x00', _ber = b'\x00', _rssi = b'\x00', _source_rptr = b'\x00\x00\x00\x00'):
@@ -2438,7 +2528,7 @@ class routerOBP(OPENBRIDGE):
                     'lastData': False,
                     'RX_PEER': _peer_id,
                     'packets': 0,
-                    'crcs': set(),
+                    'recent': FrameRing(),
                     'LC': b''.join([LC_OPT,_dst_id,_rf_src]),
                 }
             else:
@@ -2447,13 +2537,13 @@ class routerOBP(OPENBRIDGE):
                 _obp_st.setdefault('1ST', perf_counter())
                 _obp_st.setdefault('LC', b''.join([LC_OPT,_dst_id,_rf_src]))
                 _obp_st.setdefault('packets', 0)
-                _obp_st.setdefault('crcs', set())
+                if 'recent' not in _obp_st:
+                    _obp_st['recent'] = FrameRing()
                 _obp_st.setdefault('lastSeq', False)
                 _obp_st.setdefault('lastData', False)
             
             self.STATUS[_stream_id]['LAST'] = pkt_time
             self.STATUS[_stream_id].setdefault('packets', 0)
-            self.STATUS[_stream_id].setdefault('crcs', set())
             self.STATUS[_stream_id]['packets'] = self.STATUS[_stream_id]['packets'] + 1
             
             hr_times = {}
@@ -2501,22 +2591,22 @@ class routerOBP(OPENBRIDGE):
                 logger.info('(%s) *UNIT CSBK* STREAM ID: %s, RPTR: %s SUB: %s (%s) PEER: %s (%s) DST_ID %s (%s), TS %s, SRC: %s, RPTR: %s', \
                         self._system, int_id(_stream_id), self.get_rptr(_source_rptr), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot, int_id(_source_server),int_id(_source_rptr))
                 if CONFIG['REPORTS']['REPORT']:
-                        self._report.send_bridgeEvent('UNIT CSBK,DATA,RX,{},{},{},{},{},{}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id)).encode(encoding='utf-8', errors='ignore'))
+                        self._report.bridge_event(BridgeEvent.UNIT_CSBK, 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id)
             elif _dtype_vseq == 6:
                 logger.info('(%s) *UNIT DATA HEADER* STREAM ID: %s, RPTR: %s SUB: %s (%s) PEER: %s (%s) DST_ID %s (%s), TS %s, SRC: %s, RPTR: %s', \
                         self._system, int_id(_stream_id),self.get_rptr(_source_rptr), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot,int_id(_source_server),int_id(_source_rptr))
                 if CONFIG['REPORTS']['REPORT']:
-                        self._report.send_bridgeEvent('UNIT DATA HEADER,DATA,RX,{},{},{},{},{},{}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id)).encode(encoding='utf-8', errors='ignore'))
+                        self._report.bridge_event(BridgeEvent.UNIT_DATA_HEADER, 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id)
             elif _dtype_vseq == 7:
                     logger.info('(%s) *UNIT VCSBK 1/2 DATA BLOCK * STREAM ID: %s, RPTR: %s SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s, SRC: %s, RPTR: %s', \
                             self._system, int_id(_stream_id), self.get_rptr(_source_rptr), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot, int_id(_source_server),int_id(_source_rptr))
                     if CONFIG['REPORTS']['REPORT']:
-                        self._report.send_bridgeEvent('UNIT VCSBK 1/2 DATA BLOCK,DATA,RX,{},{},{},{},{},{}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id)).encode(encoding='utf-8', errors='ignore'))
+                        self._report.bridge_event(BridgeEvent.UNIT_VCSBK_12, 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id)
             elif _dtype_vseq == 8:
                     logger.info('(%s) *UNIT VCSBK 3/4 DATA BLOCK * STREAM ID: %s, RPTR: %s, SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s, SRC: %s, RPTR: %s', \
                             self._system, int_id(_stream_id), self.get_rptr(_source_rptr), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot,int_id(_source_server),int_id(_source_rptr))
                     if CONFIG['REPORTS']['REPORT']:
-                        self._report.send_bridgeEvent('UNIT VCSBK 3/4 DATA BLOCK,DATA,RX,{},{},{},{},{},{}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id)).encode(encoding='utf-8', errors='ignore'))
+                        self._report.bridge_event(BridgeEvent.UNIT_VCSBK_34, 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id)
             else:
                     logger.info('(%s) *UNKNOWN DATA TYPE* STREAM ID: %s, RPTR: %s, SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s, SRC: %s, RPTR: %s', \
                             self._system, int_id(_stream_id), self.get_rptr(_source_rptr), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot,int_id(_source_server),int_id(_source_rptr))
@@ -2540,20 +2630,10 @@ class routerOBP(OPENBRIDGE):
             
             #If destination ID is in the Subscriber Map
             if _dst_id in SUB_MAP:
-                # BACKWARDS COMPATIBILITY: Handle 3, 4, and 5-element formats
-                try:
-                    if len(SUB_MAP[_dst_id]) == 5:
-                        (_d_system, _d_slot, _d_tg, _d_time, _d_peer_id) = SUB_MAP[_dst_id]
-                    elif len(SUB_MAP[_dst_id]) == 4:
-                        (_d_system, _d_slot, _d_tg, _d_time) = SUB_MAP[_dst_id]
-                    else:  # Old 3-element format
-                        (_d_system, _d_slot, _d_time) = SUB_MAP[_dst_id]
-                except (TypeError, ValueError):
-                    logger.warning('(%s) Invalid SUB_MAP entry for destination %s', self._system, int_id(_dst_id))
-                else:
-                    _dst_slot  = systems[_d_system].STATUS[_d_slot]
-                    logger.info('(%s) SUB_MAP matched, System: %s Slot: %s, Time: %s',self._system, _d_system,_d_slot,_d_time)
-                    #If slot is idle for RX and TX
+                _d_system, _d_slot, _d_tg, _d_time, _d_peer_id = SUB_MAP[_dst_id]
+                _dst_slot  = systems[_d_system].STATUS[_d_slot]
+                logger.info('(%s) SUB_MAP matched, System: %s Slot: %s, Time: %s',self._system, _d_system,_d_slot,_d_time)
+                #If slot is idle for RX and TX
                 if (_dst_slot['RX_TYPE'] == HBPF_SLT_VTERM) and (_dst_slot['TX_TYPE'] == HBPF_SLT_VTERM) and (time() - _dst_slot['TX_TIME'] > CONFIG['SYSTEMS'][_d_system]['GROUP_HANGTIME']):                
                 #rewrite slot if required
                     if _slot != _d_slot:
@@ -2630,6 +2710,18 @@ class routerOBP(OPENBRIDGE):
             # UA activate once: brand-new STATUS, or first inbound claim on an outbound stub
             _obp_ua_arm = False
             if _obp_new_stream:
+                # An idle gap restarts the stream but not the call: keep its
+                # recent frames so late copies from before the gap stay dropped
+                if (_obp_previous is not None and 'recent' in _obp_previous
+                        and not _obp_previous.get('_fin') and not _obp_vhead_restart):
+                    _recent = _obp_previous['recent']
+                    if not _recent.add(_data):
+                        _obp_previous['loss'] = _obp_previous.get('loss', 0) + 1
+                        logger.debug("(%s) *PacketControl* Packet SEQ: %s after an idle gap is a duplicate of a recent one, disgarding. Stream ID:, %s TGID: %s",self._system,_seq,int_id(_stream_id),int_id(_dst_id))
+                        return
+                else:
+                    _recent = FrameRing()
+                    _recent.add(_data)
                 
                 # This is a new call stream
                 self.STATUS[_stream_id] = {
@@ -2643,7 +2735,7 @@ class routerOBP(OPENBRIDGE):
                     'RX_PEER': _peer_id,
                     'packets': 0,
                     'loss': 0,
-                    'crcs': set()
+                    'recent': _recent
 
                 }
                 _obp_ua_arm = True
@@ -2667,7 +2759,7 @@ class routerOBP(OPENBRIDGE):
                 logger.info('(%s) *CALL START* STREAM ID: %s, SUB: %s (%s), RPTR: %s (%s), PEER: %s (%s) TGID %s (%s), TS %s, SRC: %s, HOPS %s', 
                         self._system, int_id(_stream_id),get_alias(_rf_src, subscriber_ids),int_id(_rf_src),self.get_rptr(_source_rptr), int_id(_source_rptr),  get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot,int_id(_source_server),_inthops)
                 if CONFIG['REPORTS']['REPORT']:
-                    self._report.send_bridgeEvent('GROUP VOICE,START,RX,{},{},{},{},{},{}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id)).encode(encoding='utf-8', errors='ignore'))
+                    self._report.bridge_event(BridgeEvent.GROUP_VOICE_START, 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id)
 
 
             else:
@@ -2679,7 +2771,8 @@ class routerOBP(OPENBRIDGE):
                 _obp_st.setdefault('LC', b''.join([LC_OPT,_dst_id,_rf_src]))
                 _obp_st.setdefault('packets', 0)
                 _obp_st.setdefault('loss', 0)
-                _obp_st.setdefault('crcs', set())
+                if 'recent' not in _obp_st:
+                    _obp_st['recent'] = FrameRing()
                 _obp_st.setdefault('lastSeq', False)
                 _obp_st.setdefault('lastData', False)
                 _obp_st['packets'] = _obp_st['packets'] + 1
@@ -2765,6 +2858,11 @@ class routerOBP(OPENBRIDGE):
                     self.STATUS[_stream_id]['loss'] += 1
                     logger.debug("%s) *PacketControl* Out of order packet - last SEQ: %s, this SEQ: %s,  disgarding. Stream ID:, %s TGID: %s, LOSS: %.2f%%",self._system,self.STATUS[_stream_id]['lastSeq'],_seq,int_id(_stream_id),int_id(_dst_id),((self.STATUS[_stream_id]['loss'] / self.STATUS[_stream_id]['packets']) * 100))
                     return
+                #Copy of a recent packet (e.g. a late duplicate after an idle gap restarted the stream)
+                if not self.STATUS[_stream_id]['recent'].add(_data):
+                    self.STATUS[_stream_id]['loss'] += 1
+                    logger.debug("(%s) *PacketControl* Packet SEQ: %s is a duplicate of a recent one, disgarding. Stream ID:, %s TGID: %s, LOSS: %.2f%%",self._system,_seq,int_id(_stream_id),int_id(_dst_id),((self.STATUS[_stream_id]['loss'] / self.STATUS[_stream_id]['packets']) * 100))
+                    return
                 #Inbound missed packets
                 if _seq_delta is not None and 1 < _seq_delta <= 127:
                     self.STATUS[_stream_id]['loss'] += 1
@@ -2842,7 +2940,7 @@ class routerOBP(OPENBRIDGE):
                 logger.info('(%s) *CALL END*   STREAM ID: %s SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s, Duration: %.2f, Packet rate: %.2f/s, Loss: %.2f%%', \
                         self._system, int_id(_stream_id), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot, call_duration, packet_rate,loss)
                 if CONFIG['REPORTS']['REPORT']:
-                   self._report.send_bridgeEvent('GROUP VOICE,END,RX,{},{},{},{},{},{},{:.2f}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id), call_duration).encode(encoding='utf-8', errors='ignore'))
+                   self._report.bridge_event(BridgeEvent.GROUP_VOICE_END, 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id, call_duration)
                 self.STATUS[_stream_id]['_fin'] = True
                 _remember_term(_term_key, _data, pkt_time)
                    
@@ -2854,7 +2952,7 @@ class routerHBP(HBSYSTEM):
         HBSYSTEM.__init__(self, _name, _config, _report)
         # Status information for the system, TS1 & TS2
         # 1 & 2 are "timeslot"
-        # In TX_EMB_LC, 2-5 are burst B-E
+        # TX_LC_TPL holds the LC rewrite templates for the current TX stream
         self.STATUS = {
             1: {
                 'RX_START':     time(),
@@ -2873,18 +2971,11 @@ class routerHBP(HBSYSTEM):
                 'RX_TYPE':      HBPF_SLT_VTERM,
                 'TX_TYPE':      HBPF_SLT_VTERM,
                 'RX_LC':        b'\x00',
-                'TX_H_LC':      b'\x00',
-                'TX_T_LC':      b'\x00',
-                'TX_EMB_LC': {
-                    1: b'\x00',
-                    2: b'\x00',
-                    3: b'\x00',
-                    4: b'\x00',
-                    },
+                'TX_LC_TPL':    None,
                 'lastSeq': False,
                 'lastData': False,
                 'packets': 0,
-                'crcs': set(),
+                'recent': FrameRing(),
                 '_allStarMode': False
                 },
             2: {
@@ -2904,18 +2995,11 @@ class routerHBP(HBSYSTEM):
                 'RX_TYPE':      HBPF_SLT_VTERM,
                 'TX_TYPE':      HBPF_SLT_VTERM,
                 'RX_LC':        b'\x00',
-                'TX_H_LC':      b'\x00',
-                'TX_T_LC':      b'\x00',
-                'TX_EMB_LC': {
-                    1: b'\x00',
-                    2: b'\x00',
-                    3: b'\x00',
-                    4: b'\x00',
-                    },
+                'TX_LC_TPL':    None,
                 'lastSeq': False,
                 'lastData': False,
                 'packets': 0,
-                'crcs': set(),
+                'recent': FrameRing(),
                 '_allStarMode': False
                 }
             }
@@ -2960,6 +3044,7 @@ class routerHBP(HBSYSTEM):
 
     def to_target(self, _peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data, pkt_time, dmrpkt, _bits,_bridge,_system,_noOBP,sysIgnore,_source_server, _ber, _rssi, _source_rptr, _new_generation=False):
         _sysIgnore = sysIgnore
+        _fanout = {}
         for _target in BRIDGES[_bridge]:
             #if _target['SYSTEM'] != self._system or (_target['SYSTEM'] == self._system and _target['TS'] != _slot):
             if _target['SYSTEM'] != self._system and _target['ACTIVE']:
@@ -3013,7 +3098,7 @@ class routerHBP(HBSYSTEM):
                                 # Inbound LoopControl may see this stub first — keep packet stats present
                                 'packets': 0,
                                 'loss': 0,
-                                'crcs': set(),
+                                'recent': FrameRing(),
                                 'lastSeq': False,
                                 'lastData': False,
                                 'TARGET_LC': {},
@@ -3024,13 +3109,11 @@ class routerHBP(HBSYSTEM):
                             dst_lc = b''.join([self.STATUS[_slot]['RX_LC'][0:3], _target['TGID'], _rf_src])
                             _target_lc_map[_target['TGID']] = {
                                 'START': pkt_time,
-                                'H_LC': bptc.encode_header_lc(dst_lc),
-                                'T_LC': bptc.encode_terminator_lc(dst_lc),
-                                'EMB_LC': bptc.encode_emblc(dst_lc),
+                                'LC_TPL': lc_rewrite_templates(dst_lc),
                             }
                             logger.debug('(%s) Conference Bridge: %s, Call Bridged to OBP System: %s TS: %s, TGID: %s', self._system, _bridge, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
                             if CONFIG['REPORTS']['REPORT']:
-                                systems[_target['SYSTEM']]._report.send_bridgeEvent('GROUP VOICE,START,TX,{},{},{},{},{},{}'.format(_target['SYSTEM'], int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _target['TS'], int_id(_target['TGID'])).encode(encoding='utf-8', errors='ignore'))
+                                systems[_target['SYSTEM']]._report.bridge_event(BridgeEvent.GROUP_VOICE_START, 'TX', _target['SYSTEM'], _stream_id, _peer_id, _rf_src, _target['TS'], _target['TGID'])
                         _target_lc = _target_lc_map[_target['TGID']]
                             
                         # Record the time of this packet so we can later identify a stale stream
@@ -3038,31 +3121,16 @@ class routerHBP(HBSYSTEM):
                         # Clear the TS bit -- all OpenBridge streams are effectively on TS1
                         _tmp_bits = _bits & ~(1 << 7)
 
-                        # Assemble transmit HBP packet header
-                        _tmp_data = b''.join([_data[:8], _target['TGID'], _data[11:15], _tmp_bits.to_bytes(1, 'big'), _data[16:20]])
-
-                        # MUST TEST FOR NEW STREAM AND IF SO, RE-WRITE THE LC FOR THE TARGET
-                        # MUST RE-WRITE DESTINATION TGID IF DIFFERENT
-                        # if _dst_id != rule['DST_GROUP']:
-                        # Keep each fanout leg isolated: LC rewriting for one target
-                        # must never become the input payload for the next target.
-                        _tx_dmrpkt = dmrpkt
-                        dmrbits = bitarray(endian='big')
-                        dmrbits.frombytes(_tx_dmrpkt)
-                        # Create a voice header packet (FULL LC)
-                        if _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VHEAD:
-                            dmrbits = _target_lc['H_LC'][0:98] + dmrbits[98:166] + _target_lc['H_LC'][98:197]
-                        # Create a voice terminator packet (FULL LC)
-                        elif _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VTERM:
-                            dmrbits = _target_lc['T_LC'][0:98] + dmrbits[98:166] + _target_lc['T_LC'][98:197]
+                        # Assemble the transmit HBP packet. Legs sharing TGID, slot bit and
+                        # LC templates reuse one payload per frame; the bytes are immutable, so
+                        # one target's LC rewrite never becomes the input for the next.
+                        # Header/terminator get the target's FULL LC, bursts B-E its
+                        # embedded LC, applied as int masks from the per-call templates
+                        _tmp_data = fanout_payload(_fanout, _data, _target['TGID'], _tmp_bits, dmrpkt, _frame_type, _dtype_vseq, _target_lc['LC_TPL'])
+                        if _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VTERM:
                             if CONFIG['REPORTS']['REPORT']:
                                 call_duration = pkt_time - _target_lc['START']
-                                systems[_target['SYSTEM']]._report.send_bridgeEvent('GROUP VOICE,END,TX,{},{},{},{},{},{},{:.2f}'.format(_target['SYSTEM'], int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _target['TS'], int_id(_target['TGID']), call_duration).encode(encoding='utf-8', errors='ignore'))
-                        # Create a Burst B-E packet (Embedded LC)
-                        elif _dtype_vseq in [1,2,3,4]:
-                            dmrbits = dmrbits[0:116] + _target_lc['EMB_LC'][_dtype_vseq] + dmrbits[148:264]
-                        _tx_dmrpkt = dmrbits.tobytes()
-                        _tmp_data = b''.join([_tmp_data, _tx_dmrpkt])
+                                systems[_target['SYSTEM']]._report.bridge_event(BridgeEvent.GROUP_VOICE_END, 'TX', _target['SYSTEM'], _stream_id, _peer_id, _rf_src, _target['TS'], _target['TGID'], call_duration)
 
                     else:
                         # BEGIN STANDARD CONTENTION HANDLING
@@ -3112,13 +3180,11 @@ class routerHBP(HBSYSTEM):
                                 _target_status[_target['TS']]['TX_PEER'] = _peer_id
                                 # Generate LCs (full and EMB) for the TX stream
                                 dst_lc = b''.join([self.STATUS[_slot]['RX_LC'][0:3],_target['TGID'],_rf_src])
-                                _target_status[_target['TS']]['TX_H_LC'] = bptc.encode_header_lc(dst_lc)
-                                _target_status[_target['TS']]['TX_T_LC'] = bptc.encode_terminator_lc(dst_lc)
-                                _target_status[_target['TS']]['TX_EMB_LC'] = bptc.encode_emblc(dst_lc)
+                                _target_status[_target['TS']]['TX_LC_TPL'] = lc_rewrite_templates(dst_lc)
                                 logger.debug('(%s) Generating TX FULL and EMB LCs for HomeBrew destination: System: %s, TS: %s, TGID: %s', self._system, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
                                 logger.debug('(%s) Conference Bridge: %s, Call Bridged to HBP System: %s TS: %s, TGID: %s', self._system, _bridge, _target['SYSTEM'], _target['TS'], int_id(_target['TGID']))
                                 if CONFIG['REPORTS']['REPORT']:
-                                    systems[_target['SYSTEM']]._report.send_bridgeEvent('GROUP VOICE,START,TX,{},{},{},{},{},{}'.format(_target['SYSTEM'], int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _target['TS'], int_id(_target['TGID'])).encode(encoding='utf-8', errors='ignore'))
+                                    systems[_target['SYSTEM']]._report.bridge_event(BridgeEvent.GROUP_VOICE_START, 'TX', _target['SYSTEM'], _stream_id, _peer_id, _rf_src, _target['TS'], _target['TGID'])
 
                         # Set other values for the contention handler to test next time there is a frame to forward
                         _target_status[_target['TS']]['TX_TIME'] = pkt_time
@@ -3130,35 +3196,16 @@ class routerHBP(HBSYSTEM):
                         else:
                             _tmp_bits = _bits
 
-                        # Assemble transmit HBP packet header
-                        _tmp_data = b''.join([_data[:8], _target['TGID'], _data[11:15], _tmp_bits.to_bytes(1, 'big'), _data[16:20]])
-
-                        # MUST TEST FOR NEW STREAM AND IF SO, RE-WRITE THE LC FOR THE TARGET
-                        # MUST RE-WRITE DESTINATION TGID IF DIFFERENT
-                        # if _dst_id != rule['DST_GROUP']:
-                        # Keep each fanout leg isolated: LC rewriting for one target
-                        # must never become the input payload for the next target.
-                        _tx_dmrpkt = dmrpkt
-                        dmrbits = bitarray(endian='big')
-                        dmrbits.frombytes(_tx_dmrpkt)
-                        # Create a voice header packet (FULL LC)
-                        if _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VHEAD:
-                            dmrbits = _target_status[_target['TS']]['TX_H_LC'][0:98] + dmrbits[98:166] + _target_status[_target['TS']]['TX_H_LC'][98:197]
-                        # Create a voice terminator packet (FULL LC)
-                        elif _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VTERM:
-                            dmrbits = _target_status[_target['TS']]['TX_T_LC'][0:98] + dmrbits[98:166] + _target_status[_target['TS']]['TX_T_LC'][98:197]
+                        # Assemble the transmit HBP packet. Legs sharing TGID, slot bit and
+                        # LC templates reuse one payload per frame; the bytes are immutable, so
+                        # one target's LC rewrite never becomes the input for the next.
+                        # Header/terminator get the target's FULL LC, bursts B-E its
+                        # embedded LC, applied as int masks from the per-call templates
+                        _tmp_data = fanout_payload(_fanout, _data, _target['TGID'], _tmp_bits, dmrpkt, _frame_type, _dtype_vseq, _target_status[_target['TS']]['TX_LC_TPL'], _data[53:55])
+                        if _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VTERM:
                             if CONFIG['REPORTS']['REPORT']:
                                 call_duration = pkt_time - _target_status[_target['TS']]['TX_START']
-                                systems[_target['SYSTEM']]._report.send_bridgeEvent('GROUP VOICE,END,TX,{},{},{},{},{},{},{:.2f}'.format(_target['SYSTEM'], int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _target['TS'], int_id(_target['TGID']), call_duration).encode(encoding='utf-8', errors='ignore'))
-                        # Create a Burst B-E packet (Embedded LC)
-                        elif _dtype_vseq in [1,2,3,4]:
-                            dmrbits = dmrbits[0:116] + _target_status[_target['TS']]['TX_EMB_LC'][_dtype_vseq] + dmrbits[148:264]
-                        try:
-                            _tx_dmrpkt = dmrbits.tobytes()
-                        except AttributeError:
-                            logger.exception('(%s) Non-fatal AttributeError - dmrbits.tobytes()',self._system)
-                            
-                        _tmp_data = b''.join([_tmp_data, _tx_dmrpkt, _data[53:55]])
+                                systems[_target['SYSTEM']]._report.bridge_event(BridgeEvent.GROUP_VOICE_END, 'TX', _target['SYSTEM'], _stream_id, _peer_id, _rf_src, _target['TS'], _target['TGID'], call_duration)
 
                     # Transmit the packet to the destination system
                     systems[_target['SYSTEM']].send_system(_tmp_data,b'',_ber,_rssi,_source_server, _source_rptr)
@@ -3174,7 +3221,7 @@ class routerHBP(HBSYSTEM):
         systems[_d_system].send_system(_tmp_data,None)
         logger.debug('(%s) UNIT Data Bridged to HBP on slot 1: %s DST_ID: %s',self._system,_d_system,_int_dst_id)
         if CONFIG['REPORTS']['REPORT']:
-            systems[_d_system]._report.send_bridgeEvent('UNIT DATA,DATA,TX,{},{},{},{},{},{}'.format(_d_system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), 1, _int_dst_id).encode(encoding='utf-8', errors='ignore'))
+            systems[_d_system]._report.bridge_event(BridgeEvent.UNIT_DATA, 'TX', _d_system, _stream_id, _peer_id, _rf_src, 1, _int_dst_id)
 
     def _cancel_reflector_fallback(self, slot):
         timer = self.STATUS[slot].pop('_reflect_fallback', None)
@@ -3261,7 +3308,7 @@ class routerHBP(HBSYSTEM):
 
         elif int_dst_id >= 9991 and int_dst_id <= 9999:
             self.STATUS[slot]['_stopTgAnnounce'] = True
-            reactor.callInThread(playFileOnRequest, self, int_dst_id)
+            playFileOnRequest(self, int_dst_id)
             return None
 
         elif is_parrot_talkgroup(int_dst_id):
@@ -3304,7 +3351,7 @@ class routerHBP(HBSYSTEM):
                 self.ipsc_reflector_speech, speech, slot, peer_id, _gen, int_dst_id)
         else:
             speech = pkt_gen(bytes_3(5000), bytes_3(9), bytes_4(9), 1, _say)
-            reactor.callInThread(sendSpeech, self, speech)
+            sendSpeech(self, speech)
 
     def _reset_allstar_mode(self, slot):
         self.STATUS[slot]['_allStarMode'] = False
@@ -3328,10 +3375,8 @@ class routerHBP(HBSYSTEM):
 
         if _dst_id in SUB_MAP:
             try:
-                _entry = SUB_MAP[_dst_id]
-                _d_system = _entry[0]
-                _d_slot = _entry[1]
-                if _send(_d_system, _d_slot):
+                _rec = SUB_MAP[_dst_id]
+                if _send(_rec.system, _rec.ts):
                     return
             except (TypeError, ValueError, IndexError):
                 pass
@@ -3408,7 +3453,7 @@ class routerHBP(HBSYSTEM):
                 # Match group OBP stub counters — inbound may see this first
                 'packets': 0,
                 'loss': 0,
-                'crcs': set(),
+                'recent': FrameRing(),
                 'lastSeq': False,
                 'lastData': False,
             }
@@ -3428,7 +3473,7 @@ class routerHBP(HBSYSTEM):
         systems[_target].send_system(_tmp_data,b'',_ber,_rssi,_source_server,_source_rptr)
         logger.debug('(%s) UNIT Data Bridged to OBP System: %s DST_ID: %s', self._system, _target,_int_dst_id)
         if CONFIG['REPORTS']['REPORT']:
-            systems[system]._report.send_bridgeEvent('UNIT DATA,DATA,TX,{},{},{},{},{},{}'.format(_target, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), 1, _int_dst_id).encode(encoding='utf-8', errors='ignore'))
+            systems[system]._report.bridge_event(BridgeEvent.UNIT_DATA, 'TX', _target, _stream_id, _peer_id, _rf_src, 1, _int_dst_id)
     
 
     def dmrd_received(self, _peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data):
@@ -3458,20 +3503,10 @@ class routerHBP(HBSYSTEM):
         _voice_call = False
         
         # Add system to SUB_MAP - initialize with current TG as None (will be updated for group calls)
-        # New format: SUB_MAP[subscriber] = (system, ts, tg, timestamp, peer_id)
-        # Keep existing TG if subscriber already in map, else set to None
-        _existing_tg = None
-        if _rf_src in SUB_MAP:
-            try:
-                if len(SUB_MAP[_rf_src]) == 5:
-                    _existing_tg = SUB_MAP[_rf_src][2]  # Keep existing sticky TG
-                elif len(SUB_MAP[_rf_src]) == 4:
-                    _existing_tg = SUB_MAP[_rf_src][2]  # Keep existing sticky TG (old format)
-                elif len(SUB_MAP[_rf_src]) == 3:
-                    _existing_tg = None  # Old format, no TG
-            except (TypeError, IndexError):
-                _existing_tg = None
-        SUB_MAP[_rf_src] = (self._system, _slot, _existing_tg, pkt_time, _peer_id)
+        # Keep existing (sticky) TG if subscriber already in map, else set to None
+        _existing = SUB_MAP.get(_rf_src)
+        _existing_tg = _existing.tg if _existing is not None else None
+        _sub_map_set(_rf_src, SubscriberRecord(self._system, _slot, _existing_tg, pkt_time, _peer_id))
         
         def resetallStarMode():
             self.STATUS[_slot]['_allStarMode'] = False
@@ -3494,28 +3529,28 @@ class routerHBP(HBSYSTEM):
             _data_call = True
             
             self.STATUS[_slot]['packets'] = 0
-            self.STATUS[_slot]['crcs'] = set()
+            self.STATUS[_slot]['recent'] = FrameRing()
             
             if _dtype_vseq == 3:
                 logger.info('(%s) *UNIT CSBK* STREAM ID: %s SUB: %s (%s) PEER: %s (%s) DST_ID %s (%s), TS %s', \
                         self._system, int_id(_stream_id), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot)
                 if CONFIG['REPORTS']['REPORT']:
-                        self._report.send_bridgeEvent('UNIT CSBK,DATA,RX,{},{},{},{},{},{}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id)).encode(encoding='utf-8', errors='ignore'))
+                        self._report.bridge_event(BridgeEvent.UNIT_CSBK, 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id)
             elif _dtype_vseq == 6:
                 logger.info('(%s) *UNIT DATA HEADER* STREAM ID: %s SUB: %s (%s) PEER: %s (%s) DST_ID %s (%s), TS %s', \
                         self._system, int_id(_stream_id), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot)
                 if CONFIG['REPORTS']['REPORT']:
-                        self._report.send_bridgeEvent('UNIT DATA HEADER,DATA,RX,{},{},{},{},{},{}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id)).encode(encoding='utf-8', errors='ignore'))
+                        self._report.bridge_event(BridgeEvent.UNIT_DATA_HEADER, 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id)
             elif _dtype_vseq == 7:
                     logger.info('(%s) *UNIT VCSBK 1/2 DATA BLOCK * STREAM ID: %s SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s', \
                             self._system, int_id(_stream_id), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot)
                     if CONFIG['REPORTS']['REPORT']:
-                        self._report.send_bridgeEvent('UNIT VCSBK 1/2 DATA BLOCK,DATA,RX,{},{},{},{},{},{}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id)).encode(encoding='utf-8', errors='ignore'))
+                        self._report.bridge_event(BridgeEvent.UNIT_VCSBK_12, 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id)
             elif _dtype_vseq == 8:
                     logger.info('(%s) *UNIT VCSBK 3/4 DATA BLOCK * STREAM ID: %s SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s', \
                             self._system, int_id(_stream_id), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot)
                     if CONFIG['REPORTS']['REPORT']:
-                        self._report.send_bridgeEvent('UNIT VCSBK 3/4 DATA BLOCK,DATA,RX,{},{},{},{},{},{}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id)).encode(encoding='utf-8', errors='ignore'))
+                        self._report.bridge_event(BridgeEvent.UNIT_VCSBK_34, 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id)
             else:
                     logger.info('(%s) *UNKNOW TYPE* STREAM ID: %s SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s', \
                             self._system, int_id(_stream_id), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot)
@@ -3539,30 +3574,20 @@ class routerHBP(HBSYSTEM):
                     
             #If destination ID is in the Subscriber Map
             if _dst_id in SUB_MAP:
-                # BACKWARDS COMPATIBILITY: Handle 3, 4, and 5-element formats
-                try:
-                    if len(SUB_MAP[_dst_id]) == 5:
-                        (_d_system, _d_slot, _d_tg, _d_time, _d_peer_id) = SUB_MAP[_dst_id]
-                    elif len(SUB_MAP[_dst_id]) == 4:
-                        (_d_system, _d_slot, _d_tg, _d_time) = SUB_MAP[_dst_id]
-                    else:  # Old 3-element format
-                        (_d_system, _d_slot, _d_time) = SUB_MAP[_dst_id]
-                except (TypeError, ValueError):
-                    logger.warning('(%s) Invalid SUB_MAP entry for destination %s', self._system, int_id(_dst_id))
+                _d_system, _d_slot, _d_tg, _d_time, _d_peer_id = SUB_MAP[_dst_id]
+                _dst_slot  = systems[_d_system].STATUS[_d_slot]
+                logger.info('(%s) SUB_MAP matched, System: %s Slot: %s, Time: %s',self._system, _d_system,_d_slot,_d_time)
+                #If slot is idle for RX and TX
+                if (_dst_slot['RX_TYPE'] == HBPF_SLT_VTERM) and (_dst_slot['TX_TYPE'] == HBPF_SLT_VTERM) and (time() - _dst_slot['TX_TIME'] > CONFIG['SYSTEMS'][_d_system]['GROUP_HANGTIME']):                
+                #rewrite slot if required
+                    if _slot != _d_slot:
+                        _tmp_bits = _bits ^ 1 << 7
+                    else: 
+                        _tmp_bits = _bits                        
+                    self.sendDataToHBP(_d_system,_d_slot,_dst_id,_tmp_bits,_data,dmrpkt,_rf_src,_stream_id,_peer_id)
+                        
                 else:
-                    _dst_slot  = systems[_d_system].STATUS[_d_slot]
-                    logger.info('(%s) SUB_MAP matched, System: %s Slot: %s, Time: %s',self._system, _d_system,_d_slot,_d_time)
-                    #If slot is idle for RX and TX
-                    if (_dst_slot['RX_TYPE'] == HBPF_SLT_VTERM) and (_dst_slot['TX_TYPE'] == HBPF_SLT_VTERM) and (time() - _dst_slot['TX_TIME'] > CONFIG['SYSTEMS'][_d_system]['GROUP_HANGTIME']):                
-                    #rewrite slot if required
-                        if _slot != _d_slot:
-                            _tmp_bits = _bits ^ 1 << 7
-                        else: 
-                            _tmp_bits = _bits                        
-                        self.sendDataToHBP(_d_system,_d_slot,_dst_id,_tmp_bits,_data,dmrpkt,_rf_src,_stream_id,_peer_id)
-                            
-                    else:
-                        logger.debug('(%s) UNIT Data not bridged to HBP on slot 1 - target busy: %s DST_ID: %s',self._system,_d_system,_int_dst_id)
+                    logger.debug('(%s) UNIT Data not bridged to HBP on slot 1 - target busy: %s DST_ID: %s',self._system,_d_system,_int_dst_id)
             
             elif _int_dst_id == 900999:
                     if 'D-APRS' in systems and CONFIG['SYSTEMS']['D-APRS']['MODE'] == 'MASTER':
@@ -3655,7 +3680,7 @@ class routerHBP(HBSYSTEM):
             elif is_parrot_talkgroup(_int_dst_id):
                 if (_stream_id != self.STATUS[_slot]['RX_STREAM_ID']):
                     self.STATUS[_slot]['packets'] = 0
-                    self.STATUS[_slot]['crcs'] = set()
+                    self.STATUS[_slot]['recent'] = FrameRing()
                     logger.info('(%s) Parrot: Private call from %s to %s',
                                 self._system, int_id(_rf_src), _int_dst_id)
                 self._forward_parrot_unit_voice(_dst_id, _slot, _bits, _data, dmrpkt)
@@ -3673,7 +3698,7 @@ class routerHBP(HBSYSTEM):
                 if (_stream_id != self.STATUS[_slot]['RX_STREAM_ID']):
                 
                     self.STATUS[_slot]['packets'] = 0
-                    self.STATUS[_slot]['crcs'] = set()
+                    self.STATUS[_slot]['recent'] = FrameRing()
                 
                     self.STATUS[_slot]['_stopTgAnnounce'] = False
                     self.STATUS[_slot]['_reflect_announced'] = None
@@ -3704,7 +3729,7 @@ class routerHBP(HBSYSTEM):
                                                 _bridge, _system, _rf_src, _peer_id)
                                             and ((_system['TO_TYPE'] == 'ON' and (_system['ACTIVE'] == True))
                                                  or (_system['TO_TYPE'] == 'OFF' and _system['ACTIVE'] == False))):
-                                        _system['TIMER'] = pkt_time + _system['TIMEOUT']
+                                        _set_leg_timer(_bridge, _system, pkt_time + _system['TIMEOUT'])
                                         logger.info('(%s) [B] Transmission match for Reflector: %s. Reset timeout to %s', self._system, _bridge, _system['TIMER'])
                             
                                 # TGID matches an ACTIVATION trigger
@@ -3712,20 +3737,19 @@ class routerHBP(HBSYSTEM):
                                         and _int_dst_id == int(_dehash_bridge) and _system['SYSTEM'] == self._system and  _slot == _system['TS']):
                                     # Set the matching rule as ACTIVE
                                     if _system['ACTIVE'] == False:
-                                        _system['ACTIVE'] = True
-                                        _system['TIMER'] = pkt_time + _system['TIMEOUT']
+                                        _set_leg_timer(_bridge, _system, pkt_time + _system['TIMEOUT'], active=True)
                                         set_reflector_link_owner(_system, _rf_src, _peer_id)
                                         logger.info('(%s) [C] Reflector: %s, connection changed to state: %s', self._system, _bridge, _system['ACTIVE'])
                                         # Cancel the timer if we've enabled an "OFF" type timeout
                                         if _system['TO_TYPE'] == 'OFF':
-                                            _system['TIMER'] = pkt_time
+                                            _set_leg_timer(_bridge, _system, pkt_time)
                                             logger.info('(%s) [D] Reflector: %s has an "OFF" timer and set to "ON": timeout timer cancelled', self._system, _bridge)
                                 # Reset the timer for the rule (linked private call only)
                                 if (_system['SYSTEM'] == self._system
                                         and not is_dial_service_code(_int_dst_id)
                                         and _int_dst_id == int(_dehash_bridge)
                                         and _system['ACTIVE'] == True and _system['TO_TYPE'] == 'ON'):
-                                    _system['TIMER'] = pkt_time + _system['TIMEOUT']
+                                    _set_leg_timer(_bridge, _system, pkt_time + _system['TIMEOUT'])
                                     logger.info('(%s) [E] Reflector: %s, timeout timer reset to: %s', self._system, _bridge, _system['TIMER'] - pkt_time)
 
                                 # TGID matches an DE-ACTIVATION trigger
@@ -3735,20 +3759,20 @@ class routerHBP(HBSYSTEM):
                                         #Single TG mode
                                         if _dst_id in _system['OFF'] or _int_dst_id != int(_dehash_bridge) :
                                             if _system['ACTIVE'] == True:
-                                                _system['ACTIVE'] = False
+                                                _set_leg_timer(_bridge, _system, active=False)
                                                 clear_reflector_link_owner(_system)
                                                 logger.info('(%s) [F] Reflector: %s, connection changed to state: %s', self._system, _bridge, _system['ACTIVE'])
                                                 # Cancel the timer if we've enabled an "ON" type timeout
                                                 if _system['TO_TYPE'] == 'ON':
-                                                    _system['TIMER'] = pkt_time
+                                                    _set_leg_timer(_bridge, _system, pkt_time)
                                                     logger.info('(%s) [G] Reflector: %s has ON timer and set to "OFF": timeout timer cancelled', self._system, _bridge)
                                         # Reset the timer for the rule
                                         if _system['ACTIVE'] == False and _system['TO_TYPE'] == 'OFF':
-                                            _system['TIMER'] = pkt_time + _system['TIMEOUT']
+                                            _set_leg_timer(_bridge, _system, pkt_time + _system['TIMEOUT'])
                                             logger.info('(%s) [H] Reflector: %s, timeout timer reset to: %s', self._system, _bridge, _system['TIMER'] - pkt_time)
                                         # Cancel the timer if we've enabled an "ON" type timeout
                                         if _system['ACTIVE'] == True and _system['TO_TYPE'] == 'ON' and _dst_id in _system['OFF']:
-                                            _system['TIMER'] = pkt_time
+                                            _set_leg_timer(_bridge, _system, pkt_time)
                                             logger.info('(%s) [I] Reflector: %s has ON timer and set to "OFF": timeout timer cancelled', self._system, _bridge)
                         deactivate_other_dynamic_reflectors(self._system, _bridgename, _slot)
 
@@ -3764,6 +3788,7 @@ class routerHBP(HBSYSTEM):
                     _int_dst_id, group_call=False)
                 for _rb in _reset:
                     logger.info('(%s) [P] Dial-a-tg timer reset on private call end: %s', self._system, _rb)
+                    _arm_bridge_expiry(_rb)
                 if _reset:
                     notify_bridge_table_updated()
                 _say = self._build_reflector_announce_say(_int_dst_id, _slot, _lang)
@@ -3864,7 +3889,11 @@ class routerHBP(HBSYSTEM):
 
                 self.STATUS[_slot]['packets'] = 0
                 self.STATUS[_slot]['loss'] = 0
-                self.STATUS[_slot]['crcs'] = set()
+                # An idle gap restarts the stream but not the call: keep its
+                # recent frames so late copies from before the gap stay dropped
+                if (_stream_id != self.STATUS[_slot]['RX_STREAM_ID']
+                        or _hbp_is_vhead):
+                    self.STATUS[_slot]['recent'] = FrameRing()
                 self.STATUS[_slot]['lastSeq'] = False
                 self.STATUS[_slot]['lastData'] = False
 
@@ -3876,18 +3905,18 @@ class routerHBP(HBSYSTEM):
                         logger.info('(%s) *DATA HEADER* STREAM ID: %s SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s', \
                                 self._system, int_id(_stream_id), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot)
                         if CONFIG['REPORTS']['REPORT']:
-                            self._report.send_bridgeEvent('DATA HEADER,DATA,RX,{},{},{},{},{},{}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id)).encode(encoding='utf-8', errors='ignore'))
+                            self._report.bridge_event(BridgeEvent.DATA_HEADER, 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id)
                     
                     else:
                         logger.info('(%s) *CALL START* STREAM ID: %s SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s', \
                             self._system, int_id(_stream_id), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot)
                         if CONFIG['REPORTS']['REPORT']:
-                            self._report.send_bridgeEvent('GROUP VOICE,START,RX,{},{},{},{},{},{}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id)).encode(encoding='utf-8', errors='ignore'))
+                            self._report.bridge_event(BridgeEvent.GROUP_VOICE_START, 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id)
                 else:
                     logger.info('(%s) *VCSBK* STREAM ID: %s SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s _dtype_vseq: %s', 
                             self._system, int_id(_stream_id), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot, _dtype_vseq)
                     if CONFIG['REPORTS']['REPORT']:
-                        self._report.send_bridgeEvent('OTHER DATA,DATA,RX,{},{},{},{},{},{}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id)).encode(encoding='utf-8', errors='ignore'))
+                        self._report.bridge_event(BridgeEvent.OTHER_DATA, 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id)
 
                 # If we can, use the LC from the voice header as to keep all options intact
                 if _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VHEAD:
@@ -3909,22 +3938,9 @@ class routerHBP(HBSYSTEM):
                 # Update SUB_MAP with the TG for this call
                 # This enables sticky TG functionality - subscriber is now associated with this TG
                 if _rf_src in SUB_MAP:
-                    # BACKWARDS COMPATIBILITY: Handle 3, 4, and 5-element formats
-                    _sub_peer_id = None  # Initialize for backwards compatibility
-                    try:
-                        if len(SUB_MAP[_rf_src]) == 5:
-                            _system, _ts, _old_tg, _timestamp, _sub_peer_id = SUB_MAP[_rf_src]
-                        elif len(SUB_MAP[_rf_src]) == 4:
-                            _system, _ts, _old_tg, _timestamp = SUB_MAP[_rf_src]
-                        else:  # Old 3-element format
-                            _system, _ts, _timestamp = SUB_MAP[_rf_src]
-                            _old_tg = None
-                    except (TypeError, ValueError) as e:
-                        logger.warning('(%s) Invalid SUB_MAP entry for subscriber %s: %s', 
-                                      self._system, int_id(_rf_src), e)
-                        _system, _ts, _old_tg, _timestamp = self._system, _slot, None, pkt_time
-                    
-                    SUB_MAP[_rf_src] = (_system, _ts, _dst_id, pkt_time, _peer_id)
+                    _old_rec = SUB_MAP[_rf_src]
+                    _old_tg = _old_rec.tg
+                    _sub_map_set(_rf_src, _old_rec._replace(tg=_dst_id, time=pkt_time, peer_id=_peer_id))
                     
                     # Check if we should log sticky TG change based on per-peer or system-wide setting
                     _sticky_enabled = False
@@ -3949,12 +3965,12 @@ class routerHBP(HBSYSTEM):
                     logger.info('(%s) *VCSBK 1/2 DATA BLOCK * STREAM ID: %s SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s', \
                             self._system, int_id(_stream_id), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot)
                     if CONFIG['REPORTS']['REPORT']:
-                        self._report.send_bridgeEvent('VCSBK 1/2 DATA BLOCK,DATA,RX,{},{},{},{},{},{}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id)).encode(encoding='utf-8', errors='ignore'))
+                        self._report.bridge_event(BridgeEvent.VCSBK_12, 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id)
                 elif _dtype_vseq == 8:
                     logger.info('(%s) *VCSBK 3/4 DATA BLOCK * STREAM ID: %s SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s', \
                             self._system, int_id(_stream_id), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot)
                     if CONFIG['REPORTS']['REPORT']:
-                        self._report.send_bridgeEvent('VCSBK 3/4 DATA BLOCK,DATA,RX,{},{},{},{},{},{}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id)).encode(encoding='utf-8', errors='ignore'))
+                        self._report.bridge_event(BridgeEvent.VCSBK_34, 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id)
                         
             #Timeout
             if self.STATUS[_slot]['RX_START'] + 180 < pkt_time:
@@ -4028,6 +4044,11 @@ class routerHBP(HBSYSTEM):
                 self.STATUS[_slot]['loss'] += 1
                 logger.debug("%s) *PacketControl* Out of order packet - last SEQ: %s, this SEQ: %s,  disgarding. Stream ID:, %s TGID: %s ",self._system,self.STATUS[_slot]['lastSeq'],_seq,int_id(_stream_id),int_id(_dst_id))
                 return
+            #Copy of a recent packet (e.g. a late duplicate after an idle gap restarted the stream)
+            if not self.STATUS[_slot]['recent'].add(_data):
+                self.STATUS[_slot]['loss'] += 1
+                logger.debug("(%s) *PacketControl* Packet SEQ: %s is a duplicate of a recent one, disgarding. Stream ID:, %s TGID: %s",self._system,_seq,int_id(_stream_id),int_id(_dst_id))
+                return
             #Inbound missed packets
             if _seq_delta is not None and 1 < _seq_delta <= 127:
                 self.STATUS[_slot]['loss'] += 1
@@ -4089,7 +4110,7 @@ class routerHBP(HBSYSTEM):
                 logger.info('(%s) *CALL END*   STREAM ID: %s SUB: %s (%s) PEER: %s (%s) TGID %s (%s), TS %s, Duration: %.2f,  Packet rate: %.2f/s, LOSS: %.2f%%', \
                         self._system, int_id(_stream_id), get_alias(_rf_src, subscriber_ids), int_id(_rf_src), get_alias(_peer_id, peer_ids), int_id(_peer_id), get_alias(_dst_id, talkgroup_ids), int_id(_dst_id), _slot, call_duration, packet_rate, loss)
                 if CONFIG['REPORTS']['REPORT']:
-                   self._report.send_bridgeEvent('GROUP VOICE,END,RX,{},{},{},{},{},{},{:.2f}'.format(self._system, int_id(_stream_id), int_id(_peer_id), int_id(_rf_src), _slot, int_id(_dst_id), call_duration).encode(encoding='utf-8', errors='ignore'))
+                   self._report.bridge_event(BridgeEvent.GROUP_VOICE_END, 'RX', self._system, _stream_id, _peer_id, _rf_src, _slot, _dst_id, call_duration)
                 
                 #Reset back to False  
                 self.STATUS[_slot]['lastSeq'] = False
@@ -4105,6 +4126,7 @@ class routerHBP(HBSYSTEM):
                     _int_dst_id, group_call=True)
                 for _rb in _reset:
                     logger.info('(%s) [G9] Dial-a-tg timer reset on group call end: %s', self._system, _rb)
+                    _arm_bridge_expiry(_rb)
                 if _reset:
                     notify_bridge_table_updated()
 
@@ -4121,7 +4143,7 @@ class routerHBP(HBSYSTEM):
                                         _bridge, _system, _rf_src, _peer_id)
                                     and ((_system['TO_TYPE'] == 'ON' and (_system['ACTIVE'] == True))
                                          or (_system['TO_TYPE'] == 'OFF' and _system['ACTIVE'] == False))):
-                                _system['TIMER'] = pkt_time + _system['TIMEOUT']
+                                _set_leg_timer(_bridge, _system, pkt_time + _system['TIMEOUT'])
                                 logger.info('(%s) [1] Transmission match for Bridge: %s. Reset timeout to %s', self._system, _bridge, _system['TIMER'])
 
                             # TGID matches an ACTIVATION trigger
@@ -4130,8 +4152,7 @@ class routerHBP(HBSYSTEM):
                                 # Set the matching rule as ACTIVE
                                 if _dst_id in _system['ON']:
                                     if _system['ACTIVE'] == False:
-                                        _system['ACTIVE'] = True
-                                        _system['TIMER'] = pkt_time + _system['TIMEOUT']
+                                        _set_leg_timer(_bridge, _system, pkt_time + _system['TIMEOUT'], active=True)
                                         if _bridge[0:1] == '#':
                                             set_reflector_link_owner(_system, _rf_src, _peer_id)
                                         logger.info('(%s) [2] Bridge: %s, connection changed to state: %s', self._system, _bridge, _system['ACTIVE'])
@@ -4139,13 +4160,13 @@ class routerHBP(HBSYSTEM):
                                             notify_bridge_table_updated()
                                         # Cancel the timer if we've enabled an "OFF" type timeout
                                         if _system['TO_TYPE'] == 'OFF':
-                                            _system['TIMER'] = pkt_time
+                                            _set_leg_timer(_bridge, _system, pkt_time)
                                             logger.info('(%s) [3] Bridge: %s set to "OFF" with an on timer rule: timeout timer cancelled', self._system, _bridge)
                                 # Reset the timer for the rule (link owner PTT only on # reflectors)
                                 if (_system['ACTIVE'] == True and _system['TO_TYPE'] == 'ON'
                                         and reflector_timer_reset_allowed(
                                             _bridge, _system, _rf_src, _peer_id)):
-                                    _system['TIMER'] = pkt_time + _system['TIMEOUT']
+                                    _set_leg_timer(_bridge, _system, pkt_time + _system['TIMEOUT'])
                                     logger.info('(%s) [4] Bridge: %s, timeout timer reset to: %s', self._system, _bridge, _system['TIMER'] - pkt_time)
 
                             # TGID matches an DE-ACTIVATION trigger
@@ -4164,21 +4185,21 @@ class routerHBP(HBSYSTEM):
                                                 _int_dst_id, _dst_id, _bridge, _system)):
                                     #if _dst_id in _system['OFF']:
                                         if _system['ACTIVE'] == True:
-                                            _system['ACTIVE'] = False
+                                            _set_leg_timer(_bridge, _system, active=False)
                                             if _bridge[0:1] == '#':
                                                 clear_reflector_link_owner(_system)
                                             logger.info('(%s) [5] Bridge: %s, connection changed to state: %s', self._system, _bridge, _system['ACTIVE'])
                                             # Cancel the timer if we've enabled an "ON" type timeout
                                             if _system['TO_TYPE'] == 'ON':
-                                                _system['TIMER'] = pkt_time
+                                                _set_leg_timer(_bridge, _system, pkt_time)
                                                 logger.info('(%s) [6] Bridge: %s set to ON with an "OFF" timer rule: timeout timer cancelled', self._system, _bridge)
                                     # Reset the timer for the rule
                                     if _system['ACTIVE'] == False and _system['TO_TYPE'] == 'OFF':
-                                        _system['TIMER'] = pkt_time + _system['TIMEOUT']
+                                        _set_leg_timer(_bridge, _system, pkt_time + _system['TIMEOUT'])
                                         logger.info('(%s) [7] Bridge: %s, timeout timer reset to: %s', self._system, _bridge, _system['TIMER'] - pkt_time)
                                     # Cancel the timer if we've enabled an "ON" type timeout
                                     if _system['ACTIVE'] == True and _system['TO_TYPE'] == 'ON' and _dst_id in _system['OFF']:
-                                        _system['TIMER'] = pkt_time
+                                        _set_leg_timer(_bridge, _system, pkt_time)
                                         logger.info('(%s) [8] Bridge: %s set to ON with and "OFF" timer rule: timeout timer cancelled', self._system, _bridge)
                             else:
                                 
@@ -4186,19 +4207,19 @@ class routerHBP(HBSYSTEM):
                                     # Set the matching rule as ACTIVE
                                     if _dst_id in _system['OFF']:
                                         if _system['ACTIVE'] == True:
-                                            _system['ACTIVE'] = False
+                                            _set_leg_timer(_bridge, _system, active=False)
                                             logger.info('(%s) [9] Bridge: %s, connection changed to state: %s', self._system, _bridge, _system['ACTIVE'])
                                             # Cancel the timer if we've enabled an "ON" type timeout
                                         if _system['TO_TYPE'] == 'ON':
-                                            _system['TIMER'] = pkt_time
+                                            _set_leg_timer(_bridge, _system, pkt_time)
                                             logger.info('(%s) [10] Bridge: %s set to ON with and "OFF" timer rule: timeout timer cancelled', self._system, _bridge)
                                     # Reset the timer for the rule
                                     if _system['ACTIVE'] == False and _system['TO_TYPE'] == 'OFF':
-                                        _system['TIMER'] = pkt_time + _system['TIMEOUT']
+                                        _set_leg_timer(_bridge, _system, pkt_time + _system['TIMEOUT'])
                                         logger.info('(%s) [11] Bridge: %s, timeout timer reset to: %s', self._system, _bridge, _system['TIMER'] - pkt_time)
                                     # Cancel the timer if we've enabled an "ON" type timeout
                                     if _system['ACTIVE'] == True and _system['TO_TYPE'] == 'ON' and _dst_id in _system['OFF']:
-                                        _system['TIMER'] = pkt_time
+                                        _set_leg_timer(_bridge, _system, pkt_time)
                                         logger.info('(%s) [12] Bridge: %s set to ON with and "OFF" timer rule: timeout timer cancelled', self._system, _bridge)
 
             #
@@ -4260,6 +4281,27 @@ class routerIPSC(IpscMasterMixin, routerHBP):
 #
 class bridgeReportFactory(reportFactory):
 
+    # Full BRIDGE_DELTA snapshot at least this often, even without a gap
+    BRIDGE_RESYNC_S = 300.0
+    # Bridge events are buffered and sent at most this often; past
+    # EVENT_BUFFER_MAX unsent events the oldest are dropped
+    EVENT_FLUSH_S = 0.05
+    EVENT_BUFFER_MAX = 5000
+
+    def __init__(self, config):
+        super().__init__(config)
+        # Table and sequence number every BRIDGE_DELTA client currently holds
+        self._bridge_seq = 0
+        self._bridge_sent = None
+        self._bridge_full_at = 0.0
+        # Serialized worker-thread encode jobs, see send_bridge
+        self._report_jobs = deque()
+        self._report_busy = False
+        # Bridge event tuples waiting for the next flush, see bridge_event
+        self._events = []
+        self._events_call = None
+        self.events_dropped = 0
+
     @staticmethod
     def _clean_trigger_list(value):
         if value is None:
@@ -4277,7 +4319,7 @@ class bridgeReportFactory(reportFactory):
                 continue
             safe_systems = []
             for bridge_system in systems:
-                if not isinstance(bridge_system, dict):
+                if not isinstance(bridge_system, Mapping):
                     logger.warning('(REPORT) Skipping malformed bridge entry in %s payload type: %s', bridge, type(bridge_system))
                     continue
                 leg = build_report_bridge_leg(bridge_system)
@@ -4293,18 +4335,157 @@ class bridgeReportFactory(reportFactory):
         return safe_bridges
 
     def send_bridge(self):
+        # The report table is built here on the reactor (it reads BRIDGES);
+        # diffing and encoding run in a worker thread, one job at a time so
+        # BRIDGE_DELTA sequence numbers stay in order. A table that is still
+        # waiting for the worker is replaced by the newer one.
+        if not self.clients:
+            return
         _t0 = time()
-        serialized = pickle.dumps(self._safe_bridges_payload(), protocol=2) #.decode("utf-8", errors='ignore')
-        self.send_clients(b''.join([REPORT_OPCODES['BRIDGE_SND'],serialized]))
+        payload = self._safe_bridges_payload()
+        for i, (_kind, _arg) in enumerate(self._report_jobs):
+            if _kind == 'bridge':
+                self._report_jobs[i] = ('bridge', (payload, _t0))
+                self.coalesced += 1
+                break
+        else:
+            self._report_jobs.append(('bridge', (payload, _t0)))
         _elapsed_ms = (time() - _t0) * 1000.0
         if _elapsed_ms >= 50.0:
             logger.info(
-                '(DIAGNOSTICS) send_bridge took %.1fms (payload=%d bytes, bridges=%d)',
-                _elapsed_ms, len(serialized), len(BRIDGES))
+                '(DIAGNOSTICS) send_bridge took %.1fms to build the report table (bridges=%d)',
+                _elapsed_ms, len(BRIDGES))
+        self._run_report_jobs()
+
+    def send_bridge_resync(self, client):
+        # Queued behind any table being encoded, so the snapshot is the one
+        # every other delta client holds when it is taken
+        self._report_jobs.append(('resync', client))
+        self._run_report_jobs()
+
+    def _run_report_jobs(self):
+        if self._report_busy or not self._report_jobs:
+            return
+        _kind, _arg = self._report_jobs.popleft()
+        if _kind == 'resync':
+            client = _arg
+            if client not in self.clients:
+                self._run_report_jobs()
+                return
+            client.bridge_deltas = True
+            if self._bridge_sent is None:
+                self._bridge_sent = self._safe_bridges_payload()
+                self._bridge_full_at = time()
+            self._report_in_thread(
+                self.encode_formats,
+                (REPORT_OPCODES['BRIDGE_DELTA'], full_message(self._bridge_seq, self._bridge_sent),
+                 {client.report_format}),
+                lambda _messages: self.fan_out(_messages, [client]))
+        else:
+            payload, _t0 = _arg
+            _full = self._bridge_sent is None or _t0 - self._bridge_full_at >= self.BRIDGE_RESYNC_S
+            self._report_in_thread(
+                self._encode_bridge,
+                (payload, self._bridge_sent, self._bridge_seq, _full,
+                 {c.report_format for c in self.clients if not c.bridge_deltas},
+                 {c.report_format for c in self.clients if c.bridge_deltas}),
+                lambda _result: self._bridge_encoded(_result, payload, _t0, _full))
+
+    def _report_in_thread(self, _fn, _args, _done):
+        # Run _fn(*_args) on the reactor thread pool, then _done(result)
+        # back on the reactor; the next queued job starts after that
+        self._report_busy = True
+
+        def _work():
+            try:
+                _result = _fn(*_args)
+            except Exception as exc:
+                logger.error('(REPORT) Encoding bridge report failed: %s', exc)
+                reactor.callFromThread(self._report_job_done, None)
+                return
+            reactor.callFromThread(self._report_job_done, _done, _result)
+
+        reactor.callInThread(_work)
+
+    def _report_job_done(self, _done, _result=None):
+        try:
+            if _done is not None:
+                _done(_result)
+        finally:
+            self._report_busy = False
+            self._run_report_jobs()
+
+    @classmethod
+    def _encode_bridge(cls, payload, sent, seq, full, legacy_formats, delta_formats):
+        # Worker thread: only touches its arguments, never BRIDGES
+        _t0 = time()
+        _snd = cls.encode_formats(REPORT_OPCODES['BRIDGE_SND'], payload, legacy_formats)
+        _delta = {}
+        if delta_formats:
+            _message = None
+            if full:
+                seq += 1
+                _message = full_message(seq, payload)
+            else:
+                _ops = diff_bridges(sent, payload)
+                if _ops:
+                    seq += 1
+                    _message = delta_message(seq, _ops)
+            if _message is not None:
+                _delta = cls.encode_formats(REPORT_OPCODES['BRIDGE_DELTA'], _message, delta_formats)
+        return _snd, _delta, seq, (time() - _t0) * 1000.0
+
+    def _bridge_encoded(self, result, payload, t0, full):
+        _snd, _delta, _seq, _encode_ms = result
+        _size = self.fan_out(_snd, [c for c in self.clients if not c.bridge_deltas])
+        _size = max(_size, self.fan_out(_delta, [c for c in self.clients if c.bridge_deltas]))
+        self._bridge_sent = payload
+        self._bridge_seq = _seq
+        if full and _delta:
+            self._bridge_full_at = t0
+        logger.debug('(REPORT) Bridge report encoded off-reactor in %.1fms (payload=%d bytes)', _encode_ms, _size)
+
+    def bridge_event(self, kind, trx, system, stream_id, peer_id, rf_src, slot, dst_id, duration=None):
+        # Routing hot path: IDs stay as the raw packet bytes and nothing is
+        # formatted here; _flush_events encodes the whole batch later
+        if not self.clients:
+            return
+        _events = self._events
+        if len(_events) >= self.EVENT_BUFFER_MAX:
+            del _events[0]
+            self.events_dropped += 1
+        _events.append((kind, trx, system, stream_id, peer_id, rf_src, slot, dst_id, duration))
+        if self._events_call is None:
+            self._events_call = reactor.callLater(self.EVENT_FLUSH_S, self._flush_events)
+
+    def _flush_events(self):
+        self._events_call = None
+        _events, self._events = self._events, []
+        if not _events or not self.clients:
+            return
+        _binary = [client for client in self.clients if client.binary_events]
+        _legacy = [client for client in self.clients if not client.binary_events]
+        if _binary:
+            try:
+                _message = b''.join([REPORT_OPCODES['BRDG_EVENTS'], pack_events(_events)])
+            except EventError as e:
+                # Binary clients miss this batch; CSV clients still get theirs
+                logger.warning('(REPORT) Cannot pack %s bridge events: %s', len(_events), e)
+            else:
+                for client in _binary:
+                    client.queue_message(_message)
+        if _legacy:
+            # CSV lines are only built when someone still wants them
+            _opcode = REPORT_OPCODES['BRDG_EVENT']
+            _messages = [b''.join([_opcode, format_csv(_event).encode('utf-8', errors='ignore')]) for _event in _events]
+            for client in _legacy:
+                for _message in _messages:
+                    client.queue_message(_message)
 
     def send_bridgeEvent(self, _data):
+        # Pre-formatted CSV, sent straight away to every client
         if isinstance(_data, str):
-            _data = _data.decode('utf-8', error='ignore')
+            _data = _data.encode('utf-8', errors='ignore')
         self.send_clients(b''.join([REPORT_OPCODES['BRDG_EVENT'],_data]))
 
     def send_server_info(self):
@@ -4322,6 +4503,7 @@ if __name__ == '__main__':
     import sys
     import os
     import signal
+    from bridge_shards import SHARD_KEY_ENV, SHARD_WATCH_S, ShardChildren, apply_shard, assign_shards, make_shard_links
     
     # Higheset peer ID permitted by HBP
     PEER_MAX = 4294967295
@@ -4340,6 +4522,8 @@ if __name__ == '__main__':
     parser.add_argument('-r', '--rules', action='store', dest='RULES_FILE', help='/full/path/to/rules.file (usually rules.py)')
     parser.add_argument('-l', '--logging', action='store', dest='LOG_LEVEL', help='Override config file logging level.')
     parser.add_argument('--version', action='store_true', dest='SHOW_VERSION', help='Print RYSEN version and exit.')
+    # Internal: set by the shard 0 process when it starts the other shards
+    parser.add_argument('--shard', action='store', dest='SHARD', type=int, default=0, help=argparse.SUPPRESS)
     cli_args = parser.parse_args()
 
     if cli_args.SHOW_VERSION:
@@ -4396,14 +4580,22 @@ if __name__ == '__main__':
         AMIOBJ = AMI(CONFIG['ALLSTAR']['SERVER'],CONFIG['ALLSTAR']['PORT'],CONFIG['ALLSTAR']['USER'],CONFIG['ALLSTAR']['PASS'],CONFIG['ALLSTAR']['NODE'])
             
 
+    # Shard processes started by this one (SHARDS > 1, shard 0 only)
+    _shard_children = None
+    shard_watch_task = None
+
     # Set up the signal handler
     def sig_handler(_signal, _frame):
         logger.info('(GLOBAL) SHUTDOWN: CONFBRIDGE IS TERMINATING WITH SIGNAL %s', str(_signal))
+        if shard_watch_task is not None and shard_watch_task.running:
+            shard_watch_task.stop()
+        if _shard_children is not None:
+            _shard_children.terminate()
         hblink_handler(_signal, _frame)
         logger.info('(GLOBAL) SHUTDOWN: ALL SYSTEM HANDLERS EXECUTED - STOPPING REACTOR')
         reactor.stop()
         if CONFIG['ALIASES']['SUB_MAP_FILE']:
-            subMapWrite()
+            subMapWrite(sync=True)
 
     # Set signal handers so that we can gracefully exit if need be
     for sig in [signal.SIGINT, signal.SIGTERM]:
@@ -4420,7 +4612,7 @@ if __name__ == '__main__':
     CONFIG['_PEER_IDS'] = peer_ids
     CONFIG['_LOCAL_SUBSCRIBER_IDS'] = local_subscriber_ids
     CONFIG['_SERVER_IDS'] = server_ids
-    
+    SOURCE_SERVERS.rebuild(CONFIG)
     
     
     # Import the ruiles file as a module, and create BRIDGES from it
@@ -4456,46 +4648,13 @@ if __name__ == '__main__':
     #Subscriber map for unit calls - complete with test entry
     #SUB_MAP = {bytes_3(73578):('REP-1',1,time())}
     SUB_MAP = {}
-    
-    
-    if CONFIG['ALIASES']['SUB_MAP_FILE']:
-        try:
-            with open(CONFIG['ALIASES']['PATH'] + CONFIG['ALIASES']['SUB_MAP_FILE'],'rb') as _fh:
-                SUB_MAP = pickle.load(_fh)
-            
-            # BACKWARDS COMPATIBILITY: Handle old SUB_MAP formats
-            # Old 3-element format: SUB_MAP[subscriber] = (system, ts, timestamp)
-            # Old 4-element format: SUB_MAP[subscriber] = (system, ts, tg, timestamp)
-            # New 5-element format: SUB_MAP[subscriber] = (system, ts, tg, timestamp, peer_id)
-            # Convert old formats to new format by adding None for missing fields
-            _converted_count = 0
-            for _subscriber in list(SUB_MAP.keys()):
-                try:
-                    if len(SUB_MAP[_subscriber]) == 3:  # Old 3-element format
-                        _system, _ts, _timestamp = SUB_MAP[_subscriber]
-                        SUB_MAP[_subscriber] = (_system, _ts, None, _timestamp, None)
-                        _converted_count += 1
-                    elif len(SUB_MAP[_subscriber]) == 4:  # Old 4-element format
-                        _system, _ts, _tg, _timestamp = SUB_MAP[_subscriber]
-                        SUB_MAP[_subscriber] = (_system, _ts, _tg, _timestamp, None)
-                        _converted_count += 1
-                except (TypeError, ValueError) as e:
-                    logger.warning('(SUBSCRIBER) Invalid SUB_MAP entry for subscriber %s, removing: %s', int_id(_subscriber), e)
-                    SUB_MAP.pop(_subscriber, None)
-            
-            if _converted_count > 0:
-                logger.info('(SUBSCRIBER) Converted %s SUB_MAP entries to new 5-element format', _converted_count)
-            logger.info('(SUBSCRIBER) Loaded SUB_MAP with %s entries', len(SUB_MAP))
-        except Exception as e:
-            logger.warning('(SUBSCRIBER) Cannot load SUB_MAP file: %s', e)
-            #sys.exit('(SUBSCRIBER) TERMINATING: SUB_MAP file not found or invalid')
-        
-        #Test value
-        #SUB_MAP[bytes_3(73578)] = ('REP-1',1,None,time())
+    # Where a shard with no SUB_MAP of its own yet starts from
+    _sub_map_seed = None
     
     
     #Generator
     generator = {}
+    generated_slots = {}
     systemdelete = deque()
     for system in CONFIG['SYSTEMS']:
         if CONFIG['SYSTEMS'][system]['ENABLED']:
@@ -4507,6 +4666,7 @@ if __name__ == '__main__':
                     generator[_systemname]['PORT'] = generator[_systemname]['PORT'] + count
                     generator[_systemname]['_default_options'] = "TS1_STATIC={};TS2_STATIC={};SINGLE={};DEFAULT_UA_TIMER={};DEFAULT_REFLECTOR={};VOICE={};LANG={}".format(generator[_systemname]['TS1_STATIC'],generator[_systemname]['TS2_STATIC'],int(generator[_systemname]['SINGLE_MODE']),generator[_systemname]['DEFAULT_UA_TIMER'],generator[_systemname]['DEFAULT_REFLECTOR'],int(generator[_systemname]['VOICE_IDENT']), generator[_systemname]['ANNOUNCEMENT_LANGUAGE'])
                     logger.debug('(GLOBAL) Generator - generated system %s',_systemname)
+                    generated_slots.setdefault(system, []).append(_systemname)
                     generator[_systemname]['_default_options']
                 systemdelete.append(system)
     
@@ -4518,7 +4678,48 @@ if __name__ == '__main__':
     del generator
     del systemdelete
 
+    # Sharded mode: shard 0 (this process) starts one copy of bridge_master
+    # per extra shard. Every shard trims CONFIG to its own GENERATOR slots
+    # (shard 0 also keeps all other systems) plus OBP-SHARD-n links to the rest.
+    if CONFIG['GLOBAL']['SHARDS'] > 1:
+        _shards = CONFIG['GLOBAL']['SHARDS']
+        if cli_args.SHARD:
+            _shard_key = bytes.fromhex(os.environ[SHARD_KEY_ENV])
+        else:
+            _shard_key = os.urandom(20)
+            _shard_env = dict(os.environ)
+            _shard_env[SHARD_KEY_ENV] = _shard_key.hex()
+            _shard_args = {}
+            for _shard in range(1, _shards):
+                _shard_args[_shard] = [sys.executable, os.path.realpath(sys.argv[0]), '-c', cli_args.CONFIG_FILE, '-r', cli_args.RULES_FILE, '--shard', str(_shard)]
+                if cli_args.LOG_LEVEL:
+                    _shard_args[_shard] += ['-l', cli_args.LOG_LEVEL]
+            _shard_children = ShardChildren(_shard_args, _shard_env)
+            _shard_children.start_all()
+        if cli_args.SHARD and CONFIG['ALIASES']['SUB_MAP_FILE']:
+            _sub_map_seed = CONFIG['ALIASES']['PATH'] + CONFIG['ALIASES']['SUB_MAP_FILE']
+        apply_shard(CONFIG, cli_args.SHARD,
+                    assign_shards(CONFIG['SYSTEMS'], generated_slots, _shards),
+                    make_shard_links(CONFIG['GLOBAL']['SERVER_ID'], CONFIG['GLOBAL']['SHARD_PORT'], _shards, cli_args.SHARD, _shard_key))
+        setproctitle('{} shard {}'.format(__file__, cli_args.SHARD))
+        logger.info('(GLOBAL) Running as shard %s of %s with %s systems', cli_args.SHARD, _shards, len(CONFIG['SYSTEMS']))
+    del generated_slots
+
+    # After apply_shard: each shard has its own SUB_MAP_FILE, snapshot and journal
+    if CONFIG['ALIASES']['SUB_MAP_FILE']:
+        try:
+            subMapLoad(_sub_map_seed)
+        except Exception as e:
+            logger.warning('(SUBSCRIBER) Cannot load SUB_MAP file: %s', e)
+            #sys.exit('(SUBSCRIBER) TERMINATING: SUB_MAP file not found or invalid')
+        
+        #Test value
+        #SUB_MAP[bytes_3(73578)] = ('REP-1',1,None,time())
+    rebuild_sub_map_indexes()
+
     augment_bridges_for_masters()
+    if CONFIG['GLOBAL']['SHARDS'] > 1:
+        augment_bridges_for_shards()
     
     # Default reflector
     logger.debug('(ROUTER) Setting default reflectors')
@@ -4609,17 +4810,28 @@ if __name__ == '__main__':
 
     # Initialize the rule timer -- this if for user activated stuff
     rule_timer_task = task.LoopingCall(rule_timer_loop)
-    rule_timer = rule_timer_task.start(52)
+    rule_timer = rule_timer_task.start(RULE_TIMER_SWEEP_S)
     rule_timer.addErrback(loopingErrHandle)
 
+    # Per-bridge rule timer deadlines (see _LEG_EXPIRY)
+    leg_expiry_task = task.LoopingCall(leg_expiry_loop)
+    leg_expiry = leg_expiry_task.start(_LEG_EXPIRY_TICK_S)
+    leg_expiry.addErrback(loopingErrHandle)
+
     # Initialize the stream trimmer
     stream_trimmer_task = task.LoopingCall(stream_trimmer_loop)
     stream_trimmer = stream_trimmer_task.start(5)
     stream_trimmer.addErrback(loopingErrHandle)
+
+    # Restart shard processes that exit (shard 0 only)
+    if _shard_children is not None:
+        shard_watch_task = task.LoopingCall(_shard_children.check)
+        shard_watch = shard_watch_task.start(SHARD_WATCH_S, now=False)
+        shard_watch.addErrback(loopingErrHandle)
    
     # Ident
     #This runs in a thread so as not to block the reactor
-    ident_task = task.LoopingCall(threadIdent)
+    ident_task = task.LoopingCall(ident)
     identa = ident_task.start(914)
     identa.addErrback(loopingErrHandle)
     
@@ -4668,6 +4880,11 @@ if __name__ == '__main__':
     sub_trimmer = sub_trimmer_task.start(3600)#3600
     sub_trimmer.addErrback(loopingErrHandle)
 
+    if SUB_JOURNAL is not None:
+        sub_journal_task = task.LoopingCall(subMapJournalFlush)
+        sub_journal = sub_journal_task.start(SUB_JOURNAL_FLUSH_S)
+        sub_journal.addErrback(loopingErrHandle)
+
     # Reactor lag / event-loop health diagnostics
     _REACTOR_LAG_LAST[0] = time()  # seed with current time so first check is meaningful
     _ROUTE_STATS_NEXT_LOG[0] = time() + _ROUTE_STATS_INTERVAL
@@ -4675,7 +4892,8 @@ if __name__ == '__main__':
     reactor_lag = reactor_lag_task.start(_REACTOR_LAG_INTERVAL)
     reactor_lag.addErrback(loopingErrHandle)
 
-    #more threads
+    # Workers for IPSC reflector speech, alias downloads and report
+    # encoding; HBP voice playout runs on the reactor (VOICE_PLAYOUT)
     reactor.suggestThreadPoolSize(100)
 
     _log_file = CONFIG['LOGGER'].get('LOG_FILE', '/opt/rysen/log/rysen.log')
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+###############################################################################
+#   Sharded router layout (GLOBAL SHARDS)
+#   Copyright (C) 2026 Shane Daley, M0VUB <shane@freestar.network>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+###############################################################################
+'''
+With SHARDS > 1, bridge_master.py runs one process (and one reactor) per
+shard. GENERATOR slots are dealt out to the shards in contiguous blocks;
+every other system stays on shard 0. Shards are joined by a full mesh of
+OpenBridge links on 127.0.0.1 named OBP-SHARD-<n>, so cross-shard group
+traffic uses the same STAT bridge and loop control as any other OBP peer.
+Each shard's BRIDGES only holds legs for its own systems plus those
+links, so there is no bridge table to replicate between processes.
+
+The layout helpers open no sockets. ShardChildren is shard 0's handle on
+the other shard processes: it starts them, restarts any that exit and
+has the kernel stop them if shard 0 itself dies.
+'''
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import signal
+import subprocess
+import sys
+
+import const
+from config import acl_build
+
+logger = logging.getLogger(__name__)
+
+SHARD_LINK_PREFIX = 'OBP-SHARD-'
+SHARD_LINK_IP = '127.0.0.1'
+SHARD_KEY_ENV = 'RYSEN_SHARD_KEY'
+# How often shard 0 checks that its children are still running (seconds)
+SHARD_WATCH_S = 5
+# prctl(2) option: signal delivered to this process when its parent exits
+PR_SET_PDEATHSIG = 1
+
+
+def assign_shards(system_names, generated, shards):
+    '''
+    Return {system name: shard}. generated maps each GENERATOR parent to
+    its slot names in order; slot i of n goes to shard i * shards // n so
+    each shard gets one contiguous run of ports per generator.
+    '''
+    _assign = {_system: 0 for _system in system_names}
+    for _slots in generated.values():
+        _count = len(_slots)
+        for _i, _system in enumerate(_slots):
+            _assign[_system] = _i * shards // _count
+    return _assign
+
+
+def shard_link_name(peer_shard):
+    return '{}{}'.format(SHARD_LINK_PREFIX, peer_shard)
+
+
+def shard_link_ports(base_port, shards, shard, peer_shard):
+    '''(local port, target port) for the link from shard to peer_shard.'''
+    return (base_port + shard * shards + peer_shard,
+            base_port + peer_shard * shards + shard)
+
+
+def shard_link_config(server_id, port, target_port, passphrase):
+    '''An OPENBRIDGE system entry, as config.build_config would produce it.'''
+    return {
+        'MODE': 'OPENBRIDGE',
+        'ENABLED': True,
+        'NETWORK_ID': server_id,
+        'IP': SHARD_LINK_IP,
+        'PORT': port,
+        'PASSPHRASE': passphrase,
+        'TARGET_IP': SHARD_LINK_IP,
+        'TARGET_PORT': target_port,
+        'TARGET_SOCK': (SHARD_LINK_IP, target_port),
+        'USE_ACL': False,
+        'SUB_ACL': acl_build('PERMIT:ALL', const.ID_MAX),
+        'TG1_ACL': acl_build('PERMIT:ALL', const.ID_MAX),
+        'TG2_ACL': acl_build('PERMIT:ALL', const.ID_MAX),
+        'RELAX_CHECKS': False,
+        'ENHANCED_OBP': False,
+        'VER': const.VER,
+        '_SHARD_LINK': True,
+    }
+
+
+def make_shard_links(server_id, base_port, shards, shard, passphrase):
+    _links = {}
+    for _peer in range(shards):
+        if _peer == shard:
+            continue
+        _port, _target_port = shard_link_ports(base_port, shards, shard, _peer)
+        _links[shard_link_name(_peer)] = shard_link_config(server_id, _port, _target_port, passphrase)
+    return _links
+
+
+def apply_shard(_config, shard, assignment, links):
+    '''
+    Trim CONFIG down to this shard's systems, add its links and move the
+    per-process files and ports out of each other's way.
+    '''
+    for _system in list(_config['SYSTEMS']):
+        if assignment.get(_system, 0) != shard:
+            _config['SYSTEMS'].pop(_system)
+    _config['SYSTEMS'].update(links)
+    if shard:
+        _config['REPORTS']['REPORT_PORT'] += shard
+        if _config['ALIASES'].get('SUB_MAP_FILE'):
+            _config['ALIASES']['SUB_MAP_FILE'] = '{}.shard{}'.format(_config['ALIASES']['SUB_MAP_FILE'], shard)
+    _config['GLOBAL']['_SHARD'] = shard
+    return _config
+
+
+def die_with_parent(parent_pid):
+    '''
+    preexec_fn for shard children: SIGTERM the child when shard 0 exits, so
+    a killed or crashed parent never leaves shards holding their ports.
+    Linux only; elsewhere the child just outlives its parent as before.
+    '''
+    def _preexec():
+        try:
+            _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            _libc.prctl(PR_SET_PDEATHSIG, signal.SIGTERM)
+        except (OSError, AttributeError):
+            return
+        # The parent may have gone before prctl took effect
+        if os.getppid() != parent_pid:
+            os.kill(os.getpid(), signal.SIGTERM)
+    return _preexec
+
+
+class ShardChildren:
+    '''
+    The shard processes run by shard 0, keyed by shard number. check() is
+    polled from a LoopingCall and restarts any child that has exited.
+    '''
+
+    def __init__(self, args, env):
+        self.args = args
+        self.env = env
+        self.procs = {}
+        self.restarts = 0
+
+    def start(self, shard):
+        _preexec = die_with_parent(os.getpid()) if sys.platform.startswith('linux') else None
+        self.procs[shard] = subprocess.Popen(self.args[shard], env=self.env, preexec_fn=_preexec)
+        logger.info('(GLOBAL) Started shard %s, pid %s', shard, self.procs[shard].pid)
+
+    def start_all(self):
+        for _shard in sorted(self.args):
+            self.start(_shard)
+
+    def check(self):
+        for _shard, _proc in list(self.procs.items()):
+            _code = _proc.poll()
+            if _code is None:
+                continue
+            logger.error('(GLOBAL) Shard %s (pid %s) exited with status %s, restarting', _shard, _proc.pid, _code)
+            self.restarts += 1
+            self.start(_shard)
+
+    def terminate(self):
+        for _proc in self.procs.values():
+            if _proc.poll() is None:
+                _proc.terminate()
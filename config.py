@@ -28,6 +28,7 @@ change.
 
 import configparser
 import sys
+from bisect import bisect_right
 
 from rysen_version import advertised_package_id
 import const
@@ -49,6 +50,9 @@ __email__      = 'simon@gb7fr.org.uk'
 # Processing of ALS goes here. It's separated from the acl_build function because this
 # code is hblink config-file format specific, and acl_build is abstracted
 def process_acls(_config):
+    # Tables (and per-stream verdicts) compiled from any previous ACLs are stale now
+    acl_tables_clear()
+
     # Global registration ACL
     _config['GLOBAL']['REG_ACL'] = acl_build(_config['GLOBAL']['REG_ACL'], const.PEER_MAX)
 
@@ -66,12 +70,20 @@ def process_acls(_config):
         for acl in ['SUB_ACL', 'TG1_ACL', 'TG2_ACL']:
             _config['SYSTEMS'][system][acl] = acl_build(_config['SYSTEMS'][system][acl], const.ID_MAX)
 
+    # Compile lookup tables now so the first DMRD frame doesn't pay for it
+    for acl in ['REG_ACL', 'SUB_ACL', 'TG1_ACL', 'TG2_ACL']:
+        acl_compile(_config['GLOBAL'][acl])
+    for system in _config['SYSTEMS']:
+        for acl in ['REG_ACL', 'SUB_ACL', 'TG1_ACL', 'TG2_ACL']:
+            if isinstance(_config['SYSTEMS'][system].get(acl), tuple):
+                acl_compile(_config['SYSTEMS'][system][acl])
+
 # Create an access control list that is programatically useable from human readable:
 # ORIGINAL:  'DENY:1-5,3120101,3120124'
 # PROCESSED: (False, set([(1, 5), (3120124, 3120124), (3120101, 3120101)]))
 def acl_build(_acl, _max):
     if not _acl:
-        return(True, set((const.ID_MIN, _max)))
+        return(True, [(const.ID_MIN, _max)])
 
     acl = [] #set()
     sections = _acl.split(':')
@@ -102,6 +114,86 @@ def acl_build(_acl, _max):
 
     return (action, acl)
 
+
+# Compiled ACL lookup tables, keyed by id() of the (action, acl) tuple built by
+# acl_build. The ACL tuples themselves stay plain so CONFIG still pickles for
+# the report clients. Each table keeps a reference to its tuple, so the id
+# can't be recycled for a different ACL while the table is cached.
+ACL_TABLES = {}
+
+# Upper bound on cached per-ID verdicts for a single ACL
+ACL_VERDICT_MAX = 65536
+
+# Bumped whenever compiled ACLs are thrown away (process_acls rebuilding the
+# ACLs, or acl_tables_clear directly), so anything caching ACL results further
+# up (e.g. hblink's per-stream verdicts) knows to drop them
+ACL_GENERATION = 0
+
+
+class AclTable:
+    '''
+    Merged, sorted range table for one ACL. Single IDs are answered from a
+    set, ranges by bisecting the range starts, and every answer is remembered
+    per raw ID so repeat lookups for the same subscriber or TG are one dict hit.
+    '''
+    __slots__ = ('acl', 'action', 'exact', 'starts', 'ends', 'verdicts')
+
+    def __init__(self, _acl):
+        self.acl = _acl
+        self.action = _acl[0]
+        self.exact = set()
+        self.starts = []
+        self.ends = []
+        self.verdicts = {}
+        for start, end in acl_merge(_acl[1]):
+            if start == end:
+                self.exact.add(start)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def match(self, _int_id):
+        if _int_id in self.exact:
+            return True
+        pos = bisect_right(self.starts, _int_id) - 1
+        return pos >= 0 and _int_id <= self.ends[pos]
+
+    def check(self, _id):
+        verdict = self.verdicts.get(_id)
+        if verdict is None:
+            verdict = self.action if self.match(int.from_bytes(_id, 'big')) else not self.action
+            if len(self.verdicts) >= ACL_VERDICT_MAX:
+                self.verdicts.clear()
+            self.verdicts[_id] = verdict
+        return verdict
+
+
+# Sort the (start, end) entries of an ACL and fold overlapping or adjacent
+# ranges together. Inverted ranges can never match and are dropped.
+def acl_merge(_entries):
+    merged = []
+    for start, end in sorted(e for e in _entries if e[0] <= e[1]):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+# Return the compiled table for an ACL built by acl_build, compiling it on first use
+def acl_compile(_acl):
+    table = ACL_TABLES.get(id(_acl))
+    if table is None or table.acl is not _acl:
+        table = AclTable(_acl)
+        ACL_TABLES[id(_acl)] = table
+    return table
+
+# Drop every compiled table, e.g. after the ACLs have been rebuilt
+def acl_tables_clear():
+    global ACL_GENERATION
+    ACL_TABLES.clear()
+    ACL_GENERATION += 1
+
 def IsIPv4Address(ip):
     try:
         ipaddress.IPv4Address(ip)
@@ -183,7 +275,10 @@ def build_config(_config_file):
                     'ANNOUNCEMENT_LANGUAGES': config.get(section, 'ANNOUNCEMENT_LANGUAGES'),
                     'SERVER_ID': config.getint(section, 'SERVER_ID').to_bytes(4, 'big'),
                     'DATA_GATEWAY': config.getboolean(section, 'DATA_GATEWAY'),
-                    'VALIDATE_SERVER_IDS': config.getboolean(section, 'VALIDATE_SERVER_IDS')
+                    'VALIDATE_SERVER_IDS': config.getboolean(section, 'VALIDATE_SERVER_IDS'),
+                    'BATCH_EGRESS': config.getboolean(section, 'BATCH_EGRESS', fallback=False),
+                    'SHARDS': config.getint(section, 'SHARDS', fallback=1),
+                    'SHARD_PORT': config.getint(section, 'SHARD_PORT', fallback=62100)
                     
                 })
                 if not CONFIG['GLOBAL']['ANNOUNCEMENT_LANGUAGES']:
@@ -219,6 +314,7 @@ def build_config(_config_file):
                     'TGID_URL': config.get(section, 'TGID_URL'),
                     'STALE_TIME': config.getint(section, 'STALE_DAYS') * 86400,
                     'SUB_MAP_FILE': config.get(section, 'SUB_MAP_FILE'),
+                    'SUB_MAP_JOURNAL': config.getboolean(section, 'SUB_MAP_JOURNAL', fallback=False),
                     'LOCAL_SUBSCRIBER_FILE': config.get(section, 'LOCAL_SUBSCRIBER_FILE'),
                     'SERVER_ID_URL': config.get(section, 'SERVER_ID_URL'),
                     'SERVER_ID_FILE': config.get(section, 'SERVER_ID_FILE')
@@ -498,11 +594,7 @@ if __name__ == '__main__':
     pprint(CONFIG)
     
     def acl_check(_id, _acl):
-        id = int_id(_id)
-        for entry in _acl[1]:
-            if entry[0] <= id <= entry[1]:
-                return _acl[0]
-        return not _acl[0]
+        return acl_compile(_acl).check(_id)
         
     print(acl_check(b'\x00\x01\x37', CONFIG['GLOBAL']['TG1_ACL']))
 
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+###############################################################################
+#   Shared HBP / OpenBridge DMR frame decoder
+#   Copyright (C) 2026 Shane Daley, M0VUB <shane@freestar.network>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+###############################################################################
+'''
+DmrFrame decodes the fixed fields of an HBP DMRD frame, and the OpenBridge
+DMRE / DMRF trailers, with struct.unpack_from straight out of the received
+datagram instead of slicing it field by field. The burst bits at byte 15
+are looked up in a 256-entry table built once at import.
+
+One DmrFrame is reused for every packet: decode*() overwrite the slots and
+return the frame, so callers copy what they need into locals before
+handing control to anything that might decode again.
+
+    0   opcode[4]  seq  rf_src[3]  dst_id[3]  peer_id[4]  bits  stream_id[4]
+    20  payload[33]                                    (53 bytes, any opcode)
+    DMRE v5+ 53  ber rssi ver timestamp[8] src_server[4] src_rptr[4] hops
+                 hash[16]                                        (89 bytes)
+    DMRE v4  53  ber rssi ver timestamp[8] src_server[4] hops hash[16]  (85)
+    DMRF     53  timestamp[8] hops hash[16]                         (78)
+
+Identifiers stay bytes (they key routing tables downstream); seq, bits,
+version, hops and timestamp are ints.
+'''
+
+import struct
+
+_HEAD = struct.Struct('>B3s3s4sB4s')
+_DMRE5_TAIL = struct.Struct('>ssBQ4s4sB16s')
+_DMRE4_TAIL = struct.Struct('>ssBQ4sB16s')
+_DMRF_TAIL = struct.Struct('>QB16s')
+
+_NO_RPTR = b'\x00\x00\x00\x00'
+
+
+def _bits(bits):
+    if bits & 0x40:
+        call_type = 'unit'
+    elif (bits & 0x23) == 0x23:
+        call_type = 'vcsbk'
+    else:
+        call_type = 'group'
+    # dtype_vseq -- data: 1=voice header, 2=voice terminator; voice: 0=burst A ... 5=burst F
+    return (2 if (bits & 0x80) else 1, call_type, (bits & 0x30) >> 4, bits & 0xF)
+
+
+# slot, call_type, frame_type, dtype_vseq for every value of byte 15
+BITS = tuple(_bits(_b) for _b in range(256))
+
+
+class DmrFrame(object):
+    """Reusable view of one DMR frame's header and OpenBridge trailer."""
+    __slots__ = ('seq', 'rf_src', 'dst_id', 'peer_id', 'bits', 'stream_id',
+                 'slot', 'call_type', 'frame_type', 'dtype_vseq',
+                 'ber', 'rssi', 'version', 'timestamp', 'source_server',
+                 'source_rptr', 'hops', 'hash', 'signed')
+
+    def __init__(self):
+        self.seq = self.bits = self.version = self.timestamp = self.hops = self.signed = 0
+        self.rf_src = self.dst_id = self.peer_id = self.stream_id = b''
+        self.ber = self.rssi = self.source_server = self.source_rptr = self.hash = b''
+        self.slot, self.call_type, self.frame_type, self.dtype_vseq = BITS[0]
+
+    def decode(self, packet):
+        """Header fields common to DMRD, DMRE and DMRF (len(packet) >= 20)."""
+        (self.seq, self.rf_src, self.dst_id, self.peer_id, _bits,
+         self.stream_id) = _HEAD.unpack_from(packet, 4)
+        self.bits = _bits
+        self.slot, self.call_type, self.frame_type, self.dtype_vseq = BITS[_bits]
+        return self
+
+    def decode_dmre(self, packet):
+        """Header plus DMRE trailer; the layout follows the version byte at 55."""
+        self.decode(packet)
+        if packet[55] > 4:
+            (self.ber, self.rssi, self.version, self.timestamp, self.source_server,
+             self.source_rptr, self.hops, self.hash) = _DMRE5_TAIL.unpack_from(packet, 53)
+            self.signed = 73
+        else:
+            (self.ber, self.rssi, self.version, self.timestamp, self.source_server,
+             self.hops, self.hash) = _DMRE4_TAIL.unpack_from(packet, 53)
+            self.source_rptr = _NO_RPTR
+            self.signed = 69
+        return self
+
+    def decode_dmrf(self, packet):
+        """Header plus DMRF timestamp, hop count and hash."""
+        self.decode(packet)
+        self.timestamp, self.hops, self.hash = _DMRF_TAIL.unpack_from(packet, 53)
+        return self
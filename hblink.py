@@ -31,10 +31,10 @@ sufficient logging to be used standalone as a troubleshooting application.
 from binascii import b2a_hex as ahex
 from binascii import a2b_hex as bhex
 from random import randint
-from hashlib import sha256, sha1, blake2b
-from hmac import new as hmac_new, compare_digest
-from time import time, time_ns
-from collections import deque
+from hashlib import sha256
+from hmac import compare_digest
+from time import time
+from collections import deque, OrderedDict
 
 # Twisted is pretty important, so I keep it separate
 from twisted.internet.protocol import DatagramProtocol, Factory, Protocol
@@ -50,10 +50,14 @@ from ipsc_peer_meta import (
     lookup_peer_alias, callsign_bytes, parse_ipsc_peer_status, ipsc_peer_display_fields,
 )
 from bridge_helpers import mark_options_dirty, dmr_seq_delta, reset_slot_voice_ident
+from udp_egress import EGRESS
+from obp_sign import ObpKeys, obp_packer
+from dmr_frame import DmrFrame
 
 # Imports for the reporting server
 import pickle
 from reporting_const import *
+from report_codec import DEFAULT_FORMAT, negotiate_format, dumps as report_dumps
 
 # The module needs logging logging, but handlers, etc. are controlled by the parent
 import logging
@@ -111,13 +115,140 @@ def hblink_handler(_signal, _frame):
         systems[system].dereg()
 
 # Check a supplied ID against the ACL provided. Returns action (True|False) based
-# on matching and the action specified.
+# on matching and the action specified. The range scan is done by the compiled
+# table from config.acl_compile, which also caches the verdict per ID.
 def acl_check(_id, _acl):
-    id = int_id(_id)
-    for entry in _acl[1]:
-        if entry[0] <= id <= entry[1]:
-            return _acl[0]
-    return not _acl[0]
+    return config.acl_compile(_acl).check(_id)
+
+# Ingress verdicts are remembered for this long after a stream's last frame
+STREAM_VERDICT_TO = 5
+# Upper bound on remembered ingress streams across all systems
+STREAM_VERDICT_MAX = 4096
+
+class StreamVerdictCache:
+    '''
+    Accept/drop decisions for live ingress streams, keyed by (system, slot,
+    stream_id). The TG filter, ACL ladder and source server checks only
+    depend on the stream's source and destination, so they are run on the
+    first frame of a call and the answer is reused for the rest of it. An
+    entry is dropped if the stream's source or destination changes, after
+    STREAM_VERDICT_TO seconds of silence, on VTERM, and whenever the ACLs
+    are rebuilt (config.process_acls moves config.ACL_GENERATION) or
+    invalidate() is called.
+    '''
+    __slots__ = ('maxlen', 'timeout', 'generation', '_entries')
+
+    def __init__(self, maxlen=STREAM_VERDICT_MAX, timeout=STREAM_VERDICT_TO):
+        self.maxlen = maxlen
+        self.timeout = timeout
+        self.generation = config.ACL_GENERATION
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, _system, _slot, _stream_id, _rf_src, _dst_id):
+        if self.generation != config.ACL_GENERATION:
+            self.invalidate()
+            return None
+        _key = (_system, _slot, _stream_id)
+        _entry = self._entries.get(_key)
+        if _entry is None:
+            return None
+        _now = time()
+        if _entry[0] != _rf_src or _entry[1] != _dst_id or _now - _entry[3] > self.timeout:
+            del self._entries[_key]
+            return None
+        _entry[3] = _now
+        return _entry[2]
+
+    def put(self, _system, _slot, _stream_id, _rf_src, _dst_id, _verdict):
+        if self.generation != config.ACL_GENERATION:
+            self.invalidate()
+        _key = (_system, _slot, _stream_id)
+        if _key not in self._entries and len(self._entries) >= self.maxlen:
+            self._entries.popitem(last=False)
+        self._entries[_key] = [_rf_src, _dst_id, _verdict, time()]
+        return _verdict
+
+    def discard(self, _system, _slot, _stream_id):
+        self._entries.pop((_system, _slot, _stream_id), None)
+
+    def invalidate(self):
+        self._entries.clear()
+        self.generation = config.ACL_GENERATION
+
+STREAM_VERDICTS = StreamVerdictCache()
+
+# Upper bound on remembered OpenBridge source server verdicts
+SOURCE_SERVER_MAX = 4096
+
+class SourceServerCache:
+    '''
+    OpenBridge DMRE source server checks, keyed by the 4 wire bytes. A
+    source server must be 4-7 digits long; with VALIDATE_SERVER_IDS a 4 or 5
+    digit one must start with an ID from the server ID list, and a 6 or 7
+    digit one must be a known DMR ID. rebuild() turns the server ID list
+    into the set of every 4-byte value it allows, so the common case is one
+    set lookup. Other values are checked once and remembered, up to
+    SOURCE_SERVER_MAX of them. The cache rebuilds itself for a new CONFIG,
+    and bridge_master calls rebuild() when the aliases reload.
+    '''
+    __slots__ = ('allowed', '_validate', '_config', '_verdicts')
+
+    # Verdicts are the warning logged for a rejected server, None if allowed
+    BAD_LENGTH = '(%s) Source Server should be  between 4 and 7 digits, discarding Src: %s'
+    NOT_LISTED = '(%s) Source Server ID is 4 or 5 digits but not in list: %s'
+    NOT_DMR_ID = '(%s) Source Server 6 or 7 digits but not a valid DMR ID, discarding Src: %s'
+
+    def __init__(self):
+        self.allowed = frozenset()
+        self._validate = False
+        self._config = None
+        self._verdicts = {}
+
+    def rebuild(self, _config):
+        _allowed = set()
+        for _server_id in _config.get('_SERVER_IDS') or ():
+            # Only a 4-digit list entry can match the first 4 digits of an ID
+            _server_id = str(_server_id)
+            if len(_server_id) != 4 or not _server_id.isdigit() or _server_id[0] == '0':
+                continue
+            _int_id = int(_server_id)
+            _allowed.add(_int_id.to_bytes(4, 'big'))
+            _allowed.update((_int_id * 10 + _d).to_bytes(4, 'big') for _d in range(10))
+        self.allowed = frozenset(_allowed)
+        self._validate = _config['GLOBAL'].get('VALIDATE_SERVER_IDS', False)
+        self._config = _config
+        self._verdicts.clear()
+
+    def check(self, _system, _source_server):
+        if self._config is not _system._CONFIG:
+            self.rebuild(_system._CONFIG)
+        if _source_server in self.allowed:
+            return None
+        try:
+            return self._verdicts[_source_server]
+        except KeyError:
+            pass
+        _digits = len(str(int.from_bytes(_source_server, 'big')))
+        if _digits < 4 or _digits > 7:
+            _verdict = self.BAD_LENGTH
+        elif _digits <= 5:
+            _verdict = self.NOT_LISTED if self._validate else None
+        else:
+            _verdict = None if _system.validate_id(_source_server) else self.NOT_DMR_ID
+        if len(self._verdicts) >= SOURCE_SERVER_MAX:
+            self._verdicts.clear()
+        self._verdicts[_source_server] = _verdict
+        return _verdict
+
+SOURCE_SERVERS = SourceServerCache()
+
+# Every HBP and OpenBridge ingress path decodes into this one frame and
+# copies the fields it needs into locals straight away; the reactor is
+# single threaded, so nothing else can overwrite it in between
+_RX = DmrFrame()
 
 
 def build_peer_record(peer_id, host, port, *, protocol='HBP', connection='YES',
@@ -190,6 +321,12 @@ def build_peer_record(peer_id, host, port, *, protocol='HBP', connection='YES',
 #************************************************
 
 class OPENBRIDGE(DatagramProtocol):
+    # Pre-keyed hash contexts and the signing packer for the current
+    # PASSPHRASE / VER / SERVER_ID, see obp_sign
+    _keys = None
+    _packer = None
+    _packer_for = None
+
     def __init__(self, _name, _config, _report):
         # Define a few shortcuts to make the rest of the class more readable
         self._CONFIG = _config
@@ -197,6 +334,10 @@ class OPENBRIDGE(DatagramProtocol):
         self._report = _report
         self._config = self._CONFIG['SYSTEMS'][self._system]
         self._laststrid = deque([], 20)
+        # Queue everything routed from one inbound frame and flush it in as
+        # few syscalls as possible (sendmmsg on Linux) once routing returns
+        if self._CONFIG['GLOBAL'].get('BATCH_EGRESS'):
+            self.datagramReceived = EGRESS.wrap(self.datagramReceived)
 
     def validate_id(self,_peer_id):
                 
@@ -236,58 +377,30 @@ class OPENBRIDGE(DatagramProtocol):
     def dereg(self):
         logger.info('(%s) is mode OPENBRIDGE. No De-Registration required, continuing shutdown', self._system)
 
+    def obp_keys(self):
+        _keys = self._keys
+        if _keys is None or _keys.passphrase != self._config['PASSPHRASE']:
+            _keys = self._keys = ObpKeys(self._config['PASSPHRASE'])
+        return _keys
+
+    def obp_packer(self):
+        # Rebuilt when the negotiated VER (BCVE / DMRE upgrade), PASSPHRASE
+        # or SERVER_ID changes
+        _for = (self._config.get('VER', 1), self._config['PASSPHRASE'], self._CONFIG['GLOBAL']['SERVER_ID'])
+        if _for != self._packer_for:
+            self._packer = obp_packer(_for[0], self.obp_keys(), _for[2])
+            self._packer_for = _for
+        return self._packer
+
     def send_system(self, _packet, _hops = b'', _ber = b'\x00', _rssi = b'\x00', _source_server = b'\x00\x00\x00\x00', _source_rptr = b'\x00\x00\x00\x00'):                      
         #Don't do anything if we are STUNned
         if 'STUN' in self._CONFIG:
             logger.info('(%s) Bridge STUNned, discarding', self._system)
             return
         
-        if not _hops:
-            _hops = 1
-            _hops = _hops.to_bytes(1,'big')
-            
-        
         if _packet[:3] == DMR and self._config['TARGET_IP']:
-            
-            if 'VER' in self._config and self._config['VER'] > 4:
-                _ver = self._config['VER'].to_bytes(1,'big')
-                _packet = b''.join([DMRE,_packet[4:11], self._CONFIG['GLOBAL']['SERVER_ID'],_packet[15:],_ber,_rssi,_ver,time_ns().to_bytes(8,'big'), _source_server, _source_rptr, _hops])
-                _h = blake2b(key=self._config['PASSPHRASE'], digest_size=16)
-                _h.update(_packet)
-                _hash = _h.digest()
-                _packet = b''.join([_packet, _hash])
-                self.transport.write(_packet, (self._config['TARGET_IP'], self._config['TARGET_PORT']))
-
-            elif 'VER' in self._config and self._config['VER'] == 4:
-                _ver = self._config['VER'].to_bytes(1,'big')
-                _packet = b''.join([DMRE,_packet[4:11], self._CONFIG['GLOBAL']['SERVER_ID'],_packet[15:],_ber,_rssi,_ver,time_ns().to_bytes(8,'big'), _source_server, _hops])
-                _h = blake2b(key=self._config['PASSPHRASE'], digest_size=16)
-                _h.update(_packet)
-                _hash = _h.digest()
-                _packet = b''.join([_packet, _hash])
-                self.transport.write(_packet, (self._config['TARGET_IP'], self._config['TARGET_PORT']))
-            
-            elif 'VER' in self._config and self._config['VER'] == 3:
-                _packet = b''.join([DMRF,_packet[4:11], self._CONFIG['GLOBAL']['SERVER_ID'],_packet[15:]])
-                _h = blake2b(key=self._config['PASSPHRASE'], digest_size=16)
-                _h.update(_packet)
-                _hash = _h.digest()
-                _packet = b''.join([_packet,time_ns().to_bytes(8,'big'), _hops, _hash])
-                self.transport.write(_packet, (self._config['TARGET_IP'], self._config['TARGET_PORT']))
-            
-            elif 'VER' in self._config and self._config['VER'] == 2:
-                _packet = b''.join([DMRF,_packet[4:11], self._CONFIG['GLOBAL']['SERVER_ID'],_packet[15:], time_ns().to_bytes(8,'big')])
-                _h = blake2b(key=self._config['PASSPHRASE'], digest_size=16)
-                _h.update(_packet)
-                _hash = _h.digest()
-                _packet = b''.join([_packet,_hops, _hash])
-                self.transport.write(_packet, (self._config['TARGET_IP'], self._config['TARGET_PORT']))
-                # KEEP THE FOLLOWING COMMENTED OUT UNLESS YOU'RE DEBUGGING DEEPLY!!!!
-                #logger.debug('(%s) TX Packet to OpenBridge %s:%s -- %s %s', self._system, self._config['TARGET_IP'], self._config['TARGET_PORT'], _packet, _hash)
-            else:                
-                _packet = b''.join([DMRD,_packet[4:11], self._CONFIG['GLOBAL']['SERVER_ID'], _packet[15:]])
-                _packet = b''.join([_packet, (hmac_new(self._config['PASSPHRASE'],_packet,sha1).digest())])
-                self.transport.write(_packet, (self._config['TARGET_IP'], self._config['TARGET_PORT']))
+            _packet = self.obp_packer()(_packet, _hops, _ber, _rssi, _source_server, _source_rptr)
+            EGRESS.write(self.transport, _packet, (self._config['TARGET_IP'], self._config['TARGET_PORT']))
                 
         else:
             
@@ -299,7 +412,7 @@ class OPENBRIDGE(DatagramProtocol):
     def send_bcka(self):
         if self._config['TARGET_IP']:
             _packet = BCKA
-            _packet = b''.join([_packet[:4], (hmac_new(self._config['PASSPHRASE'],_packet,sha1).digest())])
+            _packet = b''.join([_packet[:4], self.obp_keys().hmac(_packet)])
             self.transport.write(_packet, (self._config['TARGET_IP'], self._config['TARGET_PORT']))
             logger.trace('(%s) *BridgeControl* sent KeepAlive',self._system)
         else:
@@ -308,7 +421,7 @@ class OPENBRIDGE(DatagramProtocol):
     def send_bcst(self):
         if self._config['TARGET_IP']:
             _packet = BCST
-            _packet = b''.join([_packet[:4], (hmac_new(self._config['PASSPHRASE'],_packet,sha1).digest())])
+            _packet = b''.join([_packet[:4], self.obp_keys().hmac(_packet)])
             self.transport.write(_packet, (self._config['TARGET_IP'], self._config['TARGET_PORT']))
             logger.trace('(%s) *BridgeControl* sent BCST STUN',self._system)
         else:
@@ -317,7 +430,7 @@ class OPENBRIDGE(DatagramProtocol):
     def send_bcsq(self,_tgid,_stream_id):
         if self._config['TARGET_IP']:
             _packet = b''.join([BCSQ, _tgid, _stream_id])
-            _packet = b''.join([_packet, (hmac_new(self._config['PASSPHRASE'],_packet,sha1).digest())])
+            _packet = b''.join([_packet, self.obp_keys().hmac(_packet)])
             self.transport.write(_packet, (self._config['TARGET_IP'], self._config['TARGET_PORT']))
             logger.trace('(%s) *BridgeControl* sent BCSQ Source Quench, TG: %s, Stream ID: %s',self._system,int_id(_tgid), int_id(_stream_id))
         else:
@@ -326,12 +439,68 @@ class OPENBRIDGE(DatagramProtocol):
     def send_bcve(self):
         if self._config['ENHANCED_OBP'] and self._config['TARGET_IP']:
             _packet = b''.join([BCVE,VER.to_bytes(1,'big')])
-            _packet = b''.join([_packet, (hmac_new(self._config['PASSPHRASE'],_packet[4:5],sha1).digest())])
+            _packet = b''.join([_packet, self.obp_keys().hmac(_packet[4:5])])
             self.transport.write(_packet, (self._config['TARGET_IP'], self._config['TARGET_PORT']))
             logger.trace('(%s) *BridgeControl* sent BCVE. Ver: %s',self._system,VER)
         else:
             logger.trace('(%s) *BridgeControl* not sending BCVE, TARGET_IP currently not known',self._system) 
 
+    # Validate the claimed source server of an inbound DMRE stream
+    def source_server_allowed(self, _source_server, _dst_id, _stream_id):
+        # Sibling shards are this same server and relay what they accepted
+        if self._config.get('_SHARD_LINK'):
+            return True
+        _verdict = SOURCE_SERVERS.check(self, _source_server)
+        if _verdict is None:
+            return True
+        if _stream_id not in self._laststrid:
+            logger.warning(_verdict, self._system, int.from_bytes(_source_server,'big'))
+            self.send_bcsq(_dst_id,_stream_id)
+            self._laststrid.append(_stream_id)
+        return False
+
+    # Low-level TG filter and ACLs for an inbound stream. Version 1 (DMRD) links
+    # additionally filter TGs 92-199
+    def ingress_allowed(self, _rf_src, _dst_id, _slot, _call_type, _stream_id, _tg_filter_v1=False):
+        #Low-level TG filtering
+        if _call_type != 'unit':
+            _int_dst_id = int_id(_dst_id)
+            if _int_dst_id <= 59 or (_int_dst_id >= 9990 and _int_dst_id <= 9999) or (_tg_filter_v1 and 92 <= _int_dst_id <= 199) or _int_dst_id == 900999:
+                if _stream_id not in self._laststrid:
+                    logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY GLOBAL TG FILTER', self._system, int_id(_stream_id), _int_dst_id)
+                    self.send_bcsq(_dst_id,_stream_id)
+                    self._laststrid.append(_stream_id)
+                return False
+
+        # ACL Processing
+        if self._CONFIG['GLOBAL']['USE_ACL']:
+            if not acl_check(_rf_src, self._CONFIG['GLOBAL']['SUB_ACL']):
+                if _stream_id not in self._laststrid:
+                    logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS1 ACL', self._system, int_id(_stream_id), int_id(_rf_src))
+                    self.send_bcsq(_dst_id,_stream_id)
+                    self._laststrid.append(_stream_id)
+                return False
+            if _slot == 1 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG1_ACL']):
+                if _stream_id not in self._laststrid:
+                    logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
+                    self.send_bcsq(_dst_id,_stream_id)
+                    self._laststrid.append(_stream_id)
+                return False
+        if self._config['USE_ACL']:
+            if not acl_check(_rf_src, self._config['SUB_ACL']):
+                if _stream_id not in self._laststrid:
+                    logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY SYSTEM ACL', self._system, int_id(_stream_id), int_id(_rf_src))
+                    self.send_bcsq(_dst_id,_stream_id)
+                    self._laststrid.append(_stream_id)
+                return False
+            if not acl_check(_dst_id, self._config['TG1_ACL']):
+                if _stream_id not in self._laststrid:
+                    logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM ACL', self._system, int_id(_stream_id), int_id(_dst_id))
+                    self.send_bcsq(_dst_id,_stream_id)
+                    self._laststrid.append(_stream_id)
+                return False
+        return True
+
     def dmrd_received(self, _peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data,_hash,_hops = b'', _source_server = b'\x00\x00\x00\x00', _ber = b'\x00', _rssi = b'\x00', _source_rptr = b'\x00\x00\x00\x00'):
         pass
         #print(int_id(_peer_id), int_id(_rf_src), int_id(_dst_id), int_id(_seq), _slot, _call_type, _frame_type, repr(_dtype_vseq), int_id(_stream_id))
@@ -347,7 +516,8 @@ class OPENBRIDGE(DatagramProtocol):
                                    self._system, len(_packet))
                     return
                 _data = _packet[:53]
-                _stream_id = _data[16:20]
+                _f = _RX.decode(_packet)
+                _stream_id = _f.stream_id
                 if self._config['VER'] > 1:
                     if _stream_id not in self._laststrid:
                         logger.warning('(%s) *ProtoControl*  Version 1 protocol prohibited by PROTO_VER, Ver: %s',self._system,self._config['VER'])
@@ -355,10 +525,10 @@ class OPENBRIDGE(DatagramProtocol):
                     self.send_bcve()
                     return
                 _hash = _packet[53:]
-                _ckhs = hmac_new(self._config['PASSPHRASE'],_data,sha1).digest()
+                _ckhs = self.obp_keys().hmac(_data)
 
                 if compare_digest(_hash, _ckhs) and (_sockaddr == self._config['TARGET_SOCK'] or self._config['RELAX_CHECKS']):
-                    _peer_id = _data[11:15]
+                    _peer_id = _f.peer_id
                     if self._config['NETWORK_ID'] != _peer_id:
                         if _stream_id not in self._laststrid:
                             logger.error('(%s) OpenBridge packet discarded because NETWORK_ID: %s Does not match sent Peer ID: %s', self._system, int_id(self._config['NETWORK_ID']), int_id(_peer_id))
@@ -374,20 +544,8 @@ class OPENBRIDGE(DatagramProtocol):
                     _rssi = b'\x00'
                     _hops = b''
                     
-                    _seq = _data[4]
-                    _rf_src = _data[5:8]
-                    _dst_id = _data[8:11]
-                    _bits = _data[15]
-                    _slot = 2 if (_bits & 0x80) else 1
-                    #_call_type = 'unit' if (_bits & 0x40) else 'group'
-                    if _bits & 0x40:
-                        _call_type = 'unit'
-                    elif (_bits & 0x23) == 0x23:
-                        _call_type = 'vcsbk'
-                    else:
-                        _call_type = 'group'
-                    _frame_type = (_bits & 0x30) >> 4
-                    _dtype_vseq = (_bits & 0xF) # data, 1=voice header, 2=voice terminator; voice, 0=burst A ... 5=burst F
+                    _seq, _rf_src, _dst_id = _f.seq, _f.rf_src, _f.dst_id
+                    _slot, _call_type, _frame_type, _dtype_vseq = _f.slot, _f.call_type, _f.frame_type, _f.dtype_vseq
                     #logger.debug('(%s) DMRD - Seqence: %s, RF Source: %s, Destination ID: %s', self._system, int_id(_seq), int_id(_rf_src), int_id(_dst_id))
                         
 
@@ -404,46 +562,19 @@ class OPENBRIDGE(DatagramProtocol):
                             return
                     
                     
-                    #Low-level TG filtering 
-                    if _call_type != 'unit':
-                        _int_dst_id = int_id(_dst_id)
-                        if _int_dst_id <= 59 or (_int_dst_id >= 9990 and _int_dst_id <= 9999) or (_int_dst_id >= 92 and _int_dst_id <= 199)  or _int_dst_id == 900999:
-                            if _stream_id not in self._laststrid:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY GLOBAL TG FILTER', self._system, int_id(_stream_id), _int_dst_id)
-                                self.send_bcsq(_dst_id,_stream_id)
-                                self._laststrid.append(_stream_id)
-                            return
-                    
-                    # ACL Processing
-                    if self._CONFIG['GLOBAL']['USE_ACL']:
-                        if not acl_check(_rf_src, self._CONFIG['GLOBAL']['SUB_ACL']):
-                            if _stream_id not in self._laststrid:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS1 ACL', self._system, int_id(_stream_id), int_id(_rf_src))
-                                self.send_bcsq(_dst_id,_stream_id)
-                                self._laststrid.append(_stream_id)
-                            return
-                        if _slot == 1 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG1_ACL']):
-                            if _stream_id not in self._laststrid:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                                self.send_bcsq(_dst_id,_stream_id)
-                                self._laststrid.append(_stream_id)
-                            return
-                    if self._config['USE_ACL']:
-                        if not acl_check(_rf_src, self._config['SUB_ACL']):
-                            if _stream_id not in self._laststrid:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY SYSTEM ACL', self._system, int_id(_stream_id), int_id(_rf_src))
-                                self.send_bcsq(_dst_id,_stream_id)
-                                self._laststrid.append(_stream_id)
-                            return
-                        if not acl_check(_dst_id, self._config['TG1_ACL']):
-                            if _stream_id not in self._laststrid:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                                self.send_bcsq(_dst_id,_stream_id)
-                                self._laststrid.append(_stream_id)
-                            return
+                    # The TG filter and ACLs only depend on source and destination,
+                    # so they are evaluated once per stream
+                    _verdict = STREAM_VERDICTS.get(self._system, _slot, _stream_id, _rf_src, _dst_id)
+                    if _verdict is None:
+                        _verdict = STREAM_VERDICTS.put(self._system, _slot, _stream_id, _rf_src, _dst_id,
+                                                       self.ingress_allowed(_rf_src, _dst_id, _slot, _call_type, _stream_id, _tg_filter_v1=True))
+                    if not _verdict:
+                        return
 
                     # Userland actions -- typically this is the function you subclass for an application
                     self.dmrd_received(_peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data,_hash,_hops,_source_server,_ber,_rssi,_source_rptr)
+                    if _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VTERM:
+                        STREAM_VERDICTS.discard(self._system, _slot, _stream_id)
                     #Silently treat a DMRD packet like a keepalive - this is because it's traffic and the 
                     #Other end may not have enabled ENAHNCED_OBP
                     self._config['_bcka'] = time()
@@ -471,59 +602,27 @@ class OPENBRIDGE(DatagramProtocol):
                                    self._system, _embedded_version, len(_packet))
                     return
 
-                if _embedded_version > 4:
-                    _data = _packet[:53]
-                    _ber = _packet[53:54]
-                    _rssi = _packet[54:55]
-                    _timestamp = _packet[56:64]
-                    _source_server = _packet[64:68]
-                    _source_rptr = _packet[68:72]
-                    _hops = _packet[72]
-                    _hash = _packet[73:89]
-                    #_ckhs = hmac_new(self._config['PASSPHRASE'],_data,sha1).digest()
-                    _h = blake2b(key=self._config['PASSPHRASE'], digest_size=16)
-                    _h.update(_packet[:73])
-                else:
-                    _data = _packet[:53]
-                    _ber = _packet[53:54]
-                    _rssi = _packet[54:55]
-                    _timestamp = _packet[56:64]
-                    _source_server = _packet[64:68]
-                    _source_rptr = b'\x00\x00\x00\x00'
-                    _hops = _packet[68]
-                    _hash = _packet[69:85]
-                    #_ckhs = hmac_new(self._config['PASSPHRASE'],_data,sha1).digest()
-                    _h = blake2b(key=self._config['PASSPHRASE'], digest_size=16)
-                    _h.update(_packet[:69])
-                    
-                _ckhs = _h.digest()
-                
-                _stream_id = _data[16:20]
+                # v5+ carries src_rptr between src_server and hops; v4 does not
+                _f = _RX.decode_dmre(_packet)
+                _ber, _rssi, _source_server, _source_rptr = _f.ber, _f.rssi, _f.source_server, _f.source_rptr
+                _hops = _f.hops
+                _hash = _f.hash
+                #_ckhs = hmac_new(self._config['PASSPHRASE'],_data,sha1).digest()
+                _ckhs = self.obp_keys().blake(memoryview(_packet)[:_f.signed])
+                _stream_id = _f.stream_id
 
                 if compare_digest(_hash, _ckhs) and (_sockaddr == self._config['TARGET_SOCK'] or self._config['RELAX_CHECKS']):
                     if _embedded_version > self._config['VER']:
                         self._config['VER'] = _embedded_version
-                    _peer_id = _data[11:15]
+                    _peer_id = _f.peer_id
                     if self._config['NETWORK_ID'] != _peer_id:
                         if _stream_id not in self._laststrid:
                             logger.error('(%s) OpenBridge packet discarded because NETWORK_ID: %s Does not match sent Peer ID: %s', self._system, int_id(self._config['NETWORK_ID']), int_id(_peer_id))
                             self._laststrid.append(_stream_id)
                         return
-                    _seq = _data[4]
-                    _rf_src = _data[5:8]
-                    _dst_id = _data[8:11]
+                    _seq, _rf_src, _dst_id = _f.seq, _f.rf_src, _f.dst_id
                     _int_dst_id = int_id(_dst_id)
-                    _bits = _data[15]
-                    _slot = 2 if (_bits & 0x80) else 1
-                    #_call_type = 'unit' if (_bits & 0x40) else 'group'
-                    if _bits & 0x40:
-                        _call_type = 'unit'
-                    elif (_bits & 0x23) == 0x23:
-                        _call_type = 'vcsbk'
-                    else:
-                        _call_type = 'group'
-                    _frame_type = (_bits & 0x30) >> 4
-                    _dtype_vseq = (_bits & 0xF) # data, 1=voice header, 2=voice terminator; voice, 0=burst A ... 5=burst F
+                    _slot, _call_type, _frame_type, _dtype_vseq = _f.slot, _f.call_type, _f.frame_type, _f.dtype_vseq
                     #logger.debug('(%s) DMRD - Seqence: %s, RF Source: %s, Destination ID: %s', self._system, int_id(_seq), int_id(_rf_src), int_id(_dst_id))
                     
                     #Don't do anything if we are STUNned
@@ -536,7 +635,7 @@ class OPENBRIDGE(DatagramProtocol):
                     # Discard genuinely stale packets without quenching an
                     # otherwise healthy stream for one delayed datagram.
                     _max_packet_age = self._config.get('MAX_PACKET_AGE', 15)
-                    if (int.from_bytes(_timestamp,'big')/1000000000) < (
+                    if (_f.timestamp / 1000000000) < (
                             time() - _max_packet_age):
                         if _stream_id not in self._laststrid:
                             logger.warning(
@@ -546,26 +645,6 @@ class OPENBRIDGE(DatagramProtocol):
                             self._laststrid.append(_stream_id)
                         return
                     
-                    #Discard bad source server 
-                    if ((len(str(int.from_bytes(_source_server,'big'))) < 4) or (len(str(int.from_bytes(_source_server,'big'))) > 7)):
-                        if _stream_id not in self._laststrid:
-                            logger.warning('(%s) Source Server should be  between 4 and 7 digits, discarding Src: %s', self._system, int.from_bytes(_source_server,'big'))
-                            self.send_bcsq(_dst_id,_stream_id)
-                            self._laststrid.append(_stream_id)
-                        return
-                    elif self._CONFIG['GLOBAL']['VALIDATE_SERVER_IDS'] and (len(str(int.from_bytes(_source_server,'big'))) == 4 or (len(str(int.from_bytes(_source_server,'big'))) == 5))  and ((str(int.from_bytes(_source_server,'big'))[:4]) not in self._CONFIG['_SERVER_IDS'] ):
-                        if _stream_id not in self._laststrid:
-                            logger.warning('(%s) Source Server ID is 4 or 5 digits but not in list: %s', self._system, int.from_bytes(_source_server,'big'))
-                            self.send_bcsq(_dst_id,_stream_id)
-                            self._laststrid.append(_stream_id)
-                        return
-                    elif len(str(int.from_bytes(_source_server,'big'))) > 5 and not self.validate_id(_source_server):
-                        if _stream_id not in self._laststrid:
-                            logger.warning('(%s) Source Server 6 or 7 digits but not a valid DMR ID, discarding Src: %s', self._system, int.from_bytes(_source_server,'big'))
-                            self.send_bcsq(_dst_id,_stream_id)
-                            self._laststrid.append(_stream_id)
-                        return
-
                     #Increment max hops
                     _inthops = _hops +1 
                     
@@ -575,49 +654,23 @@ class OPENBRIDGE(DatagramProtocol):
                         return
                     
                     
-                    #Low-level TG filtering 
-                    if _call_type != 'unit':
-                        _int_dst_id = int_id(_dst_id)
-                        if _int_dst_id <= 59 or (_int_dst_id >= 9990 and _int_dst_id <= 9999) or _int_dst_id == 900999:
-                            if _stream_id not in self._laststrid:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY GLOBAL TG FILTER', self._system, int_id(_stream_id), _int_dst_id)
-                                self.send_bcsq(_dst_id,_stream_id)
-                                self._laststrid.append(_stream_id)
-                            return
-                    
-                    # ACL Processing
-                    if self._CONFIG['GLOBAL']['USE_ACL']:
-                        if not acl_check(_rf_src, self._CONFIG['GLOBAL']['SUB_ACL']):
-                            if _stream_id not in self._laststrid:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS1 ACL', self._system, int_id(_stream_id), int_id(_rf_src))
-                                self.send_bcsq(_dst_id,_stream_id)
-                                self._laststrid.append(_stream_id)
-                            return
-                        if _slot == 1 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG1_ACL']):
-                            if _stream_id not in self._laststrid:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                                self.send_bcsq(_dst_id,_stream_id)
-                                self._laststrid.append(_stream_id)
-                            return
-                    if self._config['USE_ACL']:
-                        if not acl_check(_rf_src, self._config['SUB_ACL']):
-                            if _stream_id not in self._laststrid:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY SYSTEM ACL', self._system, int_id(_stream_id), int_id(_rf_src))
-                                self.send_bcsq(_dst_id,_stream_id)
-                                self._laststrid.append(_stream_id)
-                            return
-                        if not acl_check(_dst_id, self._config['TG1_ACL']):
-                            if _stream_id not in self._laststrid:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                                self.send_bcsq(_dst_id,_stream_id)
-                                self._laststrid.append(_stream_id)
-                            return
+                    # Source server, TG filter and ACLs only depend on the stream's
+                    # origin and destination, so they are evaluated once per stream
+                    _verdict = STREAM_VERDICTS.get(self._system, _slot, _stream_id, _rf_src, _dst_id)
+                    if _verdict is None:
+                        _verdict = STREAM_VERDICTS.put(self._system, _slot, _stream_id, _rf_src, _dst_id,
+                                                       self.source_server_allowed(_source_server, _dst_id, _stream_id)
+                                                       and self.ingress_allowed(_rf_src, _dst_id, _slot, _call_type, _stream_id))
+                    if not _verdict:
+                        return
 
-                    _data = b''.join([DMRD,_data[4:]])
+                    _data = b''.join([DMRD,_packet[4:53]])
                     
                     _hops = _inthops.to_bytes(1,'big')
                     # Userland actions -- typically this is the function you subclass for an application
                     self.dmrd_received(_peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data,_hash,_hops,_source_server,_ber,_rssi,_source_rptr)
+                    if _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VTERM:
+                        STREAM_VERDICTS.discard(self._system, _slot, _stream_id)
                     #Silently treat a DMRD packet like a keepalive - this is because it's traffic and the 
                     #Other end may not have enabled ENAHNCED_OBP
                     self._config['_bcka'] = time()
@@ -631,47 +684,33 @@ class OPENBRIDGE(DatagramProtocol):
                     logger.warning('(%s) OpenBridge invalid DMRF discarded: %s bytes',
                                    self._system, len(_packet))
                     return
-                _data = _packet[:53]
-                _stream_id = _data[16:20]
-                _timestamp = _packet[53:61]
-                _hops = _packet[61]
-                _hash = _packet[62:]
+                _f = _RX.decode_dmrf(_packet)
+                _stream_id = _f.stream_id
+                _hops = _f.hops
+                _hash = _f.hash
                 #_ckhs = hmac_new(self._config['PASSPHRASE'],_data,sha1).digest()
-                _h = blake2b(key=self._config['PASSPHRASE'], digest_size=16)
                 if 'VER' in self._config and self._config['VER'] > 2:
-                    _h.update(_packet[:53])
+                    _ckhs = self.obp_keys().blake(memoryview(_packet)[:53])
                 elif 'VER' in self._config and self._config['VER'] == 2:
-                    _h.update(_packet[:61])
-                    
-                _ckhs = _h.digest()
+                    _ckhs = self.obp_keys().blake(memoryview(_packet)[:61])
+                else:
+                    _ckhs = self.obp_keys().blake(b'')
 
                 if compare_digest(_hash, _ckhs) and (_sockaddr == self._config['TARGET_SOCK'] or self._config['RELAX_CHECKS']):
                     _max_packet_age = self._config.get('MAX_PACKET_AGE', 15)
-                    if (int.from_bytes(_timestamp, 'big') / 1000000000) < (
+                    if (_f.timestamp / 1000000000) < (
                             time() - _max_packet_age):
                         logger.warning('(%s) Stale DMRF packet discarded', self._system)
                         return
-                    _peer_id = _data[11:15]
+                    _peer_id = _f.peer_id
                     if self._config['NETWORK_ID'] != _peer_id:
                         if _stream_id not in self._laststrid:
                             logger.error('(%s) OpenBridge packet discarded because NETWORK_ID: %s Does not match sent Peer ID: %s', self._system, int_id(self._config['NETWORK_ID']), int_id(_peer_id))
                             self._laststrid.append(_stream_id)
                         return
-                    _seq = _data[4]
-                    _rf_src = _data[5:8]
-                    _dst_id = _data[8:11]
+                    _seq, _rf_src, _dst_id = _f.seq, _f.rf_src, _f.dst_id
                     _int_dst_id = int_id(_dst_id)
-                    _bits = _data[15]
-                    _slot = 2 if (_bits & 0x80) else 1
-                    #_call_type = 'unit' if (_bits & 0x40) else 'group'
-                    if _bits & 0x40:
-                        _call_type = 'unit'
-                    elif (_bits & 0x23) == 0x23:
-                        _call_type = 'vcsbk'
-                    else:
-                        _call_type = 'group'
-                    _frame_type = (_bits & 0x30) >> 4
-                    _dtype_vseq = (_bits & 0xF) # data, 1=voice header, 2=voice terminator; voice, 0=burst A ... 5=burst F
+                    _slot, _call_type, _frame_type, _dtype_vseq = _f.slot, _f.call_type, _f.frame_type, _f.dtype_vseq
                     #logger.debug('(%s) DMRD - Seqence: %s, RF Source: %s, Destination ID: %s', self._system, int_id(_seq), int_id(_rf_src), int_id(_dst_id))
                     
                     #Don't do anything if we are STUNned
@@ -690,54 +729,27 @@ class OPENBRIDGE(DatagramProtocol):
                         return
                     
                     
-                    #Low-level TG filtering 
-                    if _call_type != 'unit':
-                        _int_dst_id = int_id(_dst_id)
-                        if _int_dst_id <= 59 or (_int_dst_id >= 9990 and _int_dst_id <= 9999) or _int_dst_id == 900999:
-                            if _stream_id not in self._laststrid:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY GLOBAL TG FILTER', self._system, int_id(_stream_id), _int_dst_id)
-                                self.send_bcsq(_dst_id,_stream_id)
-                                self._laststrid.append(_stream_id)
-                            return
-                    
-                    # ACL Processing
-                    if self._CONFIG['GLOBAL']['USE_ACL']:
-                        if not acl_check(_rf_src, self._CONFIG['GLOBAL']['SUB_ACL']):
-                            if _stream_id not in self._laststrid:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS1 ACL', self._system, int_id(_stream_id), int_id(_rf_src))
-                                self.send_bcsq(_dst_id,_stream_id)
-                                self._laststrid.append(_stream_id)
-                            return
-                        if _slot == 1 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG1_ACL']):
-                            if _stream_id not in self._laststrid:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                                self.send_bcsq(_dst_id,_stream_id)
-                                self._laststrid.append(_stream_id)
-                            return
-                    if self._config['USE_ACL']:
-                        if not acl_check(_rf_src, self._config['SUB_ACL']):
-                            if _stream_id not in self._laststrid:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY SYSTEM ACL', self._system, int_id(_stream_id), int_id(_rf_src))
-                                self.send_bcsq(_dst_id,_stream_id)
-                                self._laststrid.append(_stream_id)
-                            return
-                        if not acl_check(_dst_id, self._config['TG1_ACL']):
-                            if _stream_id not in self._laststrid:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                                self.send_bcsq(_dst_id,_stream_id)
-                                self._laststrid.append(_stream_id)
-                            return
+                    # The TG filter and ACLs only depend on source and destination,
+                    # so they are evaluated once per stream
+                    _verdict = STREAM_VERDICTS.get(self._system, _slot, _stream_id, _rf_src, _dst_id)
+                    if _verdict is None:
+                        _verdict = STREAM_VERDICTS.put(self._system, _slot, _stream_id, _rf_src, _dst_id,
+                                                       self.ingress_allowed(_rf_src, _dst_id, _slot, _call_type, _stream_id))
+                    if not _verdict:
+                        return
                 
 
                     
                     #Remove timestamp from data. For now dmrd_received does not expect it
                     #Leaving it in screws up the AMBE data
                     #_data = b''.join([_data[:5],_data[12:]])
-                    _data = b''.join([DMRD,_data[4:]])
+                    _data = b''.join([DMRD,_packet[4:53]])
                     
                     _hops = _inthops.to_bytes(1,'big')
                     # Userland actions -- typically this is the function you subclass for an application
                     self.dmrd_received(_peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data,_hash,_hops)
+                    if _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VTERM:
+                        STREAM_VERDICTS.discard(self._system, _slot, _stream_id)
                     #Silently treat a DMRD packet like a keepalive - this is because it's traffic and the 
                     #Other end may not have enabled ENAHNCED_OBP
                     self._config['_bcka'] = time()
@@ -751,7 +763,7 @@ class OPENBRIDGE(DatagramProtocol):
                 if _packet[:4] == BCKA:
                     #_data = _packet[:53]
                     _hash = _packet[4:]
-                    _ckhs = hmac_new(self._config['PASSPHRASE'],_packet[:4],sha1).digest()
+                    _ckhs = self.obp_keys().hmac(_packet[:4])
                     if compare_digest(_hash, _ckhs):
                         logger.trace('(%s) *BridgeControl* Keep Alive received',self._system)
                         self._config['_bcka'] = time()
@@ -771,7 +783,7 @@ class OPENBRIDGE(DatagramProtocol):
                     _hash = _packet[11:]
                     _tgid = _packet[4:7]
                     _stream_id = _packet[7:11]
-                    _ckhs = hmac_new(self._config['PASSPHRASE'],_packet[:11],sha1).digest()
+                    _ckhs = self.obp_keys().hmac(_packet[:11])
                     if compare_digest(_hash, _ckhs):
                         logger.trace('(%s) *BridgeControl*  BCSQ Source Quench request received for TGID: %s, Stream ID: %s',self._system,int_id(_tgid), int_id(_stream_id))
                         if '_bcsq' not in self._config:
@@ -784,7 +796,7 @@ class OPENBRIDGE(DatagramProtocol):
                 if _packet[:4] == BCST:
                     #_data = _packet[:11]
                     _hash = _packet[4:]
-                    _ckhs = hmac_new(self._config['PASSPHRASE'],_packet[4:],sha1).digest()
+                    _ckhs = self.obp_keys().hmac(_packet[4:])
                     if compare_digest(_hash, _ckhs):
                         logger.trace('(%s) *BridgeControl*  BCST STUN request received for TGID: %s, Stream ID: %s',self._system,int_id(_tgid), int_id(_stream_id))
                         self._config['_STUN'] = True
@@ -796,7 +808,7 @@ class OPENBRIDGE(DatagramProtocol):
                     #_data = _packet[:11]
                     _ver = int.from_bytes(_packet[4:5],'big')
                     _hash = _packet[5:]
-                    _ckhs = hmac_new(self._config['PASSPHRASE'],_packet[4:5],sha1).digest()
+                    _ckhs = self.obp_keys().hmac(_packet[4:5])
                     if compare_digest(_hash, _ckhs):
                         logger.trace('(%s) *ProtoControl*  BCVE Version received, Ver: %s',self._system,_ver)
                         
@@ -855,6 +867,11 @@ class HBSYSTEM(DatagramProtocol):
             self.maintenance_loop = self.peer_maintenance_loop
             self.datagramReceived = self.peer_datagramReceived
             self.dereg = self.peer_dereg
+
+        # Queue everything routed from one inbound frame and flush it in as
+        # few syscalls as possible (sendmmsg on Linux) once routing returns
+        if self._CONFIG['GLOBAL'].get('BATCH_EGRESS'):
+            self.datagramReceived = EGRESS.wrap(self.datagramReceived)
             
     def loopingErrHandle(self,failure):
         logger.error('(GLOBAL - hblink.py) Unhandled error in timed loop.\n %s', failure)
@@ -934,21 +951,21 @@ class HBSYSTEM(DatagramProtocol):
         # hotspot/repeater peer — that causes a post-dekey "parrot" tail when
         # OBP or reactor lag round-trips the caller's own audio.
         _rf_src = _packet[5:8] if _packet[:4] == DMRD and len(_packet) >= 8 else None
+        # Pad once for every peer; send_peer only patches the peer ID
+        if len(_packet) < 54:
+            _packet = b''.join([_packet, _ber, _rssi])
         for _peer in self._peers:
             if (_source_rptr != b'\x00\x00\x00\x00' and _peer == _source_rptr):
                 continue
             if _rf_src is not None and _peer == _rf_src:
                 continue
-            _tx_pkt = _packet
-            if len(_tx_pkt) < 54:
-                _tx_pkt = b''.join([_tx_pkt, _ber, _rssi])
-            self.send_peer(_peer, _tx_pkt)
+            self.send_peer(_peer, _packet)
             #logger.debug('(%s) Packet sent to peer %s', self._system, self._peers[_peer]['RADIO_ID'])
 
     def send_peer(self, _peer, _packet):
         if _packet[:4] == DMRD:
             _packet = b''.join([_packet[:11], _peer, _packet[15:]])
-        self.transport.write(_packet, self._peers[_peer]['SOCKADDR'])
+        EGRESS.write(self.transport, _packet, self._peers[_peer]['SOCKADDR'])
         # KEEP THE FOLLOWING COMMENTED OUT UNLESS YOU'RE DEBUGGING DEEPLY!!!!
         #logger.debug('(%s) TX Packet to %s on port %s: %s', self._peers[_peer]['RADIO_ID'], self._peers[_peer]['IP'], self._peers[_peer]['PORT'], ahex(_packet))
 
@@ -959,7 +976,7 @@ class HBSYSTEM(DatagramProtocol):
             else:
                 _packet = b''.join([_packet[:11], self._config['RADIO_ID'], _packet[15:]])
             
-        self.transport.write(_packet, self._config['MASTER_SOCKADDR'])
+        EGRESS.write(self.transport, _packet, self._config['MASTER_SOCKADDR'])
         # KEEP THE FOLLOWING COMMENTED OUT UNLESS YOU'RE DEBUGGING DEEPLY!!!!
         #logger.debug('(%s) TX Packet to %s:%s -- %s', self._system, self._config['MASTER_IP'], self._config['MASTER_PORT'], ahex(_packet))
 
@@ -1030,6 +1047,42 @@ class HBSYSTEM(DatagramProtocol):
             return False
         
 
+    # HBP ingress ACLs, global then system
+    def acl_allowed(self, _rf_src, _dst_id, _slot, _stream_id):
+        if self._CONFIG['GLOBAL']['USE_ACL']:
+            if not acl_check(_rf_src, self._CONFIG['GLOBAL']['SUB_ACL']):
+                if self._laststrid[_slot] != _stream_id:
+                    logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY GLOBAL ACL', self._system, int_id(_stream_id), int_id(_rf_src))
+                    self._laststrid[_slot] = _stream_id
+                return False
+            if _slot == 1 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG1_ACL']):
+                if self._laststrid[_slot] != _stream_id:
+                    logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
+                    self._laststrid[_slot] = _stream_id
+                return False
+            if _slot == 2 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG2_ACL']):
+                if self._laststrid[_slot] != _stream_id:
+                    logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS2 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
+                    self._laststrid[_slot] = _stream_id
+                return False
+        if self._config['USE_ACL']:
+            if not acl_check(_rf_src, self._config['SUB_ACL']):
+                if self._laststrid[_slot] != _stream_id:
+                    logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY SYSTEM ACL', self._system, int_id(_stream_id), int_id(_rf_src))
+                    self._laststrid[_slot] = _stream_id
+                return False
+            if _slot == 1 and not acl_check(_dst_id, self._config['TG1_ACL']):
+                if self._laststrid[_slot] != _stream_id:
+                    logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
+                    self._laststrid[_slot] = _stream_id
+                return False
+            if _slot == 2 and not acl_check(_dst_id, self._config['TG2_ACL']):
+                if self._laststrid[_slot] != _stream_id:
+                    logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM TS2 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
+                    self._laststrid[_slot] = _stream_id
+                return False
+        return True
+
     # Aliased in __init__ to datagramReceived if system is a master
     def master_datagramReceived(self, _data, _sockaddr):
         # Keep This Line Commented Unless HEAVILY Debugging!
@@ -1043,64 +1096,28 @@ class HBSYSTEM(DatagramProtocol):
                 logger.warning('(%s) Short master DMRD discarded: %s bytes',
                                self._system, len(_data))
                 return
-            _peer_id = _data[11:15]
+            _f = _RX.decode(_data)
+            _peer_id = _f.peer_id
             if _peer_id in self._peers \
                         and self._peers[_peer_id]['CONNECTION'] == 'YES' \
                         and self._peers[_peer_id]['SOCKADDR'] == _sockaddr:
                 # Authenticated voice is live peer traffic even when an endpoint
                 # suppresses RPTPING while transmitting.
                 self._peers[_peer_id]['LAST_PING'] = time()
-                _seq = _data[4]
-                _rf_src = _data[5:8]
-                _dst_id = _data[8:11]
-                _bits = _data[15]
-                _slot = 2 if (_bits & 0x80) else 1
-                #_call_type = 'unit' if (_bits & 0x40) else 'group'
-                if _bits & 0x40:
-                    _call_type = 'unit'
-                elif (_bits & 0x23) == 0x23:
-                    _call_type = 'vcsbk'
-                else:
-                    _call_type = 'group'
-                _frame_type = (_bits & 0x30) >> 4
-                _dtype_vseq = (_bits & 0xF) # data, 1=voice header, 2=voice terminator; voice, 0=burst A ... 5=burst F
-                _stream_id = _data[16:20]
+                _seq, _rf_src, _dst_id, _stream_id = _f.seq, _f.rf_src, _f.dst_id, _f.stream_id
+                _slot, _call_type, _frame_type, _dtype_vseq = _f.slot, _f.call_type, _f.frame_type, _f.dtype_vseq
                 if not int_id(_stream_id):
                     logger.warning('(%s) CALL DROPPED AS STREAM ID IS NULL FROM SUBSCRIBER %s', self._system, int_id(_rf_src))
                     return
                 #logger.debug('(%s) DMRD - Seqence: %s, RF Source: %s, Destination ID: %s', self._system, _seq, int_id(_rf_src), int_id(_dst_id))
-                # ACL Processing
-                if self._CONFIG['GLOBAL']['USE_ACL']:
-                    if not acl_check(_rf_src, self._CONFIG['GLOBAL']['SUB_ACL']):
-                        if self._laststrid[_slot] != _stream_id:
-                            logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY GLOBAL ACL', self._system, int_id(_stream_id), int_id(_rf_src))
-                            self._laststrid[_slot] = _stream_id
-                        return
-                    if _slot == 1 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG1_ACL']):
-                        if self._laststrid[_slot] != _stream_id:
-                            logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                            self._laststrid[_slot] = _stream_id
-                        return
-                    if _slot == 2 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG2_ACL']):
-                        if self._laststrid[_slot] != _stream_id:
-                            logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS2 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                            self._laststrid[_slot] = _stream_id
-                        return
-                if self._config['USE_ACL']:
-                    if not acl_check(_rf_src, self._config['SUB_ACL']):
-                        if self._laststrid[_slot] != _stream_id:
-                            logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY SYSTEM ACL', self._system, int_id(_stream_id), int_id(_rf_src))
-                            self._laststrid[_slot] = _stream_id
-                        return
-                    if _slot == 1 and not acl_check(_dst_id, self._config['TG1_ACL']):
-                        if self._laststrid[_slot] != _stream_id:
-                            logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                            self._laststrid[_slot] = _stream_id
-                        return
-                    if _slot == 2 and not acl_check(_dst_id, self._config['TG2_ACL']):
-                        if self._laststrid[_slot]!= _stream_id:
-                            logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM TS2 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                            self._laststrid[_slot] = _stream_id
+                # ACLs only depend on source and destination, so they are evaluated
+                # once per stream
+                if self._CONFIG['GLOBAL']['USE_ACL'] or self._config['USE_ACL']:
+                    _verdict = STREAM_VERDICTS.get(self._system, _slot, _stream_id, _rf_src, _dst_id)
+                    if _verdict is None:
+                        _verdict = STREAM_VERDICTS.put(self._system, _slot, _stream_id, _rf_src, _dst_id,
+                                                       self.acl_allowed(_rf_src, _dst_id, _slot, _stream_id))
+                    if not _verdict:
                         return
 
                 # Raw peer repeat happens before application routing, so apply a
@@ -1155,7 +1172,7 @@ class HBSYSTEM(DatagramProtocol):
                     for _peer in self._peers:
                         if _peer != _peer_id:
                             pkt[1] = _peer
-                            self.transport.write(b''.join(pkt), self._peers[_peer]['SOCKADDR'])
+                            EGRESS.write(self.transport, b''.join(pkt), self._peers[_peer]['SOCKADDR'])
                             #logger.debug('(%s) Packet on TS%s from %s (%s) for destination ID %s repeated to peer: %s (%s) [Stream ID: %s]', self._system, _slot, self._peers[_peer_id]['CALLSIGN'], int_id(_peer_id), int_id(_dst_id), self._peers[_peer]['CALLSIGN'], int_id(_peer), int_id(_stream_id))
                 if (_repeat_enabled and _repeat_ok
                         and _frame_type == HBPF_DATA_SYNC
@@ -1165,6 +1182,8 @@ class HBSYSTEM(DatagramProtocol):
 
                 # Userland actions -- typically this is the function you subclass for an application
                 self.dmrd_received(_peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data)
+                if _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VTERM:
+                    STREAM_VERDICTS.discard(self._system, _slot, _stream_id)
 
         elif _command == RPTL:    # RPTLogin -- a repeater wants to login
             _peer_id = _data[4:8]
@@ -1403,66 +1422,31 @@ class HBSYSTEM(DatagramProtocol):
                     logger.warning('(%s) Short peer DMRD discarded: %s bytes',
                                    self._system, len(_data))
                     return
-                _peer_id = _data[11:15]
+                _f = _RX.decode(_data)
+                _peer_id = _f.peer_id
                 if self._config['LOOSE'] or _peer_id == self._config['RADIO_ID']: # Validate the Radio_ID unless using loose validation
-                    #_seq = _data[4:5]
-                    _seq = _data[4]
-                    _rf_src = _data[5:8]
-                    _dst_id = _data[8:11]
-                    _bits = _data[15]
-                    _slot = 2 if (_bits & 0x80) else 1
-                    #_call_type = 'unit' if (_bits & 0x40) else 'group'
-                    if _bits & 0x40:
-                        _call_type = 'unit'
-                    elif (_bits & 0x23) == 0x23:
-                        _call_type = 'vcsbk'
-                    else:
-                        _call_type = 'group'
-                    _frame_type = (_bits & 0x30) >> 4
-                    _dtype_vseq = (_bits & 0xF) # data, 1=voice header, 2=voice terminator; voice, 0=burst A ... 5=burst F
-                    _stream_id = _data[16:20]
+                    _seq, _rf_src, _dst_id, _stream_id = _f.seq, _f.rf_src, _f.dst_id, _f.stream_id
+                    _slot, _call_type, _frame_type, _dtype_vseq = _f.slot, _f.call_type, _f.frame_type, _f.dtype_vseq
                     if not int_id(_stream_id):
                         logger.warning('(%s) CALL DROPPED AS STREAM ID IS NULL FROM SUBSCRIBER %s', self._system, int_id(_rf_src))
                         return
                     #logger.debug('(%s) DMRD - Sequence: %s, RF Source: %s, Destination ID: %s', self._system, int_id(_seq), int_id(_rf_src), int_id(_dst_id))
 
-                    # ACL Processing
-                    if self._CONFIG['GLOBAL']['USE_ACL']:
-                        if not acl_check(_rf_src, self._CONFIG['GLOBAL']['SUB_ACL']):
-                            if self._laststrid[_slot] != _stream_id:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY GLOBAL ACL', self._system, int_id(_stream_id), int_id(_rf_src))
-                                self._laststrid[_slot] = _stream_id
-                            return
-                        if _slot == 1 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG1_ACL']):
-                            if self._laststrid[_slot] != _stream_id:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                                self._laststrid[_slot] = _stream_id
-                            return
-                        if _slot == 2 and not acl_check(_dst_id, self._CONFIG['GLOBAL']['TG2_ACL']):
-                            if self._laststrid[_slot] != _stream_id:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY GLOBAL TS2 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                                self._laststrid[_slot] = _stream_id
-                            return
-                    if self._config['USE_ACL']:
-                        if not acl_check(_rf_src, self._config['SUB_ACL']):
-                            if self._laststrid[_slot] != _stream_id:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s FROM SUBSCRIBER %s BY SYSTEM ACL', self._system, int_id(_stream_id), int_id(_rf_src))
-                                self._laststrid[_slot] = _stream_id
-                            return
-                        if _slot == 1 and not acl_check(_dst_id, self._config['TG1_ACL']):
-                            if self._laststrid[_slot] != _stream_id:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM TS1 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                                self._laststrid[_slot] = _stream_id
-                            return
-                        if _slot == 2 and not acl_check(_dst_id, self._config['TG2_ACL']):
-                            if self._laststrid[_slot] != _stream_id:
-                                logger.info('(%s) CALL DROPPED WITH STREAM ID %s ON TGID %s BY SYSTEM TS2 ACL', self._system, int_id(_stream_id), int_id(_dst_id))
-                                self._laststrid[_slot] = _stream_id
+                    # ACLs only depend on source and destination, so they are evaluated
+                    # once per stream
+                    if self._CONFIG['GLOBAL']['USE_ACL'] or self._config['USE_ACL']:
+                        _verdict = STREAM_VERDICTS.get(self._system, _slot, _stream_id, _rf_src, _dst_id)
+                        if _verdict is None:
+                            _verdict = STREAM_VERDICTS.put(self._system, _slot, _stream_id, _rf_src, _dst_id,
+                                                           self.acl_allowed(_rf_src, _dst_id, _slot, _stream_id))
+                        if not _verdict:
                             return
 
 
                     # Userland actions -- typically this is the function you subclass for an application
                     self.dmrd_received(_peer_id, _rf_src, _dst_id, _seq, _slot, _call_type, _frame_type, _dtype_vseq, _stream_id, _data)
+                    if _frame_type == HBPF_DATA_SYNC and _dtype_vseq == HBPF_SLT_VTERM:
+                        STREAM_VERDICTS.discard(self._system, _slot, _stream_id)
 
             elif _command == MSTN:    # Actually MSTNAK -- a NACK from the master
                 _peer_id = _data[6:10]
@@ -1563,18 +1547,69 @@ class HBSYSTEM(DatagramProtocol):
 # Socket-based reporting section
 #
 class report(NetstringReceiver):
+    # Set once the client asks for BRIDGE_DELTA instead of full BRIDGE_SND
+    bridge_deltas = False
+    # Payload encoding for this client, see report_codec (FORMAT_REQ)
+    report_format = DEFAULT_FORMAT
+    # Set once the client asks for batched binary BRDG_EVENTS (report_events)
+    binary_events = False
+    # Messages held while the transport is paused; beyond this the oldest
+    # is dropped. BRIDGE_SND / CONFIG_SND only ever keep the newest copy.
+    QUEUE_MAX = 64
+    COALESCE_OPCODES = (REPORT_OPCODES['BRIDGE_SND'], REPORT_OPCODES['CONFIG_SND'])
+
     def __init__(self, factory):
         self._factory = factory
+        self._queue = deque()
+        self._paused = False
+        self.dropped = 0
+        self.coalesced = 0
 
     def connectionMade(self):
         self._factory.clients.append(self)
+        # Streaming producer: the transport pauses us once its write buffer
+        # is full, so a stuck client backs up here, bounded, not in Twisted
+        self.transport.registerProducer(self, True)
         logger.info('(REPORT) HBlink reporting client connected: %s', self.transport.getPeer())
         if hasattr(self._factory, 'send_server_info'):
             self._factory.send_server_info()
 
     def connectionLost(self, reason):
         logger.info('(REPORT) HBlink reporting client disconnected: %s', self.transport.getPeer())
+        if self.dropped or self.coalesced:
+            logger.info('(REPORT) Client %s had %s report messages dropped, %s coalesced',
+                        self.transport.getPeer(), self.dropped, self.coalesced)
         self._factory.clients.remove(self)
+        self._queue.clear()
+
+    def pauseProducing(self):
+        self._paused = True
+
+    def resumeProducing(self):
+        self._paused = False
+        while self._queue and not self._paused:
+            self.sendString(self._queue.popleft())
+
+    def stopProducing(self):
+        self._queue.clear()
+
+    def queue_message(self, _message):
+        if not self._paused and not self._queue:
+            self.sendString(_message)
+            return
+        _opcode = _message[:1]
+        if _opcode in self.COALESCE_OPCODES:
+            for i, _queued in enumerate(self._queue):
+                if _queued[:1] == _opcode:
+                    self._queue[i] = _message
+                    self.coalesced += 1
+                    self._factory.coalesced += 1
+                    return
+        if len(self._queue) >= self.QUEUE_MAX:
+            self._queue.popleft()
+            self.dropped += 1
+            self._factory.dropped += 1
+        self._queue.append(_message)
 
     def stringReceived(self, data):
         self.process_message(data)
@@ -1584,12 +1619,26 @@ class report(NetstringReceiver):
         if opcode == REPORT_OPCODES['CONFIG_REQ']:
             logger.info('(REPORT) HBlink reporting client sent \'CONFIG_REQ\': %s', self.transport.getPeer())
             self.send_config()
+        elif opcode == REPORT_OPCODES['FORMAT_REQ']:
+            self.report_format = negotiate_format(_message[1:])
+            logger.info('(REPORT) HBlink reporting client %s using %s payloads', self.transport.getPeer(), self.report_format)
+            # Queued behind anything already encoded in the old format
+            self.queue_message(b''.join([REPORT_OPCODES['FORMAT_ACK'], self.report_format.encode('ascii')]))
+        elif opcode == REPORT_OPCODES['BRIDGE_RESYNC_REQ'] and hasattr(self._factory, 'send_bridge_resync'):
+            logger.info('(REPORT) HBlink reporting client sent \'BRIDGE_RESYNC_REQ\': %s', self.transport.getPeer())
+            self._factory.send_bridge_resync(self)
+        elif opcode == REPORT_OPCODES['BRDG_EVENTS_REQ']:
+            logger.info('(REPORT) HBlink reporting client sent \'BRDG_EVENTS_REQ\': %s', self.transport.getPeer())
+            self.binary_events = True
         else:
             logger.error('(REPORT) got unknown opcode')
 
 class reportFactory(Factory):
     def __init__(self, config):
         self._config = config
+        # Messages dropped / replaced in client queues since startup
+        self.dropped = 0
+        self.coalesced = 0
 
     def buildProtocol(self, addr):
         if (addr.host) in self._config['REPORTS']['REPORT_CLIENTS'] or '*' in self._config['REPORTS']['REPORT_CLIENTS']:
@@ -1601,12 +1650,35 @@ class reportFactory(Factory):
 
     def send_clients(self, _message):
         for client in self.clients:
-            client.sendString(_message)
+            client.queue_message(_message)
+
+    @staticmethod
+    def encode_formats(_opcode, _payload, _formats):
+        # One message per report format; safe to run off the reactor as
+        # long as nothing mutates _payload meanwhile
+        return {_fmt: b''.join([_opcode, report_dumps(_fmt, _payload)]) for _fmt in _formats}
+
+    def fan_out(self, _messages, _clients=None):
+        # Returns the largest message size sent
+        _size = 0
+        for client in (self.clients if _clients is None else _clients):
+            _message = _messages.get(client.report_format)
+            if _message is not None:
+                client.queue_message(_message)
+                _size = max(_size, len(_message))
+        return _size
+
+    def send_clients_encoded(self, _opcode, _payload, _clients=None):
+        # Encode once per format in use rather than once per client
+        _clients = self.clients if _clients is None else _clients
+        return self.fan_out(
+            self.encode_formats(_opcode, _payload, {client.report_format for client in _clients}), _clients)
 
     def send_config(self):
-        serialized = pickle.dumps(self._config['SYSTEMS'], protocol=2) #.decode('utf-8', errors='ignore') #pickle.HIGHEST_PROTOCOL)
+        # CONFIG['SYSTEMS'] is live reactor state, so it is encoded here
+        # rather than in a thread; the client queues still coalesce it
         logger.debug('(REPORT) Send config')
-        self.send_clients(b''.join([REPORT_OPCODES['CONFIG_SND'], serialized]))
+        self.send_clients_encoded(REPORT_OPCODES['CONFIG_SND'], self._config['SYSTEMS'])
 
 #Use this try_download instead of that from dmr_utils3
 def try_download(_path, _file, _url, _stale,):
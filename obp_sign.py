@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+###############################################################################
+#   OpenBridge frame signing and verification (PASSPHRASE, PROTO_VER)
+#   Copyright (C) 2026 Shane Daley, M0VUB <shane@freestar.network>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+###############################################################################
+'''
+ObpKeys holds a blake2b and an HMAC-SHA1 context already keyed with one
+system's PASSPHRASE. Every frame is hashed with a .copy() of them, so the
+key setup runs once per passphrase instead of once per packet.
+
+obp_packer(version, keys, server_id) returns the function OPENBRIDGE
+uses to turn a 53-byte HBP DMRD frame into the signed frame for that
+protocol version. The opcode, our SERVER_ID and (DMRE) the version byte
+are bound into the packer; per packet the frame slices are joined and
+the trailer fields packed with one struct:
+
+    v1  DMRD  frame[53]                                     + HMAC-SHA1[20]
+    v2  DMRF  frame[53] timestamp[8]                        + hops + blake2b[16]
+    v3  DMRF  frame[53]                + timestamp[8] + hops + blake2b[16]
+    v4  DMRE  frame[53] ber rssi ver timestamp[8] src_server[4] hops
+                                                            + blake2b[16]
+    v5+ DMRE  frame[53] ber rssi ver timestamp[8] src_server[4]
+              src_rptr[4] hops                              + blake2b[16]
+
+Only the fields before the '+' are hashed. Bytes 11-15 of the frame (the
+peer ID) are replaced by server_id.
+'''
+
+import struct
+from hashlib import blake2b, sha1
+from hmac import new as hmac_new
+from time import time_ns
+
+from const import DMRD, DMRE, DMRF
+
+# Trailers after the 53-byte frame; the head is joined from slices, which
+# is cheaper than packing the whole frame
+_V2_TAIL = struct.Struct('>Q')
+_V3_TAIL = struct.Struct('>Q1s')
+_V4_TAIL = struct.Struct('>1s1sBQ4s1s')
+_V5_TAIL = struct.Struct('>1s1sBQ4s4s1s')
+
+_ONE_HOP = b'\x01'
+
+
+class ObpKeys(object):
+    """Pre-keyed hash contexts for one PASSPHRASE."""
+    __slots__ = ('passphrase', '_blake', '_hmac')
+
+    def __init__(self, passphrase):
+        self.passphrase = passphrase
+        self._blake = blake2b(key=passphrase, digest_size=16)
+        self._hmac = hmac_new(passphrase, digestmod=sha1)
+
+    def blake(self, data):
+        _h = self._blake.copy()
+        _h.update(data)
+        return _h.digest()
+
+    def hmac(self, data):
+        _h = self._hmac.copy()
+        _h.update(data)
+        return _h.digest()
+
+
+def obp_packer(version, keys, server_id):
+    """Signing function pack(frame, hops, ber, rssi, source_server, source_rptr) for version."""
+    _blake = keys._blake
+    _hmac = keys._hmac
+
+    if version > 4:
+        _tail = _V5_TAIL.pack
+
+        def pack(frame, hops, ber, rssi, source_server, source_rptr):
+            _h = _blake.copy()
+            _body = b''.join([DMRE, frame[4:11], server_id, frame[15:53],
+                              _tail(ber, rssi, version, time_ns(), source_server, source_rptr, hops or _ONE_HOP)])
+            _h.update(_body)
+            return _body + _h.digest()
+
+    elif version == 4:
+        _tail = _V4_TAIL.pack
+
+        def pack(frame, hops, ber, rssi, source_server, source_rptr):
+            _h = _blake.copy()
+            _body = b''.join([DMRE, frame[4:11], server_id, frame[15:53],
+                              _tail(ber, rssi, version, time_ns(), source_server, hops or _ONE_HOP)])
+            _h.update(_body)
+            return _body + _h.digest()
+
+    elif version == 3:
+        _tail = _V3_TAIL.pack
+
+        def pack(frame, hops, ber, rssi, source_server, source_rptr):
+            _h = _blake.copy()
+            _body = b''.join([DMRF, frame[4:11], server_id, frame[15:53]])
+            _h.update(_body)
+            return b''.join([_body, _tail(time_ns(), hops or _ONE_HOP), _h.digest()])
+
+    elif version == 2:
+        _tail = _V2_TAIL.pack
+
+        def pack(frame, hops, ber, rssi, source_server, source_rptr):
+            _h = _blake.copy()
+            _body = b''.join([DMRF, frame[4:11], server_id, frame[15:53], _tail(time_ns())])
+            _h.update(_body)
+            return b''.join([_body, hops or _ONE_HOP, _h.digest()])
+
+    else:
+
+        def pack(frame, hops, ber, rssi, source_server, source_rptr):
+            _h = _hmac.copy()
+            _body = b''.join([DMRD, frame[4:11], server_id, frame[15:53]])
+            _h.update(_body)
+            return _body + _h.digest()
+
+    return pack
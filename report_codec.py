@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+###############################################################################
+#   Report socket payload encodings (REPORT_OPCODES FORMAT_REQ)
+#   Copyright (C) 2026 Shane Daley, M0VUB <shane@freestar.network>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+###############################################################################
+'''
+CONFIG_SND, BRIDGE_SND and BRIDGE_DELTA carry a structured payload. By
+default it is a protocol 2 pickle, as it always has been. A client can
+send FORMAT_REQ with one of the names below right after connecting; the
+server answers FORMAT_ACK with the format it will use from then on
+(pickle if the name is unknown), and every later payload to that client
+is encoded that way.
+
+  pickle  pickle.dumps(obj, protocol=2)
+
+  json    compact UTF-8 JSON. bytes (TGIDs, peer IDs, dict keys too)
+          become lowercase hex strings; tuples, sets and deques become
+          lists; anything else JSON cannot hold is sent as str().
+
+  rbin    tagged binary, b'RB' + version byte, then one value:
+
+            0x00-0x3f   small int 0..63
+            c0 c2 c3    None, False, True
+            'i' >q      int            'f' >d   float
+            's' >I      UTF-8 string, added to the string table
+            'r' >I      string table reference
+            'b' >I      bytes          'l' >I   list of n values
+            'd' >I      dict of n key/value pairs
+            'L'         report leg: SYSTEM and TO_TYPE as string values,
+                        then '>B3sBdiBBB' TS, TGID, flags, TIMER,
+                        TIMEOUT, ON/OFF/RESET counts and their 3-byte IDs
+
+          Repeated strings (system names, dict keys) cost five bytes
+          after the first, and bridge legs skip per-field tags, so a
+          bridge table is less than half the size of the pickle. It is
+          pure Python, so it costs more CPU than pickle to encode.
+
+Decoders return plain dicts, lists and scalars; tuples come back as
+lists in json and rbin.
+'''
+
+import json
+import pickle
+import struct
+from collections import deque
+from collections.abc import Mapping
+
+DEFAULT_FORMAT = 'pickle'
+REPORT_FORMATS = ('pickle', 'json', 'rbin')
+
+RBIN_MAGIC = b'RB'
+RBIN_VERSION = 1
+
+_LEN = struct.Struct('>I')
+_INT = struct.Struct('>q')
+_FLOAT = struct.Struct('>d')
+_LEG = struct.Struct('>B3sBdiBBB')
+
+_LEG_KEYS = frozenset(('SYSTEM', 'TS', 'TGID', 'ACTIVE', 'TIMEOUT', 'TO_TYPE', 'TIMER', 'ON', 'OFF', 'RESET'))
+_LEG_REQUIRED = frozenset(('SYSTEM', 'TS', 'TGID', 'ACTIVE', 'TIMEOUT', 'TO_TYPE', 'TIMER'))
+_TRIGGERS = ('ON', 'OFF', 'RESET')
+
+# Leg flags
+_ACTIVE = 0x01
+_NO_TIMEOUT = 0x02      # TIMEOUT was ''
+_INT_TIMER = 0x04
+_HAS_ON = 0x08
+_HAS_OFF = 0x10
+_HAS_RESET = 0x20
+_HAS = (_HAS_ON, _HAS_OFF, _HAS_RESET)
+
+_MAX_EXACT = 1 << 53     # largest int TIMER a double holds exactly
+_INT_MIN = -(1 << 63)
+_INT_MAX = (1 << 63) - 1
+
+
+class CodecError(ValueError):
+    pass
+
+
+def _json_default(obj):
+    if type(obj) is bytes:
+        return obj.hex()
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, (set, frozenset, deque)):
+        return list(obj)
+    return str(obj)
+
+
+def _jsonable(obj):
+    # Slow path for payloads with bytes dict keys (CONFIG PEERS)
+    _type = type(obj)
+    if _type is str or _type is int or _type is float or _type is bool or obj is None:
+        return obj
+    if _type is bytes:
+        return obj.hex()
+    if isinstance(obj, Mapping):
+        return {(key.hex() if type(key) is bytes else key): _jsonable(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return [_jsonable(value) for value in obj]
+    return str(obj)
+
+
+def _leg_record(leg):
+    # A report leg we can pack as one struct, or None to fall back to 'd'
+    if not _LEG_REQUIRED <= leg.keys() <= _LEG_KEYS:
+        return None
+    _ts, _tgid, _timer, _timeout, _active = leg['TS'], leg['TGID'], leg['TIMER'], leg['TIMEOUT'], leg['ACTIVE']
+    if (type(_ts) is not int or not 0 <= _ts <= 255 or type(_tgid) is not bytes or len(_tgid) != 3
+            or type(leg['SYSTEM']) is not str or type(leg['TO_TYPE']) is not str or type(_active) is not bool):
+        return None
+    _flags = _ACTIVE if _active else 0
+    if type(_timer) is int:
+        if not -_MAX_EXACT <= _timer <= _MAX_EXACT:
+            return None
+        _flags |= _INT_TIMER
+    elif type(_timer) is not float:
+        return None
+    if _timeout == '':
+        _flags |= _NO_TIMEOUT
+        _timeout = 0
+    elif type(_timeout) is not int or not -0x80000000 <= _timeout <= 0x7fffffff:
+        return None
+    _on = leg.get('ON')
+    _off = leg.get('OFF')
+    _reset = leg.get('RESET')
+    _ids = b''
+    if _on is not None or _off is not None or _reset is not None:
+        _ids = []
+        for _trigger, _bit in ((_on, _HAS_ON), (_off, _HAS_OFF), (_reset, _HAS_RESET)):
+            if _trigger is None:
+                continue
+            if type(_trigger) is not list or len(_trigger) > 255:
+                return None
+            for _id in _trigger:
+                if type(_id) is not bytes or len(_id) != 3:
+                    return None
+            _flags |= _bit
+            _ids.extend(_trigger)
+        _ids = b''.join(_ids)
+    return _LEG.pack(_ts, _tgid, _flags, _timer, _timeout,
+                     len(_on) if _on else 0, len(_off) if _off else 0, len(_reset) if _reset else 0) + _ids
+
+
+def _rbin_dumps(obj):
+    parts = [RBIN_MAGIC, bytes((RBIN_VERSION,))]
+    strings = {}
+    out = parts.append
+
+    def encode_str(value):
+        _ref = strings.get(value)
+        if _ref is not None:
+            out(b'r' + _LEN.pack(_ref))
+            return
+        strings[value] = len(strings)
+        _raw = value.encode('utf-8')
+        out(b's' + _LEN.pack(len(_raw)))
+        out(_raw)
+
+    def encode(value):
+        _type = type(value)
+        if _type is str:
+            encode_str(value)
+        elif _type is list:
+            out(b'l' + _LEN.pack(len(value)))
+            for item in value:
+                encode(item)
+        elif _type is bool:
+            out(b'\xc3' if value else b'\xc2')
+        elif _type is int:
+            if 0 <= value < 64:
+                out(bytes((value,)))
+            elif _INT_MIN <= value <= _INT_MAX:
+                out(b'i' + _INT.pack(value))
+            else:
+                raise CodecError('int out of range: {}'.format(value))
+        elif _type is float:
+            out(b'f' + _FLOAT.pack(value))
+        elif value is None:
+            out(b'\xc0')
+        elif _type is bytes:
+            out(b'b' + _LEN.pack(len(value)))
+            out(value)
+        elif _type is dict or isinstance(value, Mapping):
+            _record = _leg_record(value) if 'TGID' in value else None
+            if _record is not None:
+                out(b'L')
+                encode_str(value['SYSTEM'])
+                encode_str(value['TO_TYPE'])
+                out(_record)
+                return
+            out(b'd' + _LEN.pack(len(value)))
+            for key, item in value.items():
+                encode(key)
+                encode(item)
+        elif isinstance(value, (tuple, set, frozenset, deque)):
+            out(b'l' + _LEN.pack(len(value)))
+            for item in value:
+                encode(item)
+        else:
+            encode(str(value))
+
+    encode(obj)
+    return b''.join(parts)
+
+
+def _rbin_loads(data):
+    if data[:2] != RBIN_MAGIC or data[2:3] != bytes((RBIN_VERSION,)):
+        raise CodecError('not an rbin payload')
+    view = memoryview(data)
+    strings = []
+    pos = 3
+
+    def length():
+        nonlocal pos
+        (_n,) = _LEN.unpack_from(view, pos)
+        pos += 4
+        return _n
+
+    def decode():
+        nonlocal pos
+        _tag = view[pos]
+        pos += 1
+        if _tag < 64:
+            return _tag
+        if _tag == 0x72:        # r
+            return strings[length()]
+        if _tag == 0x73:        # s
+            _n = length()
+            _value = str(view[pos:pos + _n], 'utf-8')
+            pos += _n
+            strings.append(_value)
+            return _value
+        if _tag == 0x4c:        # L
+            _system = decode()
+            _to_type = decode()
+            _ts, _tgid, _flags, _timer, _timeout, _on, _off, _reset = _LEG.unpack_from(view, pos)
+            pos += _LEG.size
+            leg = {
+                'SYSTEM': _system,
+                'TS': _ts,
+                'TGID': _tgid,
+                'ACTIVE': bool(_flags & _ACTIVE),
+                'TIMEOUT': '' if _flags & _NO_TIMEOUT else _timeout,
+                'TO_TYPE': _to_type,
+                'TIMER': int(_timer) if _flags & _INT_TIMER else _timer,
+            }
+            for key, bit, count in zip(_TRIGGERS, _HAS, (_on, _off, _reset)):
+                if _flags & bit:
+                    leg[key] = [bytes(view[pos + 3 * i:pos + 3 * i + 3]) for i in range(count)]
+                    pos += 3 * count
+            return leg
+        if _tag == 0x64:        # d
+            _n = length()
+            _value = {}
+            for _ in range(_n):
+                key = decode()
+                _value[key] = decode()
+            return _value
+        if _tag == 0x6c:        # l
+            return [decode() for _ in range(length())]
+        if _tag == 0xc0:
+            return None
+        if _tag == 0xc2:
+            return False
+        if _tag == 0xc3:
+            return True
+        if _tag == 0x69:        # i
+            (_value,) = _INT.unpack_from(view, pos)
+            pos += 8
+            return _value
+        if _tag == 0x66:        # f
+            (_value,) = _FLOAT.unpack_from(view, pos)
+            pos += 8
+            return _value
+        if _tag == 0x62:        # b
+            _n = length()
+            _value = bytes(view[pos:pos + _n])
+            pos += _n
+            return _value
+        raise CodecError('unknown rbin tag 0x{:02x} at {}'.format(_tag, pos - 1))
+
+    try:
+        value = decode()
+    except (IndexError, struct.error) as exc:
+        raise CodecError('truncated rbin payload') from exc
+    if pos != len(data):
+        raise CodecError('trailing bytes in rbin payload')
+    return value
+
+
+def negotiate_format(name):
+    """Format the server will use for a FORMAT_REQ payload."""
+    if isinstance(name, bytes):
+        name = name.decode('ascii', errors='replace')
+    name = name.strip().lower()
+    return name if name in REPORT_FORMATS else DEFAULT_FORMAT
+
+
+def dumps(fmt, obj):
+    if fmt == 'json':
+        try:
+            return json.dumps(obj, default=_json_default, separators=(',', ':')).encode('utf-8')
+        except TypeError:
+            return json.dumps(_jsonable(obj), separators=(',', ':')).encode('utf-8')
+    if fmt == 'rbin':
+        return _rbin_dumps(obj)
+    return pickle.dumps(obj, protocol=2)
+
+
+def loads(fmt, data):
+    if fmt == 'json':
+        return json.loads(bytes(data).decode('utf-8'))
+    if fmt == 'rbin':
+        return _rbin_loads(bytes(data))
+    return pickle.loads(data)
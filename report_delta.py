@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+###############################################################################
+#   Incremental bridge table reports (REPORT_OPCODES BRIDGE_DELTA)
+#   Copyright (C) 2026 Shane Daley, M0VUB <shane@freestar.network>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+###############################################################################
+'''
+BRIDGE_SND pickles the whole report table to every client on every send.
+Clients that send BRIDGE_RESYNC_REQ are switched to BRIDGE_DELTA instead:
+one full snapshot, then only what changed since the previous send.
+
+Every BRIDGE_DELTA payload is a dict, encoded in the client's report
+format (report_codec; pickle unless the client sent FORMAT_REQ):
+
+    {'seq': n, 'full': True,  'bridges': {bridge: [leg, ...]}}
+    {'seq': n, 'full': False, 'ops': [(kind, bridge, key, data), ...]}
+
+A delta with sequence n applies on top of the table at n - 1. Legs are
+keyed by (SYSTEM, TS, TGID) within their bridge. Op kinds:
+
+    bridge_added     data is the full leg list
+    bridge_removed
+    bridge_replaced  data is the full leg list (surviving legs changed
+                     order or keys are not unique)
+    leg_added        data is (index, leg), inserted after removals
+    leg_removed
+    leg_activated    data holds only the changed ACTIVE/TIMER/TIMEOUT
+    leg_deactivated  fields
+    leg_timer
+    leg_changed      data is the full replacement leg
+
+A client that sees a sequence gap, or a delta that does not apply, sends
+BRIDGE_RESYNC_REQ and gets a fresh full snapshot. The server also sends a
+full snapshot every BRIDGE_RESYNC_S so a client can never drift for long.
+'''
+
+from report_codec import DEFAULT_FORMAT, loads
+
+BRIDGE_ADDED = 'bridge_added'
+BRIDGE_REMOVED = 'bridge_removed'
+BRIDGE_REPLACED = 'bridge_replaced'
+LEG_ADDED = 'leg_added'
+LEG_REMOVED = 'leg_removed'
+LEG_ACTIVATED = 'leg_activated'
+LEG_DEACTIVATED = 'leg_deactivated'
+LEG_TIMER = 'leg_timer'
+LEG_CHANGED = 'leg_changed'
+
+_STATE_FIELDS = frozenset(('ACTIVE', 'TIMER', 'TIMEOUT'))
+_MISSING = object()
+
+
+class DeltaError(ValueError):
+    pass
+
+
+def leg_key(leg):
+    return (leg['SYSTEM'], leg['TS'], leg['TGID'])
+
+
+def _leg_op(bridge, key, old, new):
+    changed = [field for field in set(old) | set(new)
+               if old.get(field, _MISSING) != new.get(field, _MISSING)]
+    if not changed:
+        return None
+    if not _STATE_FIELDS.issuperset(changed):
+        return (LEG_CHANGED, bridge, key, dict(new))
+    if 'ACTIVE' in changed:
+        kind = LEG_ACTIVATED if new['ACTIVE'] else LEG_DEACTIVATED
+    else:
+        kind = LEG_TIMER
+    return (kind, bridge, key, {field: new[field] for field in changed})
+
+
+def _diff_bridge(bridge, old_legs, new_legs, ops):
+    old_keys = [leg_key(leg) for leg in old_legs]
+    new_keys = [leg_key(leg) for leg in new_legs]
+    old_set = set(old_keys)
+    new_set = set(new_keys)
+    # Per-leg ops remove and insert; legs present in both tables must keep
+    # their relative order, otherwise the bridge is sent whole
+    if (len(old_set) != len(old_keys) or len(new_set) != len(new_keys)
+            or [k for k in old_keys if k in new_set] != [k for k in new_keys if k in old_set]):
+        ops.append((BRIDGE_REPLACED, bridge, None, [dict(leg) for leg in new_legs]))
+        return
+    old_by_key = dict(zip(old_keys, old_legs))
+    for key in old_keys:
+        if key not in new_set:
+            ops.append((LEG_REMOVED, bridge, key, None))
+    for index, (key, leg) in enumerate(zip(new_keys, new_legs)):
+        old = old_by_key.get(key)
+        if old is None:
+            ops.append((LEG_ADDED, bridge, key, (index, dict(leg))))
+        else:
+            op = _leg_op(bridge, key, old, leg)
+            if op is not None:
+                ops.append(op)
+
+
+def diff_bridges(old, new):
+    """Ops that turn report table `old` into `new` (both {bridge: [leg]})."""
+    ops = []
+    for bridge in old:
+        if bridge not in new:
+            ops.append((BRIDGE_REMOVED, bridge, None, None))
+    for bridge, legs in new.items():
+        old_legs = old.get(bridge)
+        if old_legs is None:
+            ops.append((BRIDGE_ADDED, bridge, None, [dict(leg) for leg in legs]))
+        elif old_legs != legs:
+            _diff_bridge(bridge, old_legs, legs, ops)
+    return ops
+
+
+def _find_leg(legs, key):
+    # json and rbin clients get the key back as a list
+    key = tuple(key)
+    for i, leg in enumerate(legs):
+        if leg_key(leg) == key:
+            return i
+    raise DeltaError('no leg {}'.format(key))
+
+
+def apply_delta(bridges, ops):
+    """Apply diff_bridges() ops to `bridges` in place.
+
+    Raises DeltaError if the table does not match what the ops expect.
+    """
+    for kind, bridge, key, data in ops:
+        if kind in (BRIDGE_ADDED, BRIDGE_REPLACED):
+            bridges[bridge] = list(data)
+            continue
+        if bridge not in bridges:
+            raise DeltaError('{} for unknown bridge {}'.format(kind, bridge))
+        legs = bridges[bridge]
+        if kind == BRIDGE_REMOVED:
+            del bridges[bridge]
+        elif kind == LEG_ADDED:
+            legs.insert(data[0], data[1])
+        elif kind == LEG_REMOVED:
+            del legs[_find_leg(legs, key)]
+        elif kind == LEG_CHANGED:
+            legs[_find_leg(legs, key)] = data
+        elif kind in (LEG_ACTIVATED, LEG_DEACTIVATED, LEG_TIMER):
+            legs[_find_leg(legs, key)].update(data)
+        else:
+            raise DeltaError('unknown op {}'.format(kind))
+
+
+def full_message(seq, bridges):
+    return {'seq': seq, 'full': True, 'bridges': bridges}
+
+
+def delta_message(seq, ops):
+    return {'seq': seq, 'full': False, 'ops': ops}
+
+
+class BridgeMirror(object):
+    """Client-side copy of the report table kept in step with BRIDGE_DELTA."""
+
+    def __init__(self, fmt=DEFAULT_FORMAT):
+        self.format = fmt
+        self.bridges = None
+        self.seq = None
+
+    def feed(self, data):
+        """Apply one BRIDGE_DELTA payload.
+
+        Returns False when the client has just fallen out of step and must
+        send BRIDGE_RESYNC_REQ. Deltas are then ignored (returning True, the
+        request is already out) until the next full snapshot arrives.
+        """
+        message = loads(self.format, data)
+        if message['full']:
+            self.bridges = message['bridges']
+            self.seq = message['seq']
+            return True
+        if self.seq is None:
+            return True
+        if message['seq'] != self.seq + 1:
+            self.seq = None
+            return False
+        try:
+            apply_delta(self.bridges, message['ops'])
+        except DeltaError:
+            self.seq = None
+            return False
+        self.seq = message['seq']
+        return True
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+###############################################################################
+#   Typed bridge events for the report socket (REPORT_OPCODES BRDG_EVENTS)
+#   Copyright (C) 2026 Shane Daley, M0VUB <shane@freestar.network>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+###############################################################################
+'''
+A bridge event is a plain tuple:
+
+    (kind, trx, system, stream_id, peer_id, rf_src, slot, dst_id, duration)
+
+kind is a BridgeEvent, trx 'RX' or 'TX', duration a float for call ends
+and None otherwise. The IDs may be the raw DMR bytes straight off the
+packet or ints; nothing converts them until the event is sent, so the
+routing path only builds the tuple.
+
+Clients that send BRDG_EVENTS_REQ get events in batches as BRDG_EVENTS:
+
+    header   '>BH'    format version, system name count, then per name
+                      '>B' length + UTF-8 bytes
+    events   '>BBHIIIIBd' per event: kind, flags (TX, has duration),
+                      system name index, stream id, peer id, rf src,
+                      dst id, slot, duration
+
+Version 1 batches ('>BB' header, float32 duration) are still decoded.
+
+Everyone else gets one BRDG_EVENT CSV line per event, exactly as before,
+built by format_csv at send time.
+'''
+
+import struct
+from enum import IntEnum
+
+EVENTS_VERSION = 2
+
+_HEADER = struct.Struct('>BH')
+_NAME_LEN = struct.Struct('>B')
+_EVENT = struct.Struct('>BBHIIIIBd')
+# Version 1: at most 255 system names, float32 durations
+_LAYOUTS = {
+    1: (struct.Struct('>BB'), struct.Struct('>BBHIIIIBf')),
+    EVENTS_VERSION: (_HEADER, _EVENT),
+}
+_MAX_NAMES = 0xffff
+
+_TX = 0x01
+_HAS_DURATION = 0x02
+
+
+class BridgeEvent(IntEnum):
+    GROUP_VOICE_START = 1
+    GROUP_VOICE_END = 2
+    UNIT_DATA = 3
+    UNIT_CSBK = 4
+    UNIT_DATA_HEADER = 5
+    UNIT_VCSBK_12 = 6
+    UNIT_VCSBK_34 = 7
+    DATA_HEADER = 8
+    OTHER_DATA = 9
+    VCSBK_12 = 10
+    VCSBK_34 = 11
+
+
+# First two CSV columns for each kind
+EVENT_TEXT = {
+    BridgeEvent.GROUP_VOICE_START: ('GROUP VOICE', 'START'),
+    BridgeEvent.GROUP_VOICE_END: ('GROUP VOICE', 'END'),
+    BridgeEvent.UNIT_DATA: ('UNIT DATA', 'DATA'),
+    BridgeEvent.UNIT_CSBK: ('UNIT CSBK', 'DATA'),
+    BridgeEvent.UNIT_DATA_HEADER: ('UNIT DATA HEADER', 'DATA'),
+    BridgeEvent.UNIT_VCSBK_12: ('UNIT VCSBK 1/2 DATA BLOCK', 'DATA'),
+    BridgeEvent.UNIT_VCSBK_34: ('UNIT VCSBK 3/4 DATA BLOCK', 'DATA'),
+    BridgeEvent.DATA_HEADER: ('DATA HEADER', 'DATA'),
+    BridgeEvent.OTHER_DATA: ('OTHER DATA', 'DATA'),
+    BridgeEvent.VCSBK_12: ('VCSBK 1/2 DATA BLOCK', 'DATA'),
+    BridgeEvent.VCSBK_34: ('VCSBK 3/4 DATA BLOCK', 'DATA'),
+}
+
+
+class EventError(ValueError):
+    pass
+
+
+def _int(value):
+    return value if type(value) is int else int.from_bytes(value, 'big')
+
+
+def format_csv(event):
+    """Legacy BRDG_EVENT line for one event tuple (no opcode, str)."""
+    kind, trx, system, stream_id, peer_id, rf_src, slot, dst_id, duration = event
+    _type, _event = EVENT_TEXT[kind]
+    _line = '{},{},{},{},{},{},{},{},{}'.format(
+        _type, _event, trx, system, _int(stream_id), _int(peer_id), _int(rf_src), slot, _int(dst_id))
+    if duration is not None:
+        _line = '{},{:.2f}'.format(_line, duration)
+    return _line
+
+
+def pack_events(events):
+    names = {}
+    records = []
+    for kind, trx, system, stream_id, peer_id, rf_src, slot, dst_id, duration in events:
+        _index = names.get(system)
+        if _index is None:
+            _index = names[system] = len(names)
+        _flags = _TX if trx == 'TX' else 0
+        if duration is not None:
+            _flags |= _HAS_DURATION
+        records.append(_EVENT.pack(
+            kind, _flags, _index, _int(stream_id), _int(peer_id), _int(rf_src), _int(dst_id),
+            slot, duration or 0.0))
+    if len(names) > _MAX_NAMES:
+        raise EventError('too many systems in one batch: {}'.format(len(names)))
+    parts = [_HEADER.pack(EVENTS_VERSION, len(names))]
+    for name in names:
+        _raw = name.encode('utf-8')[:255]
+        parts.append(_NAME_LEN.pack(len(_raw)))
+        parts.append(_raw)
+    parts.extend(records)
+    return b''.join(parts)
+
+
+def unpack_events(data):
+    """Event tuples from a BRDG_EVENTS payload, IDs as ints."""
+    try:
+        _layout = _LAYOUTS.get(data[0])
+        if _layout is None:
+            raise EventError('unsupported events version {}'.format(data[0]))
+        _header, _event = _layout
+        _version, _count = _header.unpack_from(data, 0)
+        pos = _header.size
+        names = []
+        for _ in range(_count):
+            (_n,) = _NAME_LEN.unpack_from(data, pos)
+            pos += 1
+            names.append(bytes(data[pos:pos + _n]).decode('utf-8', errors='replace'))
+            pos += _n
+        if (len(data) - pos) % _event.size:
+            raise EventError('truncated events payload')
+        events = []
+        for kind, _flags, _index, stream_id, peer_id, rf_src, dst_id, slot, duration in _event.iter_unpack(data[pos:]):
+            events.append((
+                BridgeEvent(kind), 'TX' if _flags & _TX else 'RX', names[_index],
+                stream_id, peer_id, rf_src, slot, dst_id,
+                duration if _flags & _HAS_DURATION else None))
+    except (struct.error, IndexError, ValueError) as exc:
+        if isinstance(exc, EventError):
+            raise
+        raise EventError('bad events payload: {}'.format(exc)) from exc
+    return events
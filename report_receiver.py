@@ -19,28 +19,47 @@
 #This is example code to connect to the report service in RYSEN / HBLink3
 #It can be used as a skeleton to build logging and monitoring tools. 
 
-import pickle
-
 from twisted.internet import reactor
 from twisted.internet.protocol import ReconnectingClientFactory
 from twisted.protocols.basic import NetstringReceiver
 
 from reporting_const import *
+from report_codec import DEFAULT_FORMAT, loads
+from report_delta import BridgeMirror
+from report_events import format_csv, unpack_events
 
 from pprint import pprint
 
 class reportClient(NetstringReceiver):
+
+    def connectionMade(self):
+        # Payloads stay pickled until the server acknowledges FORMAT_REQ
+        self.format = DEFAULT_FORMAT
+        self.mirror = BridgeMirror()
+        if cli_args.FORMAT:
+            self.sendString(REPORT_OPCODES['FORMAT_REQ'] + cli_args.FORMAT.encode('ascii'))
+        # Ask for BRIDGE_DELTA; servers without it keep sending BRIDGE_SND
+        self.sendString(REPORT_OPCODES['BRIDGE_RESYNC_REQ'])
+        # Ask for batched BRDG_EVENTS; servers without it keep sending BRDG_EVENT
+        self.sendString(REPORT_OPCODES['BRDG_EVENTS_REQ'])
             
     def stringReceived(self, data):
         
         if data[:1] == REPORT_OPCODES['BRDG_EVENT']:
             self.bridgeEvent(data[1:].decode('UTF-8'))
+        elif data[:1] == REPORT_OPCODES['BRDG_EVENTS']:
+            self.bridgeEvents(data[1:])
         elif data[:1] == REPORT_OPCODES['CONFIG_SND']:
             if cli_args.CONFIG:
                 self.configSend(data[1:])
         elif data[:1] == REPORT_OPCODES['BRIDGE_SND']:
             if cli_args.BRIDGES:
                 self.bridgeSend(data[1:])
+        elif data[:1] == REPORT_OPCODES['BRIDGE_DELTA']:
+            self.bridgeDelta(data[1:])
+        elif data[:1] == REPORT_OPCODES['FORMAT_ACK']:
+            self.format = self.mirror.format = data[1:].decode('ascii')
+            print('Report payload format: {}'.format(self.format))
         elif data[:1] == REPORT_OPCODES['SERVER_INFO_SND']:
             if cli_args.CONFIG:
                 self.serverInfoSend(data[1:])
@@ -69,9 +88,24 @@ class reportClient(NetstringReceiver):
             
         if cli_args.EVENTS:
             pprint(event, compact=True)
+
+    def bridgeEvents(self,data):
+        for _event in unpack_events(data):
+            self.bridgeEvent(format_csv(_event))
         
+    def bridgeDelta(self,data):
+        if not self.mirror.feed(data):
+            print('Bridge delta out of sequence, requesting resync')
+            self.sendString(REPORT_OPCODES['BRIDGE_RESYNC_REQ'])
+            return
+        if self.mirror.seq is not None and cli_args.BRIDGES:
+            self.showBridges(self.mirror.bridges)
+
     def bridgeSend(self,data):
-        self.BRIDGES = pickle.loads(data)
+        self.showBridges(loads(self.format, data))
+
+    def showBridges(self,bridges):
+        self.BRIDGES = bridges
         if cli_args.STATS:
             print('There are currently {} active bridges in the bridge table:\n'.format(len(self.BRIDGES)))
             for _bridge in self.BRIDGES.keys():
@@ -84,7 +118,7 @@ class reportClient(NetstringReceiver):
                 pprint(self.BRIDGES, compact=True, indent=4)
         
     def configSend(self,data):
-        self.CONFIG = pickle.loads(data)
+        self.CONFIG = loads(self.format, data)
         pprint(self.CONFIG, compact=True)
 
     def serverInfoSend(self, data):
@@ -144,6 +178,7 @@ if __name__ == '__main__':
     parser.add_argument('-o', '--host', action='store', dest='HOST', help='host to connect to <ip address>')
     parser.add_argument('-p', '--port', action='store', dest='PORT', help='port to connect to <port>')
     parser.add_argument('-s', '--stats', action='store', dest='STATS', help='print stats only') 
+    parser.add_argument('-f', '--format', action='store', dest='FORMAT', help='payload format <pickle|json|rbin>')
     
     cli_args = parser.parse_args()
 
@@ -27,30 +27,161 @@ __email__      = 'simon@gb7fr.org.uk'
 #This is example code to connect to the report service in RYSEN / HBLink3
 #It can be used as a skeleton to build logging and monitoring tools. 
 
-import pickle
+from collections import deque
+from queue import Empty, LifoQueue
 
-from twisted.internet import reactor
+from twisted.internet import reactor, task
 from twisted.internet.protocol import ReconnectingClientFactory
 from twisted.protocols.basic import NetstringReceiver
 
-import mysql.connector
-from mysql.connector import errorcode
-
 from reporting_const import *
+from report_codec import DEFAULT_FORMAT, loads
+from report_events import format_csv, unpack_events
+
+# Columns after the auto-increment id in the feed table
+FEED_COLUMNS = ('type', 'event', 'trx', 'system', 'streamid', 'peerid', 'subid', 'slot', 'dstid', 'duration')
+
+
+class BatchEventWriter(object):
+    """Insert bridge events into the feed table in batches, off the reactor.
+
+    add() only appends to an in-memory queue. Every flush_ms, or as soon
+    as batch_rows events are waiting, a batch is handed to a thread which
+    takes a connection from the pool and inserts it with one executemany
+    and one commit. At most pool_size batches are in flight; with the
+    default of one, rows land in the order they arrived.
+
+    A batch that fails is put back at the front of the queue and its
+    connection is discarded, so the next flush reconnects. The queue holds
+    at most max_queue events; beyond that the oldest are dropped and
+    counted, so a dead database costs bounded memory rather than latency.
+    """
+
+    def __init__(self, reactor, connect, placeholder='%s',
+                 batch_rows=500, flush_ms=250, max_queue=50000, pool_size=1, connections=()):
+        self._reactor = reactor
+        self._connect = connect
+        self._sql = 'insert into feed values (NULL,{})'.format(','.join([placeholder] * len(FEED_COLUMNS)))
+        self.batch_rows = batch_rows
+        self.flush_ms = flush_ms
+        self.max_queue = max_queue
+        self.pool_size = pool_size
+        self._queue = deque()
+        self._pool = LifoQueue()
+        for _conn in connections:
+            self._pool.put(_conn)
+        self._in_flight = 0
+        self._loop = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def __len__(self):
+        return len(self._queue)
+
+    def add(self, event):
+        if len(self._queue) >= self.max_queue:
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append(tuple(event[_col] for _col in FEED_COLUMNS))
+        if len(self._queue) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        while self._queue and self._in_flight < self.pool_size:
+            _batch = [self._queue.popleft() for _ in range(min(self.batch_rows, len(self._queue)))]
+            self._in_flight += 1
+            self._reactor.callInThread(self._write, _batch)
+
+    def start(self):
+        self._loop = task.LoopingCall(self.flush)
+        self._loop.start(self.flush_ms / 1000.0, now=False)
+
+    def stop(self):
+        # Shutdown: write whatever is left on this thread
+        if self._loop is not None and self._loop.running:
+            self._loop.stop()
+        while self._queue:
+            _batch = [self._queue.popleft() for _ in range(min(self.batch_rows, len(self._queue)))]
+            try:
+                self.write_rows(self._take_connection(), _batch)
+                self.written += len(_batch)
+            except Exception as err:
+                print('(MYSQL) error writing {} events at shutdown: {}'.format(len(_batch), err))
+                break
+
+    def _take_connection(self):
+        try:
+            return self._pool.get_nowait()
+        except Empty:
+            return self._connect()
+
+    def write_rows(self, conn, rows):
+        _cursor = conn.cursor()
+        try:
+            _cursor.executemany(self._sql, rows)
+            conn.commit()
+        finally:
+            _cursor.close()
+        self._pool.put(conn)
+
+    def _write(self, batch):
+        # Runs in the reactor thread pool. Any failure, including a refused
+        # reconnect, must come back to the reactor or the slot leaks.
+        _conn = None
+        try:
+            _conn = self._take_connection()
+            self.write_rows(_conn, batch)
+        except Exception as err:
+            if _conn is not None:
+                try:
+                    _conn.close()
+                except Exception:
+                    pass
+            self._reactor.callFromThread(self._batch_failed, batch, err)
+        else:
+            self._reactor.callFromThread(self._batch_done, batch)
+
+    def _batch_done(self, batch):
+        self._in_flight -= 1
+        self.written += len(batch)
+        if len(self._queue) >= self.batch_rows:
+            self.flush()
+
+    def _batch_failed(self, batch, err):
+        self._in_flight -= 1
+        self.failed += 1
+        print('(MYSQL) error writing {} events, will retry: {}'.format(len(batch), err))
+        _room = self.max_queue - len(self._queue)
+        if _room < len(batch):
+            self.dropped += len(batch) - max(_room, 0)
+            batch = batch[len(batch) - max(_room, 0):]
+        self._queue.extendleft(reversed(batch))
+
 
 class reportClient(NetstringReceiver):
-    def __init__(self,db,reactor):
-        self.db = db
+    def __init__(self,writer,reactor):
+        self.writer = writer
         self.reactor = reactor
+        self.format = DEFAULT_FORMAT
+
+    def connectionMade(self):
+        # Ask for batched BRDG_EVENTS; servers without it keep sending BRDG_EVENT
+        self.sendString(REPORT_OPCODES['BRDG_EVENTS_REQ'])
             
     def stringReceived(self, data):
         
         if data[:1] == REPORT_OPCODES['BRDG_EVENT']:
             self.bridgeEvent(data[1:].decode('UTF-8'))
+        elif data[:1] == REPORT_OPCODES['BRDG_EVENTS']:
+            for _event in unpack_events(data[1:]):
+                self.bridgeEvent(format_csv(_event))
         elif data[:1] == REPORT_OPCODES['CONFIG_SND']:
             self.configSend(data[1:])
         elif data[:1] == REPORT_OPCODES['BRIDGE_SND']:
             self.bridgeSend(data[1:])
+        elif data[:1] == REPORT_OPCODES['FORMAT_ACK']:
+            self.format = data[1:].decode('ascii')
         elif data == b'bridge updated':
             pass
         else:
@@ -74,39 +205,19 @@ class reportClient(NetstringReceiver):
         if len(datalist) > 9:
             event['duration'] = datalist[9]
         
-        
-        #self.reactor.callInThread(self.send_mysql,event)
-        self.send_mysql(event)
-        
-    def send_mysql(self,event):
-
-        while not self.db.is_connected():
-            try:
-                self.db.reconnect()
-            except mysql.connector.Error as err:
-                print('(MYSQL) error on reconnect: {}'.format(err))    
-                
-        print("{} {} {} {} {} {} {} {} {}".format(event['type'],event['event'], event['trx'],event['system'],event['streamid'],event['peerid'],event['subid'],event['slot'],event['dstid'],event['duration']))
-        _cursor = self.db.cursor()
-        try:
-            _cursor.execute("insert into feed values (NULL,'{}','{}','{}','{}','{}','{}','{}','{}','{}','{}')".format(event['type'],event['event'], event['trx'],event['system'],event['streamid'],event['peerid'],event['subid'],event['slot'],event['dstid'],event['duration']))
-            self.db.commit()
-        except mysql.connector.Error as err:
-            _cursor.close()
-            print('(MYSQL) error, problem with cursor execute: {}'.format(err))
-            
+        self.writer.add(event)
         
     def bridgeSend(self,data):
-        self.BRIDGES = pickle.loads(data)
+        self.BRIDGES = loads(self.format, data)
         
     def configSend(self,data):
-        self.CONFIG = pickle.loads(data)
+        self.CONFIG = loads(self.format, data)
         
 
 class reportClientFactory(ReconnectingClientFactory):
-    def __init__(self,proto,db,reactor):
+    def __init__(self,proto,writer,reactor):
         self.proto = proto
-        self.db = db
+        self.writer = writer
         self.reactor = reactor
         
     def startedConnecting(self, connector):
@@ -116,7 +227,7 @@ class reportClientFactory(ReconnectingClientFactory):
         print('Connected.')
         print('Resetting reconnection delay')
         self.resetDelay()
-        return self.proto(db,reactor)
+        return self.proto(self.writer,self.reactor)
 
     def clientConnectionLost(self, connector, reason):
         print('Lost connection.  Reason:', reason)
@@ -148,15 +259,19 @@ if __name__ == '__main__':
     for sig in [signal.SIGINT, signal.SIGTERM]:
         signal.signal(sig, sig_handler)
         
-    try:
-        db = mysql.connector.connect(
+    import mysql.connector
+    from mysql.connector import errorcode
+
+    def db_connect():
+        return mysql.connector.connect(
             host=sys.argv[3],
             user=sys.argv[4],
             password=sys.argv[5],
             database=sys.argv[6],
-            #pool_name = "master",
-            #pool_size = 5
         )
+
+    try:
+        db = db_connect()
     except mysql.connector.Error as err:
         if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
             sys.exit('(MYSQL) username or password error')
@@ -166,5 +281,9 @@ if __name__ == '__main__':
             sys.exit('(MYSQL) error: %s',err)
             
         
-    reactor.connectTCP(sys.argv[1],int(sys.argv[2]), reportClientFactory(reportClient,db,reactor))
+    writer = BatchEventWriter(reactor, db_connect, connections=[db])
+    writer.start()
+    reactor.addSystemEventTrigger('before', 'shutdown', writer.stop)
+
+    reactor.connectTCP(sys.argv[1],int(sys.argv[2]), reportClientFactory(reportClient,writer,reactor))
     reactor.run()
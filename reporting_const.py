@@ -28,4 +28,10 @@ REPORT_OPCODES = {
     'LINK_EVENT': b'\x06',
     'BRDG_EVENT': b'\x07',
     'SERVER_INFO_SND': b'\x08',
+    'BRIDGE_DELTA': b'\x09',
+    'BRIDGE_RESYNC_REQ': b'\x0a',
+    'FORMAT_REQ': b'\x0b',
+    'FORMAT_ACK': b'\x0c',
+    'BRDG_EVENTS_REQ': b'\x0d',
+    'BRDG_EVENTS': b'\x0e',
     }
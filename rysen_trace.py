@@ -19,7 +19,7 @@ from rysen_version import __version__, user_agent
 logger = logging.getLogger('HBlink')
 
 PING_URL = 'https://api.freestar.network/v1/rysen/ping.php'
-REPORT_PROTOCOL = 1
+REPORT_PROTOCOL = 4
 _PING_INTERVAL_S = 86400
 
 
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+###############################################################################
+#   Subscriber map records and on-disk snapshot (ALIASES SUB_MAP_FILE)
+#   Copyright (C) 2026 Shane Daley, M0VUB <shane@freestar.network>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+###############################################################################
+'''
+SUB_MAP maps a 3-byte subscriber ID to the system, slot and (sticky) TG it
+was last heard on. Entries are SubscriberRecord tuples, so code that still
+indexes entry[0]..entry[4] keeps working while new code uses the names.
+
+The snapshot is a small versioned binary file instead of a pickle:
+
+    header   '>4sHI'   magic b'RSUB', format version, record count
+    systems  '>H'      name count, then per name '>B' length + UTF-8 bytes
+    records  '>3sBB3s4sHd' per subscriber: id, slot, flags, tg, peer id,
+                       system name index, last heard time
+    trailer  '>I'      CRC-32 of everything above
+
+Flags say whether tg / peer id are present (zero bytes otherwise). A file
+that does not start with the magic is treated as a legacy pickle of 3/4/5
+tuples and migrated on load; the next write replaces it. Writes go to a
+temporary file that is fsynced and renamed over the old one, so a crash
+mid-write leaves the previous snapshot in place.
+
+With ALIASES SUB_MAP_JOURNAL, SubscriberJournal appends changes to
+<SUB_MAP_FILE>.wal instead, one batch per second, each entry framed as
+
+    '>HI'    payload length, CRC-32 of payload
+    payload  '>B3s' op (set / delete) + subscriber id; a set is followed
+             by '>BB3s4sdB' slot, flags, tg, peer id, time, name length
+             and the UTF-8 system name
+
+Compaction renames the log to <SUB_MAP_FILE>.wal.1, writes a snapshot of
+the map as it was at the rename, then deletes .wal.1. Startup loads the
+snapshot and replays .wal.1 (left over if compaction was interrupted)
+and .wal in that order; replay stops at the first torn or corrupt frame.
+'''
+
+import logging
+import os
+import pickle
+import struct
+import zlib
+from collections import namedtuple
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'RSUB'
+SNAPSHOT_VERSION = 1
+
+_HEADER = struct.Struct('>4sHI')
+_NAMES = struct.Struct('>H')
+_NAME_LEN = struct.Struct('>B')
+_RECORD = struct.Struct('>3sBB3s4sHd')
+_TRAILER = struct.Struct('>I')
+
+_FLAG_TG = 0x01
+_FLAG_PEER = 0x02
+
+_WAL_FRAME = struct.Struct('>HI')
+_WAL_OP = struct.Struct('>B3s')
+_WAL_SET = struct.Struct('>BB3s4sdB')
+WAL_SET = 1
+WAL_DELETE = 2
+
+# SubscriberBuckets granularity: a trim re-checks at most one bucket of records
+SUB_BUCKET_WIDTH_S = 300
+
+# One writer at a time: hourly trimmer writes run in the reactor thread pool
+_WRITE_LOCK = Lock()
+
+
+class SubscriberRecord(namedtuple('SubscriberRecord', 'system ts tg time peer_id')):
+    '''Where a subscriber was last heard. tg and peer_id may be None.'''
+    __slots__ = ()
+
+    @classmethod
+    def from_entry(cls, entry):
+        '''Build a record from a legacy 3, 4 or 5 element SUB_MAP tuple.'''
+        if isinstance(entry, cls):
+            return entry
+        if len(entry) == 5:
+            return cls(*entry)
+        if len(entry) == 4:
+            return cls(entry[0], entry[1], entry[2], entry[3], None)
+        if len(entry) == 3:
+            return cls(entry[0], entry[1], None, entry[2], None)
+        raise ValueError('unexpected SUB_MAP entry length {}'.format(len(entry)))
+
+
+class SubscriberBuckets:
+    '''Subscriber IDs grouped by last-heard time, *width* seconds per bucket.
+
+    Expiry takes whole buckets that are older than the cutoff and only
+    checks record times in the one bucket the cutoff falls inside, so a
+    trim costs O(expired + one bucket) instead of O(SUB_MAP).
+    '''
+    __slots__ = ('_buckets', 'width')
+
+    def __init__(self, width=SUB_BUCKET_WIDTH_S):
+        self._buckets = {}
+        self.width = width
+
+    def __len__(self):
+        return sum(len(_subs) for _subs in self._buckets.values())
+
+    def bucket_count(self):
+        return len(self._buckets)
+
+    def update(self, subscriber, old_time, new_time):
+        '''Move *subscriber* between buckets; either time may be None.'''
+        _old = int(old_time // self.width) if old_time is not None else None
+        _new = int(new_time // self.width) if new_time is not None else None
+        if _old == _new:
+            return
+        if _old is not None:
+            _subs = self._buckets.get(_old)
+            if _subs is not None:
+                _subs.discard(subscriber)
+                if not _subs:
+                    del self._buckets[_old]
+        if _new is not None:
+            _subs = self._buckets.get(_new)
+            if _subs is None:
+                _subs = self._buckets[_new] = set()
+            _subs.add(subscriber)
+
+    def expired(self, sub_map, expire):
+        '''Subscribers in *sub_map* last heard before *expire*.'''
+        _edge = int(expire // self.width)
+        _out = []
+        for _slot in [_s for _s in self._buckets if _s <= _edge]:
+            _stale = []
+            for _subscriber in self._buckets[_slot]:
+                _rec = sub_map.get(_subscriber)
+                if _rec is None:
+                    _stale.append(_subscriber)
+                elif _slot < _edge or _rec.time < expire:
+                    _out.append(_subscriber)
+            for _subscriber in _stale:
+                self.update(_subscriber, _slot * self.width, None)
+        return _out
+
+    @classmethod
+    def build(cls, sub_map, width=SUB_BUCKET_WIDTH_S):
+        _self = cls(width)
+        for _subscriber, _rec in sub_map.items():
+            _self.update(_subscriber, None, _rec.time)
+        return _self
+
+
+def migrate_sub_map(legacy):
+    '''Convert a legacy {id: tuple} map; returns (records, dropped).'''
+    _records = {}
+    _dropped = 0
+    for _subscriber, _entry in legacy.items():
+        try:
+            _records[_subscriber] = SubscriberRecord.from_entry(_entry)
+        except (TypeError, ValueError) as e:
+            logger.warning('(SUBSCRIBER) Invalid SUB_MAP entry for subscriber %r, removing: %s', _subscriber, e)
+            _dropped += 1
+    return _records, _dropped
+
+
+def encode_snapshot(sub_map):
+    '''Serialise {id: SubscriberRecord}. Records that do not fit the format are skipped.'''
+    _names = {}
+    _body = []
+    _skipped = 0
+    for _subscriber, _rec in sub_map.items():
+        _flags = 0
+        _tg = _rec.tg
+        _peer = _rec.peer_id
+        if _tg is not None:
+            _flags |= _FLAG_TG
+        else:
+            _tg = b'\x00\x00\x00'
+        if _peer is not None:
+            _flags |= _FLAG_PEER
+        else:
+            _peer = b'\x00\x00\x00\x00'
+        if (len(_subscriber) != 3 or len(_tg) != 3 or len(_peer) != 4
+                or _rec.ts not in (1, 2)):
+            _skipped += 1
+            continue
+        _index = _names.setdefault(_rec.system, len(_names))
+        _body.append(_RECORD.pack(_subscriber, _rec.ts, _flags, _tg, _peer, _index, _rec.time))
+    if _skipped:
+        logger.warning('(SUBSCRIBER) %s SUB_MAP entries not representable in snapshot, skipped', _skipped)
+    _parts = [_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(_body)), _NAMES.pack(len(_names))]
+    for _name in _names:
+        _raw = _name.encode('utf-8')
+        _parts.append(_NAME_LEN.pack(len(_raw)))
+        _parts.append(_raw)
+    _parts.extend(_body)
+    _data = b''.join(_parts)
+    return _data + _TRAILER.pack(zlib.crc32(_data))
+
+
+def decode_snapshot(data):
+    '''Parse a snapshot written by encode_snapshot(); raises ValueError if it is damaged.'''
+    if len(data) < _HEADER.size + _NAMES.size + _TRAILER.size:
+        raise ValueError('snapshot truncated')
+    _payload = memoryview(data)[:-_TRAILER.size]
+    (_crc,) = _TRAILER.unpack_from(data, len(data) - _TRAILER.size)
+    if zlib.crc32(_payload) != _crc:
+        raise ValueError('snapshot CRC mismatch')
+    _magic, _version, _count = _HEADER.unpack_from(data, 0)
+    if _magic != SNAPSHOT_MAGIC:
+        raise ValueError('not a subscriber snapshot')
+    if _version != SNAPSHOT_VERSION:
+        raise ValueError('unsupported snapshot version {}'.format(_version))
+    _offset = _HEADER.size
+    (_nnames,) = _NAMES.unpack_from(data, _offset)
+    _offset += _NAMES.size
+    _names = []
+    for _ in range(_nnames):
+        (_len,) = _NAME_LEN.unpack_from(data, _offset)
+        _offset += _NAME_LEN.size
+        _names.append(bytes(data[_offset:_offset + _len]).decode('utf-8'))
+        _offset += _len
+    if _offset + _count * _RECORD.size != len(_payload):
+        raise ValueError('snapshot record count mismatch')
+    _records = {}
+    for _subscriber, _ts, _flags, _tg, _peer, _index, _time in _RECORD.iter_unpack(_payload[_offset:]):
+        _records[_subscriber] = SubscriberRecord(
+            _names[_index], _ts,
+            _tg if _flags & _FLAG_TG else None,
+            _time,
+            _peer if _flags & _FLAG_PEER else None)
+    return _records
+
+
+def load_sub_map(path):
+    '''Load a snapshot, migrating a legacy pickle. Returns (records, migrated).'''
+    with open(path, 'rb') as _fh:
+        _data = _fh.read()
+    if _data[:len(SNAPSHOT_MAGIC)] == SNAPSHOT_MAGIC:
+        return decode_snapshot(_data), False
+    _records, _dropped = migrate_sub_map(pickle.loads(_data))
+    logger.info('(SUBSCRIBER) Migrated %s entries from legacy pickle SUB_MAP (%s dropped)',
+                len(_records), _dropped)
+    return _records, True
+
+
+def write_snapshot(path, sub_map):
+    '''Atomically replace *path* with a snapshot of *sub_map*.'''
+    _data = encode_snapshot(sub_map)
+    _tmp = path + '.tmp'
+    with _WRITE_LOCK:
+        with open(_tmp, 'wb') as _fh:
+            _fh.write(_data)
+            _fh.flush()
+            os.fsync(_fh.fileno())
+        os.replace(_tmp, path)
+    return len(_data)
+
+
+def encode_wal_entry(subscriber, rec):
+    '''One framed log entry; *rec* None records a delete.'''
+    if rec is None:
+        _payload = _WAL_OP.pack(WAL_DELETE, subscriber)
+    else:
+        _flags = (_FLAG_TG if rec.tg is not None else 0) | (_FLAG_PEER if rec.peer_id is not None else 0)
+        _name = rec.system.encode('utf-8')
+        _payload = b''.join((
+            _WAL_OP.pack(WAL_SET, subscriber),
+            _WAL_SET.pack(rec.ts, _flags, rec.tg or b'\x00\x00\x00', rec.peer_id or b'\x00\x00\x00\x00',
+                          rec.time, len(_name)),
+            _name))
+    return _WAL_FRAME.pack(len(_payload), zlib.crc32(_payload)) + _payload
+
+
+def replay_wal(data, sub_map):
+    '''Apply log entries to *sub_map* in order. Returns (applied, torn).'''
+    _applied, _offset = _replay_wal(data, sub_map)
+    return _applied, _offset != len(data)
+
+
+def _replay_wal(data, sub_map):
+    # (applied, end of the last intact entry)
+    _offset = 0
+    _applied = 0
+    _end = len(data)
+    while _offset + _WAL_FRAME.size <= _end:
+        _len, _crc = _WAL_FRAME.unpack_from(data, _offset)
+        _start = _offset + _WAL_FRAME.size
+        _payload = data[_start:_start + _len]
+        if len(_payload) != _len or zlib.crc32(_payload) != _crc or _len < _WAL_OP.size:
+            break
+        _op, _subscriber = _WAL_OP.unpack_from(_payload, 0)
+        if _op == WAL_DELETE:
+            sub_map.pop(_subscriber, None)
+        elif _op == WAL_SET:
+            _ts, _flags, _tg, _peer, _time, _nlen = _WAL_SET.unpack_from(_payload, _WAL_OP.size)
+            _name_at = _WAL_OP.size + _WAL_SET.size
+            sub_map[_subscriber] = SubscriberRecord(
+                bytes(_payload[_name_at:_name_at + _nlen]).decode('utf-8'), _ts,
+                _tg if _flags & _FLAG_TG else None,
+                _time,
+                _peer if _flags & _FLAG_PEER else None)
+        else:
+            break
+        _applied += 1
+        _offset = _start + _len
+    return _applied, _offset
+
+
+class SubscriberJournal:
+    '''Append-only change log beside the SUB_MAP snapshot.
+
+    record() is called on every SUB_MAP change and only remembers the
+    latest value per subscriber; flush() appends that batch with a single
+    write. Both run on the reactor thread. Compaction is split so the
+    rename happens in step with the appends and the snapshot is written
+    in the thread pool.
+    '''
+    __slots__ = ('path', 'wal_path', 'old_path', '_pending', '_fd', 'compacting')
+
+    def __init__(self, path):
+        self.path = path
+        self.wal_path = path + '.wal'
+        self.old_path = path + '.wal.1'
+        self._pending = {}
+        self._fd = None
+        self.compacting = False
+
+    def load(self):
+        '''Snapshot plus both logs. Returns (records, migrated, replayed).'''
+        try:
+            _records, _migrated = load_sub_map(self.path)
+        except FileNotFoundError:
+            _records, _migrated = {}, False
+        _replayed = 0
+        for _wal in (self.old_path, self.wal_path):
+            try:
+                with open(_wal, 'rb') as _fh:
+                    _data = _fh.read()
+            except FileNotFoundError:
+                continue
+            _applied, _torn = replay_wal(_data, _records)
+            _replayed += _applied
+            if _torn:
+                logger.warning('(SUBSCRIBER) %s: torn tail after %s entries ignored', _wal, _applied)
+        return _records, _migrated, _replayed
+
+    def open(self):
+        if self._fd is None:
+            self._fd = os.open(self.wal_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def close(self):
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def record(self, subscriber, rec):
+        self._pending[subscriber] = rec
+
+    def pending(self):
+        return len(self._pending)
+
+    def flush(self):
+        '''Append the pending batch; returns the number of entries written.'''
+        if not self._pending:
+            return 0
+        self.open()
+        _batch = b''.join(encode_wal_entry(_sub, _rec) for _sub, _rec in self._pending.items())
+        _count = len(self._pending)
+        self._pending = {}
+        os.write(self._fd, _batch)
+        return _count
+
+    def begin_compaction(self):
+        '''Rotate the log. Call with SUB_MAP in the state the snapshot will hold.'''
+        if self.compacting:
+            return False
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if os.path.exists(self.wal_path):
+            if os.path.exists(self.old_path):
+                self._merge_into_old()
+            else:
+                os.replace(self.wal_path, self.old_path)
+        self.compacting = True
+        return True
+
+    def _merge_into_old(self):
+        # The last snapshot failed, so the rotated log still holds entries
+        # no snapshot covers: append the current log to it, after its last
+        # intact entry. A crash before the remove replays some entries
+        # twice, which lands on the same state.
+        with open(self.old_path, 'rb') as _fh:
+            _old = _fh.read()
+        with open(self.wal_path, 'rb') as _fh:
+            _new = _fh.read()
+        _, _intact = _replay_wal(_old, {})
+        with open(self.old_path, 'r+b') as _fh:
+            _fh.truncate(_intact)
+            _fh.seek(_intact)
+            _fh.write(_new)
+            _fh.flush()
+            os.fsync(_fh.fileno())
+        os.remove(self.wal_path)
+
+    def finish_compaction(self, snapshot):
+        '''Write the snapshot and drop the rotated log (thread pool).'''
+        try:
+            _size = write_snapshot(self.path, snapshot)
+            try:
+                os.remove(self.old_path)
+            except FileNotFoundError:
+                pass
+            return _size
+        finally:
+            self.compacting = False
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Compiled ACL tables — parity with the legacy linear acl_check scan."""
+import random
+import unittest
+
+import const
+from config import (
+    ACL_TABLES,
+    acl_build,
+    acl_compile,
+    acl_merge,
+    acl_tables_clear,
+    process_acls,
+)
+from hblink import acl_check
+
+
+def _linear_check(_id, _acl):
+    id = int.from_bytes(_id, 'big')
+    for entry in _acl[1]:
+        if entry[0] <= id <= entry[1]:
+            return _acl[0]
+    return not _acl[0]
+
+
+class TestAclMerge(unittest.TestCase):
+
+    def test_overlapping_and_adjacent_ranges_fold(self):
+        self.assertEqual(
+            acl_merge([(10, 20), (1, 5), (6, 6), (15, 30), (40, 40)]),
+            [(1, 6), (10, 30), (40, 40)],
+        )
+
+    def test_inverted_ranges_dropped(self):
+        self.assertEqual(acl_merge([(9, 3), (4, 4)]), [(4, 4)])
+
+
+class TestAclCheck(unittest.TestCase):
+
+    def setUp(self):
+        acl_tables_clear()
+
+    def test_permit_all(self):
+        acl = acl_build('PERMIT:ALL', const.ID_MAX)
+        self.assertTrue(acl_check(b'\x00\x00\x01', acl))
+        self.assertTrue(acl_check(const.ID_MAX.to_bytes(3, 'big'), acl))
+
+    def test_deny_list_singletons_and_ranges(self):
+        acl = acl_build('DENY:1-5,3120101,3120124', const.ID_MAX)
+        self.assertFalse(acl_check((3).to_bytes(3, 'big'), acl))
+        self.assertFalse(acl_check((3120124).to_bytes(3, 'big'), acl))
+        self.assertTrue(acl_check((6).to_bytes(3, 'big'), acl))
+        self.assertTrue(acl_check((3120102).to_bytes(3, 'big'), acl))
+
+    def test_empty_acl_permits_everything(self):
+        acl = acl_build('', const.ID_MAX)
+        self.assertTrue(acl_check(b'\x00\x00\x07', acl))
+
+    def test_randomised_parity_with_linear_scan(self):
+        rng = random.Random(1234)
+        for action in ('PERMIT', 'DENY'):
+            parts = []
+            for _ in range(300):
+                start = rng.randint(1, 100000)
+                if rng.random() < 0.3:
+                    parts.append('{}-{}'.format(start, start + rng.randint(0, 200)))
+                else:
+                    parts.append(str(start))
+            acl = acl_build(action + ':' + ','.join(parts), const.ID_MAX)
+            for _ in range(3000):
+                _id = rng.randint(1, 100500).to_bytes(3, 'big')
+                self.assertEqual(acl_check(_id, acl), _linear_check(_id, acl), _id)
+                # second lookup comes from the verdict cache
+                self.assertEqual(acl_check(_id, acl), _linear_check(_id, acl), _id)
+
+    def test_table_cached_per_acl(self):
+        acl = acl_build('DENY:100', const.ID_MAX)
+        self.assertIs(acl_compile(acl), acl_compile(acl))
+        other = acl_build('DENY:100', const.ID_MAX)
+        self.assertIsNot(acl_compile(acl), acl_compile(other))
+
+    def test_process_acls_precompiles(self):
+        cfg = {
+            'GLOBAL': {'REG_ACL': 'PERMIT:ALL', 'SUB_ACL': 'DENY:1',
+                       'TG1_ACL': 'PERMIT:ALL', 'TG2_ACL': 'PERMIT:ALL'},
+            'SYSTEMS': {
+                'SYSTEM-0': {'MODE': 'MASTER', 'REG_ACL': 'PERMIT:ALL', 'SUB_ACL': 'DENY:1',
+                             'TG1_ACL': 'PERMIT:ALL', 'TG2_ACL': 'PERMIT:ALL'},
+                'OBP-1': {'MODE': 'OPENBRIDGE', 'SUB_ACL': 'DENY:1',
+                          'TG1_ACL': 'PERMIT:ALL', 'TG2_ACL': 'PERMIT:ALL'},
+            },
+        }
+        stale = acl_build('DENY:100', const.ID_MAX)
+        acl_compile(stale)
+        process_acls(cfg)
+        # Tables for the ACLs it replaced are dropped
+        self.assertNotIn(id(stale), ACL_TABLES)
+        self.assertIn(id(cfg['GLOBAL']['SUB_ACL']), ACL_TABLES)
+        self.assertIn(id(cfg['SYSTEMS']['OBP-1']['TG1_ACL']), ACL_TABLES)
+        self.assertIsInstance(cfg['SYSTEMS']['SYSTEM-0']['SUB_ACL'], tuple)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Slotted BridgeLeg — dict-compatible access for helpers, reports and rules."""
+import copy
+import pickle
+import unittest
+
+from dmr_utils3.utils import bytes_3
+
+from bridge_helpers import (
+    BridgeLeg,
+    build_bridge_index,
+    build_report_bridge_leg,
+    clear_reflector_link_owner,
+    reset_dial_reflector_timers_on_user_activity,
+    set_reflector_link_owner,
+)
+
+TG = bytes_3(3100)
+
+
+def _leg(**kwargs):
+    _fields = dict(SYSTEM='SYSTEM-0', TS=1, TGID=bytes_3(3100), ACTIVE=False, TIMEOUT=600,
+                   TO_TYPE='ON', ON=[bytes_3(3100)], TIMER=100.0)
+    _fields.update(kwargs)
+    return BridgeLeg(**_fields)
+
+
+class TestBridgeLegMapping(unittest.TestCase):
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(_leg(), '__dict__'))
+
+    def test_reads_and_writes_like_dict(self):
+        leg = _leg()
+        self.assertEqual(leg['SYSTEM'], 'SYSTEM-0')
+        self.assertEqual(leg.get('TGID'), TG)
+        leg['ACTIVE'] = True
+        leg['TIMER'] = 200.0
+        self.assertTrue(leg['ACTIVE'])
+        self.assertEqual(leg['TIMER'], 200.0)
+        self.assertEqual(len(leg), 10)
+        with self.assertRaises(KeyError):
+            leg['NOPE']
+        with self.assertRaises(KeyError):
+            del leg['SYSTEM']
+
+    def test_equals_rules_dict(self):
+        rules = {'SYSTEM': 'SYSTEM-0', 'TS': 1, 'TGID': TG, 'ACTIVE': False, 'TIMEOUT': 600,
+                 'TO_TYPE': 'ON', 'OFF': (), 'ON': (TG,), 'RESET': (), 'TIMER': 100.0}
+        self.assertEqual(_leg(), rules)
+        self.assertEqual(rules, _leg())
+        self.assertEqual(BridgeLeg.from_mapping(rules), rules)
+
+    def test_optional_and_extra_keys(self):
+        leg = _leg()
+        self.assertNotIn('LINKER', leg)
+        set_reflector_link_owner(leg, 1234567, b'\x00\x00\x00\x01')
+        self.assertEqual(leg['LINKER'], 1234567)
+        self.assertEqual(len(leg), 12)
+        clear_reflector_link_owner(leg)
+        self.assertNotIn('LINKER', leg)
+        self.assertIsNone(leg.get('LINKER_PEER'))
+        leg['NOTE'] = 'from rules'
+        self.assertIn('NOTE', leg)
+        self.assertEqual(BridgeLeg.from_mapping(dict(leg))['NOTE'], 'from rules')
+
+    def test_triggers_shared_and_immutable(self):
+        a = _leg(SYSTEM='SYSTEM-1')
+        b = _leg(SYSTEM='SYSTEM-2', TGID=bytes_3(3100))
+        self.assertIs(a['ON'], b['ON'])
+        self.assertIs(a['OFF'], b['RESET'])
+        self.assertIs(a['TGID'], b['TGID'])
+        self.assertEqual(a['OFF'], ())
+        # Callers replace trigger lists; the leg keeps the shared tuple
+        a['ON'] = [x for x in a['ON'] if x != TG]
+        self.assertEqual(a['ON'], ())
+        self.assertEqual(b['ON'], (TG,))
+
+    def test_pickle_and_copy(self):
+        leg = _leg(LINKER=5)
+        for clone in (pickle.loads(pickle.dumps(leg, protocol=2)), copy.deepcopy(leg), leg.copy()):
+            self.assertIsInstance(clone, BridgeLeg)
+            self.assertEqual(clone, leg)
+            self.assertIsNot(clone, leg)
+
+
+class TestBridgeLegHelpers(unittest.TestCase):
+
+    def test_report_leg_is_plain_dict(self):
+        leg = build_report_bridge_leg(_leg(ACTIVE=True))
+        self.assertIs(type(leg), dict)
+        self.assertEqual(leg['ON'], [TG])
+        self.assertNotIn('OFF', leg)
+        self.assertIsNone(build_report_bridge_leg(_leg(ACTIVE=False)))
+
+    def test_index_and_dial_timer_helpers(self):
+        bridges = {
+            '3100': [_leg(), _leg(TS=2)],
+            '#3100': [_leg(TS=2, TGID=bytes_3(9), ACTIVE=True, ON=[TG])],
+        }
+        index = build_bridge_index(bridges)
+        self.assertEqual(index[('SYSTEM-0', 1, TG)], {'3100'})
+        reset = reset_dial_reflector_timers_on_user_activity(
+            bridges, 'SYSTEM-0', 1234567, b'\x00\x00\x00\x01', 2, 500.0, 9, group_call=True)
+        self.assertEqual(reset, ['#3100'])
+        self.assertEqual(bridges['#3100'][0]['TIMER'], 1100.0)
+        self.assertEqual(bridges['#3100'][0]['LINKER'], 1234567)
+
+
+if __name__ == '__main__':
+    unittest.main()
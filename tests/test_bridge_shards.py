@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""Sharded router layout: slot assignment, link mesh and CONFIG trimming."""
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import bridge_master as bm
+from bridge_shards import (
+    ShardChildren,
+    apply_shard,
+    assign_shards,
+    make_shard_links,
+    shard_link_name,
+    shard_link_ports,
+)
+from hblink import OPENBRIDGE
+from subscriber_store import SubscriberRecord, write_snapshot
+
+_MISSING = object()
+
+
+def _config():
+    systems = {'OBP-1': {'MODE': 'OPENBRIDGE'}, 'PARROT': {'MODE': 'PEER'}}
+    for n in range(10):
+        systems['SYSTEM-{}'.format(n)] = {'MODE': 'MASTER', 'PORT': 54000 + n}
+    return {
+        'GLOBAL': {'SERVER_ID': (23400).to_bytes(4, 'big')},
+        'REPORTS': {'REPORT_PORT': 4321},
+        'ALIASES': {'SUB_MAP_FILE': 'sub_map.pkl'},
+        'SYSTEMS': systems,
+    }
+
+
+class TestShardLayout(unittest.TestCase):
+
+    def setUp(self):
+        self.config = _config()
+        self.generated = {'SYSTEM': ['SYSTEM-{}'.format(n) for n in range(10)]}
+
+    def test_generator_slots_split_in_contiguous_blocks(self):
+        assign = assign_shards(self.config['SYSTEMS'], self.generated, 3)
+        self.assertEqual([assign['SYSTEM-{}'.format(n)] for n in range(10)],
+                         [0, 0, 0, 0, 1, 1, 1, 2, 2, 2])
+        self.assertEqual(assign['OBP-1'], 0)
+        self.assertEqual(assign['PARROT'], 0)
+
+    def test_link_ports_pair_up(self):
+        for a in range(4):
+            for b in range(4):
+                if a != b:
+                    local, target = shard_link_ports(62100, 4, a, b)
+                    self.assertEqual((target, local), shard_link_ports(62100, 4, b, a))
+
+    def test_links_form_full_mesh(self):
+        links = make_shard_links(b'\x00\x00\x5b\x68', 62100, 3, 1, b'k' * 20)
+        self.assertEqual(sorted(links), [shard_link_name(0), shard_link_name(2)])
+        for link in links.values():
+            self.assertTrue(link['_SHARD_LINK'])
+            self.assertEqual(link['NETWORK_ID'], b'\x00\x00\x5b\x68')
+            self.assertEqual(link['TARGET_SOCK'], ('127.0.0.1', link['TARGET_PORT']))
+
+    def test_apply_trims_to_own_systems(self):
+        assign = assign_shards(self.config['SYSTEMS'], self.generated, 2)
+        links = make_shard_links(self.config['GLOBAL']['SERVER_ID'], 62100, 2, 1, b'k' * 20)
+        apply_shard(self.config, 1, assign, links)
+        self.assertEqual(sorted(self.config['SYSTEMS']),
+                         ['OBP-SHARD-0'] + ['SYSTEM-{}'.format(n) for n in range(5, 10)])
+        self.assertEqual(self.config['REPORTS']['REPORT_PORT'], 4322)
+        self.assertEqual(self.config['ALIASES']['SUB_MAP_FILE'], 'sub_map.pkl.shard1')
+
+    def test_shard_zero_keeps_shared_systems_and_files(self):
+        assign = assign_shards(self.config['SYSTEMS'], self.generated, 2)
+        apply_shard(self.config, 0, assign, {})
+        self.assertIn('OBP-1', self.config['SYSTEMS'])
+        self.assertIn('PARROT', self.config['SYSTEMS'])
+        self.assertEqual(self.config['REPORTS']['REPORT_PORT'], 4321)
+        self.assertEqual(self.config['ALIASES']['SUB_MAP_FILE'], 'sub_map.pkl')
+
+
+class TestShardLinkTrust(unittest.TestCase):
+
+    def test_source_server_not_validated_on_shard_links(self):
+        links = make_shard_links((0).to_bytes(4, 'big'), 62100, 2, 0, b'k' * 20)
+        config = {'GLOBAL': {}, 'SYSTEMS': links}
+        obp = OPENBRIDGE('OBP-SHARD-1', config, None)
+        # SERVER_ID 0 would normally fail the 4-7 digit source server check
+        self.assertTrue(obp.source_server_allowed(b'\x00\x00\x00\x00', b'\x00\x00\x5b', b'\x01\x02\x03\x04'))
+
+
+class TestShardSplitHorizon(unittest.TestCase):
+
+    def test_obp_fanout_skips_link_to_link(self):
+        with open('bridge_master.py', encoding='utf-8') as fh:
+            source = fh.read()
+        self.assertIn(
+            "if self._config.get('_SHARD_LINK') and _target_system.get('_SHARD_LINK'):",
+            source)
+
+
+class TestShardBridgeLegs(unittest.TestCase):
+
+    def setUp(self):
+        self._prev = {name: getattr(bm, name, _MISSING) for name in ('CONFIG', 'BRIDGES', 'BRIDGE_IDX', 'BRIDGE_IDX_KEYS')}
+        config = _config()
+        config['SYSTEMS'].pop('PARROT')
+        for system in config['SYSTEMS'].values():
+            system['DEFAULT_UA_TIMER'] = 10
+        apply_shard(config, 0, assign_shards(config['SYSTEMS'], {}, 2),
+                    make_shard_links(config['GLOBAL']['SERVER_ID'], 62100, 2, 0, b'k' * 20))
+        bm.CONFIG = config
+        bm.BRIDGES = {}
+
+    def tearDown(self):
+        for name, value in self._prev.items():
+            if value is _MISSING:
+                delattr(bm, name)
+            else:
+                setattr(bm, name, value)
+
+    def _link_legs(self, bridge):
+        return [(leg['TS'], leg['TGID']) for leg in bm.BRIDGES[bridge] if leg['SYSTEM'] == 'OBP-SHARD-1']
+
+    def test_rules_bridges_get_links(self):
+        bm.BRIDGES = {
+            '2350': [bm.BridgeLeg(SYSTEM='SYSTEM-1', TS=1, TGID=bm.bytes_3(2350), ACTIVE=True, TIMEOUT=600, TO_TYPE='NONE')],
+            '#2351': [bm.BridgeLeg(SYSTEM='SYSTEM-1', TS=2, TGID=bm.bytes_3(9), ACTIVE=False, TIMEOUT=600, TO_TYPE='ON')],
+            '#20': [], '9990': [],
+        }
+        bm.augment_bridges_for_shards()
+        self.assertEqual(self._link_legs('2350'), [(1, bm.bytes_3(2350))])
+        self.assertEqual(self._link_legs('#2351'), [(1, bm.bytes_3(2351))])
+        self.assertEqual(self._link_legs('#20'), [])
+        self.assertEqual(self._link_legs('9990'), [])
+        self.assertIn('#2351', bm.BRIDGE_IDX[('OBP-SHARD-1', 1, bm.bytes_3(2351))])
+        # Idempotent
+        bm.augment_bridges_for_shards()
+        self.assertEqual(len(self._link_legs('#2351')), 1)
+
+    def test_runtime_reflectors_get_links(self):
+        with mock.patch.object(bm, 'notify_bridge_table_updated'):
+            bm.make_single_reflector(bm.bytes_3(2352), 10, 'SYSTEM-1')
+            bm.make_default_reflector(2353, 10, 'SYSTEM-2')
+            bm.make_single_bridge(bm.bytes_3(2354), 'SYSTEM-3', 1, 10)
+        self.assertEqual(self._link_legs('#2352'), [(1, bm.bytes_3(2352))])
+        self.assertEqual(self._link_legs('#2353'), [(1, bm.bytes_3(2353))])
+        self.assertEqual(self._link_legs('2354'), [(1, bm.bytes_3(2354))])
+
+
+class TestShardChildren(unittest.TestCase):
+
+    def test_dead_child_is_restarted(self):
+        procs = [mock.Mock(pid=100 + n) for n in range(3)]
+        with mock.patch('subprocess.Popen', side_effect=procs) as popen:
+            children = ShardChildren({1: ['shard', '1'], 2: ['shard', '2']}, {'KEY': 'x'})
+            children.start_all()
+            for proc in procs:
+                proc.poll.return_value = None
+            children.check()
+            self.assertEqual(popen.call_count, 2)
+
+            procs[1].poll.return_value = -9
+            with self.assertLogs('bridge_shards', 'ERROR') as logs:
+                children.check()
+            self.assertIn('Shard 2 (pid 101) exited with status -9', logs.output[0])
+            self.assertEqual(popen.call_args.args, (['shard', '2'],))
+            self.assertEqual(popen.call_args.kwargs['env'], {'KEY': 'x'})
+            self.assertEqual((children.procs[2], children.restarts), (procs[2], 1))
+
+            children.terminate()
+        procs[0].terminate.assert_called_once_with()
+        procs[1].terminate.assert_not_called()
+        procs[2].terminate.assert_called_once_with()
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), 'PR_SET_PDEATHSIG is Linux only')
+    def test_children_die_with_parent(self):
+        # A stand-in shard 0 starts one child, reports its pid and is then killed
+        parent = subprocess.Popen([sys.executable, '-c', (
+            'import sys, time\n'
+            'from bridge_shards import ShardChildren\n'
+            'c = ShardChildren({1: [sys.executable, "-c", "import time; time.sleep(60)"]}, None)\n'
+            'c.start_all()\n'
+            'print(c.procs[1].pid, flush=True)\n'
+            'time.sleep(60)\n')],
+            stdout=subprocess.PIPE, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.addCleanup(parent.stdout.close)
+        child = int(parent.stdout.readline())
+        parent.kill()
+        parent.wait()
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                with open('/proc/{}/stat'.format(child)) as fh:
+                    # A zombie is dead too; whether it is reaped depends on the init process
+                    if fh.read().rsplit(')', 1)[1].split()[0] == 'Z':
+                        break
+            except FileNotFoundError:
+                break
+            time.sleep(0.05)
+        else:
+            os.kill(child, signal.SIGKILL)
+            self.fail('shard child outlived its parent')
+
+
+class TestShardSubMapFiles(unittest.TestCase):
+
+    def setUp(self):
+        self._prev = {name: getattr(bm, name, _MISSING) for name in ('CONFIG', 'SUB_MAP', 'SUB_JOURNAL', 'STICKY_IDX', 'SUB_BUCKETS')}
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def tearDown(self):
+        if bm.SUB_JOURNAL is not None:
+            bm.SUB_JOURNAL.close()
+        for name, value in self._prev.items():
+            if value is _MISSING:
+                delattr(bm, name)
+            else:
+                setattr(bm, name, value)
+
+    def _start(self, shard):
+        # bridge_master start-up order: apply_shard, then load SUB_MAP
+        config = _config()
+        config['GLOBAL']['SHARDS'] = 2
+        config['ALIASES'].update({'PATH': self.tmp.name + '/', 'SUB_MAP_JOURNAL': True})
+        seed = config['ALIASES']['PATH'] + config['ALIASES']['SUB_MAP_FILE'] if shard else None
+        assign = assign_shards(config['SYSTEMS'], {'SYSTEM': ['SYSTEM-{}'.format(n) for n in range(10)]}, 2)
+        apply_shard(config, shard, assign, make_shard_links(config['GLOBAL']['SERVER_ID'], 62100, 2, shard, b'k' * 20))
+        if bm.SUB_JOURNAL is not None:
+            bm.SUB_JOURNAL.close()
+        bm.CONFIG = config
+        bm.subMapLoad(seed)
+        bm.rebuild_sub_map_indexes()
+
+    def test_each_shard_keeps_its_own_snapshot_and_journal(self):
+        # The unsharded map seeds a shard that has nothing on disk yet
+        write_snapshot(self.tmp.name + '/sub_map.pkl', {
+            b'\x00\x00\x01': SubscriberRecord('SYSTEM-1', 1, None, 100.0, None),
+            b'\x00\x00\x02': SubscriberRecord('SYSTEM-7', 2, None, 100.0, None)})
+
+        self._start(1)
+        self.assertEqual(list(bm.SUB_MAP), [b'\x00\x00\x02'])
+        bm._sub_map_set(b'\x00\x00\x03', SubscriberRecord('SYSTEM-8', 1, None, 200.0, None))
+        bm.subMapJournalFlush()
+
+        self._start(0)
+        self.assertEqual(list(bm.SUB_MAP), [b'\x00\x00\x01'])
+        bm._sub_map_set(b'\x00\x00\x04', SubscriberRecord('SYSTEM-2', 1, None, 200.0, None))
+        bm.subMapJournalFlush()
+
+        self.assertEqual(sorted(os.listdir(self.tmp.name)),
+                         ['sub_map.pkl', 'sub_map.pkl.shard1', 'sub_map.pkl.shard1.wal', 'sub_map.pkl.wal'])
+
+        # After a restart each shard reads back its own files, not the shared one
+        self._start(1)
+        self.assertEqual(sorted(bm.SUB_MAP), [b'\x00\x00\x02', b'\x00\x00\x03'])
+        self._start(0)
+        self.assertEqual(sorted(bm.SUB_MAP), [b'\x00\x00\x01', b'\x00\x00\x04'])
+
+
+if __name__ == '__main__':
+    unittest.main()
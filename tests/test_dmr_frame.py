@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""DmrFrame: struct decoding matches the old per-field slicing on every ingress path."""
+import random
+import unittest
+from unittest import mock
+
+from const import DMRD
+from dmr_frame import BITS, DmrFrame
+from hblink import OPENBRIDGE, STREAM_VERDICTS
+from obp_sign import ObpKeys, obp_packer
+
+KEY = b'passw0rd'.ljust(20, b'\x00')
+NETWORK_ID = (23450).to_bytes(4, 'big')
+SOCK = ('192.0.2.1', 62044)
+SRC_SERVER, SRC_RPTR = (2345).to_bytes(4, 'big'), (234501).to_bytes(4, 'big')
+
+
+def _legacy_bits(bits):
+    slot = 2 if (bits & 0x80) else 1
+    if bits & 0x40:
+        call_type = 'unit'
+    elif (bits & 0x23) == 0x23:
+        call_type = 'vcsbk'
+    else:
+        call_type = 'group'
+    return slot, call_type, (bits & 0x30) >> 4, bits & 0xF
+
+
+def _frame(rng):
+    return DMRD + bytes(rng.randrange(256) for _ in range(49))
+
+
+class TestDmrFrame(unittest.TestCase):
+
+    def test_bits_table_matches_inline_decoding(self):
+        self.assertEqual(len(BITS), 256)
+        for bits in range(256):
+            self.assertEqual(BITS[bits], _legacy_bits(bits))
+
+    def test_header_matches_slices(self):
+        rng = random.Random(22)
+        frame = DmrFrame()
+        for _ in range(500):
+            data = _frame(rng)
+            self.assertIs(frame.decode(data), frame)
+            self.assertEqual(
+                (frame.seq, frame.rf_src, frame.dst_id, frame.peer_id, frame.stream_id),
+                (data[4], data[5:8], data[8:11], data[11:15], data[16:20]))
+            self.assertEqual((frame.slot, frame.call_type, frame.frame_type, frame.dtype_vseq),
+                             _legacy_bits(data[15]))
+
+    def test_trailers_match_slices(self):
+        rng = random.Random(23)
+        frame = DmrFrame()
+        for _ in range(200):
+            v5 = _frame(rng)[:53] + bytes(rng.randrange(256) for _ in range(36))
+            v5 = v5[:55] + bytes([5]) + v5[56:]
+            frame.decode_dmre(v5)
+            self.assertEqual(
+                (frame.ber, frame.rssi, frame.version, frame.timestamp, frame.source_server,
+                 frame.source_rptr, frame.hops, frame.hash, frame.signed),
+                (v5[53:54], v5[54:55], 5, int.from_bytes(v5[56:64], 'big'), v5[64:68],
+                 v5[68:72], v5[72], v5[73:89], 73))
+
+            v4 = v5[:55] + bytes([4]) + v5[56:85]
+            frame.decode_dmre(v4)
+            self.assertEqual(
+                (frame.version, frame.source_server, frame.source_rptr, frame.hops, frame.hash, frame.signed),
+                (4, v4[64:68], b'\x00\x00\x00\x00', v4[68], v4[69:85], 69))
+
+            dmrf = v5[:78]
+            frame.decode_dmrf(dmrf)
+            self.assertEqual((frame.timestamp, frame.hops, frame.hash),
+                             (int.from_bytes(dmrf[53:61], 'big'), dmrf[61], dmrf[62:]))
+
+
+class TestOpenBridgeIngress(unittest.TestCase):
+
+    def setUp(self):
+        STREAM_VERDICTS.invalidate()
+        config = {
+            'GLOBAL': {'SERVER_ID': (99999).to_bytes(4, 'big'), 'USE_ACL': False},
+            'SYSTEMS': {'OBP-1': {'MODE': 'OPENBRIDGE', 'PASSPHRASE': KEY, 'VER': 5,
+                                  'NETWORK_ID': NETWORK_ID, 'TARGET_IP': SOCK[0], 'TARGET_PORT': SOCK[1],
+                                  'TARGET_SOCK': SOCK, 'RELAX_CHECKS': False, 'ENHANCED_OBP': False,
+                                  'USE_ACL': False, '_SHARD_LINK': True}},
+        }
+        self.obp = OPENBRIDGE('OBP-1', config, None)
+        self.obp.transport = mock.Mock()
+        self.obp.dmrd_received = mock.Mock()
+        self.keys = ObpKeys(KEY)
+
+    def _receive(self, version, frame):
+        self.obp._config['VER'] = version
+        packet = obp_packer(version, self.keys, NETWORK_ID)(frame, b'\x02', b'\x07', b'\x09', SRC_SERVER, SRC_RPTR)
+        self.obp.datagramReceived(packet, SOCK)
+        return packet
+
+    def test_dmre_and_dmrf_reach_dmrd_received(self):
+        # slot 1 group voice burst to TG 2350
+        frame = DMRD + b'\x2a' + (3120001).to_bytes(3, 'big') + (2350).to_bytes(3, 'big') \
+            + NETWORK_ID + b'\x01' + b'\x11\x22\x33\x44' + bytes(range(33))
+        for version, stream_rptr in ((5, SRC_RPTR), (4, b'\x00\x00\x00\x00')):
+            with self.subTest(version=version):
+                self.obp.dmrd_received.reset_mock()
+                packet = self._receive(version, frame)
+                args = self.obp.dmrd_received.call_args.args
+                self.assertEqual(args[:10], (NETWORK_ID, frame[5:8], frame[8:11], 0x2a, 1, 'group', 0, 1,
+                                             frame[16:20], frame))
+                self.assertEqual(args[10:], (packet[-16:], b'\x03', SRC_SERVER, b'\x07', b'\x09', stream_rptr))
+
+        self.obp.dmrd_received.reset_mock()
+        packet = self._receive(3, frame)
+        self.assertEqual(self.obp.dmrd_received.call_args.args,
+                         (NETWORK_ID, frame[5:8], frame[8:11], 0x2a, 1, 'group', 0, 1,
+                          frame[16:20], frame, packet[-16:], b'\x03'))
+
+    def test_bad_hash_is_not_delivered(self):
+        frame = DMRD + bytes(range(4, 11)) + NETWORK_ID + b'\x01' + b'\x55\x66\x77\x88' + bytes(33)
+        self.obp._config['VER'] = 5
+        packet = bytearray(obp_packer(5, self.keys, NETWORK_ID)(frame, b'', b'\x00', b'\x00', SRC_SERVER, SRC_RPTR))
+        packet[-1] ^= 0xff
+        with self.assertLogs('hblink', 'WARNING'):
+            self.obp.datagramReceived(bytes(packet), SOCK)
+        self.obp.dmrd_received.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""FrameRing: bounded per-stream duplicate detection, fuzzed through routerOBP with reordered/duplicated UDP delivery."""
+import random
+import unittest
+from unittest import mock
+
+import bridge_master as bm
+from bridge_helpers import FRAME_RING_SIZE, FrameRing
+from const import DMRD, HBPF_VOICE, HBPF_VOICE_SYNC
+
+STREAM = b'\x11\x22\x33\x44'
+SUB = (3120001).to_bytes(3, 'big')
+TG = (2350).to_bytes(3, 'big')
+PEER = (23450).to_bytes(4, 'big')
+SILENCE = bytes(33)
+
+
+def _frame(seq, payload):
+    # slot 1 group voice: burst A is voice sync, B-F plain voice
+    _bits = HBPF_VOICE_SYNC << 4 if seq % 6 == 0 else (HBPF_VOICE << 4) | (seq % 6)
+    return b''.join([DMRD, bytes([seq & 0xff]), SUB, TG, PEER, bytes([_bits]), STREAM, payload])
+
+
+def _udp(rng, frames):
+    # 60 ms frame spacing with jitter, an idle gap now and then, and late copies
+    arrivals = []
+    now = 1000.0
+    for i, data in enumerate(frames):
+        now += 0.06
+        if i and i % 150 == 0:
+            now += rng.uniform(0.4, 1.5)
+        arrivals.append((now + rng.uniform(0, 0.1), i, data))
+        while rng.random() < 0.15:
+            arrivals.append((now + rng.uniform(0, 2.5), i, data))
+    arrivals.sort()
+    return arrivals
+
+
+def _leg(system):
+    return {'SYSTEM': system, 'TS': 1, 'TGID': TG, 'ACTIVE': True, 'TIMEOUT': 600,
+            'TO_TYPE': 'NONE', 'OFF': [], 'ON': [], 'RESET': [], 'TIMER': 0.0}
+
+
+class _NoRing(FrameRing):
+    __slots__ = ()
+
+    def add(self, frame):
+        return True
+
+
+class TestFrameRing(unittest.TestCase):
+
+    def test_add_and_evict(self):
+        ring = FrameRing(size=4)
+        frames = [_frame(seq, SILENCE) for seq in range(6)]
+        self.assertTrue(all(ring.add(data) for data in frames[:4]))
+        self.assertFalse(ring.add(frames[0]))
+        self.assertTrue(ring.add(frames[4]))
+        # frames[0] fell out of the ring; the same payload at another SEQ never matched
+        self.assertNotIn(frames[0], ring)
+        self.assertIn(frames[1], ring)
+        self.assertTrue(ring.add(frames[0]))
+        ring.clear()
+        self.assertEqual(len(ring), 0)
+        self.assertTrue(ring.add(frames[1]))
+
+    def test_memory_is_bounded(self):
+        ring = FrameRing()
+        for n in range(10000):
+            ring.add(_frame(n, n.to_bytes(33, 'big')))
+        self.assertEqual((len(ring), len(ring._seen)), (FRAME_RING_SIZE, FRAME_RING_SIZE))
+
+
+class TestRouterDuplicates(unittest.TestCase):
+
+    def setUp(self):
+        self._prev = {name: getattr(bm, name, None)
+                      for name in ('CONFIG', 'BRIDGES', 'BRIDGE_IDX', 'BRIDGE_IDX_KEYS', 'SUB_MAP',
+                                   'subscriber_ids', 'peer_ids', 'talkgroup_ids', 'local_subscriber_ids')}
+        bm.subscriber_ids = bm.peer_ids = bm.talkgroup_ids = bm.local_subscriber_ids = {}
+        self.clock = 0.0
+        for patcher in (mock.patch.dict(bm.systems, clear=True),
+                        mock.patch.object(bm, '_OPENBRIDGE_SYSTEMS', {'OBP-1', 'OBP-2'}),
+                        mock.patch.object(bm, 'time', side_effect=lambda: self.clock),
+                        mock.patch.object(bm, 'logger')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        for name, value in self._prev.items():
+            if value is None:
+                delattr(bm, name)
+            else:
+                setattr(bm, name, value)
+        bm.STICKY_IDX = {}
+        bm.SUB_BUCKETS = bm.SubscriberBuckets()
+
+    def _route(self, router, source, arrivals):
+        # Feed arrivals into *source* and return the frame indexes OBP-2 transmitted
+        obp = {'MODE': 'OPENBRIDGE', 'TARGET_IP': None, 'TARGET_PORT': None,
+               'ENHANCED_OBP': False, 'USE_ACL': False}
+        hbp = {'MODE': 'MASTER', 'PEERS': {}, 'ANNOUNCEMENT_LANGUAGE': 'en_GB', 'GROUP_HANGTIME': 5,
+               'DEFAULT_UA_TIMER': 10, 'OPTIONS': '', 'SINGLE_MODE': False, 'TS1_STATIC': '',
+               'TS2_STATIC': '', 'DEFAULT_REFLECTOR': 0}
+        bm.CONFIG = {
+            'GLOBAL': {'GEN_STAT_BRIDGES': False, 'USE_ACL': False, 'SERVER_ID': (2345).to_bytes(4, 'big')},
+            'SYSTEMS': {source: hbp if router is bm.routerHBP else dict(obp), 'OBP-2': dict(obp)},
+            'REPORTS': {'REPORT': False},
+        }
+        bm.BRIDGES = {'FUZZ': [_leg(source), _leg('OBP-2')]}
+        bm.SUB_MAP = {}
+        bm.rebuild_bridge_index()
+        bm.systems.clear()
+        bm.systems[source] = router(source, bm.CONFIG, None)
+        bm.systems['OBP-2'] = target = bm.routerOBP('OBP-2', bm.CONFIG, None)
+        target.send_system = mock.Mock()
+        # routerOBP.dmrd_received also takes the frame hash
+        extra = (None,) if router is bm.routerOBP else ()
+        forwarded = []
+        with mock.patch.dict(bm._HBP_STREAM_CLAIMS, clear=True):
+            for now, i, data in arrivals:
+                self.clock = now
+                sent = target.send_system.call_count
+                bm.systems[source].dmrd_received(PEER, SUB, TG, data[4], 1, 'group', data[15] >> 4,
+                                                 data[15] & 0xf, STREAM, data, *extra)
+                if target.send_system.call_count > sent:
+                    forwarded.append(i)
+        return forwarded
+
+    def test_fuzz_reordered_and_duplicated_streams(self):
+        for router, source in ((bm.routerOBP, 'OBP-1'), (bm.routerHBP, 'HBP-1')):
+            slipped = 0
+            for seed in range(40):
+                rng = random.Random(seed)
+                # Silence repeats the payload: only the SEQ byte tells those frames apart
+                frames = [_frame(i, SILENCE if rng.random() < 0.3 else rng.randbytes(33)) for i in range(600)]
+                arrivals = _udp(rng, frames)
+                with self.subTest(source=source, seed=seed):
+                    forwarded = self._route(router, source, arrivals)
+                    # Every frame goes out at most once; most get through, the
+                    # rest are reordered past a later one and dropped
+                    self.assertEqual(len(forwarded), len(set(forwarded)))
+                    self.assertGreater(len(forwarded), 0.8 * len(frames))
+                    if router is bm.routerOBP:
+                        self.assertLessEqual(len(bm.systems[source].STATUS[STREAM]['recent']), FRAME_RING_SIZE)
+                    else:
+                        self.assertLessEqual(len(bm.systems[source].STATUS[1]['recent']), FRAME_RING_SIZE)
+
+                    # Without the ring, late copies get through after an idle gap restarts the stream
+                    with mock.patch.object(bm, 'FrameRing', _NoRing):
+                        forwarded = self._route(router, source, arrivals)
+                    slipped += len(forwarded) - len(set(forwarded))
+            self.assertGreater(slipped, 0, source)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Precomputed LC rewrite templates — parity with the bitarray splice."""
+import random
+import unittest
+
+from bitarray import bitarray
+from dmr_utils3 import bptc
+
+from bridge_helpers import fanout_payload, lc_rewrite_templates, rewrite_burst_lc
+from const import HBPF_DATA_SYNC, HBPF_SLT_VHEAD, HBPF_SLT_VTERM, HBPF_VOICE
+
+
+def _bitarray_rewrite(dmrpkt, frame_type, dtype_vseq, dst_lc):
+    """The pre-template fanout rewrite from bridge_master.to_target."""
+    h_lc = bptc.encode_header_lc(dst_lc)
+    t_lc = bptc.encode_terminator_lc(dst_lc)
+    emb_lc = bptc.encode_emblc(dst_lc)
+    dmrbits = bitarray(endian='big')
+    dmrbits.frombytes(dmrpkt)
+    if frame_type == HBPF_DATA_SYNC and dtype_vseq == HBPF_SLT_VHEAD:
+        dmrbits = h_lc[0:98] + dmrbits[98:166] + h_lc[98:197]
+    elif frame_type == HBPF_DATA_SYNC and dtype_vseq == HBPF_SLT_VTERM:
+        dmrbits = t_lc[0:98] + dmrbits[98:166] + t_lc[98:197]
+    elif dtype_vseq in [1, 2, 3, 4]:
+        dmrbits = dmrbits[0:116] + emb_lc[dtype_vseq] + dmrbits[148:264]
+    return dmrbits.tobytes()
+
+
+class TestLcRewrite(unittest.TestCase):
+
+    def test_parity_with_bitarray_splice(self):
+        rng = random.Random(2024)
+        frames = [(HBPF_DATA_SYNC, HBPF_SLT_VHEAD), (HBPF_DATA_SYNC, HBPF_SLT_VTERM)]
+        frames += [(HBPF_VOICE, vseq) for vseq in range(6)]
+        for _ in range(50):
+            dst_lc = bytes(rng.getrandbits(8) for _ in range(9))
+            dmrpkt = bytes(rng.getrandbits(8) for _ in range(33))
+            templates = lc_rewrite_templates(dst_lc)
+            for frame_type, dtype_vseq in frames:
+                with self.subTest(frame_type=frame_type, dtype_vseq=dtype_vseq):
+                    self.assertEqual(
+                        rewrite_burst_lc(dmrpkt, frame_type, dtype_vseq, templates),
+                        _bitarray_rewrite(dmrpkt, frame_type, dtype_vseq, dst_lc),
+                    )
+
+    def test_bursts_a_and_f_pass_through(self):
+        dmrpkt = bytes(range(33))
+        templates = lc_rewrite_templates(b'\x00\x00\x00\x00\x00\x09\x00\x00\x01')
+        self.assertIs(rewrite_burst_lc(dmrpkt, HBPF_VOICE, 0, templates), dmrpkt)
+        self.assertIs(rewrite_burst_lc(dmrpkt, HBPF_VOICE, 5, templates), dmrpkt)
+
+    def test_templates_cached_per_lc(self):
+        dst_lc = b'\x00\x00\x00\x00\x0b\xb8\x2f\x9b\x65'
+        self.assertIs(lc_rewrite_templates(dst_lc), lc_rewrite_templates(dst_lc))
+
+
+
+class TestFanoutPayload(unittest.TestCase):
+
+    def setUp(self):
+        self.data = b'DMRD' + bytes(range(1, 51)) + b'\x11\x22'
+        self.dmrpkt = self.data[20:53]
+        self.tgid = b'\x00\x00\x09'
+        self.tpl = lc_rewrite_templates(b'\x00\x00\x00' + self.tgid + self.data[5:8])
+
+    def _build(self, fanout, tgid, bits, tpl, trailer=b''):
+        return fanout_payload(fanout, self.data, tgid, bits, self.dmrpkt,
+                              HBPF_VOICE, 2, tpl, trailer)
+
+    def test_matches_per_leg_assembly(self):
+        packet = self._build({}, self.tgid, 0xa1, self.tpl, self.data[53:55])
+        self.assertEqual(packet, b''.join([
+            self.data[:8], self.tgid, self.data[11:15], b'\xa1', self.data[16:20],
+            rewrite_burst_lc(self.dmrpkt, HBPF_VOICE, 2, self.tpl), self.data[53:55],
+        ]))
+
+    def test_same_signature_reuses_payload(self):
+        fanout = {}
+        first = self._build(fanout, self.tgid, 0x21, self.tpl)
+        self.assertIs(self._build(fanout, self.tgid, 0x21, self.tpl), first)
+        self.assertEqual(len(fanout), 1)
+
+    def test_distinct_signatures_build_separately(self):
+        fanout = {}
+        other_tgid = b'\x00\x00\x5b'
+        other_tpl = lc_rewrite_templates(b'\x00\x00\x00' + other_tgid + self.data[5:8])
+        base = self._build(fanout, self.tgid, 0x21, self.tpl)
+        self.assertNotEqual(self._build(fanout, self.tgid, 0xa1, self.tpl), base)
+        self.assertNotEqual(self._build(fanout, other_tgid, 0x21, other_tpl), base)
+        self.assertNotEqual(self._build(fanout, self.tgid, 0x21, self.tpl, b'\x11\x22'), base)
+        self.assertEqual(len(fanout), 4)
+
+    def test_new_templates_for_same_key_rebuild(self):
+        fanout = {}
+        self._build(fanout, self.tgid, 0x21, self.tpl)
+        other_tpl = lc_rewrite_templates(b'\x20\x00\x00' + self.tgid + self.data[5:8])
+        packet = self._build(fanout, self.tgid, 0x21, other_tpl)
+        self.assertEqual(packet[20:53], rewrite_burst_lc(self.dmrpkt, HBPF_VOICE, 2, other_tpl))
+
+
+if __name__ == '__main__':
+    unittest.main()
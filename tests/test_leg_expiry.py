@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Rule timer deadlines: ExpiryQueue and the per-bridge leg_expiry_loop."""
+import ast
+import unittest
+from unittest import mock
+
+import bridge_master as bm
+from bridge_helpers import ExpiryQueue, bridge_next_deadline
+
+TG = b'\x00\x01\x46'  # 326
+
+
+def _unarmed():
+    # Bridges whose earliest pending leg TIMER is not covered by _LEG_EXPIRY
+    return sorted(name for name, entries in bm.BRIDGES.items()
+                  if bridge_next_deadline(entries) is not None
+                  and bm._LEG_EXPIRY._next.get(name, float('inf')) > bridge_next_deadline(entries))
+
+
+class _LegWrites(ast.NodeVisitor):
+    # Collects (function, line) for every x['TIMER'] = / x['ACTIVE'] = assignment
+
+    def __init__(self):
+        self.func = None
+        self.writes = []
+
+    def visit_FunctionDef(self, node):
+        outer, self.func = self.func, node.name
+        self.generic_visit(node)
+        self.func = outer
+
+    def _check(self, node, targets):
+        for target in targets:
+            if (isinstance(target, ast.Subscript) and isinstance(target.slice, ast.Constant)
+                    and target.slice.value in ('TIMER', 'ACTIVE')):
+                self.writes.append((self.func, node.lineno))
+        self.generic_visit(node)
+
+    def visit_Assign(self, node):
+        self._check(node, node.targets)
+
+    def visit_AugAssign(self, node):
+        self._check(node, [node.target])
+
+
+def _leg(system, ts, active, to_type='ON', timer=0.0):
+    return {
+        'SYSTEM': system,
+        'TS': ts,
+        'TGID': TG,
+        'ACTIVE': active,
+        'TIMEOUT': 600,
+        'TO_TYPE': to_type,
+        'OFF': [],
+        'ON': [TG],
+        'RESET': [],
+        'TIMER': timer,
+    }
+
+
+class TestExpiryQueue(unittest.TestCase):
+
+    def test_one_live_entry_per_key(self):
+        q = ExpiryQueue()
+        self.assertTrue(q.schedule('a', 10.0))
+        # Extension: the earlier entry stays, caller re-arms when it fires
+        self.assertFalse(q.schedule('a', 20.0))
+        self.assertEqual(len(q), 1)
+        self.assertEqual(q.next_deadline(), 10.0)
+        # Shortening supersedes the old entry; the stale one is skipped
+        self.assertTrue(q.schedule('a', 5.0))
+        self.assertEqual(q.pop_due(10.0), ['a'])
+        self.assertEqual(q.pop_due(100.0), [])
+        self.assertNotIn('a', q)
+
+    def test_pop_due_order_and_discard(self):
+        q = ExpiryQueue()
+        q.schedule('late', 30.0)
+        q.schedule('early', 10.0)
+        q.schedule('gone', 15.0)
+        q.discard('gone')
+        self.assertEqual(q.pop_due(5.0), [])
+        self.assertEqual(q.pop_due(40.0), ['early', 'late'])
+        self.assertIsNone(q.next_deadline())
+
+    def test_compacts_superseded_entries(self):
+        q = ExpiryQueue()
+        for i in range(5000):
+            q.schedule('a', 10000.0 - i)
+        self.assertLess(len(q._heap), 2100)
+        self.assertEqual(q.pop_due(1e9), ['a'])
+
+    def test_bridge_next_deadline(self):
+        entries = [
+            _leg('S1', 1, active=True, timer=50.0),
+            _leg('S1', 2, active=False, timer=10.0),        # ON idle: nothing pending
+            _leg('S2', 1, active=False, to_type='OFF', timer=40.0),
+            _leg('OBP-1', 1, active=True, to_type='NONE', timer=1.0),
+        ]
+        self.assertEqual(bridge_next_deadline(entries), 40.0)
+        self.assertIsNone(bridge_next_deadline(entries[1:2]))
+
+
+class TestLegExpiryLoop(unittest.TestCase):
+
+    def setUp(self):
+        self._prev = {name: getattr(bm, name, None) for name in ('BRIDGES', 'CONFIG', 'SUB_MAP')}
+        bm.CONFIG = {
+            'SYSTEMS': {'SYSTEM-1': {'MODE': 'MASTER', 'DEFAULT_UA_TIMER': 10, 'OPTIONS': '', 'PEERS': {}}},
+            'REPORTS': {'REPORT': False},
+        }
+        bm.SUB_MAP = {}
+        bm.BRIDGES = {
+            '326': [_leg('SYSTEM-1', 1, active=False), _leg('SYSTEM-1', 2, active=False)],
+            '327': [_leg('SYSTEM-1', 1, active=True, timer=1200.0)],
+        }
+        bm.rebuild_bridge_index()
+
+    def tearDown(self):
+        for name, value in self._prev.items():
+            if value is None:
+                delattr(bm, name)
+            else:
+                setattr(bm, name, value)
+        bm._LEG_EXPIRY.clear()
+
+    def test_activation_arms_deadline(self):
+        self.assertNotIn('326', bm._LEG_EXPIRY)
+        with mock.patch.object(bm, 'time', return_value=1000.0), \
+                mock.patch.object(bm, 'notify_bridge_table_updated'):
+            bm.activate_ua_bridge_source('326', 'SYSTEM-1', 1)
+        self.assertIn('326', bm._LEG_EXPIRY)
+        self.assertEqual(bm._LEG_EXPIRY._next['326'], 1600.0)
+
+    def test_only_due_bridges_evaluated(self):
+        with mock.patch.object(bm, 'time', return_value=1000.0), \
+                mock.patch.object(bm, 'notify_bridge_table_updated'):
+            bm.activate_ua_bridge_source('326', 'SYSTEM-1', 1)
+        with mock.patch.object(bm, '_bridge_timer_pass', wraps=bm._bridge_timer_pass) as timer_pass, \
+                mock.patch.object(bm, 'time', return_value=1100.0):
+            bm.leg_expiry_loop()
+        timer_pass.assert_not_called()
+        # 327 is due first: its only leg expires and nothing is left to arm
+        with mock.patch.object(bm, '_bridge_timer_pass', wraps=bm._bridge_timer_pass) as timer_pass, \
+                mock.patch.object(bm, 'time', return_value=1201.0):
+            bm.leg_expiry_loop()
+        self.assertEqual([c.args[0] for c in timer_pass.call_args_list], ['327'])
+        self.assertFalse(bm.BRIDGES['327'][0]['ACTIVE'])
+        self.assertNotIn('327', bm._LEG_EXPIRY)
+        self.assertTrue(bm.BRIDGES['326'][0]['ACTIVE'])
+        # The backstop sweep drops the idle bridge and keeps 326 armed
+        with mock.patch.object(bm, 'time', return_value=1250.0):
+            bm.rule_timer_loop()
+        self.assertNotIn('327', bm.BRIDGES)
+        self.assertEqual(bm._LEG_EXPIRY._next['326'], 1600.0)
+
+    def test_extended_timer_is_rearmed(self):
+        with mock.patch.object(bm, 'time', return_value=1000.0), \
+                mock.patch.object(bm, 'notify_bridge_table_updated'):
+            bm.activate_ua_bridge_source('326', 'SYSTEM-1', 1)
+            bm._set_leg_timer('326', bm.BRIDGES['326'][0], 1900.0)    # PTT refresh
+        with mock.patch.object(bm, 'time', return_value=1601.0):
+            bm.leg_expiry_loop()
+        self.assertTrue(bm.BRIDGES['326'][0]['ACTIVE'])
+        self.assertEqual(bm._LEG_EXPIRY._next['326'], 1900.0)
+        with mock.patch.object(bm, 'time', return_value=1901.0):
+            bm.leg_expiry_loop()
+        self.assertFalse(bm.BRIDGES['326'][0]['ACTIVE'])
+
+    def test_sweep_reports_unarmed_timer(self):
+        # A leg activated behind _set_leg_timer's back: leg_expiry_loop never
+        # sees it, the consistency sweep expires it and says so
+        bm.BRIDGES['326'][0].update({'ACTIVE': True, 'TIMER': 1000.0})
+        self.assertEqual(_unarmed(), ['326'])
+        with mock.patch.object(bm, 'time', return_value=1001.0):
+            bm.leg_expiry_loop()
+        self.assertTrue(bm.BRIDGES['326'][0]['ACTIVE'])
+        with mock.patch.object(bm, 'time', return_value=1001.0), \
+                mock.patch.object(bm, 'logger') as logger:
+            bm.rule_timer_loop()
+        logger.warning.assert_called_once_with('(ROUTER) Rule timer for bridge %s was not armed', '326')
+        self.assertFalse(bm.BRIDGES['326'][0]['ACTIVE'])
+
+
+class TestTimerWritesArmed(unittest.TestCase):
+
+    def setUp(self):
+        self._prev = {name: getattr(bm, name, None)
+                      for name in ('BRIDGES', 'CONFIG', 'SUB_MAP', 'BRIDGE_IDX', 'BRIDGE_IDX_KEYS')}
+        master = {'MODE': 'MASTER', 'DEFAULT_UA_TIMER': 10, 'OPTIONS': '', 'PEERS': {},
+                  'SINGLE_MODE': False}
+        bm.CONFIG = {
+            'GLOBAL': {'GEN_STAT_BRIDGES': False},
+            'SYSTEMS': {'SYSTEM-1': dict(master), 'SYSTEM-2': dict(master),
+                        'OBP-1': {'MODE': 'OPENBRIDGE'}},
+            'REPORTS': {'REPORT': False},
+        }
+        bm.SUB_MAP = {}
+        bm.BRIDGES = {}
+        bm.rebuild_bridge_index()
+        for patcher in (mock.patch.object(bm, 'time', return_value=1000.0),
+                        mock.patch.object(bm, 'notify_bridge_table_updated'),
+                        mock.patch.object(bm, 'disconnectedVoice')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        for name, value in self._prev.items():
+            if value is None:
+                delattr(bm, name)
+            else:
+                setattr(bm, name, value)
+        bm._LEG_EXPIRY.clear()
+
+    def test_only_set_leg_timer_writes_timers(self):
+        with open(bm.__file__, encoding='utf-8') as fh:
+            tree = ast.parse(fh.read())
+        visitor = _LegWrites()
+        visitor.visit(tree)
+        self.assertEqual([w for w in visitor.writes
+                          if w[0] not in ('_set_leg_timer', '_bridge_timer_pass')], [])
+        self.assertTrue(visitor.writes)
+
+    def test_builders_and_mutators_arm_their_bridges(self):
+        steps = [
+            lambda: bm.make_single_bridge(bm.bytes_3(2350), 'SYSTEM-1', 1, 10),
+            lambda: bm.activate_ua_bridge_source('2350', 'SYSTEM-2', 2),
+            lambda: bm.make_static_tg(2351, 1, 10, 'SYSTEM-1'),
+            lambda: bm.reset_static_tg(2351, 1, 10, 'SYSTEM-1'),
+            lambda: bm.make_single_reflector(bm.bytes_3(4400), 10, 'SYSTEM-1'),
+            lambda: bm.make_default_reflector(4401, 10, 'SYSTEM-2'),
+            lambda: bm.clear_default_reflectors('SYSTEM-2'),
+            lambda: bm.deactivate_other_dynamic_reflectors('SYSTEM-1', '#4401'),
+            lambda: bm.reset_dynamic_reflectors('SYSTEM-1'),
+            lambda: bm.selfcare_disconnect('SYSTEM-2'),
+            lambda: bm.remove_bridge_system('SYSTEM-1'),
+        ]
+        for n, step in enumerate(steps):
+            step()
+            self.assertEqual(_unarmed(), [], n)
+        self.assertIn('#4401', bm._LEG_EXPIRY)
+
+        # A shortened TIMER is re-armed; a bare write is caught by the check above
+        leg = bm.BRIDGES['2350'][0]
+        bm._set_leg_timer('2350', leg, 1010.0, active=True)
+        self.assertEqual(bm._LEG_EXPIRY._next['2350'], 1010.0)
+        leg['TIMER'] = 1005.0
+        self.assertEqual(_unarmed(), ['2350'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""OpenBridge signing: pre-keyed contexts and per-version packers match the old framing."""
+import unittest
+from hashlib import blake2b, sha1
+from hmac import new as hmac_new
+from unittest import mock
+
+import obp_sign
+from const import DMRD, DMRE, DMRF
+from hblink import OPENBRIDGE
+from obp_sign import ObpKeys, obp_packer
+
+KEY = b'passw0rd'.ljust(20, b'\x00')
+SERVER = (23450).to_bytes(4, 'big')
+NOW = 1700000000123456789
+FRAME = DMRD + bytes(range(4, 53))
+BER, RSSI, SRC_SERVER, SRC_RPTR, HOPS = b'\x01', b'\x02', b'\x00\x00\x5b\x9a', b'\x00\x23\x45\x01', b'\x03'
+
+
+def _blake(data):
+    _h = blake2b(key=KEY, digest_size=16)
+    _h.update(data)
+    return _h.digest()
+
+
+def _legacy(version, frame, hops):
+    # The send_system framing before the packers, per PROTO_VER
+    _ts = NOW.to_bytes(8, 'big')
+    if version > 4:
+        _packet = b''.join([DMRE, frame[4:11], SERVER, frame[15:], BER, RSSI, bytes([version]), _ts,
+                            SRC_SERVER, SRC_RPTR, hops])
+        return _packet + _blake(_packet)
+    if version == 4:
+        _packet = b''.join([DMRE, frame[4:11], SERVER, frame[15:], BER, RSSI, bytes([version]), _ts,
+                            SRC_SERVER, hops])
+        return _packet + _blake(_packet)
+    if version == 3:
+        _packet = b''.join([DMRF, frame[4:11], SERVER, frame[15:]])
+        return b''.join([_packet, _ts, hops, _blake(_packet)])
+    if version == 2:
+        _packet = b''.join([DMRF, frame[4:11], SERVER, frame[15:], _ts])
+        return b''.join([_packet, hops, _blake(_packet)])
+    _packet = b''.join([DMRD, frame[4:11], SERVER, frame[15:]])
+    return _packet + hmac_new(KEY, _packet, sha1).digest()
+
+
+class TestObpSign(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(obp_sign, 'time_ns', return_value=NOW)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.keys = ObpKeys(KEY)
+
+    def test_keys_match_fresh_contexts(self):
+        for data in (b'', b'BCKA', FRAME):
+            self.assertEqual(self.keys.blake(data), _blake(data))
+            self.assertEqual(self.keys.hmac(data), hmac_new(KEY, data, sha1).digest())
+        # copies never leak state into the next packet
+        self.assertEqual(self.keys.blake(FRAME), self.keys.blake(FRAME))
+
+    def test_packers_match_legacy_framing(self):
+        for version in (1, 2, 3, 4, 5, 6):
+            pack = obp_packer(version, self.keys, SERVER)
+            with self.subTest(version=version):
+                self.assertEqual(pack(FRAME, HOPS, BER, RSSI, SRC_SERVER, SRC_RPTR), _legacy(version, FRAME, HOPS))
+                # Missing hop count goes out as one hop
+                self.assertEqual(pack(FRAME, b'', BER, RSSI, SRC_SERVER, SRC_RPTR), _legacy(version, FRAME, b'\x01'))
+        self.assertEqual(len(obp_packer(5, self.keys, SERVER)(FRAME, HOPS, BER, RSSI, SRC_SERVER, SRC_RPTR)), 89)
+        self.assertEqual(len(obp_packer(4, self.keys, SERVER)(FRAME, HOPS, BER, RSSI, SRC_SERVER, SRC_RPTR)), 85)
+
+
+class TestOpenBridgeSend(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(obp_sign, 'time_ns', return_value=NOW)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        config = {
+            'GLOBAL': {'SERVER_ID': SERVER},
+            'SYSTEMS': {'OBP-1': {'MODE': 'OPENBRIDGE', 'PASSPHRASE': KEY, 'VER': 4,
+                                  'TARGET_IP': '192.0.2.1', 'TARGET_PORT': 62044}},
+        }
+        self.obp = OPENBRIDGE('OBP-1', config, None)
+        self.obp.transport = mock.Mock()
+
+    def _sent(self):
+        return self.obp.transport.write.call_args.args[0]
+
+    def test_packer_follows_negotiated_version_and_passphrase(self):
+        self.obp.send_system(FRAME, HOPS, BER, RSSI, SRC_SERVER, SRC_RPTR)
+        self.assertEqual(self._sent(), _legacy(4, FRAME, HOPS))
+        packer = self.obp._packer
+        self.obp.send_system(FRAME, HOPS, BER, RSSI, SRC_SERVER, SRC_RPTR)
+        self.assertIs(self.obp._packer, packer)
+
+        # BCVE / DMRE upgrade
+        self.obp._config['VER'] = 5
+        self.obp.send_system(FRAME, HOPS, BER, RSSI, SRC_SERVER, SRC_RPTR)
+        self.assertEqual(self._sent(), _legacy(5, FRAME, HOPS))
+
+        self.obp._config['PASSPHRASE'] = b'other'.ljust(20, b'\x00')
+        self.obp.send_system(FRAME, HOPS, BER, RSSI, SRC_SERVER, SRC_RPTR)
+        self.assertNotEqual(self._sent()[-16:], _legacy(5, FRAME, HOPS)[-16:])
+        self.assertEqual(self.obp.obp_keys().passphrase, self.obp._config['PASSPHRASE'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""ObpStreamTable: OpenBridge stream expiry from a deadline queue instead of STATUS sweeps."""
+import unittest
+from unittest import mock
+
+import bridge_master as bm
+from bridge_helpers import ObpStreamTable
+
+TG = b'\x00\x09\x2e'
+SRC = b'\x2f\x9b\xe1'
+PEER = b'\x00\x00\x5b\x9a'
+
+
+def _stream(t, **extra):
+    stream = {'START': t, 'LAST': t, 'CONTENTION': False, 'RFS': SRC, 'TGID': TG, 'RX_PEER': PEER,
+              'packets': 0, 'loss': 0}
+    stream.update(extra)
+    return stream
+
+
+def _sid(n):
+    return n.to_bytes(4, 'big')
+
+
+class TestObpStreamTable(unittest.TestCase):
+
+    def test_timeout_then_hold(self):
+        table = ObpStreamTable()
+        table[_sid(1)] = _stream(100.0)
+        self.assertEqual(table.expire(104.0), ([], []))
+        # Frames keep arriving: the early deadline just reschedules
+        table[_sid(1)]['LAST'] = 103.0
+        self.assertEqual(table.expire(106.0), ([], []))
+        timed_out, removed = table.expire(108.5)
+        self.assertEqual([sid for sid, _ in timed_out], [_sid(1)])
+        self.assertTrue(table[_sid(1)]['_to'])
+        # Reported once, then kept until hold expires
+        self.assertEqual(table.expire(200.0), ([], []))
+        timed_out, removed = table.expire(283.5)
+        self.assertEqual(([sid for sid, _ in removed], timed_out), ([_sid(1)], []))
+        self.assertNotIn(_sid(1), table)
+        self.assertEqual((table.opened, table.timed_out, table.removed), (1, 1, 1))
+
+    def test_finished_stream_is_not_timed_out(self):
+        table = ObpStreamTable()
+        table[_sid(2)] = _stream(100.0)
+        table[_sid(2)]['_fin'] = True
+        self.assertEqual(table.expire(150.0), ([], []))
+        self.assertEqual([sid for sid, _ in table.expire(281.0)[1]], [_sid(2)])
+
+    def test_stub_without_last_and_delete(self):
+        table = ObpStreamTable()
+        stub = _stream(100.0)
+        del stub['LAST']
+        table[_sid(3)] = stub
+        table[_sid(4)] = _stream(100.0)
+        table.pop(_sid(4))
+        # The stub's clock starts when it is first examined
+        self.assertEqual(table.expire(106.0), ([], []))
+        self.assertEqual(table[_sid(3)]['LAST'], 106.0)
+        self.assertEqual(len(table._expiry), 1)
+
+    def test_bounded(self):
+        table = ObpStreamTable(maxlen=3)
+        for n in range(5):
+            table[_sid(n)] = _stream(100.0 + n)
+        self.assertEqual(list(table), [_sid(2), _sid(3), _sid(4)])
+        self.assertEqual((table.opened, table.evicted), (5, 2))
+        self.assertEqual((table.evicted_live, table.live_evictions(), table.live_evictions()), (2, 2, 0))
+        # Replacing a live stream is not a new one
+        table[_sid(4)] = _stream(110.0)
+        self.assertEqual((len(table), table.opened), (3, 5))
+
+    def test_evicts_finished_before_live_then_least_recently_heard(self):
+        table = ObpStreamTable(maxlen=3)
+        table[_sid(1)] = _stream(100.0)       # long call, still live
+        table[_sid(2)] = _stream(101.0)
+        table[_sid(3)] = _stream(102.0)
+        table[_sid(1)]['LAST'] = 130.0
+        table[_sid(2)]['_fin'] = True
+        table[_sid(4)] = _stream(131.0)
+        self.assertEqual(list(table), [_sid(1), _sid(3), _sid(4)])
+        self.assertEqual((table.evicted, table.evicted_live), (1, 0))
+        # All live: the one heard longest ago goes, not the first inserted
+        table[_sid(5)] = _stream(132.0)
+        self.assertEqual(list(table), [_sid(1), _sid(4), _sid(5)])
+        self.assertEqual((table.evicted, table.evicted_live), (2, 1))
+        self.assertNotIn(_sid(3), table._expiry)
+
+
+class TestStreamTrimmerLoop(unittest.TestCase):
+
+    def setUp(self):
+        self._prev = {name: getattr(bm, name, None)
+                      for name in ('CONFIG', 'subscriber_ids', 'peer_ids', 'talkgroup_ids')}
+        bm.CONFIG = {
+            'SYSTEMS': {'OBP-1': {'MODE': 'OPENBRIDGE', '_bcsq': {b'\x00\x00\x01': _sid(7)}}},
+            'REPORTS': {'REPORT': True},
+        }
+        bm.subscriber_ids = bm.peer_ids = bm.talkgroup_ids = {}
+        self.obp = mock.Mock(STATUS=ObpStreamTable())
+        patcher = mock.patch.dict(bm.systems, {'OBP-1': self.obp}, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        for name, value in self._prev.items():
+            if value is None:
+                delattr(bm, name)
+            else:
+                setattr(bm, name, value)
+
+    def _trim(self, now):
+        with mock.patch.object(bm, 'time', return_value=now):
+            bm.stream_trimmer_loop()
+
+    def test_lost_stream_reported_then_removed_with_quench(self):
+        self.obp.STATUS[_sid(7)] = _stream(100.0, packets=50, loss=5)
+        self.obp.STATUS[_sid(8)] = _stream(100.0)
+        self.obp.STATUS[_sid(8)]['_fin'] = True
+        with self.assertLogs('bridge_master', 'INFO') as logs:
+            self._trim(106.0)
+        self.assertIn('STREAM LOST', logs.output[0])
+        self.obp._report.bridge_event.assert_called_once()
+        self._trim(200.0)
+        self.obp._report.bridge_event.assert_called_once()
+        self._trim(281.0)
+        self.assertEqual(len(self.obp.STATUS), 0)
+        self.assertEqual(bm.CONFIG['SYSTEMS']['OBP-1']['_bcsq'], {})
+
+    def test_broken_stream_is_logged_not_fatal(self):
+        self.obp.STATUS[_sid(9)] = {'START': 100.0, 'LAST': 100.0}
+        with self.assertLogs('bridge_master', 'ERROR'):
+            self._trim(106.0)
+        self._trim(281.0)
+        self.assertNotIn(_sid(9), self.obp.STATUS)
+
+    def test_live_eviction_is_logged(self):
+        self.obp.STATUS = ObpStreamTable(maxlen=1)
+        self.obp.STATUS[_sid(1)] = _stream(100.0)
+        self.obp.STATUS[_sid(2)] = _stream(101.0)
+        with self.assertLogs('bridge_master', 'WARNING') as logs:
+            self._trim(102.0)
+        self.assertIn('evicted 1 live stream', logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Report payload formats (FORMAT_REQ): pickle, json and rbin."""
+import pickle
+import unittest
+from unittest import mock
+from collections import deque
+
+import bridge_master as bm
+import report_codec as rc
+import report_delta as rd
+from reporting_const import REPORT_OPCODES
+
+TG = b'\x00\x01\x46'  # 326
+PEER = b'\x00\x00\x00\x0a'
+
+
+def _table():
+    return {
+        '326': [
+            {'SYSTEM': 'SYSTEM-1', 'TS': 1, 'TGID': TG, 'ACTIVE': True, 'TIMEOUT': 600,
+             'TO_TYPE': 'ON', 'TIMER': 1700000000.25, 'ON': [TG]},
+            {'SYSTEM': 'SYSTEM-2', 'TS': 2, 'TGID': TG, 'ACTIVE': True, 'TIMEOUT': 0,
+             'TO_TYPE': 'OFF', 'TIMER': 0, 'OFF': [TG, b'\x00\x00\x09'], 'RESET': []},
+        ],
+        '#9990': [
+            {'SYSTEM': 'SYSTEM-1', 'TS': 2, 'TGID': b'\x00\x27\x06', 'ACTIVE': False, 'TIMEOUT': '',
+             'TO_TYPE': 'NONE', 'TIMER': 12.5},
+        ],
+    }
+
+
+class FakeClient(object):
+
+    def __init__(self, fmt, deltas=False):
+        self.report_format = fmt
+        self.bridge_deltas = deltas
+        self.sent = []
+
+    def queue_message(self, data):
+        self.sent.append(data)
+
+
+class TestCodec(unittest.TestCase):
+
+    def test_rbin_roundtrips_table_exactly(self):
+        table = _table()
+        data = rc.dumps('rbin', table)
+        self.assertEqual(data[:3], b'RB\x01')
+        decoded = rc.loads('rbin', data)
+        self.assertEqual(decoded, table)
+        self.assertIs(type(decoded['326'][1]['TIMER']), int)
+        self.assertEqual(decoded['#9990'][0]['TIMEOUT'], '')
+        self.assertNotIn('ON', decoded['#9990'][0])
+        self.assertLess(len(data), len(pickle.dumps(table, protocol=2)))
+
+    def test_rbin_generic_values(self):
+        value = {'seq': 70000, 'n': -5, 'none': None, 'ops': [('leg_removed', '326', ('S1', 1, TG), None)],
+                 PEER: {'deque': deque([1, 2]), 'big': 1 << 40, 'odd_leg': {'TGID': b'\x01'}}}
+        decoded = rc.loads('rbin', rc.dumps('rbin', value))
+        self.assertEqual(decoded['ops'], [['leg_removed', '326', ['S1', 1, TG], None]])
+        self.assertEqual(decoded[PEER], {'deque': [1, 2], 'big': 1 << 40, 'odd_leg': {'TGID': b'\x01'}})
+        self.assertEqual(decoded['seq'], 70000)
+
+    def test_rbin_rejects_corrupt(self):
+        data = rc.dumps('rbin', _table())
+        for bad in (data[:-3], data + b'\x00', b'XX' + data[2:]):
+            with self.assertRaises(rc.CodecError):
+                rc.loads('rbin', bad)
+
+    def test_json_hex_bytes(self):
+        config = {'SYSTEM-1': {'MODE': 'MASTER', 'PEERS': {PEER: {'CALLSIGN': b'M0VUB   '}},
+                               'TG1_ACL': ('PERMIT', {TG})}}
+        decoded = rc.loads('json', rc.dumps('json', config))
+        self.assertEqual(decoded['SYSTEM-1']['PEERS'], {'0000000a': {'CALLSIGN': '4d30565542202020'}})
+        self.assertEqual(decoded['SYSTEM-1']['TG1_ACL'], ['PERMIT', ['000146']])
+
+    def test_negotiate_format(self):
+        self.assertEqual(rc.negotiate_format(b'RBIN'), 'rbin')
+        self.assertEqual(rc.negotiate_format(b'json\n'), 'json')
+        self.assertEqual(rc.negotiate_format(b'yaml'), 'pickle')
+
+    def test_mirror_applies_json_and_rbin_deltas(self):
+        old = _table()
+        new = _table()
+        new['326'][0]['TIMER'] += 600.0
+        del new['326'][1]
+        ops = rd.diff_bridges(old, new)
+        for fmt in ('json', 'rbin'):
+            mirror = rd.BridgeMirror(fmt)
+            self.assertTrue(mirror.feed(rc.dumps(fmt, rd.full_message(1, old))))
+            self.assertTrue(mirror.feed(rc.dumps(fmt, rd.delta_message(2, ops))))
+            self.assertEqual(mirror.bridges, rc.loads(fmt, rc.dumps(fmt, new)))
+
+
+class TestPerClientFormat(unittest.TestCase):
+
+    def setUp(self):
+        self._prev = getattr(bm, 'BRIDGES', None)
+        # Run the off-reactor encode jobs inline
+        patcher = mock.patch.object(bm, 'reactor')
+        _reactor = patcher.start()
+        _reactor.callInThread.side_effect = lambda fn, *args: fn(*args)
+        _reactor.callFromThread.side_effect = lambda fn, *args: fn(*args)
+        self.addCleanup(patcher.stop)
+        bm.BRIDGES = _table()
+        self.factory = bm.bridgeReportFactory({'REPORTS': {}, 'SYSTEMS': {'SYSTEM-1': {'MODE': 'MASTER'}}})
+        self.clients = {fmt: FakeClient(fmt) for fmt in rc.REPORT_FORMATS}
+        self.factory.clients = list(self.clients.values()) + [FakeClient('rbin')]
+
+    def tearDown(self):
+        if self._prev is None:
+            del bm.BRIDGES
+        else:
+            bm.BRIDGES = self._prev
+
+    def test_each_client_gets_its_format(self):
+        self.factory.send_bridge()
+        self.factory.send_config()
+        expected = self.factory._safe_bridges_payload()
+        for fmt, client in self.clients.items():
+            bridges, config = client.sent
+            self.assertEqual(bridges[:1], REPORT_OPCODES['BRIDGE_SND'])
+            self.assertEqual(config[:1], REPORT_OPCODES['CONFIG_SND'])
+            self.assertEqual(rc.loads(fmt, config[1:]), {'SYSTEM-1': {'MODE': 'MASTER'}})
+            self.assertEqual(rc.loads(fmt, bridges[1:]), rc.loads(fmt, rc.dumps(fmt, expected)))
+        # Encoded once per format, shared by clients using the same one
+        self.assertIs(self.factory.clients[-1].sent[0], self.clients['rbin'].sent[0])
+
+    def test_delta_resync_uses_client_format(self):
+        client = self.clients['json']
+        self.factory.send_bridge_resync(client)
+        mirror = rd.BridgeMirror('json')
+        self.assertTrue(mirror.feed(client.sent[-1][1:]))
+        self.assertEqual(mirror.seq, 0)
+        self.assertIn('326', mirror.bridges)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""BRIDGE_DELTA reports: diff/apply, sequence gaps and per-client resync."""
+import copy
+import pickle
+import unittest
+from unittest import mock
+
+import bridge_master as bm
+import report_delta as rd
+from report_codec import dumps
+from reporting_const import REPORT_OPCODES
+
+TG = b'\x00\x01\x46'  # 326
+
+
+def _leg(system, ts, active=False, timer=100.0, tgid=TG):
+    return {'SYSTEM': system, 'TS': ts, 'TGID': tgid, 'ACTIVE': active,
+            'TIMEOUT': 600, 'TO_TYPE': 'ON', 'TIMER': timer, 'ON': [tgid]}
+
+
+def _full(seq, bridges):
+    return dumps('pickle', rd.full_message(seq, bridges))
+
+
+def _delta(seq, ops):
+    return dumps('pickle', rd.delta_message(seq, ops))
+
+
+class FakeClient(object):
+
+    def __init__(self, deltas=False, fmt='pickle'):
+        self.bridge_deltas = deltas
+        self.report_format = fmt
+        self.sent = []
+
+    def queue_message(self, data):
+        self.sent.append(data)
+
+
+class TestDiffApply(unittest.TestCase):
+
+    def _roundtrip(self, old, new):
+        ops = rd.diff_bridges(old, new)
+        table = copy.deepcopy(old)
+        rd.apply_delta(table, ops)
+        self.assertEqual(table, new)
+        return ops
+
+    def test_op_kinds(self):
+        old = {'326': [_leg('S1', 1), _leg('S2', 1, active=True)], 'gone': [_leg('S1', 2)]}
+        new = {'326': [_leg('S1', 1, active=True, timer=700.0), _leg('S2', 1, active=True, timer=900.0),
+                       _leg('S3', 1)],
+               'new': [_leg('S1', 2)]}
+        ops = self._roundtrip(old, new)
+        kinds = sorted(op[0] for op in ops)
+        self.assertEqual(kinds, sorted([rd.BRIDGE_REMOVED, rd.LEG_ACTIVATED, rd.LEG_TIMER,
+                                        rd.LEG_ADDED, rd.BRIDGE_ADDED]))
+        timer_op = [op for op in ops if op[0] == rd.LEG_TIMER][0]
+        self.assertEqual(timer_op[2:], (('S2', 1, TG), {'TIMER': 900.0}))
+
+    def test_removed_changed_and_reordered(self):
+        old = {'326': [_leg('S1', 1), _leg('S2', 1), _leg('S3', 1)]}
+        changed = _leg('S2', 1)
+        changed['ON'] = []
+        ops = self._roundtrip(old, {'326': [_leg('S1', 1), changed]})
+        self.assertEqual([op[0] for op in ops], [rd.LEG_REMOVED, rd.LEG_CHANGED])
+        ops = self._roundtrip(old, {'326': [_leg('S4', 1), _leg('S1', 1), _leg('S5', 1), _leg('S3', 1)]})
+        self.assertEqual([op[0] for op in ops], [rd.LEG_REMOVED, rd.LEG_ADDED, rd.LEG_ADDED])
+        ops = self._roundtrip(old, {'326': [_leg('S2', 1), _leg('S1', 1)]})
+        self.assertEqual([op[0] for op in ops], [rd.BRIDGE_REPLACED])
+        self.assertEqual(rd.diff_bridges(old, copy.deepcopy(old)), [])
+
+    def test_apply_rejects_unknown_leg(self):
+        with self.assertRaises(rd.DeltaError):
+            rd.apply_delta({'326': []}, [(rd.LEG_TIMER, '326', ('S1', 1, TG), {'TIMER': 1.0})])
+
+    def test_mirror_requests_resync_once_on_gap(self):
+        mirror = rd.BridgeMirror()
+        self.assertTrue(mirror.feed(_full(5, {'326': [_leg('S1', 1)]})))
+        ops = [(rd.LEG_ACTIVATED, '326', ('S1', 1, TG), {'ACTIVE': True})]
+        self.assertTrue(mirror.feed(_delta(6, ops)))
+        self.assertTrue(mirror.bridges['326'][0]['ACTIVE'])
+        self.assertFalse(mirror.feed(_delta(8, [])))
+        self.assertIsNone(mirror.seq)
+        self.assertTrue(mirror.feed(_delta(9, [])))
+        self.assertTrue(mirror.feed(_full(9, {})))
+        self.assertEqual((mirror.seq, mirror.bridges), (9, {}))
+
+
+class TestBridgeReportFactory(unittest.TestCase):
+
+    def setUp(self):
+        self._prev = getattr(bm, 'BRIDGES', None)
+        # Run the off-reactor encode jobs inline
+        patcher = mock.patch.object(bm, 'reactor')
+        _reactor = patcher.start()
+        _reactor.callInThread.side_effect = lambda fn, *args: fn(*args)
+        _reactor.callFromThread.side_effect = lambda fn, *args: fn(*args)
+        self.addCleanup(patcher.stop)
+        bm.BRIDGES = {'326': [_leg('SYSTEM-1', 1), _leg('SYSTEM-2', 1, active=True)]}
+        self.factory = bm.bridgeReportFactory({'REPORTS': {}})
+        self.legacy = FakeClient()
+        self.delta = FakeClient()
+        self.factory.clients = [self.legacy, self.delta]
+
+    def tearDown(self):
+        if self._prev is None:
+            del bm.BRIDGES
+        else:
+            bm.BRIDGES = self._prev
+
+    def _decode(self, message):
+        self.assertEqual(message[:1], REPORT_OPCODES['BRIDGE_DELTA'])
+        return pickle.loads(message[1:])
+
+    def test_legacy_and_delta_clients(self):
+        mirror = rd.BridgeMirror()
+        self.factory.send_bridge()
+        self.factory.send_bridge_resync(self.delta)
+        self.assertTrue(mirror.feed(self.delta.sent[-1][1:]))
+        bm.BRIDGES['326'][0]['ACTIVE'] = True
+        with mock.patch.object(bm, 'time', return_value=self.factory._bridge_full_at + 1.0):
+            self.factory.send_bridge()
+        message = self._decode(self.delta.sent[-1])
+        self.assertFalse(message['full'])
+        # Idle ON legs are left out of reports, so activation is an insert
+        self.assertEqual([op[0] for op in message['ops']], [rd.LEG_ADDED])
+        self.assertEqual(message['ops'][0][3][0], 0)
+        self.assertTrue(mirror.feed(self.delta.sent[-1][1:]))
+        self.assertEqual(mirror.bridges, self.factory._safe_bridges_payload())
+        # Legacy clients only ever see full BRIDGE_SND pickles
+        self.assertEqual(len(self.legacy.sent), 2)
+        for sent in self.legacy.sent:
+            self.assertEqual(sent[:1], REPORT_OPCODES['BRIDGE_SND'])
+        self.assertEqual(pickle.loads(self.legacy.sent[-1][1:]), mirror.bridges)
+
+    def test_unchanged_table_sends_no_delta(self):
+        self.factory.send_bridge_resync(self.delta)
+        self.factory.send_bridge()
+        self.assertEqual(len(self.delta.sent), 1)
+
+    def test_periodic_full_resync(self):
+        self.factory.send_bridge_resync(self.delta)
+        bm.BRIDGES['326'][0]['TIMER'] = 500.0
+        with mock.patch.object(bm, 'time',
+                               return_value=self.factory._bridge_full_at + bm.bridgeReportFactory.BRIDGE_RESYNC_S):
+            self.factory.send_bridge()
+        message = self._decode(self.delta.sent[-1])
+        self.assertTrue(message['full'])
+        self.assertEqual(message['seq'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
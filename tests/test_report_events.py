@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Typed bridge events: legacy CSV, packed BRDG_EVENTS batches and the factory buffer."""
+import unittest
+from unittest import mock
+
+from dmr_utils3.utils import int_id
+
+import bridge_master as bm
+import report_events as re_
+from report_events import BridgeEvent
+from reporting_const import REPORT_OPCODES
+
+STREAM = b'\x8a\x01\x02\x03'
+PEER = b'\x00\x23\x45\x01'
+SRC = b'\x23\xd2\x31'
+TG = b'\x00\x00\xeb'  # 235
+
+
+class FakeClient(object):
+
+    def __init__(self, binary=False):
+        self.binary_events = binary
+        self.sent = []
+
+    def queue_message(self, data):
+        self.sent.append(data)
+
+
+class TestEventFormat(unittest.TestCase):
+
+    def test_csv_matches_legacy_strings(self):
+        start = (BridgeEvent.GROUP_VOICE_START, 'TX', 'SYSTEM-1', STREAM, PEER, SRC, 2, TG, None)
+        self.assertEqual(
+            re_.format_csv(start),
+            'GROUP VOICE,START,TX,{},{},{},{},{},{}'.format(
+                'SYSTEM-1', int_id(STREAM), int_id(PEER), int_id(SRC), 2, int_id(TG)))
+        end = (BridgeEvent.GROUP_VOICE_END, 'RX', 'OBP-1', STREAM, PEER, SRC, 1, TG, 4.126)
+        self.assertTrue(re_.format_csv(end).endswith(',1,235,4.13'))
+        data = (BridgeEvent.UNIT_DATA, 'TX', 'SYSTEM-2', STREAM, PEER, SRC, 1, 2345001, None)
+        self.assertTrue(re_.format_csv(data).startswith('UNIT DATA,DATA,TX,SYSTEM-2,'))
+        self.assertEqual(set(re_.EVENT_TEXT), set(BridgeEvent))
+
+    def test_pack_roundtrip(self):
+        events = [
+            (BridgeEvent.GROUP_VOICE_START, 'RX', 'SYSTEM-1', STREAM, PEER, SRC, 1, TG, None),
+            (BridgeEvent.GROUP_VOICE_END, 'TX', 'SYSTEM-2', STREAM, PEER, SRC, 2, TG, 12.5),
+            (BridgeEvent.VCSBK_34, 'RX', 'SYSTEM-1', 7, 8, 9, 1, 10, None),
+        ]
+        data = re_.pack_events(events)
+        decoded = re_.unpack_events(data)
+        self.assertEqual([re_.format_csv(event) for event in decoded],
+                         [re_.format_csv(event) for event in events])
+        self.assertEqual(decoded[0][3:], (int_id(STREAM), int_id(PEER), int_id(SRC), 1, int_id(TG), None))
+        # System names are sent once per batch
+        self.assertEqual(data.count(b'SYSTEM-1'), 1)
+
+    def test_rejects_corrupt(self):
+        data = re_.pack_events([(BridgeEvent.OTHER_DATA, 'RX', 'S', 1, 2, 3, 1, 4, None)])
+        size = re_._EVENT.size
+        for bad in (data[:-1], b'\x09' + data[1:], data[:-size] + b'\x63' + data[1 - size:], b''):
+            with self.assertRaises(re_.EventError):
+                re_.unpack_events(bad)
+
+    def test_more_than_255_systems_in_one_batch(self):
+        events = [(BridgeEvent.GROUP_VOICE_START, 'RX', 'SYSTEM-{}'.format(n), n, PEER, SRC, 1, TG, None)
+                  for n in range(600)]
+        decoded = re_.unpack_events(re_.pack_events(events))
+        self.assertEqual([event[2] for event in decoded], ['SYSTEM-{}'.format(n) for n in range(600)])
+
+    def test_duration_gives_the_same_csv_as_legacy(self):
+        # As float32 these round differently: 3.005 -> '3.01', 1234.565 -> '1234.56'
+        for duration in (3.005, 1234.565, 0.125, 86399.995):
+            event = (BridgeEvent.GROUP_VOICE_END, 'TX', 'SYSTEM-1', STREAM, PEER, SRC, 2, TG, duration)
+            (decoded,) = re_.unpack_events(re_.pack_events([event]))
+            self.assertEqual(re_.format_csv(decoded), re_.format_csv(event))
+
+    def test_decodes_version_1(self):
+        header, record = re_._LAYOUTS[1]
+        data = header.pack(1, 1) + b'\x08SYSTEM-1' + record.pack(
+            BridgeEvent.GROUP_VOICE_END, 0x03, 0, 1, 2, 3, 4, 1, 2.5)
+        self.assertEqual(re_.unpack_events(data),
+                         [(BridgeEvent.GROUP_VOICE_END, 'TX', 'SYSTEM-1', 1, 2, 3, 1, 4, 2.5)])
+
+
+class TestEventBuffer(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(bm, 'reactor')
+        self.reactor = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = bm.bridgeReportFactory({'REPORTS': {}})
+        self.legacy = FakeClient()
+        self.binary = FakeClient(binary=True)
+        self.factory.clients = [self.legacy, self.binary]
+
+    def _event(self, i, duration=None):
+        self.factory.bridge_event(BridgeEvent.GROUP_VOICE_END if duration else BridgeEvent.GROUP_VOICE_START,
+                                  'RX', 'SYSTEM-1', i.to_bytes(4, 'big'), PEER, SRC, 1, TG, duration)
+
+    def test_flush_batches_binary_and_formats_legacy(self):
+        self._event(1)
+        self._event(1, 3.0)
+        # Nothing sent from the hot path, one flush scheduled
+        self.assertEqual((self.legacy.sent, self.binary.sent), ([], []))
+        self.reactor.callLater.assert_called_once_with(self.factory.EVENT_FLUSH_S, self.factory._flush_events)
+        self.factory._flush_events()
+        self.assertEqual(len(self.binary.sent), 1)
+        self.assertEqual(self.binary.sent[0][:1], REPORT_OPCODES['BRDG_EVENTS'])
+        self.assertEqual(len(re_.unpack_events(self.binary.sent[0][1:])), 2)
+        self.assertEqual(self.legacy.sent, [
+            REPORT_OPCODES['BRDG_EVENT'] + 'GROUP VOICE,START,RX,SYSTEM-1,1,{},{},1,235'.format(
+                int_id(PEER), int_id(SRC)).encode(),
+            REPORT_OPCODES['BRDG_EVENT'] + 'GROUP VOICE,END,RX,SYSTEM-1,1,{},{},1,235,3.00'.format(
+                int_id(PEER), int_id(SRC)).encode(),
+        ])
+        # The next event schedules a new flush
+        self._event(2)
+        self.assertEqual(self.reactor.callLater.call_count, 2)
+
+    def test_buffer_is_bounded(self):
+        self.factory.EVENT_BUFFER_MAX = 3
+        for i in range(5):
+            self._event(i)
+        self.assertEqual(self.factory.events_dropped, 2)
+        self.factory.clients = [self.binary]
+        self.factory._flush_events()
+        self.assertEqual([event[3] for event in re_.unpack_events(self.binary.sent[0][1:])], [2, 3, 4])
+
+    def test_unpackable_batch_still_reaches_legacy_clients(self):
+        self._event(1)
+        with mock.patch.object(bm, 'pack_events', side_effect=re_.EventError('too many')):
+            with self.assertLogs('bridge_master', 'WARNING'):
+                self.factory._flush_events()
+        self.assertEqual((len(self.binary.sent), len(self.legacy.sent)), (0, 1))
+
+    def test_no_clients_no_work(self):
+        self.factory.clients = []
+        self._event(1)
+        self.assertEqual(self.factory._events, [])
+        self.reactor.callLater.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Report client backpressure: bounded queues, coalescing and off-reactor encoding."""
+import unittest
+from unittest import mock
+
+import bridge_master as bm
+from hblink import report, reportFactory
+from reporting_const import REPORT_OPCODES
+
+TG = b'\x00\x01\x46'  # 326
+SND = REPORT_OPCODES['BRIDGE_SND']
+CFG = REPORT_OPCODES['CONFIG_SND']
+EVT = REPORT_OPCODES['BRDG_EVENT']
+
+
+class FakeTransport(object):
+
+    def __init__(self):
+        self.written = []
+        self.producer = None
+
+    def registerProducer(self, producer, streaming):
+        self.producer = producer
+
+    def write(self, data):
+        self.written.append(data)
+
+    def writeSequence(self, data):
+        self.written.extend(data)
+
+    def getPeer(self):
+        return 'peer'
+
+
+def _client(factory):
+    client = report(factory)
+    client.makeConnection(FakeTransport())
+    return client
+
+
+class TestClientQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.factory = reportFactory({'REPORTS': {'REPORT_CLIENTS': ['*']}})
+        self.factory.clients = []
+        self.client = _client(self.factory)
+
+    def _sent(self):
+        return b''.join(self.client.transport.written)
+
+    def test_direct_write_when_not_paused(self):
+        self.factory.send_clients(EVT + b'one')
+        self.assertIn(EVT + b'one', self._sent())
+        self.assertIs(self.client.transport.producer, self.client)
+
+    def test_snapshots_coalesce_while_paused(self):
+        self.client.pauseProducing()
+        self.client.queue_message(SND + b'old')
+        self.client.queue_message(EVT + b'event')
+        self.client.queue_message(CFG + b'cfg')
+        self.client.queue_message(SND + b'new')
+        self.assertEqual(list(self.client._queue), [SND + b'new', EVT + b'event', CFG + b'cfg'])
+        self.assertEqual((self.client.coalesced, self.factory.coalesced), (1, 1))
+        self.assertEqual(self._sent(), b'')
+        self.client.resumeProducing()
+        sent = self._sent()
+        self.assertNotIn(b'old', sent)
+        self.assertLess(sent.index(b'new'), sent.index(b'event'))
+        self.assertEqual(len(self.client._queue), 0)
+
+    def test_events_drop_oldest_when_full(self):
+        self.client.pauseProducing()
+        for i in range(report.QUEUE_MAX + 5):
+            self.client.queue_message(EVT + str(i).encode())
+        self.assertEqual(len(self.client._queue), report.QUEUE_MAX)
+        self.assertEqual(self.client._queue[0], EVT + b'5')
+        self.assertEqual((self.client.dropped, self.factory.dropped), (5, 5))
+
+    def test_order_kept_after_resume(self):
+        self.client.pauseProducing()
+        self.client.queue_message(EVT + b'a')
+        self.client.resumeProducing()
+        self.client.queue_message(EVT + b'b')
+        sent = self._sent()
+        self.assertLess(sent.index(b'a'), sent.index(b'b'))
+
+
+class TestOffReactorEncode(unittest.TestCase):
+
+    def setUp(self):
+        self._prev = getattr(bm, 'BRIDGES', None)
+        bm.BRIDGES = {'326': [{'SYSTEM': 'SYSTEM-1', 'TS': 1, 'TGID': TG, 'ACTIVE': True, 'TIMEOUT': 600,
+                               'TO_TYPE': 'ON', 'TIMER': 100.0, 'ON': [TG]}]}
+        patcher = mock.patch.object(bm, 'reactor')
+        self.reactor = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = bm.bridgeReportFactory({'REPORTS': {'REPORT_CLIENTS': ['*']}})
+        self.factory.clients = []
+        self.client = _client(self.factory)
+
+    def tearDown(self):
+        if self._prev is None:
+            del bm.BRIDGES
+        else:
+            bm.BRIDGES = self._prev
+
+    def test_tables_coalesce_while_worker_busy(self):
+        self.factory.send_bridge()
+        self.assertEqual(self.reactor.callInThread.call_count, 1)
+        bm.BRIDGES['326'][0]['TIMER'] = 200.0
+        self.factory.send_bridge()
+        bm.BRIDGES['326'][0]['TIMER'] = 300.0
+        self.factory.send_bridge()
+        # One job in flight, one pending table holding the newest state
+        self.assertEqual(self.reactor.callInThread.call_count, 1)
+        self.assertEqual(len(self.factory._report_jobs), 1)
+        self.assertEqual(self.factory.coalesced, 1)
+        self.assertNotIn(SND, b''.join(self.client.transport.written))
+
+        # Worker finishes: its result is handed back via callFromThread
+        work = self.reactor.callInThread.call_args.args[0]
+        work()
+        done = self.reactor.callFromThread.call_args.args
+        done[0](*done[1:])
+        self.assertIn(SND, b''.join(self.client.transport.written))
+        # ...and the pending table goes straight to the worker
+        self.assertEqual(self.reactor.callInThread.call_count, 2)
+        self.assertEqual(len(self.factory._report_jobs), 0)
+
+    def test_no_clients_no_work(self):
+        self.factory.clients = []
+        self.factory.send_bridge()
+        self.reactor.callInThread.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""report_sql BatchEventWriter: batching, bounded queue and retry (sqlite stand-in)."""
+import sqlite3
+import unittest
+from unittest import mock
+
+from report_sql import FEED_COLUMNS, BatchEventWriter, reportClient
+
+
+def _connect():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('create table feed (id integer primary key, {})'.format(', '.join(FEED_COLUMNS)))
+    return conn
+
+
+def _event(i):
+    return {'type': 'GROUP VOICE', 'event': 'START', 'trx': 'RX', 'system': 'SYSTEM-1',
+            'streamid': str(i), 'peerid': '2345', 'subid': '2345001', 'slot': '1',
+            'dstid': '235', 'duration': 0}
+
+
+class InlineReactor(object):
+
+    def __init__(self):
+        self.pending = []
+
+    def callInThread(self, fn, *args):
+        self.pending.append((fn, args))
+
+    def callFromThread(self, fn, *args):
+        fn(*args)
+
+    def run(self):
+        while self.pending:
+            fn, args = self.pending.pop(0)
+            fn(*args)
+
+
+class TestBatchEventWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = _connect()
+        self.reactor = InlineReactor()
+        self.writer = BatchEventWriter(self.reactor, mock.Mock(side_effect=AssertionError('no reconnect')),
+                                       placeholder='?', batch_rows=10, max_queue=25,
+                                       connections=[self.conn])
+
+    def _rows(self):
+        return [row[0] for row in self.conn.execute('select streamid from feed order by id')]
+
+    def test_batches_in_order(self):
+        for i in range(23):
+            self.writer.add(_event(i))
+        # Two full batches were handed off but only one runs at a time
+        self.assertEqual(len(self.reactor.pending), 1)
+        self.reactor.run()
+        self.writer.flush()
+        self.reactor.run()
+        self.assertEqual(self._rows(), [str(i) for i in range(23)])
+        self.assertEqual((self.writer.written, len(self.writer)), (23, 0))
+
+    def test_event_is_parameterized(self):
+        event = _event(1)
+        event['system'] = "O'Brien'); drop table feed; --"
+        self.writer.add(event)
+        self.writer.flush()
+        self.reactor.run()
+        self.assertEqual(self.conn.execute('select system from feed').fetchone()[0], event['system'])
+
+    def test_failure_requeues_and_reconnects(self):
+        broken = mock.Mock()
+        broken.cursor.return_value.executemany.side_effect = sqlite3.OperationalError('gone away')
+        self.writer._pool.get_nowait()
+        self.writer._pool.put(broken)
+        self.writer._connect = mock.Mock(return_value=self.conn)
+        for i in range(5):
+            self.writer.add(_event(i))
+        self.writer.flush()
+        with mock.patch('builtins.print'):
+            self.reactor.run()
+        broken.close.assert_called_once_with()
+        self.assertEqual((self.writer.failed, len(self.writer)), (1, 5))
+        self.writer.flush()
+        self.reactor.run()
+        self.assertEqual(self._rows(), [str(i) for i in range(5)])
+        self.writer._connect.assert_called_once_with()
+
+    def test_queue_bound_drops_oldest(self):
+        self.writer.batch_rows = 100
+        for i in range(30):
+            self.writer.add(_event(i))
+        self.assertEqual((len(self.writer), self.writer.dropped), (25, 5))
+        self.writer.stop()
+        self.assertEqual(self._rows(), [str(i) for i in range(5, 30)])
+
+    def test_client_queues_without_writing(self):
+        client = reportClient(self.writer, self.reactor)
+        client.bridgeEvent('GROUP VOICE,END,RX,SYSTEM-1,1,2,3,1,235,4.20')
+        self.assertEqual(len(self.writer), 1)
+        self.assertEqual(self.reactor.pending, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
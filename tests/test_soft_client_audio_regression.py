@@ -44,13 +44,10 @@ class TestPerTargetPayloadIsolation(unittest.TestCase):
 
     def test_all_four_fanout_rewrites_use_private_payload(self):
         self.assertGreaterEqual(
-            self.source.count('_tx_dmrpkt = dmrpkt'),
-            4,
-        )
-        self.assertGreaterEqual(
-            self.source.count('dmrbits.frombytes(_tx_dmrpkt)'),
+            self.source.count('_tmp_data = fanout_payload(_fanout, _data,'),
             4,
         )
+        self.assertNotIn('dmrbits', self.source)
 
     def test_shared_payload_is_never_reassigned_after_lc_rewrite(self):
         self.assertIsNone(re.search(
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""SourceServerCache: precomputed OpenBridge source server verdicts match the per-frame checks."""
+import unittest
+from unittest import mock
+
+import bridge_master as bm
+from hblink import OPENBRIDGE, SOURCE_SERVERS, SourceServerCache
+
+DMR_IDS = {2345001, 310123}
+STREAM = b'\x01\x02\x03\x04'
+TGID = (2350).to_bytes(3, 'big')
+
+
+def _legacy(value, validate, server_ids):
+    # The string checks source_server_allowed ran per stream before the cache
+    _str = str(value)
+    if len(_str) < 4 or len(_str) > 7:
+        return False
+    if validate and len(_str) in (4, 5) and _str[:4] not in server_ids:
+        return False
+    if len(_str) > 5 and value not in DMR_IDS:
+        return False
+    return True
+
+
+class TestSourceServerCache(unittest.TestCase):
+
+    def _system(self, validate, server_ids):
+        config = {'GLOBAL': {'VALIDATE_SERVER_IDS': validate}, '_SERVER_IDS': server_ids}
+        system = mock.Mock(_CONFIG=config)
+        system.validate_id.side_effect = lambda _id: int.from_bytes(_id, 'big') in DMR_IDS
+        return system
+
+    def test_matches_string_checks(self):
+        values = [0, 7, 999, 1000, 2345, 2346, 23450, 23459, 23460, 99999, 100000, 310123,
+                  2345001, 9999999, 10000000, 4294967295]
+        for validate in (True, False):
+            for server_ids in ({'2345': 'UK', '3100': 'US'}, {}):
+                cache = SourceServerCache()
+                system = self._system(validate, server_ids)
+                for value in values:
+                    with self.subTest(validate=validate, server_ids=server_ids, value=value):
+                        # twice: the second answer comes from the set / remembered verdicts
+                        for _ in range(2):
+                            self.assertEqual(cache.check(system, value.to_bytes(4, 'big')) is None,
+                                             _legacy(value, validate, server_ids))
+
+    def test_allowed_set_and_rebuild(self):
+        cache = SourceServerCache()
+        system = self._system(True, {'2345': 'UK', '23456': 'junk', 'abcd': 'junk'})
+        cache.check(system, (2345).to_bytes(4, 'big'))
+        self.assertEqual(cache.allowed, frozenset(v.to_bytes(4, 'big') for v in [2345] + list(range(23450, 23460))))
+
+        # Aliases reloaded into the same CONFIG: the old verdict must not stick
+        self.assertIsNotNone(cache.check(system, (3100).to_bytes(4, 'big')))
+        system._CONFIG['_SERVER_IDS'] = {'3100': 'US'}
+        cache.rebuild(system._CONFIG)
+        self.assertIsNone(cache.check(system, (31005).to_bytes(4, 'big')))
+        self.assertIsNotNone(cache.check(system, (2345).to_bytes(4, 'big')))
+
+        # A six digit ID is looked up once
+        system.validate_id.reset_mock()
+        for _ in range(3):
+            self.assertIsNone(cache.check(system, (310123).to_bytes(4, 'big')))
+        self.assertEqual(system.validate_id.call_count, 1)
+
+
+class TestSourceServerAllowed(unittest.TestCase):
+
+    def setUp(self):
+        config = {
+            'GLOBAL': {'VALIDATE_SERVER_IDS': True},
+            '_SERVER_IDS': {'2345': 'UK'}, '_SUB_IDS': {}, '_PEER_IDS': {}, '_LOCAL_SUBSCRIBER_IDS': {},
+            'SYSTEMS': {'OBP-1': {'MODE': 'OPENBRIDGE', 'TARGET_IP': None}},
+        }
+        self.obp = OPENBRIDGE('OBP-1', config, None)
+
+    def test_rejects_once_per_stream(self):
+        self.assertTrue(self.obp.source_server_allowed((23451).to_bytes(4, 'big'), TGID, STREAM))
+        with self.assertLogs('hblink', 'WARNING') as logs:
+            self.assertFalse(self.obp.source_server_allowed((31001).to_bytes(4, 'big'), TGID, STREAM))
+            self.assertFalse(self.obp.source_server_allowed((31001).to_bytes(4, 'big'), TGID, STREAM))
+            self.assertFalse(self.obp.source_server_allowed((12).to_bytes(4, 'big'), TGID, b'\x05\x06\x07\x08'))
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('not in list: 31001', logs.output[0])
+        self.assertIn('between 4 and 7 digits, discarding Src: 12', logs.output[1])
+
+    def test_alias_reload_rebuilds(self):
+        prev = {name: getattr(bm, name, None) for name in ('CONFIG', 'server_ids')}
+        bm.CONFIG = self.obp._CONFIG
+        try:
+            self.assertFalse(self.obp.source_server_allowed((3100).to_bytes(4, 'big'), TGID, STREAM))
+            bm.setAlias({}, {}, {}, {}, {'3100': 'US'})
+            self.assertTrue(self.obp.source_server_allowed((3100).to_bytes(4, 'big'), TGID, STREAM))
+            self.assertIn((3100).to_bytes(4, 'big'), SOURCE_SERVERS.allowed)
+            # A list that failed to load keeps the previous one
+            bm.setAlias({}, {}, {}, {}, {})
+            self.assertEqual(self.obp._CONFIG['_SERVER_IDS'], {'3100': 'US'})
+            self.assertEqual(bm.server_ids, {'3100': 'US'})
+        finally:
+            for name, value in prev.items():
+                if value is None:
+                    delattr(bm, name)
+                else:
+                    setattr(bm, name, value)
+
+
+if __name__ == '__main__':
+    unittest.main()
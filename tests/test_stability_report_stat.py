@@ -73,7 +73,7 @@ class TestLazyMakeStatBridgeSource(unittest.TestCase):
         idx = source.find('def make_stat_bridge(_tgid):')
         self.assertGreater(idx, 0)
         block = source[idx:idx + 1200]
-        self.assertIn("TO_TYPE': 'STAT'", block)
+        self.assertIn("TO_TYPE='STAT'", block)
         self.assertNotIn('iter_routing_master_systems()', block)
         self.assertIn('def _ensure_master_on_legs', source)
         self.assertIn('_ensure_master_on_legs(bridge_name, system)', source)
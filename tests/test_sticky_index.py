@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Sticky-TG reverse index over SUB_MAP (STICKY_IDX)."""
+import unittest
+from unittest import mock
+
+import bridge_master as bm
+from bridge_helpers import build_sticky_index, sticky_index_key, sticky_index_update
+from subscriber_store import SubscriberRecord
+
+TG = b'\x00\x01\x46'  # 326
+TG2 = b'\x00\x01\x47'
+SUB = b'\x00\x00\x01'
+PEER = b'\x00\x00\x00\x0a'
+
+
+class TestStickyIndexHelpers(unittest.TestCase):
+
+    def test_key_skips_old_format_and_no_tg(self):
+        self.assertEqual(sticky_index_key(('S1', 1, TG, 10.0, PEER)), ('S1', 1, TG))
+        self.assertEqual(sticky_index_key(('S1', 1, TG, 10.0)), ('S1', 1, TG))
+        self.assertIsNone(sticky_index_key(('S1', 1, 10.0)))
+        self.assertIsNone(sticky_index_key(('S1', 1, None, 10.0, PEER)))
+        self.assertIsNone(sticky_index_key(None))
+
+    def test_update_moves_subscriber(self):
+        index = build_sticky_index({SUB: ('S1', 1, TG, 10.0, PEER)})
+        self.assertEqual(index, {('S1', 1, TG): {SUB}})
+        sticky_index_update(index, SUB, ('S1', 1, TG, 10.0, PEER), ('S1', 1, TG2, 20.0, PEER))
+        self.assertEqual(index, {('S1', 1, TG2): {SUB}})
+        sticky_index_update(index, SUB, ('S1', 1, TG2, 20.0, PEER), None)
+        self.assertEqual(index, {})
+
+
+class TestStickyIndexRouter(unittest.TestCase):
+
+    def setUp(self):
+        self._prev = {name: getattr(bm, name, None) for name in ('BRIDGES', 'CONFIG', 'SUB_MAP')}
+        bm.CONFIG = {
+            'SYSTEMS': {'SYSTEM-1': {'MODE': 'MASTER', 'STICKY_TG': True, 'DEFAULT_UA_TIMER': 10,
+                                     'OPTIONS': '', 'PEERS': {}}},
+            'REPORTS': {'REPORT': False},
+        }
+        bm.SUB_MAP = {}
+        bm.rebuild_sub_map_indexes()
+        bm.BRIDGES = {'326': [{
+            'SYSTEM': 'SYSTEM-1', 'TS': 1, 'TGID': TG, 'ACTIVE': True, 'TIMEOUT': 600,
+            'TO_TYPE': 'ON', 'OFF': [], 'ON': [TG], 'RESET': [], 'TIMER': 100.0}]}
+
+    def tearDown(self):
+        for name, value in self._prev.items():
+            if value is None:
+                delattr(bm, name)
+            else:
+                setattr(bm, name, value)
+        bm.STICKY_IDX = {}
+        bm.SUB_BUCKETS = bm.SubscriberBuckets()
+        bm._LEG_EXPIRY.clear()
+
+    def _timer_pass(self):
+        with mock.patch.object(bm, 'reactor'):
+            return bm._bridge_timer_pass('326', 200.0, bm._sticky_tg_systems())
+
+    def test_sticky_subscriber_keeps_leg_active(self):
+        bm._sub_map_set(SUB, SubscriberRecord('SYSTEM-1', 1, TG, 150.0, PEER))
+        used, next_deadline, changed = self._timer_pass()
+        self.assertTrue(bm.BRIDGES['326'][0]['ACTIVE'])
+        self.assertEqual(next_deadline, 200.0 + bm._STICKY_RECHECK_S)
+        self.assertFalse(changed)
+
+    def test_other_tg_or_cleared_subscriber_does_not(self):
+        bm._sub_map_set(SUB, SubscriberRecord('SYSTEM-1', 1, TG, 150.0, PEER))
+        bm._sub_map_set(SUB, SubscriberRecord('SYSTEM-1', 1, TG2, 160.0, PEER))
+        self.assertNotIn(('SYSTEM-1', 1, TG), bm.STICKY_IDX)
+        bm._sub_map_set(SUB, SubscriberRecord('SYSTEM-1', 1, TG, 170.0, PEER))
+        bm.clear_sub_map_for_peer(PEER)
+        self.assertEqual(bm.STICKY_IDX, {})
+        self._timer_pass()
+        self.assertFalse(bm.BRIDGES['326'][0]['ACTIVE'])
+
+    def test_peer_sticky_false_overrides_system(self):
+        bm.CONFIG['SYSTEMS']['SYSTEM-1']['PEERS'] = {PEER: {'STICKY': False}}
+        bm._sub_map_set(SUB, SubscriberRecord('SYSTEM-1', 1, TG, 150.0, PEER))
+        self._timer_pass()
+        self.assertFalse(bm.BRIDGES['326'][0]['ACTIVE'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Per-stream ingress verdict cache — ACLs run once per call, not per frame."""
+import unittest
+from unittest.mock import MagicMock, patch
+
+import config
+import const
+from config import acl_build, acl_tables_clear
+from hblink import HBSYSTEM, STREAM_VERDICTS, StreamVerdictCache
+
+
+PEER_ID = (235287).to_bytes(4, 'big')
+SOCKADDR = ('127.0.0.1', 62030)
+STREAM = b'\x00\x00\x12\x34'
+
+
+def _dmrd(rf_src, dst_id, seq=0, bits=0x00, stream=STREAM):
+    return b''.join([b'DMRD', bytes([seq]), rf_src.to_bytes(3, 'big'), dst_id.to_bytes(3, 'big'),
+                     PEER_ID, bytes([bits]), stream, bytes(33)])
+
+
+class TestStreamVerdictCache(unittest.TestCase):
+
+    def test_put_get_discard(self):
+        cache = StreamVerdictCache()
+        self.assertIsNone(cache.get('SYS', 1, STREAM, b'a', b'b'))
+        self.assertTrue(cache.put('SYS', 1, STREAM, b'a', b'b', True))
+        self.assertTrue(cache.get('SYS', 1, STREAM, b'a', b'b'))
+        self.assertIsNone(cache.get('SYS', 2, STREAM, b'a', b'b'))
+        cache.discard('SYS', 1, STREAM)
+        self.assertIsNone(cache.get('SYS', 1, STREAM, b'a', b'b'))
+
+    def test_changed_source_or_destination_misses(self):
+        cache = StreamVerdictCache()
+        cache.put('SYS', 1, STREAM, b'a', b'b', False)
+        self.assertIsNone(cache.get('SYS', 1, STREAM, b'a', b'c'))
+        self.assertEqual(len(cache), 0)
+
+    def test_stream_timeout(self):
+        cache = StreamVerdictCache(timeout=5)
+        with patch('hblink.time', return_value=100.0):
+            cache.put('SYS', 1, STREAM, b'a', b'b', True)
+        with patch('hblink.time', return_value=106.0):
+            self.assertIsNone(cache.get('SYS', 1, STREAM, b'a', b'b'))
+
+    def test_bounded(self):
+        cache = StreamVerdictCache(maxlen=4)
+        for i in range(10):
+            cache.put('SYS', 1, i.to_bytes(4, 'big'), b'a', b'b', True)
+        self.assertEqual(len(cache), 4)
+        self.assertIsNone(cache.get('SYS', 1, (0).to_bytes(4, 'big'), b'a', b'b'))
+        self.assertTrue(cache.get('SYS', 1, (9).to_bytes(4, 'big'), b'a', b'b'))
+
+    def test_acl_rebuild_invalidates(self):
+        cache = StreamVerdictCache()
+        cache.put('SYS', 1, STREAM, b'a', b'b', True)
+        acl_tables_clear()
+        self.assertIsNone(cache.get('SYS', 1, STREAM, b'a', b'b'))
+        self.assertEqual(cache.generation, config.ACL_GENERATION)
+
+    def test_process_acls_invalidates(self):
+        cache = StreamVerdictCache()
+        cache.put('SYS', 1, STREAM, b'a', b'b', True)
+        config.process_acls({
+            'GLOBAL': {'REG_ACL': 'PERMIT:ALL', 'SUB_ACL': 'DENY:1', 'TG1_ACL': 'PERMIT:ALL', 'TG2_ACL': 'PERMIT:ALL'},
+            'SYSTEMS': {},
+        })
+        self.assertIsNone(cache.get('SYS', 1, STREAM, b'a', b'b'))
+
+
+class TestMasterIngressUsesCache(unittest.TestCase):
+
+    def _make_master_stub(self, sub_acl='PERMIT:ALL'):
+        stub = HBSYSTEM.__new__(HBSYSTEM)
+        stub._system = 'MASTER-VC'
+        stub._CONFIG = {
+            'GLOBAL': {'USE_ACL': True,
+                       'SUB_ACL': acl_build(sub_acl, const.ID_MAX),
+                       'TG1_ACL': acl_build('PERMIT:ALL', const.ID_MAX),
+                       'TG2_ACL': acl_build('PERMIT:ALL', const.ID_MAX)},
+            'SYSTEMS': {
+                'MASTER-VC': {
+                    'MODE': 'MASTER',
+                    'USE_ACL': False,
+                    'REPEAT': False,
+                    'PEERS': {PEER_ID: {'CONNECTION': 'YES', 'SOCKADDR': SOCKADDR, 'LAST_PING': 0}},
+                },
+            },
+        }
+        stub._config = stub._CONFIG['SYSTEMS']['MASTER-VC']
+        stub._peers = stub._config['PEERS']
+        stub._laststrid = {1: b'', 2: b''}
+        stub._repeat_seq = {}
+        stub.dmrd_received = MagicMock()
+        stub.acl_allowed = MagicMock(side_effect=HBSYSTEM.acl_allowed.__get__(stub, HBSYSTEM))
+        return stub
+
+    def setUp(self):
+        STREAM_VERDICTS.invalidate()
+
+    def test_acl_evaluated_once_per_stream(self):
+        stub = self._make_master_stub()
+        stub.master_datagramReceived(_dmrd(3120101, 91, bits=0x21), SOCKADDR)
+        for seq in range(1, 6):
+            stub.master_datagramReceived(_dmrd(3120101, 91, seq=seq, bits=seq % 6), SOCKADDR)
+        self.assertEqual(stub.acl_allowed.call_count, 1)
+        self.assertEqual(stub.dmrd_received.call_count, 6)
+
+    def test_denied_stream_dropped_without_reevaluation(self):
+        stub = self._make_master_stub(sub_acl='DENY:3120101')
+        for seq in range(5):
+            stub.master_datagramReceived(_dmrd(3120101, 91, seq=seq), SOCKADDR)
+        self.assertEqual(stub.acl_allowed.call_count, 1)
+        stub.dmrd_received.assert_not_called()
+
+    def test_vterm_evicts_stream(self):
+        stub = self._make_master_stub()
+        stub.master_datagramReceived(_dmrd(3120101, 91, bits=0x21), SOCKADDR)
+        stub.master_datagramReceived(_dmrd(3120101, 91, seq=1, bits=0x22), SOCKADDR)
+        self.assertIsNone(STREAM_VERDICTS.get('MASTER-VC', 1, STREAM, (3120101).to_bytes(3, 'big'),
+                                              (91).to_bytes(3, 'big')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -34,6 +34,14 @@ class TestBridgeIdxMissThrottle(unittest.TestCase):
         # Miss paths + stale hit paths use the helper
         self.assertGreaterEqual(source.count('_maybe_rebuild_bridge_index_on_miss('), 4)
 
+    def test_remove_uses_reverse_map(self):
+        with open('bridge_master.py', encoding='utf-8') as fh:
+            source = fh.read()
+        # Removal walks only the bridge's own keys, never every BRIDGE_IDX key
+        self.assertIn('BRIDGE_IDX_KEYS.pop(bridge_name, ())', source)
+        self.assertNotIn('for k, v in BRIDGE_IDX.items() if bridge_name in v', source)
+        self.assertIn('BRIDGE_IDX_KEYS = new_keys', source)
+
 
 class TestProxyReaperMstclAndRxTimer(unittest.TestCase):
 
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""SUB_MAP records, the versioned binary snapshot and the append-only journal."""
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+
+import bridge_master as bm
+from subscriber_store import (
+    SNAPSHOT_MAGIC,
+    SubscriberBuckets,
+    SubscriberJournal,
+    SubscriberRecord,
+    decode_snapshot,
+    encode_snapshot,
+    load_sub_map,
+    migrate_sub_map,
+    replay_wal,
+    write_snapshot,
+)
+
+SUB1 = b'\x00\x00\x01'
+SUB2 = b'\x00\x00\x02'
+SUB3 = b'\x00\x00\x03'
+TG = b'\x00\x01\x46'
+PEER = b'\x00\x00\x00\x0a'
+
+
+class TestSubscriberRecord(unittest.TestCase):
+
+    def test_legacy_tuple_shapes(self):
+        self.assertEqual(SubscriberRecord.from_entry(('S1', 1, 10.0)),
+                         SubscriberRecord('S1', 1, None, 10.0, None))
+        self.assertEqual(SubscriberRecord.from_entry(('S1', 2, TG, 10.0)).tg, TG)
+        rec = SubscriberRecord.from_entry(('S1', 2, TG, 10.0, PEER))
+        self.assertEqual(rec.peer_id, PEER)
+        # Still a 5-tuple for code that indexes entries
+        self.assertEqual(rec[0], 'S1')
+        self.assertEqual(len(rec), 5)
+        self.assertFalse(hasattr(rec, '__dict__'))
+        with self.assertRaises(ValueError):
+            SubscriberRecord.from_entry(('S1',))
+
+    def test_migrate_drops_invalid(self):
+        records, dropped = migrate_sub_map({SUB1: ('S1', 1, 10.0), SUB2: None, SUB3: ('S1', 1)})
+        self.assertEqual(list(records), [SUB1])
+        self.assertEqual(dropped, 2)
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.sub_map = {
+            SUB1: SubscriberRecord('SYSTEM-1', 1, TG, 1700000000.5, PEER),
+            SUB2: SubscriberRecord('SYSTEM-2', 2, None, 1700000001.0, None),
+            SUB3: SubscriberRecord('SYSTEM-1', 2, TG, 1700000002.0, None),
+        }
+
+    def test_round_trip(self):
+        data = encode_snapshot(self.sub_map)
+        self.assertTrue(data.startswith(SNAPSHOT_MAGIC))
+        self.assertEqual(decode_snapshot(data), self.sub_map)
+        self.assertEqual(decode_snapshot(encode_snapshot({})), {})
+
+    def test_damage_detected(self):
+        data = bytearray(encode_snapshot(self.sub_map))
+        data[20] ^= 0xff
+        with self.assertRaises(ValueError):
+            decode_snapshot(bytes(data))
+        with self.assertRaises(ValueError):
+            decode_snapshot(bytes(data[:10]))
+
+    def test_unrepresentable_record_skipped(self):
+        self.sub_map[b'\x01'] = SubscriberRecord('SYSTEM-1', 1, None, 1.0, None)
+        self.assertEqual(len(decode_snapshot(encode_snapshot(self.sub_map))), 3)
+
+    def test_legacy_pickle_migrates_then_atomic_write(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'sub_map.pkl')
+            with open(path, 'wb') as fh:
+                pickle.dump({SUB1: ('SYSTEM-1', 1, TG, 5.0), SUB2: ('SYSTEM-2', 2, 6.0)}, fh)
+            records, migrated = load_sub_map(path)
+            self.assertTrue(migrated)
+            self.assertEqual(records[SUB1], SubscriberRecord('SYSTEM-1', 1, TG, 5.0, None))
+            self.assertEqual(records[SUB2], SubscriberRecord('SYSTEM-2', 2, None, 6.0, None))
+
+            write_snapshot(path, records)
+            self.assertEqual(os.listdir(tmp), ['sub_map.pkl'])
+            reloaded, migrated = load_sub_map(path)
+            self.assertFalse(migrated)
+            self.assertEqual(reloaded, records)
+
+
+class TestBuckets(unittest.TestCase):
+
+    def test_expired_visits_only_old_buckets(self):
+        sub_map = {
+            SUB1: SubscriberRecord('S1', 1, None, 3600.0 * 10 + 5, None),     # hour 10
+            SUB2: SubscriberRecord('S1', 1, None, 3600.0 * 12 + 100, None),   # hour 12, before cutoff
+            SUB3: SubscriberRecord('S1', 1, None, 3600.0 * 12 + 900, None),   # hour 12, after cutoff
+        }
+        buckets = SubscriberBuckets.build(sub_map, width=3600)
+        self.assertEqual(buckets.bucket_count(), 2)
+        self.assertEqual(sorted(buckets.expired(sub_map, 3600.0 * 12 + 500)), [SUB1, SUB2])
+        self.assertEqual(buckets.expired(sub_map, 3600.0 * 9), [])
+
+    def test_update_moves_between_hours(self):
+        buckets = SubscriberBuckets(width=3600)
+        buckets.update(SUB1, None, 100.0)
+        buckets.update(SUB1, 100.0, 200.0)     # same hour: no move
+        buckets.update(SUB1, 200.0, 7300.0)
+        self.assertEqual(buckets.bucket_count(), 1)
+        sub_map = {SUB1: SubscriberRecord('S1', 1, None, 7300.0, None)}
+        self.assertEqual(buckets.expired(sub_map, 3600.0), [])
+        buckets.update(SUB1, 7300.0, None)
+        self.assertEqual(len(buckets), 0)
+
+    def test_stale_ids_dropped(self):
+        buckets = SubscriberBuckets.build({SUB1: SubscriberRecord('S1', 1, None, 100.0, None)})
+        self.assertEqual(buckets.expired({}, 1e9), [])
+        self.assertEqual(len(buckets), 0)
+
+    def test_trimmer_uses_buckets(self):
+        prev = {name: getattr(bm, name, None) for name in ('SUB_MAP', 'CONFIG')}
+        try:
+            bm.SUB_MAP = {
+                SUB1: SubscriberRecord('S1', 1, TG, 1000.0, None),
+                SUB2: SubscriberRecord('S1', 1, TG, 1000.0 + bm.SUB_MAP_TTL_S, None),
+            }
+            bm.CONFIG = {'ALIASES': {'SUB_MAP_FILE': ''}}
+            bm.rebuild_sub_map_indexes()
+            with mock.patch.object(bm, 'time', return_value=2000.0 + bm.SUB_MAP_TTL_S):
+                bm.SubMapTrimmer()
+            self.assertEqual(list(bm.SUB_MAP), [SUB2])
+            self.assertEqual(len(bm.SUB_BUCKETS), 1)
+            self.assertEqual(bm.STICKY_IDX, {('S1', 1, TG): {SUB2}})
+        finally:
+            for name, value in prev.items():
+                if value is None:
+                    delattr(bm, name)
+                else:
+                    setattr(bm, name, value)
+            bm.STICKY_IDX = {}
+            bm.SUB_BUCKETS = bm.SubscriberBuckets()
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, 'sub_map.pkl')
+        self.rec1 = SubscriberRecord('SYSTEM-1', 1, TG, 10.0, PEER)
+        self.rec2 = SubscriberRecord('SYSTEM-2', 2, None, 11.0, None)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_batches_coalesce_and_replay(self):
+        journal = SubscriberJournal(self.path)
+        journal.record(SUB1, self.rec2)
+        journal.record(SUB1, self.rec1)     # same second: only the last value is written
+        journal.record(SUB2, self.rec2)
+        self.assertEqual(journal.flush(), 2)
+        self.assertEqual(journal.flush(), 0)
+        journal.record(SUB2, None)
+        journal.close()
+        records, migrated, replayed = SubscriberJournal(self.path).load()
+        self.assertEqual(records, {SUB1: self.rec1})
+        self.assertFalse(migrated)
+        self.assertEqual(replayed, 3)
+
+    def test_torn_tail_ignored(self):
+        journal = SubscriberJournal(self.path)
+        journal.record(SUB1, self.rec1)
+        journal.record(SUB2, self.rec2)
+        journal.close()
+        with open(journal.wal_path, 'rb') as fh:
+            data = fh.read()
+        records = {}
+        self.assertEqual(replay_wal(data[:-3], records), (1, True))
+        self.assertEqual(records, {SUB1: self.rec1})
+
+    def test_interrupted_compaction_replays_rotated_log_first(self):
+        journal = SubscriberJournal(self.path)
+        journal.record(SUB1, self.rec1)
+        journal.flush()
+        self.assertTrue(journal.begin_compaction())
+        self.assertFalse(journal.begin_compaction())
+        # New changes land in a fresh log while the snapshot is pending
+        journal.record(SUB1, self.rec1._replace(time=20.0))
+        journal.flush()
+        records, _, _ = SubscriberJournal(self.path).load()
+        self.assertEqual(records[SUB1].time, 20.0)
+        # Completing the compaction drops the rotated log only
+        journal.finish_compaction({SUB1: self.rec1})
+        self.assertFalse(os.path.exists(journal.old_path))
+        records, _, replayed = SubscriberJournal(self.path).load()
+        self.assertEqual(records[SUB1].time, 20.0)
+        self.assertEqual(replayed, 1)
+        journal.close()
+
+    def test_failed_snapshot_keeps_rotated_log_through_next_compaction(self):
+        journal = SubscriberJournal(self.path)
+        journal.record(SUB1, self.rec1)
+        self.assertTrue(journal.begin_compaction())
+        with mock.patch('subscriber_store.write_snapshot', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                journal.finish_compaction({SUB1: self.rec1})
+        self.assertTrue(os.path.exists(journal.old_path))
+
+        journal.record(SUB2, self.rec2)
+        self.assertTrue(journal.begin_compaction())
+        # Crash before the second snapshot lands: nothing is lost
+        records, _, replayed = SubscriberJournal(self.path).load()
+        self.assertEqual(records, {SUB1: self.rec1, SUB2: self.rec2})
+        self.assertEqual(replayed, 2)
+        self.assertFalse(os.path.exists(journal.wal_path))
+
+        journal.finish_compaction(records)
+        self.assertFalse(os.path.exists(journal.old_path))
+        self.assertEqual(SubscriberJournal(self.path).load()[0], records)
+        journal.close()
+
+    def test_merge_drops_torn_tail_of_rotated_log(self):
+        journal = SubscriberJournal(self.path)
+        journal.record(SUB1, self.rec1)
+        journal.flush()
+        with open(journal.wal_path, 'ab') as fh:
+            fh.write(b'\x00\x00\x00\x20torn')
+        journal.close()
+        self.assertTrue(journal.begin_compaction())
+        journal.compacting = False    # the snapshot never landed
+        journal.record(SUB2, self.rec2)
+        self.assertTrue(journal.begin_compaction())
+        records, _, replayed = SubscriberJournal(self.path).load()
+        self.assertEqual((records, replayed), ({SUB1: self.rec1, SUB2: self.rec2}, 2))
+        journal.close()
+
+    def test_router_records_changes(self):
+        prev = {name: getattr(bm, name, None) for name in ('SUB_MAP', 'SUB_JOURNAL')}
+        try:
+            bm.SUB_MAP = {}
+            bm.SUB_JOURNAL = SubscriberJournal(self.path)
+            bm._sub_map_set(SUB1, self.rec1)
+            bm._sub_map_set(SUB2, self.rec2)
+            bm._sub_map_pop(SUB2)
+            bm.subMapJournalFlush()
+            bm.SUB_JOURNAL.close()
+            records, _, _ = SubscriberJournal(self.path).load()
+            self.assertEqual(records, bm.SUB_MAP)
+        finally:
+            for name, value in prev.items():
+                if value is None and name == 'SUB_MAP':
+                    delattr(bm, name)
+                else:
+                    setattr(bm, name, value)
+            bm.STICKY_IDX = {}
+            bm.SUB_BUCKETS = bm.SubscriberBuckets()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -93,5 +93,60 @@ class TestActivateUaNotify(unittest.TestCase):
         )
 
 
+class TestLazyUaBridgeLegs(unittest.TestCase):
+
+    def setUp(self):
+        self._prev_bridges = getattr(bm, 'BRIDGES', None)
+        self._prev_config = getattr(bm, 'CONFIG', None)
+        bm.CONFIG = {
+            'SYSTEMS': {
+                'SYSTEM-%d' % i: {'MODE': 'MASTER', 'DEFAULT_UA_TIMER': 10, 'OPTIONS': '', 'PEERS': {}}
+                for i in range(50)
+            },
+            'REPORTS': {'REPORT': False},
+        }
+        bm.CONFIG['SYSTEMS']['IPSC-198'] = {'MODE': 'IPSC', 'DEFAULT_UA_TIMER': 10}
+        bm.CONFIG['SYSTEMS']['OBP-1'] = {'MODE': 'OPENBRIDGE'}
+        bm.BRIDGES = {}
+        bm.rebuild_bridge_index()
+
+    def tearDown(self):
+        bm.BRIDGES = self._prev_bridges if self._prev_bridges is not None else {}
+        bm.rebuild_bridge_index()
+        if self._prev_bridges is None:
+            delattr(bm, 'BRIDGES')
+        if self._prev_config is None:
+            delattr(bm, 'CONFIG')
+        else:
+            bm.CONFIG = self._prev_config
+
+    def _systems(self):
+        return sorted((e['SYSTEM'], e['TS']) for e in bm.BRIDGES['326'])
+
+    def test_new_ua_bridge_has_source_and_obp_legs_only(self):
+        with mock.patch.object(bm, 'notify_bridge_table_updated'):
+            bm.make_single_bridge(b'\x00\x01\x46', 'SYSTEM-7', 2, 10)
+        self.assertEqual(self._systems(), [('OBP-1', 1), ('SYSTEM-7', 1), ('SYSTEM-7', 2)])
+        self.assertNotIn(('SYSTEM-8', 2, b'\x00\x01\x46'), bm.BRIDGE_IDX)
+
+    def test_other_master_joins_on_key_up(self):
+        with mock.patch.object(bm, 'notify_bridge_table_updated'):
+            bm.make_single_bridge(b'\x00\x01\x46', 'SYSTEM-7', 2, 10)
+            changed = bm.activate_ua_bridge_source('326', 'SYSTEM-8', 1)
+        self.assertTrue(changed)
+        legs = {(e['SYSTEM'], e['TS']): e for e in bm.BRIDGES['326']}
+        self.assertTrue(legs[('SYSTEM-8', 1)]['ACTIVE'])
+        self.assertFalse(legs[('SYSTEM-8', 2)]['ACTIVE'])
+        self.assertIn('326', bm.BRIDGE_IDX[('SYSTEM-8', 1, b'\x00\x01\x46')])
+
+    def test_linked_ipsc_leg_materialised(self):
+        bm.CONFIG['SYSTEMS']['SYSTEM-7']['OPTIONS'] = 'IPSC=IPSC-198'
+        with mock.patch.object(bm, 'notify_bridge_table_updated'):
+            bm.make_single_bridge(b'\x00\x01\x46', 'SYSTEM-7', 1, 10)
+        legs = {(e['SYSTEM'], e['TS']): e for e in bm.BRIDGES['326']}
+        self.assertTrue(legs[('IPSC-198', 1)]['ACTIVE'])
+        self.assertIn('326', bm.BRIDGE_IDX[('IPSC-198', 1, b'\x00\x01\x46')])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Batched UDP egress — sendmmsg flush, ordering and per-packet fallback."""
+import socket
+import unittest
+from unittest import mock
+
+import udp_egress
+from udp_egress import EgressBatch, encode_sockaddr, send_batch
+
+
+class _SocketTransport:
+    """Just enough of twisted.internet.udp.Port for the egress path."""
+
+    def __init__(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(('127.0.0.1', 0))
+        self.writes = 0
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def write(self, packet, addr):
+        self.writes += 1
+        self.socket.sendto(packet, addr)
+
+
+class TestUdpEgress(unittest.TestCase):
+
+    def setUp(self):
+        self.tx = _SocketTransport()
+        self.rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.rx.bind(('127.0.0.1', 0))
+        self.rx.settimeout(1)
+        self.addr = self.rx.getsockname()
+
+    def tearDown(self):
+        self.tx.socket.close()
+        self.rx.close()
+
+    def _drain(self, count):
+        return [self.rx.recv(2048) for _ in range(count)]
+
+    def test_sockaddr_layout(self):
+        name = encode_sockaddr(socket.AF_INET, ('127.0.0.1', 62031))
+        self.assertEqual(len(name), 16)
+        self.assertEqual(name[2:8], b'\xf2\x4f\x7f\x00\x00\x01')
+        name6 = encode_sockaddr(socket.AF_INET6, ('10.0.0.1', 62031))
+        self.assertEqual(len(name6), 28)
+        self.assertEqual(name6[8:24], socket.inet_pton(socket.AF_INET6, '::ffff:10.0.0.1'))
+
+    @unittest.skipUnless(udp_egress.sendmmsg_available(), 'sendmmsg not available')
+    def test_batch_delivers_in_order_with_one_syscall(self):
+        queue = [(b'DMRD' + bytes([i]) * 51, self.addr) for i in range(50)]
+        self.assertEqual(send_batch(self.tx, queue), 1)
+        self.assertEqual(self.tx.writes, 0)
+        self.assertEqual(self._drain(50), [packet for packet, addr in queue])
+
+    def test_fallback_writes_each_packet(self):
+        queue = [(bytes([i]) * 10, self.addr) for i in range(5)]
+        with mock.patch.object(udp_egress, '_sendmmsg', None):
+            self.assertEqual(send_batch(self.tx, queue), 5)
+        self.assertEqual(self.tx.writes, 5)
+        self.assertEqual(self._drain(5), [packet for packet, addr in queue])
+
+    def test_writes_queue_only_inside_wrapped_handler(self):
+        egress = EgressBatch()
+        egress.write(self.tx, b'direct', self.addr)
+        self.assertEqual(self.tx.writes, 1)
+
+        def handler(count):
+            for i in range(count):
+                egress.write(self.tx, bytes([i]) * 4, self.addr)
+            # Nested handlers (routing into another system) share the batch
+            egress.wrap(lambda: egress.write(self.tx, b'nested', self.addr))()
+            self.assertEqual(len(egress.pending[self.tx]), count + 1)
+
+        egress.wrap(handler)(3)
+        self.assertEqual(egress.pending, {})
+        self.assertEqual(egress.datagrams, 4)
+        self.assertEqual(self._drain(5), [b'direct', b'\x00' * 4, b'\x01' * 4, b'\x02' * 4, b'nested'])
+
+    def test_flush_runs_when_handler_raises(self):
+        egress = EgressBatch()
+
+        def handler():
+            egress.write(self.tx, b'before', self.addr)
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            egress.wrap(handler)()
+        self.assertEqual(egress.depth, 0)
+        self.assertEqual(self._drain(1), [b'before'])
+
+
+
+class TestBatchEgressSwitch(unittest.TestCase):
+
+    def _master(self, batch):
+        from hblink import HBSYSTEM
+
+        class _Probe(HBSYSTEM):
+            def master_datagramReceived(self, _data, _sockaddr):
+                self.depth_seen = udp_egress.EGRESS.depth
+
+        config = {
+            'GLOBAL': {'BATCH_EGRESS': batch},
+            'SYSTEMS': {'MASTER-1': {'MODE': 'MASTER', 'PEERS': {}}},
+        }
+        return _Probe('MASTER-1', config, None)
+
+    def test_disabled_routes_without_batching(self):
+        system = self._master(False)
+        system.datagramReceived(b'RPTPING', ('127.0.0.1', 62031))
+        self.assertEqual(system.depth_seen, 0)
+
+    def test_enabled_routes_inside_a_batch(self):
+        system = self._master(True)
+        system.datagramReceived(b'RPTPING', ('127.0.0.1', 62031))
+        self.assertEqual(system.depth_seen, 1)
+        self.assertEqual(udp_egress.EGRESS.depth, 0)
+
+if __name__ == '__main__':
+    unittest.main()
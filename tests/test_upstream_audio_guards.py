@@ -385,23 +385,24 @@ class TestPacketControlSourceGuards(unittest.TestCase):
             dmre_block)
 
     def test_dmre_sender_tags_negotiated_wire_version(self):
-        self.assertGreaterEqual(
-            self.hblink_source.count(
-                "_ver = self._config['VER'].to_bytes(1,'big')"),
-            2,
-        )
+        # The signing packer is keyed on the negotiated per-system VER
+        self.assertIn(
+            "_for = (self._config.get('VER', 1), self._config['PASSPHRASE'], self._CONFIG['GLOBAL']['SERVER_ID'])",
+            self.hblink_source)
+        self.assertIn('self._packer = obp_packer(_for[0], ', self.hblink_source)
         self.assertNotIn('_ver = VER.to_bytes', self.hblink_source)
 
     def test_dmrf_uses_full_timestamp_and_stale_guard(self):
-        self.assertIn("_timestamp = _packet[53:61]", self.hblink_source)
+        # The full 8-byte timestamp is unpacked by dmr_frame
+        self.assertIn("_f = _RX.decode_dmrf(_packet)", self.hblink_source)
+        self.assertIn("if (_f.timestamp / 1000000000) < (", self.hblink_source)
         self.assertIn("Stale DMRF packet discarded", self.hblink_source)
 
     def test_canned_audio_uses_reactor_backpressure(self):
-        self.assertIn('from threading import Event', self.bridge_source)
-        self.assertIn("if not getattr(reactor, 'running', False):",
-                      self.bridge_source)
-        self.assertIn('return done.wait(1.0) and sent[0]',
-                      self.bridge_source)
+        # HBP canned audio is paced on the reactor, not by sleeping threads
+        self.assertIn('VOICE_PLAYOUT.play(', self.bridge_source)
+        self.assertNotIn('sleep(0.058)', self.bridge_source)
+        self.assertNotIn('reactor.callInThread(sendSpeech', self.bridge_source)
         self.assertNotIn(
             'reactor.callFromThread(sendVoicePacket', self.bridge_source)
         self.assertIn('_bounded_reactor_call(', self.ipsc_master_source)
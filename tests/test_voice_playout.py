@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""PlayoutScheduler: one reactor timer pacing every canned voice stream."""
+import unittest
+
+from twisted.internet.task import Clock
+
+from voice_playout import FRAME_S, PlayoutScheduler
+
+
+class TestPlayoutScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.playout = PlayoutScheduler(self.clock)
+        self.sent = []
+
+    def _sender(self, name):
+        return lambda frame: self.sent.append((name, frame, self.clock.seconds()))
+
+    def _run(self, seconds, step=FRAME_S / 3):
+        end = self.clock.seconds() + seconds
+        while self.clock.seconds() < end:
+            self.clock.advance(step)
+
+    def test_paced_after_delay(self):
+        self.playout.play(range(5), self._sender('A'), delay=1.0)
+        self._run(2.0, step=0.001)
+        times = [t for _name, _frame, t in self.sent]
+        self.assertEqual([frame for _name, frame, _t in self.sent], list(range(5)))
+        # Delays round to whole frames
+        self.assertAlmostEqual(times[0], 1.0, delta=FRAME_S / 2)
+        for a, b in zip(times, times[1:]):
+            self.assertAlmostEqual(b - a, FRAME_S, delta=0.002)
+        # Idle again: no timer left behind
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+        self.assertEqual(len(self.playout), 0)
+
+    def test_many_streams_share_one_timer(self):
+        for i in range(300):
+            self.playout.play(range(3), self._sender(i), delay=0.5)
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self._run(1.0)
+        self.assertEqual(len(self.sent), 900)
+        # Every stream's first frame went out on the same tick
+        self.assertEqual(len({t for _name, frame, t in self.sent if frame == 0}), 1)
+
+    def test_no_drift_under_jitter(self):
+        self.playout.play(range(200), self._sender('A'), delay=FRAME_S)
+        # Each tick fires 5-20ms late; the schedule must not creep
+        late = [0.005, 0.02, 0.012]
+        i = 0
+        while self.clock.getDelayedCalls():
+            call = self.clock.getDelayedCalls()[0]
+            self.clock.advance(call.getTime() - self.clock.seconds() + late[i % 3])
+            i += 1
+        first, last = self.sent[0][2], self.sent[-1][2]
+        self.assertAlmostEqual(last - first, 199 * FRAME_S, delta=0.03)
+        self.assertEqual(self.playout.skipped, 0)
+
+    def test_late_reactor_skips_instead_of_bursting(self):
+        self.playout.play(range(10), self._sender('A'), delay=FRAME_S)
+        self.clock.advance(FRAME_S)
+        self.clock.advance(0.5)       # reactor stalled for ~8 frames
+        self._run(1.0)
+        times = [t for _name, _frame, t in self.sent]
+        self.assertEqual(len(times), 10)
+        self.assertGreater(self.playout.skipped, 0)
+        for a, b in zip(times, times[1:]):
+            self.assertGreaterEqual(b - a, FRAME_S - 0.001)
+
+    def test_stop_on_false_error_or_cancel(self):
+        calls = []
+
+        def refuse(frame):
+            calls.append(frame)
+            return False
+
+        def broken(frame):
+            raise KeyError('gone')
+
+        self.playout.play(range(5), refuse, delay=FRAME_S)
+        self.playout.play(range(5), broken, delay=FRAME_S)
+        cancelled = self.playout.play(range(5), self._sender('C'), delay=FRAME_S)
+        cancelled.cancel()
+        self.playout.play(range(2), self._sender('D'), delay=FRAME_S)
+        with self.assertLogs('voice_playout', 'ERROR'):
+            self._run(1.0)
+        self.assertEqual(calls, [0])
+        self.assertEqual([name for name, _frame, _t in self.sent], ['D', 'D'])
+
+
+if __name__ == '__main__':
+    unittest.main()
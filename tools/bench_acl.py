@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+bench_acl.py – micro-benchmark for the compiled ACL tables used by
+hblink.acl_check.
+
+Run from the repository root (no live RYSEN instance required):
+
+    python3 tools/bench_acl.py [entries ...]
+
+For each list size a DENY ACL of single IDs and ranges is built with
+config.acl_build, then the legacy linear scan and the compiled table are
+timed over the same mix of subscriber IDs (mostly misses, which is the
+worst case for the linear scan). Both paths are checked for parity first.
+"""
+import os
+import random
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import const
+from config import acl_build, acl_compile, acl_tables_clear
+
+
+def linear_acl_check(_id, _acl):
+    """The pre-compiled acl_check: a full walk of the (start, end) list."""
+    id = int.from_bytes(_id, 'big')
+    for entry in _acl[1]:
+        if entry[0] <= id <= entry[1]:
+            return _acl[0]
+    return not _acl[0]
+
+
+def make_acl(entries, rng):
+    parts = []
+    for _ in range(entries):
+        start = rng.randint(const.ID_MIN, 9000000)
+        if rng.random() < 0.2:
+            parts.append('{}-{}'.format(start, start + rng.randint(1, 500)))
+        else:
+            parts.append(str(start))
+    return acl_build('DENY:' + ','.join(parts), const.ID_MAX)
+
+
+def bench(entries, lookups=20000, seed=1):
+    rng = random.Random(seed)
+    acl = make_acl(entries, rng)
+    # A voice call repeats the same few IDs; model ~200 live subscribers
+    pool = [rng.randint(const.ID_MIN, 9000000).to_bytes(3, 'big') for _ in range(200)]
+    ids = [rng.choice(pool) for _ in range(lookups)]
+
+    acl_tables_clear()
+    for _id in pool:
+        assert linear_acl_check(_id, acl) == acl_compile(acl).check(_id)
+
+    t0 = perf_counter()
+    for _id in ids:
+        linear_acl_check(_id, acl)
+    linear = perf_counter() - t0
+
+    acl_tables_clear()
+    t0 = perf_counter()
+    table = acl_compile(acl)
+    compile_s = perf_counter() - t0
+
+    t0 = perf_counter()
+    for _id in ids:
+        acl_compile(acl).check(_id)
+    compiled = perf_counter() - t0
+
+    # Uncached path: bisect/hash only, every ID new to the table
+    uncached_ids = [rng.randint(const.ID_MIN, 9000000) for _ in range(lookups)]
+    t0 = perf_counter()
+    for _int_id in uncached_ids:
+        table.match(_int_id)
+    bisect_s = perf_counter() - t0
+
+    return linear, compiled, bisect_s, compile_s, lookups
+
+
+if __name__ == '__main__':
+    sizes = [int(a) for a in sys.argv[1:]] or [10, 100, 1000, 5000, 20000]
+    print(f'{"entries":>8} {"linear us":>10} {"cached us":>10} {"bisect us":>10} {"compile ms":>11} {"speedup":>8}')
+    for size in sizes:
+        linear, compiled, bisect_s, compile_s, n = bench(size)
+        print(f'{size:>8} {linear / n * 1e6:>10.3f} {compiled / n * 1e6:>10.3f} '
+              f'{bisect_s / n * 1e6:>10.3f} {compile_s * 1e3:>11.2f} {linear / compiled:>7.0f}x')
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+bench_bridge_legs.py – memory benchmark for the BRIDGES table, per-leg
+dicts versus bridge_helpers.BridgeLeg.
+
+Run from the repository root (no live RYSEN instance required):
+
+    python3 tools/bench_bridge_legs.py [tgs] [masters]
+
+Builds the table make_single_bridge would leave behind for `tgs` UA
+talkgroups on `masters` GENERATOR slots (two legs per master plus one
+OBP leg per TG), once with the legacy dict literals and once with
+BridgeLeg. Each variant runs in its own child process so the RSS growth
+is not polluted by the other. The last column times a leg['TGID'] /
+leg['ACTIVE'] read pair, the access the routing loops make per leg.
+"""
+import os
+import subprocess
+import sys
+from time import perf_counter, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dmr_utils3.utils import bytes_3
+
+from bridge_helpers import BridgeLeg
+
+
+def rss_kib():
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def dict_leg(system, ts, tgid):
+    return {'SYSTEM': system, 'TS': ts, 'TGID': tgid, 'ACTIVE': False, 'TIMEOUT': 600,
+            'TO_TYPE': 'ON', 'OFF': [], 'ON': [tgid, ], 'RESET': [], 'TIMER': time()}
+
+
+def slot_leg(system, ts, tgid):
+    return BridgeLeg(SYSTEM=system, TS=ts, TGID=tgid, ACTIVE=False, TIMEOUT=600,
+                     TO_TYPE='ON', ON=[tgid, ], TIMER=time())
+
+
+def dict_obp(system, tgid):
+    return {'SYSTEM': system, 'TS': 1, 'TGID': tgid, 'ACTIVE': True, 'TIMEOUT': '',
+            'TO_TYPE': 'NONE', 'OFF': [], 'ON': [], 'RESET': [], 'TIMER': time()}
+
+
+def slot_obp(system, tgid):
+    return BridgeLeg(SYSTEM=system, TS=1, TGID=tgid, ACTIVE=True, TIMEOUT='',
+                     TO_TYPE='NONE', TIMER=time())
+
+
+def build(variant, tgs, masters):
+    leg, obp = (dict_leg, dict_obp) if variant == 'dict' else (slot_leg, slot_obp)
+    systems = ['SYSTEM-{}'.format(i) for i in range(masters)]
+    bridges = {}
+    for tg in range(1000, 1000 + tgs):
+        # make_single_bridge calls bytes_3 per leg, so every leg starts with its own TGID
+        bridges[str(tg)] = [leg(system, ts, bytes_3(tg)) for system in systems for ts in (1, 2)]
+        bridges[str(tg)].append(obp('OBP-1', bytes_3(tg)))
+    return bridges
+
+
+def child(variant, tgs, masters):
+    before = rss_kib()
+    bridges = build(variant, tgs, masters)
+    after = rss_kib()
+    legs = [leg for entries in bridges.values() for leg in entries][:200000]
+    t0 = perf_counter()
+    for leg in legs:
+        leg['TGID']
+        leg['ACTIVE']
+    access = (perf_counter() - t0) / len(legs)
+    nlegs = sum(len(entries) for entries in bridges.values())
+    print(nlegs, after - before, access)
+
+
+def run(variant, tgs, masters):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', variant, str(tgs), str(masters)],
+                         check=True, capture_output=True, text=True).stdout.split()
+    return int(out[0]), int(out[1]), float(out[2])
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--child']:
+        child(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+        sys.exit(0)
+    tgs = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    masters = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    print(f'{tgs} TGs x {masters} masters')
+    print(f'{"variant":>9} {"legs":>9} {"RSS MiB":>9} {"B/leg":>7} {"read ns":>8}')
+    results = {}
+    for variant in ('dict', 'BridgeLeg'):
+        nlegs, kib, access = run(variant, tgs, masters)
+        results[variant] = kib
+        print(f'{variant:>9} {nlegs:>9} {kib / 1024:>9.1f} {kib * 1024 / nlegs:>7.0f} {access * 1e9:>8.0f}')
+    print(f'RSS saved: {(results["dict"] - results["BridgeLeg"]) / 1024:.1f} MiB '
+          f'({results["dict"] / max(results["BridgeLeg"], 1):.1f}x smaller)')
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+bench_frame_ring.py – per-frame cost and memory of the PacketControl
+duplicate check: FrameRing (bridge_helpers) versus an unbounded set of
+frame fingerprints per stream, as the old 'crcs' sets would have grown.
+
+Run from the repository root (no live RYSEN instance required):
+
+    python3 tools/bench_frame_ring.py [frames]
+
+One long stream of 53-byte DMRD frames (a 10 minute QSO is ~10000 frames),
+every frame checked and remembered once.
+"""
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bridge_helpers import FrameRing
+from const import DMRD
+
+
+def best(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = perf_counter()
+        result = fn()
+        times.append(perf_counter() - t0)
+    return min(times), result
+
+
+def stream(n):
+    return [b''.join([DMRD, bytes([i & 0xff]), os.urandom(15), (i % 50000).to_bytes(33, 'big')]) for i in range(n)]
+
+
+def with_set(frames):
+    seen = set()
+    for data in frames:
+        _key = hash(data)
+        if _key not in seen:
+            seen.add(_key)
+    return seen
+
+
+def with_ring(frames):
+    ring = FrameRing()
+    for data in frames:
+        ring.add(data)
+    return ring
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    frames = stream(n)
+    t_set, seen = best(lambda: with_set(frames))
+    t_ring, ring = best(lambda: with_ring(frames))
+    print(f'{n} frames in one stream')
+    print(f'unbounded set   {t_set / n * 1e9:6.0f} ns/frame  {sys.getsizeof(seen):>10} bytes held')
+    print(f'FrameRing       {t_ring / n * 1e9:6.0f} ns/frame  '
+          f'{sys.getsizeof(ring._seen) + sys.getsizeof(ring._ring):>10} bytes held')
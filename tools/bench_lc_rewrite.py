@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+bench_lc_rewrite.py – micro-benchmark for the per-leg LC rewrite done in
+bridge_master to_target fanout.
+
+Run from the repository root (no live RYSEN instance required):
+
+    python3 tools/bench_lc_rewrite.py [legs ...]
+
+For each fanout width a superframe (header, bursts A-F, terminator) is
+rewritten once per leg, first with the legacy bitarray splice and then
+with the precomputed int templates from bridge_helpers. Both paths are
+checked for parity first. The last column models a GENERATOR bridge where
+every leg shares one TGID and slot, so bridge_helpers.fanout_payload
+builds the packet once per frame. Figures are per source frame.
+"""
+import os
+import random
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bitarray import bitarray
+from dmr_utils3 import bptc
+
+from bridge_helpers import fanout_payload, lc_rewrite_templates, rewrite_burst_lc
+from const import HBPF_DATA_SYNC, HBPF_SLT_VHEAD, HBPF_SLT_VTERM, HBPF_VOICE, HBPF_VOICE_SYNC
+
+FRAMES = [(HBPF_DATA_SYNC, HBPF_SLT_VHEAD), (HBPF_VOICE_SYNC, 0)]
+FRAMES += [(HBPF_VOICE, vseq) for vseq in range(1, 6)]
+FRAMES += [(HBPF_DATA_SYNC, HBPF_SLT_VTERM)]
+
+
+def bitarray_rewrite(dmrpkt, frame_type, dtype_vseq, lcs):
+    """The pre-template fanout rewrite, LCs already encoded per call."""
+    h_lc, t_lc, emb_lc = lcs
+    dmrbits = bitarray(endian='big')
+    dmrbits.frombytes(dmrpkt)
+    if frame_type == HBPF_DATA_SYNC and dtype_vseq == HBPF_SLT_VHEAD:
+        dmrbits = h_lc[0:98] + dmrbits[98:166] + h_lc[98:197]
+    elif frame_type == HBPF_DATA_SYNC and dtype_vseq == HBPF_SLT_VTERM:
+        dmrbits = t_lc[0:98] + dmrbits[98:166] + t_lc[98:197]
+    elif dtype_vseq in [1, 2, 3, 4]:
+        dmrbits = dmrbits[0:116] + emb_lc[dtype_vseq] + dmrbits[148:264]
+    return dmrbits.tobytes()
+
+
+def bench(legs, superframes=200, seed=1):
+    rng = random.Random(seed)
+    data = b'DMRD' + bytes(rng.getrandbits(8) for _ in range(51))
+    dmrpkt = data[20:53]
+    lcs = [b'\x00\x00\x00' + (9 + leg).to_bytes(3, 'big') + b'\x2f\x9b\x65' for leg in range(legs)]
+    old = [(bptc.encode_header_lc(lc), bptc.encode_terminator_lc(lc), bptc.encode_emblc(lc)) for lc in lcs]
+    new = [lc_rewrite_templates(lc) for lc in lcs]
+
+    for frame_type, dtype_vseq in FRAMES:
+        for leg in range(legs):
+            assert bitarray_rewrite(dmrpkt, frame_type, dtype_vseq, old[leg]) == \
+                rewrite_burst_lc(dmrpkt, frame_type, dtype_vseq, new[leg])
+
+    t0 = perf_counter()
+    for _ in range(superframes):
+        for frame_type, dtype_vseq in FRAMES:
+            for leg in old:
+                bitarray_rewrite(dmrpkt, frame_type, dtype_vseq, leg)
+    legacy = perf_counter() - t0
+
+    t0 = perf_counter()
+    for _ in range(superframes):
+        for frame_type, dtype_vseq in FRAMES:
+            for leg in new:
+                rewrite_burst_lc(dmrpkt, frame_type, dtype_vseq, leg)
+    templated = perf_counter() - t0
+
+    # GENERATOR fanout: SYSTEM-0..N all carry the same TGID on the same slot
+    shared = new[0]
+    tgid = lcs[0][3:6]
+    t0 = perf_counter()
+    for _ in range(superframes):
+        for frame_type, dtype_vseq in FRAMES:
+            _fanout = {}
+            for _ in range(legs):
+                fanout_payload(_fanout, data, tgid, 0xa1, dmrpkt, frame_type, dtype_vseq, shared, data[53:55])
+    deduped = perf_counter() - t0
+
+    return legacy, templated, deduped, superframes * len(FRAMES)
+
+
+if __name__ == '__main__':
+    sizes = [int(a) for a in sys.argv[1:]] or [1, 10, 50, 200]
+    print(f'{"legs":>6} {"bitarray us":>12} {"template us":>12} {"speedup":>8} {"generator us":>13}')
+    for size in sizes:
+        legacy, templated, deduped, n = bench(size)
+        print(f'{size:>6} {legacy / n * 1e6:>12.2f} {templated / n * 1e6:>12.2f} '
+              f'{legacy / templated:>7.1f}x {deduped / n * 1e6:>13.2f}')
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+bench_leg_expiry.py – rule timer cost, full BRIDGES sweep versus the
+per-bridge ExpiryQueue driven by leg_expiry_loop.
+
+Run from the repository root (no live RYSEN instance required):
+
+    python3 tools/bench_leg_expiry.py [legs] [due]
+
+Builds `legs` UA legs (two per bridge, one of them active with a pending
+TIMER) and times:
+
+  sweep   one pass of the old 52 s rule_timer_loop shape: visit every leg
+          and compare its TIMER against now.
+  arm     scheduling every bridge into a fresh ExpiryQueue (what
+          rebuild_bridge_index does at startup).
+  tick    one leg_expiry_loop tick where `due` bridges have expired: pop
+          the due keys and re-evaluate only their legs.
+  idle    one tick where nothing is due (the common 1 s case).
+"""
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dmr_utils3.utils import bytes_3
+
+from bridge_helpers import BridgeLeg, ExpiryQueue, bridge_next_deadline
+
+NOW = 1000000.0
+
+
+def build(legs, due):
+    bridges = {}
+    for i in range(legs // 2):
+        tgid = bytes_3(1000 + i)
+        # The first `due` bridges expire now; the rest spread over the next 15 minutes
+        timer = NOW - 1.0 if i < due else NOW + 1.0 + (i % 900)
+        bridges[str(1000 + i)] = [
+            BridgeLeg(SYSTEM='SYSTEM-1', TS=1, TGID=tgid, ACTIVE=True, TIMEOUT=600,
+                      TO_TYPE='ON', ON=[tgid], TIMER=timer),
+            BridgeLeg(SYSTEM='SYSTEM-1', TS=2, TGID=tgid, ACTIVE=False, TIMEOUT=600,
+                      TO_TYPE='ON', ON=[tgid], TIMER=0.0),
+        ]
+    return bridges
+
+
+def sweep(bridges, now):
+    expired = 0
+    for entries in bridges.values():
+        for leg in entries:
+            if leg['TO_TYPE'] == 'ON' and leg['ACTIVE'] and leg['TIMER'] < now:
+                expired += 1
+    return expired
+
+
+def arm(bridges):
+    queue = ExpiryQueue()
+    for name, entries in bridges.items():
+        deadline = bridge_next_deadline(entries)
+        if deadline is not None:
+            queue.schedule(name, deadline)
+    return queue
+
+
+def tick(bridges, queue, now):
+    expired = 0
+    for name in queue.pop_due(now):
+        for leg in bridges[name]:
+            if leg['TO_TYPE'] == 'ON' and leg['ACTIVE'] and leg['TIMER'] < now:
+                expired += 1
+        deadline = bridge_next_deadline(bridges[name])
+        if deadline is not None:
+            queue.schedule(name, deadline)
+    return expired
+
+
+def best(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = perf_counter()
+        result = fn()
+        times.append(perf_counter() - t0)
+    return min(times), result
+
+
+if __name__ == '__main__':
+    legs = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    due = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    bridges = build(legs, due)
+    print(f'{legs} legs in {len(bridges)} bridges, {due} due')
+
+    t_sweep, n_sweep = best(lambda: sweep(bridges, NOW))
+    t_arm, queue = best(lambda: arm(bridges), repeat=3)
+    # Each tick consumes its due entries, so time it on fresh queues
+    ticks = []
+    for _ in range(5):
+        fresh = arm(bridges)
+        t0 = perf_counter()
+        n_tick = tick(bridges, fresh, NOW)
+        ticks.append(perf_counter() - t0)
+    t_tick = min(ticks)
+    t_idle, _ = best(lambda: tick(bridges, queue, NOW - 10.0))
+
+    print(f'{"sweep":>6} {t_sweep * 1e3:>9.2f} ms  expired={n_sweep}')
+    print(f'{"arm":>6} {t_arm * 1e3:>9.2f} ms  queued={len(queue)}')
+    print(f'{"tick":>6} {t_tick * 1e6:>9.1f} us  expired={n_tick}')
+    print(f'{"idle":>6} {t_idle * 1e6:>9.1f} us')
+    print(f'sweep / tick: {t_sweep / max(t_tick, 1e-9):.0f}x')
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+bench_obp_stream_table.py – cost of one stream_trimmer_loop pass over an
+OpenBridge system's streams, the old full STATUS sweep versus
+ObpStreamTable.expire() (bridge_helpers).
+
+Run from the repository root (no live RYSEN instance required):
+
+    python3 tools/bench_obp_stream_table.py [streams]
+
+The table holds streams opened over the last 180 s, as a busy link would:
+about 5% still live, the rest finished or timed out and waiting to be
+forgotten. Each pass advances the clock 5 s, like the trimmer's timer.
+The sweep is the old loop's bookkeeping only, without logging.
+"""
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bridge_helpers import ObpStreamTable
+
+
+def populate(status, n, now):
+    for i in range(n):
+        _last = now - 180.0 * i / n
+        _stream = {'START': _last - 10, 'LAST': _last, 'RFS': b'\x00\x00\x01', 'TGID': b'\x00\x09\x2e',
+                   'RX_PEER': b'\x00\x00\x5b\x9a', 'packets': 100, 'loss': 0}
+        if i % 20:
+            _stream['_fin' if i % 3 else '_to'] = True
+        status[i.to_bytes(4, 'big')] = _stream
+
+
+def sweep(status, now):
+    # The bookkeeping of the old stream_trimmer_loop OBP branch
+    _timed_out = []
+    remove_list = []
+    fin_list = []
+    for stream_id in status:
+        if '_fin' in status[stream_id] and status[stream_id]['LAST'] < now - 180:
+            fin_list.append(stream_id)
+            continue
+        try:
+            if '_to' not in status[stream_id] and '_fin' not in status[stream_id] and status[stream_id]['LAST'] < now - 5:
+                status[stream_id]['_to'] = True
+                _timed_out.append(stream_id)
+                continue
+        except Exception:
+            status[stream_id]['LAST'] = now
+            continue
+        if status[stream_id]['LAST'] < now - 180:
+            remove_list.append(stream_id)
+    for stream_id in fin_list + remove_list:
+        status.pop(stream_id)
+    return len(_timed_out)
+
+
+def run(make, trim, n, passes=12):
+    status = make()
+    now = 1000.0
+    populate(status, n, now)
+    for _ in range(3):
+        now += 5.0
+        trim(status, now)
+    t0 = perf_counter()
+    for _ in range(passes):
+        now += 5.0
+        trim(status, now)
+    return (perf_counter() - t0) / passes
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    t_old = min(run(dict, sweep, n) for _ in range(5))
+    t_new = min(run(ObpStreamTable, lambda table, now: table.expire(now), n) for _ in range(5))
+    print(f'{n} streams held per OBP system, per trimmer pass')
+    print(f'STATUS sweep        {t_old * 1e3:8.3f} ms')
+    print(f'ObpStreamTable      {t_new * 1e3:8.3f} ms  x{t_old / t_new:.1f}')
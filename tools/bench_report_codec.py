@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+bench_report_codec.py – encode cost and bytes on the wire for each report
+payload format (report_codec: pickle, json, rbin).
+
+Run from the repository root (no live RYSEN instance required):
+
+    python3 tools/bench_report_codec.py [bridges]
+
+Encodes a BRIDGE_SND report table of `bridges` bridges with three legs
+each (the shape _safe_bridges_payload builds) and prints, per format, the
+best-of-five encode and decode time and the payload size.
+"""
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dmr_utils3.utils import bytes_3
+
+from report_codec import REPORT_FORMATS, dumps, loads
+
+
+def build(bridges):
+    table = {}
+    for i in range(bridges):
+        tgid = bytes_3(1000 + i)
+        table[str(1000 + i)] = [
+            {'SYSTEM': 'SYSTEM-{}'.format(s % 40 + i % 7), 'TS': 1 + s % 2, 'TGID': tgid,
+             'ACTIVE': s == 0, 'TIMEOUT': 600, 'TO_TYPE': 'ON', 'TIMER': 1700000000.0 + i,
+             'ON': [tgid]}
+            for s in range(3)
+        ]
+    return table
+
+
+def best(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = perf_counter()
+        result = fn()
+        times.append(perf_counter() - t0)
+    return min(times), result
+
+
+if __name__ == '__main__':
+    bridges = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    table = build(bridges)
+    print(f'{bridges} bridges, {bridges * 3} legs')
+    print(f'{"format":>7} {"encode":>10} {"decode":>10} {"bytes":>10}')
+    sizes = {}
+    for fmt in REPORT_FORMATS:
+        t_enc, data = best(lambda: dumps(fmt, table))
+        t_dec, _ = best(lambda: loads(fmt, data))
+        sizes[fmt] = len(data)
+        print(f'{fmt:>7} {t_enc * 1e3:>7.1f} ms {t_dec * 1e3:>7.1f} ms {len(data):>10}')
+    print(f'pickle / rbin bytes: {sizes["pickle"] / sizes["rbin"]:.1f}x')
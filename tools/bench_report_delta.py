@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+bench_report_delta.py – bridge report cost per send, full BRIDGE_SND pickle
+versus a BRIDGE_DELTA diff against the previously sent table.
+
+Run from the repository root (no live RYSEN instance required):
+
+    python3 tools/bench_report_delta.py [bridges] [changed]
+
+Builds a report table of `bridges` bridges with three legs each, then
+changes `changed` of them (one activation or timer refresh each) and
+times:
+
+  full    pickle.dumps of the whole table (what every client gets today).
+  diff    diff_bridges against the previous table plus encoding the ops.
+  apply   BridgeMirror.feed of that delta on the client side.
+"""
+import copy
+import os
+import pickle
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dmr_utils3.utils import bytes_3
+
+from report_codec import dumps
+from report_delta import BridgeMirror, delta_message, diff_bridges, full_message
+
+
+def build(bridges):
+    table = {}
+    for i in range(bridges):
+        tgid = bytes_3(1000 + i)
+        table[str(1000 + i)] = [
+            {'SYSTEM': 'SYSTEM-{}'.format(s), 'TS': 1 + s % 2, 'TGID': tgid, 'ACTIVE': s == 0,
+             'TIMEOUT': 600, 'TO_TYPE': 'ON', 'TIMER': 1000000.0 + i, 'ON': [tgid]}
+            for s in range(3)
+        ]
+    return table
+
+
+def mutate(table, changed):
+    new = copy.deepcopy(table)
+    for i, name in enumerate(list(new)[:changed]):
+        leg = new[name][i % 3]
+        if i % 2:
+            leg['TIMER'] += 600.0
+        else:
+            leg['ACTIVE'] = not leg['ACTIVE']
+    return new
+
+
+def best(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = perf_counter()
+        result = fn()
+        times.append(perf_counter() - t0)
+    return min(times), result
+
+
+if __name__ == '__main__':
+    bridges = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    changed = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    old = build(bridges)
+    new = mutate(old, changed)
+    print(f'{bridges} bridges, {bridges * 3} legs, {changed} changed')
+
+    t_full, full = best(lambda: pickle.dumps(new, protocol=2))
+    t_diff, delta = best(lambda: dumps('pickle', delta_message(2, diff_bridges(old, new))))
+
+    def apply():
+        mirror = BridgeMirror()
+        mirror.feed(snapshot)
+        t0 = perf_counter()
+        mirror.feed(delta)
+        return perf_counter() - t0
+    snapshot = dumps('pickle', full_message(1, old))
+    t_apply = min(apply() for _ in range(5))
+
+    print(f'{"full":>6} {t_full * 1e3:>9.2f} ms  {len(full):>9} bytes')
+    print(f'{"diff":>6} {t_diff * 1e3:>9.2f} ms  {len(delta):>9} bytes')
+    print(f'{"apply":>6} {t_apply * 1e3:>9.2f} ms')
+    print(f'bytes full / delta: {len(full) / max(len(delta), 1):.0f}x')
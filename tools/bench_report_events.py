@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+bench_report_events.py – cost of bridge events on the routing path and on
+the wire, per-event CSV BRDG_EVENT versus typed tuples batched into
+BRDG_EVENTS (report_events).
+
+Run from the repository root (no live RYSEN instance required):
+
+    python3 tools/bench_report_events.py [events]
+
+Times:
+
+  csv        the old call site: str.format with int_id on every ID,
+             encode, prefix the opcode (all on the reactor, per event).
+  tuple      bridge_event's hot-path work: build the event tuple and
+             append it to the buffer.
+  pack       pack_events for the whole buffer (one flush).
+  lazy csv   format_csv for the whole buffer, only paid when a legacy
+             client is connected.
+"""
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dmr_utils3.utils import int_id
+
+from report_events import BridgeEvent, format_csv, pack_events, unpack_events
+from reporting_const import REPORT_OPCODES
+
+
+def best(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = perf_counter()
+        result = fn()
+        times.append(perf_counter() - t0)
+    return min(times), result
+
+
+def packets(n):
+    return [('SYSTEM-{}'.format(i % 50), (1000000 + i).to_bytes(4, 'big'), b'\x0d\xf9\x0c\x25',
+             b'\x23\xd2\x31', (i & 1) + 1, b'\x00\x00\xeb', i % 300 / 10) for i in range(n)]
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    feed = packets(n)
+    _opcode = REPORT_OPCODES['BRDG_EVENT']
+
+    def csv():
+        return [b''.join([_opcode, 'GROUP VOICE,END,TX,{},{},{},{},{},{},{:.2f}'.format(
+            system, int_id(stream), int_id(peer), int_id(src), slot, int_id(tg), duration).encode(
+            encoding='utf-8', errors='ignore')]) for system, stream, peer, src, slot, tg, duration in feed]
+
+    def tuples():
+        buffer = []
+        _append = buffer.append
+        _kind = BridgeEvent.GROUP_VOICE_END
+        for system, stream, peer, src, slot, tg, duration in feed:
+            _append((_kind, 'TX', system, stream, peer, src, slot, tg, duration))
+        return buffer
+
+    t_csv, messages = best(csv)
+    t_tuple, events = best(tuples)
+    t_pack, batch = best(lambda: pack_events(events))
+    t_lazy, lines = best(lambda: [format_csv(event) for event in events])
+    assert [line.encode() for line in lines] == [message[1:] for message in messages]
+    assert len(unpack_events(batch)) == n
+
+    csv_bytes = sum(len(message) for message in messages)
+    print(f'{n} GROUP VOICE END events')
+    print(f'{"csv":>9} {t_csv * 1e3:>8.1f} ms  {t_csv / n * 1e6:>6.2f} us/event  {csv_bytes:>9} bytes in {n} messages')
+    print(f'{"tuple":>9} {t_tuple * 1e3:>8.1f} ms  {t_tuple / n * 1e6:>6.2f} us/event')
+    print(f'{"pack":>9} {t_pack * 1e3:>8.1f} ms  {t_pack / n * 1e6:>6.2f} us/event  {len(batch):>9} bytes in 1 message')
+    print(f'{"lazy csv":>9} {t_lazy * 1e3:>8.1f} ms  {t_lazy / n * 1e6:>6.2f} us/event')
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+bench_report_sql.py – BRDG_EVENT ingestion rate for report_sql, one
+execute + commit per event versus BatchEventWriter batches, against an
+on-disk sqlite database standing in for MySQL.
+
+Run from the repository root (no live RYSEN instance or MySQL required):
+
+    python3 tools/bench_report_sql.py [events] [batch_rows]
+
+Times:
+
+  per-event  parameterized execute + commit per event, the old
+             send_mysql shape, on the caller (reactor) thread.
+  enqueue    BatchEventWriter.add for every event: the only work left on
+             the reactor (batches are handed to a stub thread pool).
+  batched    the same events written with executemany + one commit per
+             batch_rows events (what the writer thread does).
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from report_sql import FEED_COLUMNS, BatchEventWriter
+
+
+class StubReactor(object):
+    # Collects batches instead of running them, so enqueue is timed alone
+
+    def __init__(self):
+        self.batches = []
+
+    def callInThread(self, fn, batch):
+        self.batches.append(batch)
+
+    def callFromThread(self, fn, *args):
+        fn(*args)
+
+
+def connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute('create table if not exists feed (id integer primary key, {})'.format(', '.join(FEED_COLUMNS)))
+    conn.commit()
+    return conn
+
+
+def events(n):
+    return [{'type': 'GROUP VOICE', 'event': 'END', 'trx': 'TX', 'system': 'SYSTEM-{}'.format(i % 50),
+             'streamid': str(1000000 + i), 'peerid': '234500101', 'subid': '2345001', 'slot': '1',
+             'dstid': '235', 'duration': '{:.2f}'.format(i % 300 / 10)} for i in range(n)]
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    batch_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    feed = events(n)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, 'single.db'))
+        sql = 'insert into feed values (NULL,{})'.format(','.join('?' * len(FEED_COLUMNS)))
+        t0 = perf_counter()
+        for event in feed:
+            cursor = conn.cursor()
+            cursor.execute(sql, tuple(event[col] for col in FEED_COLUMNS))
+            conn.commit()
+            cursor.close()
+        t_single = perf_counter() - t0
+
+        conn = connect(os.path.join(tmp, 'batched.db'))
+        reactor = StubReactor()
+        writer = BatchEventWriter(reactor, None, placeholder='?', batch_rows=batch_rows,
+                                  max_queue=n, pool_size=n, connections=[conn])
+        t0 = perf_counter()
+        for event in feed:
+            writer.add(event)
+        t_enqueue = perf_counter() - t0
+        writer.flush()
+        t0 = perf_counter()
+        for batch in reactor.batches:
+            writer.write_rows(conn, batch)
+        t_batched = perf_counter() - t0
+        rows = conn.execute('select count(*) from feed').fetchone()[0]
+
+    print(f'{n} events, batches of {batch_rows} ({rows} rows written)')
+    print(f'{"per-event":>10} {t_single * 1e3:>9.1f} ms  {n / t_single:>10.0f} events/s')
+    print(f'{"enqueue":>10} {t_enqueue * 1e3:>9.1f} ms  {t_enqueue / n * 1e6:>10.2f} us/event on the reactor')
+    print(f'{"batched":>10} {t_batched * 1e3:>9.1f} ms  {n / t_batched:>10.0f} events/s')
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+bench_sticky_index.py – sticky-TG check in the rule timer, SUB_MAP scan
+versus the STICKY_IDX reverse index.
+
+Run from the repository root (no live RYSEN instance required):
+
+    python3 tools/bench_sticky_index.py [subscribers] [legs]
+
+Builds a SUB_MAP of `subscribers` 5-tuples spread over 100 masters and
+`legs` active ON legs, then times the sticky lookup for every leg: the
+old per-leg walk over SUB_MAP (sampled on 250 legs and scaled, since
+the full pass takes close to a minute) and one STICKY_IDX.get() per
+leg. Also times the index build (startup / shard filter) and per-write
+upkeep.
+"""
+import os
+import random
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dmr_utils3.utils import bytes_3, bytes_4
+
+from bridge_helpers import build_sticky_index, sticky_index_update
+
+MASTERS = 100
+
+
+def build(subscribers, legs):
+    rnd = random.Random(1)
+    sub_map = {}
+    for i in range(subscribers):
+        system = 'SYSTEM-{}'.format(rnd.randrange(MASTERS))
+        tg = bytes_3(1000 + rnd.randrange(2000)) if rnd.random() < 0.8 else None
+        sub_map[bytes_3(2000000 + i)] = (system, rnd.choice((1, 2)), tg, 0.0, bytes_4(rnd.randrange(1 << 24)))
+    active = [('SYSTEM-{}'.format(rnd.randrange(MASTERS)), rnd.choice((1, 2)), bytes_3(1000 + rnd.randrange(2000)))
+              for _ in range(legs)]
+    return sub_map, active
+
+
+def scan(sub_map, active):
+    hits = 0
+    for system, ts, tgid in active:
+        for subscriber in sub_map:
+            entry = sub_map[subscriber]
+            if len(entry) == 5:
+                _system, _ts, _tg, _time, _peer = entry
+            elif len(entry) == 4:
+                _system, _ts, _tg, _time = entry
+            else:
+                continue
+            if _system == system and _ts == ts and _tg == tgid and _tg is not None:
+                hits += 1
+                break
+    return hits
+
+
+def lookup(index, active):
+    hits = 0
+    for key in active:
+        for subscriber in index.get(key, ()):
+            hits += 1
+            break
+    return hits
+
+
+def timed(fn):
+    t0 = perf_counter()
+    result = fn()
+    return perf_counter() - t0, result
+
+
+if __name__ == '__main__':
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    legs = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    sub_map, active = build(subscribers, legs)
+    print(f'{subscribers} subscribers, {legs} active legs')
+
+    t_build, index = timed(lambda: build_sticky_index(sub_map))
+    t_lookup, hits_idx = timed(lambda: lookup(index, active))
+    sample = active[:250]
+    t_scan, hits_scan = timed(lambda: scan(sub_map, sample))
+    assert lookup(index, sample) == hits_scan, hits_scan
+    t_scan *= len(active) / len(sample)
+
+    # Upkeep: one TG change per group call start
+    entries = list(sub_map.items())[:10000]
+    moves = [(subscriber, entry, (entry[0], entry[1], bytes_3(999), 1.0, entry[4]))
+             for subscriber, entry in entries]
+    t0 = perf_counter()
+    for subscriber, entry, new in moves:
+        sticky_index_update(index, subscriber, entry, new)
+    t_update = (perf_counter() - t0) / len(entries)
+
+    print(f'{"scan":>7} {t_scan * 1e3:>10.1f} ms  (scaled from {len(sample)} legs)')
+    print(f'{"index":>7} {t_lookup * 1e3:>10.3f} ms  sticky legs={hits_idx}')
+    print(f'{"build":>7} {t_build * 1e3:>10.1f} ms')
+    print(f'{"update":>7} {t_update * 1e9:>10.0f} ns per SUB_MAP write')
+    print(f'scan / index: {t_scan / max(t_lookup, 1e-9):.0f}x')
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+bench_sub_map_trim.py – SubMapTrimmer cost, full SUB_MAP scan versus
+subscriber_store.SubscriberBuckets.
+
+Run from the repository root (no live RYSEN instance required):
+
+    python3 tools/bench_sub_map_trim.py [subscribers] [expired_pct]
+
+Builds a SUB_MAP whose last-heard times are spread over the past day,
+with `expired_pct` percent older than the 24 hour TTL, and times one
+trim pass each way. Also reports the per-write cost of keeping the
+buckets up to date (one call per subscriber key-up).
+"""
+import os
+import random
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from subscriber_store import SubscriberBuckets, SubscriberRecord
+
+TTL = 86400
+NOW = 1800000000.0
+
+
+def build(subscribers, expired_pct):
+    rnd = random.Random(1)
+    sub_map = {}
+    for i in range(subscribers):
+        if rnd.random() * 100 < expired_pct:
+            heard = NOW - TTL - rnd.uniform(1, 3600)
+        else:
+            heard = NOW - rnd.uniform(0, TTL - 1)
+        sub_map[(2000000 + i).to_bytes(3, 'big')] = SubscriberRecord(
+            'SYSTEM-{}'.format(rnd.randrange(300)), rnd.choice((1, 2)), None, heard, None)
+    return sub_map
+
+
+def scan(sub_map, expire):
+    return [_sub for _sub, _rec in sub_map.items() if _rec.time < expire]
+
+
+if __name__ == '__main__':
+    subscribers = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    expired_pct = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    sub_map = build(subscribers, expired_pct)
+    expire = NOW - TTL
+    print(f'{subscribers} subscribers, {expired_pct}% past the TTL')
+
+    t0 = perf_counter()
+    buckets = SubscriberBuckets.build(sub_map)
+    t_build = perf_counter() - t0
+
+    t0 = perf_counter()
+    by_scan = scan(sub_map, expire)
+    t_scan = perf_counter() - t0
+
+    t0 = perf_counter()
+    by_bucket = buckets.expired(sub_map, expire)
+    t_bucket = perf_counter() - t0
+    assert sorted(by_scan) == sorted(by_bucket)
+
+    moves = list(sub_map.items())[:20000]
+    t0 = perf_counter()
+    for _sub, _rec in moves:
+        buckets.update(_sub, _rec.time, NOW)
+    t_update = (perf_counter() - t0) / len(moves)
+
+    print(f'{"scan":>7} {t_scan * 1e3:>9.2f} ms  expired={len(by_scan)}')
+    print(f'{"buckets":>7} {t_bucket * 1e3:>9.2f} ms  expired={len(by_bucket)} buckets={buckets.bucket_count()}')
+    print(f'{"build":>7} {t_build * 1e3:>9.2f} ms')
+    print(f'{"update":>7} {t_update * 1e9:>9.0f} ns per key-up')
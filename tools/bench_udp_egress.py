@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+bench_udp_egress.py – loopback benchmark for GLOBAL BATCH_EGRESS.
+
+Run from the repository root (no live RYSEN instance required):
+
+    python3 tools/bench_udp_egress.py [peers ...]
+
+Models a master repeating one 55-byte DMRD frame to every connected peer.
+The per-packet path is one Twisted udp.Port.write() per peer, as
+HBSYSTEM.send_peer does with batching off; the batched path queues the
+frame's datagrams through udp_egress.EgressBatch and flushes them with
+sendmmsg. Peers are spread over a handful of loopback receiver sockets
+that are never read, so the figures are sender-side cost only. The
+reactor is never started; listenUDP only binds the port.
+"""
+import os
+import socket
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from twisted.internet import reactor
+from twisted.internet.protocol import DatagramProtocol
+
+import udp_egress
+from udp_egress import EgressBatch
+
+RECEIVERS = 16
+
+
+class CountingPort:
+    """Wrap a bound twisted udp.Port and count its write() syscalls."""
+
+    def __init__(self):
+        self.port = reactor.listenUDP(0, DatagramProtocol(), interface='127.0.0.1')
+        self.socket = self.port.socket
+        self.writes = 0
+
+    def fileno(self):
+        return self.port.fileno()
+
+    def write(self, packet, addr):
+        self.writes += 1
+        self.port.write(packet, addr)
+
+
+def bench(peers, frames=200):
+    receivers = []
+    for _ in range(RECEIVERS):
+        rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        rx.bind(('127.0.0.1', 0))
+        receivers.append(rx)
+    addrs = [receivers[i % RECEIVERS].getsockname() for i in range(peers)]
+    frame = b'DMRD' + bytes(51)
+
+    tx = CountingPort()
+    t0 = perf_counter()
+    for _ in range(frames):
+        for addr in addrs:
+            tx.write(frame, addr)
+    direct = perf_counter() - t0
+    direct_calls = tx.writes
+
+    egress = EgressBatch()
+
+    def route():
+        for addr in addrs:
+            egress.write(tx, frame, addr)
+
+    batched_route = egress.wrap(route)
+    t0 = perf_counter()
+    for _ in range(frames):
+        batched_route()
+    batched = perf_counter() - t0
+
+    tx.port.stopListening()
+    for rx in receivers:
+        rx.close()
+    return direct, direct_calls / frames, batched, egress.syscalls / frames, frames
+
+
+if __name__ == '__main__':
+    sizes = [int(a) for a in sys.argv[1:]] or [100, 500, 1000]
+    print('sendmmsg available: {}'.format(udp_egress.sendmmsg_available()))
+    print(f'{"peers":>6} {"direct sys/frame":>17} {"direct frames/s":>16} '
+          f'{"batch sys/frame":>16} {"batch frames/s":>15} {"speedup":>8}')
+    for size in sizes:
+        direct, direct_sc, batched, batch_sc, n = bench(size)
+        print(f'{size:>6} {direct_sc:>17.0f} {n / direct:>16.0f} '
+              f'{batch_sc:>16.0f} {n / batched:>15.0f} {direct / batched:>7.1f}x')
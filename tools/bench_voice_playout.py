@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+bench_voice_playout.py – reactor cost of concurrent canned voice streams
+under PlayoutScheduler (voice_playout), one shared 60 ms timer.
+
+Run from the repository root (no live RYSEN instance required):
+
+    python3 tools/bench_voice_playout.py [streams] [frames]
+
+Plays streams announcements of frames packets each on a fake clock and
+reports the CPU time per tick and per frame, plus the number of reactor
+timers outstanding. The old design ran one sleeping thread per stream and
+a callFromThread + Event round trip per frame.
+"""
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from twisted.internet.task import Clock
+
+from voice_playout import FRAME_S, PlayoutScheduler
+
+
+def best(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = perf_counter()
+        result = fn()
+        times.append(perf_counter() - t0)
+    return min(times), result
+
+
+def run(streams, frames):
+    clock = Clock()
+    playout = PlayoutScheduler(clock)
+    sent = [0]
+
+    def send(frame):
+        sent[0] += 1
+
+    for _ in range(streams):
+        playout.play(range(frames), send, delay=FRAME_S)
+    timers = len(clock.getDelayedCalls())
+    ticks = 0
+    while clock.getDelayedCalls():
+        clock.advance(FRAME_S)
+        ticks += 1
+    return sent[0], ticks, timers
+
+
+if __name__ == '__main__':
+    streams = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    elapsed, (sent, ticks, timers) = best(lambda: run(streams, frames))
+    print(f'{streams} streams x {frames} frames: {sent} frames in {ticks} ticks, {timers} reactor timer(s)')
+    print(f'{elapsed / ticks * 1e3:8.3f} ms per tick  {elapsed / sent * 1e6:6.2f} us per frame (scheduler only)')
@@ -22,7 +22,12 @@ What is tested
    equivalent O(N*M) full scan (correctness parity).
 6. Removing a bridge that does not exist does not raise an exception.
 7. Index is consistent after a sequence of add / remove / replace operations.
+8. BRIDGE_IDX_KEYS (the bridge_name -> keys reverse map) matches a full
+   rebuild after a randomised add / remove / replace run over 10k+ bridges.
+9. Timing at 10k+ bridges: removing one bridge via the reverse map is
+   compared against the old full-key scan.
 """
+import random
 import sys
 import traceback
 from time import time
@@ -35,22 +40,29 @@ from time import time
 # Simulate the module-level globals that the index helpers depend on
 BRIDGES = {}
 BRIDGE_IDX = {}
+BRIDGE_IDX_KEYS = {}
 
 # ---- replicated helpers (copy of the live code) ---------------------------
 
 def _idx_add_bridge(bridge_name):
+    _keys = BRIDGE_IDX_KEYS.get(bridge_name)
     for e in BRIDGES.get(bridge_name, ()):
         _key = (e['SYSTEM'], e['TS'], e['TGID'])
         if _key not in BRIDGE_IDX:
             BRIDGE_IDX[_key] = set()
         BRIDGE_IDX[_key].add(bridge_name)
+        if _keys is None:
+            _keys = BRIDGE_IDX_KEYS[bridge_name] = set()
+        _keys.add(_key)
 
 
 def _idx_remove_bridge(bridge_name):
-    empty_keys = [k for k, v in BRIDGE_IDX.items() if bridge_name in v]
-    for _key in empty_keys:
-        BRIDGE_IDX[_key].discard(bridge_name)
-        if not BRIDGE_IDX[_key]:
+    for _key in BRIDGE_IDX_KEYS.pop(bridge_name, ()):
+        _names = BRIDGE_IDX.get(_key)
+        if _names is None:
+            continue
+        _names.discard(bridge_name)
+        if not _names:
             del BRIDGE_IDX[_key]
 
 
@@ -60,15 +72,30 @@ def _idx_replace_bridge(bridge_name):
 
 
 def rebuild_bridge_index():
-    global BRIDGE_IDX
+    global BRIDGE_IDX, BRIDGE_IDX_KEYS
     new_idx = {}
+    new_keys = {}
     for _bname, _entries in BRIDGES.items():
+        _keys = set()
         for e in _entries:
             _key = (e['SYSTEM'], e['TS'], e['TGID'])
             if _key not in new_idx:
                 new_idx[_key] = set()
             new_idx[_key].add(_bname)
+            _keys.add(_key)
+        if _keys:
+            new_keys[_bname] = _keys
     BRIDGE_IDX = new_idx
+    BRIDGE_IDX_KEYS = new_keys
+
+
+def _full_scan_remove_bridge(bridge_name):
+    """The pre-reverse-map removal: scan every key for *bridge_name*."""
+    empty_keys = [k for k, v in BRIDGE_IDX.items() if bridge_name in v]
+    for _key in empty_keys:
+        BRIDGE_IDX[_key].discard(bridge_name)
+        if not BRIDGE_IDX[_key]:
+            del BRIDGE_IDX[_key]
 
 
 # ---- helpers ---------------------------------------------------------------
@@ -120,9 +147,10 @@ _failures = []
 
 
 def _test(name, fn):
-    global BRIDGES, BRIDGE_IDX
+    global BRIDGES, BRIDGE_IDX, BRIDGE_IDX_KEYS
     BRIDGES = {}
     BRIDGE_IDX = {}
+    BRIDGE_IDX_KEYS = {}
     try:
         fn()
         print(f'  PASS  {name}')
@@ -298,6 +326,87 @@ def test_many_systems_lookup():
         f'Inactive system unexpectedly returned: full={full2} indexed={indexed2}')
 
 
+def _snapshot():
+    return ({k: set(v) for k, v in BRIDGE_IDX.items()},
+            {k: set(v) for k, v in BRIDGE_IDX_KEYS.items()})
+
+
+def _build_scale(n_bridges, n_systems=50):
+    """n_bridges TG bridges, each with legs on 4 of n_systems systems."""
+    rng = random.Random(n_bridges)
+    for i in range(n_bridges):
+        tg = (1000 + i).to_bytes(3, 'big')
+        BRIDGES[str(1000 + i)] = [
+            _entry(f'MASTER-{rng.randrange(n_systems)}', rng.choice((1, 2)), tg)
+            for _ in range(4)]
+    rebuild_bridge_index()
+
+
+def test_reverse_map_parity_at_scale():
+    """
+    10k+ bridges, 2000 random add / remove / replace operations: the
+    incrementally maintained BRIDGE_IDX and BRIDGE_IDX_KEYS must equal a
+    from-scratch rebuild.
+    """
+    _build_scale(12000)
+    rng = random.Random(7)
+    next_name = 50000
+    for _ in range(2000):
+        op = rng.randrange(3)
+        if op == 0:
+            name = str(next_name)
+            next_name += 1
+            tg = next_name.to_bytes(3, 'big')
+            BRIDGES[name] = [_entry(f'MASTER-{rng.randrange(50)}', 1, tg)
+                             for _ in range(rng.randrange(1, 5))]
+            _idx_add_bridge(name)
+        elif op == 1:
+            name = rng.choice(list(BRIDGES))
+            _idx_remove_bridge(name)
+            del BRIDGES[name]
+        else:
+            name = rng.choice(list(BRIDGES))
+            BRIDGES[name].append(_entry(f'MASTER-{rng.randrange(50)}', 2, BRIDGES[name][0]['TGID']))
+            BRIDGES[name].pop(0)
+            _idx_replace_bridge(name)
+
+    incremental = _snapshot()
+    rebuild_bridge_index()
+    rebuilt = _snapshot()
+    assert incremental[0] == rebuilt[0], 'BRIDGE_IDX drifted from a full rebuild'
+    assert incremental[1] == rebuilt[1], 'BRIDGE_IDX_KEYS drifted from a full rebuild'
+
+
+def test_remove_timing_at_scale():
+    """
+    Remove 200 bridges out of 20k with the reverse map and, on an
+    identical index, with the old full-key scan. Both must leave the same
+    index; the reverse map must be at least 10x faster.
+    """
+    _build_scale(20000)
+    victims = random.Random(3).sample(sorted(BRIDGES), 200)
+    baseline_idx = {k: set(v) for k, v in BRIDGE_IDX.items()}
+
+    t0 = time()
+    for name in victims:
+        _idx_remove_bridge(name)
+    t_reverse = time() - t0
+    after_reverse = {k: set(v) for k, v in BRIDGE_IDX.items()}
+
+    BRIDGE_IDX.clear()
+    BRIDGE_IDX.update(baseline_idx)
+    t0 = time()
+    for name in victims:
+        _full_scan_remove_bridge(name)
+    t_scan = time() - t0
+
+    assert after_reverse == BRIDGE_IDX, 'reverse-map and full-scan removal disagree'
+    print(f'        {len(baseline_idx)} keys: reverse map {t_reverse * 1e6 / len(victims):.1f}us/bridge, '
+          f'full scan {t_scan * 1e6 / len(victims):.1f}us/bridge')
+    assert t_reverse * 10 < t_scan, (
+        f'reverse map not faster: {t_reverse:.4f}s vs full scan {t_scan:.4f}s')
+
+
 # ---------------------------------------------------------------------------
 # Run
 # ---------------------------------------------------------------------------
@@ -314,6 +423,8 @@ if __name__ == '__main__':
         ('remove_nonexistent',      test_remove_nonexistent_bridge),
         ('sequence_consistency',    test_sequence_consistency),
         ('many_systems_lookup',     test_many_systems_lookup),
+        ('reverse_map_parity_10k',  test_reverse_map_parity_at_scale),
+        ('remove_timing_20k',       test_remove_timing_at_scale),
     ]
 
     for name, fn in tests:
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+###############################################################################
+#   Batched UDP egress for the router (GLOBAL BATCH_EGRESS)
+#   Copyright (C) 2026 Shane Daley, M0VUB <shane@freestar.network>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+###############################################################################
+'''
+While one inbound datagram is being routed, DMRD writes made through
+EGRESS.write() are queued per transport instead of costing one sendto()
+each. When the outermost wrapped datagramReceived returns, every queue is
+flushed with Linux sendmmsg(2), up to BATCH_MAX datagrams per syscall.
+Where sendmmsg is not available, or a batch comes up short, the rest of
+the queue goes out through plain transport.write(), so the only visible
+difference is the syscall count.
+'''
+
+import ctypes
+import ctypes.util
+import logging
+import socket
+import struct
+import sys
+
+logger = logging.getLogger(__name__)
+
+# UIO_MAXIOV: the kernel caps a single sendmmsg() at this many messages
+BATCH_MAX = 1024
+# Encoded sockaddrs kept per (family, address) before the cache is reset
+SOCKADDR_CACHE_MAX = 4096
+
+
+class _msghdr(ctypes.Structure):
+    _fields_ = [
+        ('msg_name', ctypes.c_void_p),
+        ('msg_namelen', ctypes.c_uint32),
+        ('msg_iov', ctypes.c_void_p),
+        ('msg_iovlen', ctypes.c_size_t),
+        ('msg_control', ctypes.c_void_p),
+        ('msg_controllen', ctypes.c_size_t),
+        ('msg_flags', ctypes.c_int),
+    ]
+
+
+class _mmsghdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _msghdr), ('msg_len', ctypes.c_uint)]
+
+
+def _mmsghdr_struct():
+    # Native struct layout matching _mmsghdr, so a whole batch can be packed
+    # into one bytearray without building ctypes objects per datagram
+    _fmt = 'PIPNPNi'
+    _fmt += '{}x'.format(ctypes.sizeof(_msghdr) - struct.calcsize(_fmt)) + 'I'
+    _fmt += '{}x'.format(ctypes.sizeof(_mmsghdr) - struct.calcsize(_fmt))
+    return struct.Struct(_fmt)
+
+
+_IOVEC = struct.Struct('PN')
+_MMSGHDR = _mmsghdr_struct()
+
+
+def _load_sendmmsg():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        _fn = _libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    _fn.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+    _fn.restype = ctypes.c_int
+    return _fn
+
+
+_sendmmsg = _load_sendmmsg()
+_SOCKADDRS = {}
+
+
+def sendmmsg_available():
+    return _sendmmsg is not None
+
+
+def encode_sockaddr(_family, _addr):
+    '''
+    Pack an (ip, port) tuple as a struct sockaddr for the given socket
+    family. IPv4 addresses on an AF_INET6 socket are v4-mapped.
+    '''
+    _key = (_family, _addr)
+    _name = _SOCKADDRS.get(_key)
+    if _name is None:
+        _host, _port = _addr[0], _addr[1]
+        if _family == socket.AF_INET6:
+            if ':' not in _host:
+                _host = '::ffff:' + _host
+            _name = b''.join([struct.pack('=H', socket.AF_INET6), struct.pack('!HI', _port, 0),
+                              socket.inet_pton(socket.AF_INET6, _host), struct.pack('=I', 0)])
+        else:
+            _name = b''.join([struct.pack('=H', socket.AF_INET), struct.pack('!H', _port),
+                              socket.inet_pton(socket.AF_INET, _host), bytes(8)])
+        if len(_SOCKADDRS) >= SOCKADDR_CACHE_MAX:
+            _SOCKADDRS.clear()
+        _SOCKADDRS[_key] = _name
+    return _name
+
+
+def send_batch(_transport, _queue):
+    '''
+    Send [(packet, (ip, port)), ...] on a Twisted UDP transport, in order.
+    Returns the number of syscalls used.
+    '''
+    _count = len(_queue)
+    if _sendmmsg is None or _count < 2:
+        for _packet, _addr in _queue:
+            _transport.write(_packet, _addr)
+        return _count
+
+    try:
+        _fd = _transport.fileno()
+        _family = _transport.socket.family
+        _names = [encode_sockaddr(_family, _addr) for _packet, _addr in _queue]
+    except (AttributeError, OSError, ValueError, TypeError):
+        for _packet, _addr in _queue:
+            _transport.write(_packet, _addr)
+        return _count
+
+    # One contiguous buffer each for payloads, sockaddrs, iovecs and headers
+    _packets = [_packet for _packet, _addr in _queue]
+    _payload = bytearray(b''.join(_packets))
+    _namebuf = bytearray(b''.join(_names))
+    _iovs = bytearray(_IOVEC.size * _count)
+    _msgs = bytearray(_MMSGHDR.size * _count)
+    _views = [(ctypes.c_char * len(_buf)).from_buffer(_buf) for _buf in (_payload, _namebuf, _iovs, _msgs)]
+    _payload_at, _names_at, _iovs_at, _msgs_at = [ctypes.addressof(_view) for _view in _views]
+    _p = _n = 0
+    for _i in range(_count):
+        _plen = len(_packets[_i])
+        _nlen = len(_names[_i])
+        _IOVEC.pack_into(_iovs, _i * _IOVEC.size, _payload_at + _p, _plen)
+        _MMSGHDR.pack_into(_msgs, _i * _MMSGHDR.size, _names_at + _n, _nlen,
+                           _iovs_at + _i * _IOVEC.size, 1, 0, 0, 0, 0)
+        _p += _plen
+        _n += _nlen
+
+    _sent = 0
+    _calls = 0
+    while _sent < _count:
+        _rc = _sendmmsg(_fd, _msgs_at + _sent * _MMSGHDR.size, min(_count - _sent, BATCH_MAX), 0)
+        _calls += 1
+        if _rc <= 0:
+            break
+        _sent += _rc
+    # Whatever the kernel refused goes through Twisted's own error handling
+    for _packet, _addr in _queue[_sent:]:
+        _transport.write(_packet, _addr)
+        _calls += 1
+    return _calls
+
+
+class EgressBatch:
+    '''
+    Collects datagrams per transport while a wrapped handler runs and
+    flushes them when the outermost one returns. Writes made outside a
+    wrapped handler (timers, announcements, logins) go straight out.
+    '''
+    __slots__ = ('depth', 'pending', 'datagrams', 'syscalls')
+
+    def __init__(self):
+        self.depth = 0
+        self.pending = {}
+        self.datagrams = 0
+        self.syscalls = 0
+
+    def wrap(self, _handler):
+        def _batched(*args):
+            self.depth += 1
+            try:
+                return _handler(*args)
+            finally:
+                self.depth -= 1
+                if not self.depth:
+                    self.flush()
+        return _batched
+
+    def write(self, _transport, _packet, _addr):
+        if self.depth:
+            _queue = self.pending.get(_transport)
+            if _queue is None:
+                _queue = self.pending[_transport] = []
+            _queue.append((_packet, _addr))
+        else:
+            _transport.write(_packet, _addr)
+
+    def flush(self):
+        _pending, self.pending = self.pending, {}
+        for _transport, _queue in _pending.items():
+            self.datagrams += len(_queue)
+            try:
+                self.syscalls += send_batch(_transport, _queue)
+            except Exception:
+                logger.exception('(GLOBAL) Batched egress flush failed, %s datagrams dropped', len(_queue))
+
+
+EGRESS = EgressBatch()
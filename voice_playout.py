@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+###############################################################################
+#   Paced playout of canned voice (idents, announcements, AMBE files)
+#   Copyright (C) 2026 Shane Daley, M0VUB <shane@freestar.network>
+#
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+###############################################################################
+'''
+DMR voice goes out one frame every 60 ms. Instead of a thread per
+announcement sleeping between frames, PlayoutScheduler runs one reactor
+timer that ticks every FRAME_S while anything is playing. Each tick sends
+the next frame of every active stream, so any number of concurrent
+announcements cost one callback per tick and no threads.
+
+Ticks are scheduled against a fixed epoch (epoch + n * FRAME_S) rather
+than "now + FRAME_S", so reactor jitter does not accumulate. If the
+reactor falls a whole frame or more behind, the missed ticks are skipped
+and the schedule restarts from that tick: frames are never sent in a burst.
+
+Streams that should start later (the usual 1 s after PTT release) sit in a
+bucket keyed by the tick they start on until that tick comes round, so
+the delay is rounded to whole frames. The timer stops when nothing is
+playing or waiting.
+'''
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+FRAME_S = 0.06
+
+
+class Playout(object):
+    """One stream of frames; send(frame) returns False to stop early."""
+    __slots__ = ('frames', 'send', 'name', 'sent', 'cancelled')
+
+    def __init__(self, frames, send, name):
+        self.frames = frames
+        self.send = send
+        self.name = name
+        self.sent = 0
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class PlayoutScheduler(object):
+
+    def __init__(self, reactor, frame_s=FRAME_S):
+        self._reactor = reactor
+        self.frame_s = frame_s
+        self._active = []
+        self._waiting = {}      # start tick -> [Playout]
+        self._call = None
+        self._epoch = 0.0
+        self._tick = 0
+        self.skipped = 0        # ticks skipped because the reactor was late
+
+    def __len__(self):
+        return len(self._active) + sum(len(_streams) for _streams in self._waiting.values())
+
+    def play(self, frames, send, delay=1.0, name=''):
+        """Send the frames from iterator frames, one per tick, after delay seconds."""
+        _playout = Playout(iter(frames), send, name)
+        if self._call is None:
+            self._epoch = self._reactor.seconds()
+            self._tick = 0
+            self._call = self._reactor.callLater(self.frame_s, self._run)
+        _start = self._tick + max(1, int(round(delay / self.frame_s)))
+        self._waiting.setdefault(_start, []).append(_playout)
+        return _playout
+
+    def _run(self):
+        # Tick n is due at epoch + n * frame_s. self._call stays set until
+        # the end, so a play() from inside send() does not start a second
+        # timer.
+        _now = self._reactor.seconds()
+        _late = int((_now - self._epoch) / self.frame_s) - self._tick - 1
+        if _late > 0:
+            # Whole frames late: skip those ticks and restart the schedule
+            # from now rather than burst
+            self.skipped += _late
+            self._epoch = _now - (self._tick + 1) * self.frame_s
+        self._tick += 1
+        _starting = self._waiting.pop(self._tick, None)
+        if _starting:
+            self._active.extend(_starting)
+        if self._active:
+            self._active = [_playout for _playout in self._active if self._step(_playout)]
+        self._call = None
+        if self._active or self._waiting:
+            _next = self._epoch + (self._tick + 1) * self.frame_s
+            self._call = self._reactor.callLater(max(0.0, _next - self._reactor.seconds()), self._run)
+
+    def _step(self, playout):
+        if playout.cancelled:
+            return False
+        try:
+            _frame = next(playout.frames)
+        except StopIteration:
+            logger.debug('(VOICE) %s playout ended after %s frames', playout.name, playout.sent)
+            return False
+        try:
+            if playout.send(_frame) is False:
+                return False
+        except Exception:
+            logger.exception('(VOICE) %s playout stopped by send error', playout.name)
+            return False
+        playout.sent += 1
+        return True
+
+    def stop(self):
+        if self._call is not None and self._call.active():
+            self._call.cancel()
+        self._call = None
+        self._active = []
+        self._waiting = {}